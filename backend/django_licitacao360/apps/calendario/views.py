@@ -1,13 +1,14 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
-from rest_framework.response import Response
+
+from django_licitacao360.pagination import KeysetListMixin
 
 from .models import CalendarioEvento
 from .serializers import CalendarioEventoSerializer
 
 
-class CalendarioEventoViewSet(viewsets.ModelViewSet):
+class CalendarioEventoViewSet(KeysetListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar eventos do calendário.
     Permite CRUD completo de eventos.
@@ -53,5 +54,4 @@ class CalendarioEventoViewSet(viewsets.ModelViewSet):
             except ValueError:
                 pass
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.listar(queryset, self.ordering)
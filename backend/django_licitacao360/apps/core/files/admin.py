@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import ExportacaoJob
+
+
+@admin.register(ExportacaoJob)
+class ExportacaoJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "codigo_unidade", "status", "criado_em", "concluido_em")
+    list_filter = ("tipo", "status")
+    search_fields = ("codigo_unidade", "versao_dados")
+    readonly_fields = ("criado_em", "concluido_em")
@@ -0,0 +1,52 @@
+"""
+Relatórios disponíveis para exportação assíncrona.
+
+Cada tipo informa como gerar o arquivo de uma unidade e como calcular a versão
+dos dados dessa unidade. O artefato é gravado em
+``exports/<tipo>/<codigo_unidade>/<versao>/<nome_arquivo>.xlsx`` e reaproveitado enquanto a versão
+não muda, ou seja, até a ingestão tocar a unidade.
+"""
+from dataclasses import dataclass
+from typing import IO, Callable, Dict, Optional
+
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class TipoExportacao:
+    gerar: str  # caminho da função (codigo_unidade) -> arquivo ou None
+    versao: str  # caminho da função (codigo_unidade) -> hash da versão dos dados
+    nome_arquivo: str  # nome do arquivo baixado, formatado com codigo_unidade
+    extensao: str = "xlsx"
+
+    def gerar_arquivo(self, codigo_unidade: str) -> Optional[IO[bytes]]:
+        func: Callable[[str], Optional[IO[bytes]]] = import_string(self.gerar)
+        return func(codigo_unidade)
+
+    def versao_dados(self, codigo_unidade: str) -> str:
+        return import_string(self.versao)(codigo_unidade)
+
+
+TIPOS_EXPORTACAO: Dict[str, TipoExportacao] = {
+    "pncp_unidade": TipoExportacao(
+        gerar="django_licitacao360.apps.pncp.services.export_xlsx.gerar_xlsx_unidade",
+        versao="django_licitacao360.apps.pncp.services.export_xlsx.versao_dados_unidade",
+        nome_arquivo="compras_{codigo_unidade}",
+    ),
+    "atas_unidade": TipoExportacao(
+        gerar="django_licitacao360.apps.gestao_atas.services.export_xlsx.gerar_xlsx_atas_unidade",
+        versao="django_licitacao360.apps.gestao_atas.services.export_xlsx.versao_dados_atas_unidade",
+        nome_arquivo="atas_{codigo_unidade}",
+    ),
+}
+
+
+def caminho_artefato(tipo: str, codigo_unidade: str, versao: str) -> str:
+    """Caminho do artefato no storage (relativo a MEDIA_ROOT)."""
+    definicao = TIPOS_EXPORTACAO[tipo]
+    nome = definicao.nome_arquivo.format(codigo_unidade=codigo_unidade)
+    return f"{diretorio_artefatos(tipo, codigo_unidade)}/{versao}/{nome}.{definicao.extensao}"
+
+
+def diretorio_artefatos(tipo: str, codigo_unidade: str) -> str:
+    return f"exports/{tipo}/{codigo_unidade}"
@@ -0,0 +1,46 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class ExportacaoJob(models.Model):
+    """Exportação assíncrona de relatório (gerada por task do Celery, servida por serve_file)"""
+    STATUS_PENDENTE = "pendente"
+    STATUS_PROCESSANDO = "processando"
+    STATUS_CONCLUIDO = "concluido"
+    STATUS_ERRO = "erro"
+    STATUS_EXPIRADO = "expirado"
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, "Pendente"),
+        (STATUS_PROCESSANDO, "Processando"),
+        (STATUS_CONCLUIDO, "Concluído"),
+        (STATUS_ERRO, "Erro"),
+        (STATUS_EXPIRADO, "Expirado (substituído por versão mais nova)"),
+    ]
+    STATUS_ATIVOS = (STATUS_PENDENTE, STATUS_PROCESSANDO)
+
+    id = models.UUIDField("ID", primary_key=True, default=uuid.uuid4, editable=False)
+    tipo = models.CharField("Tipo de Relatório", max_length=50)
+    codigo_unidade = models.CharField("Código da Unidade", max_length=50)
+    versao_dados = models.CharField("Versão dos Dados", max_length=40)
+    status = models.CharField("Status", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    arquivo = models.CharField("Caminho do Arquivo", max_length=255, blank=True)
+    erro = models.TextField("Erro", blank=True)
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="exportacoes", verbose_name="Solicitado por",
+    )
+    criado_em = models.DateTimeField("Criado em", auto_now_add=True)
+    concluido_em = models.DateTimeField("Concluído em", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Exportação"
+        verbose_name_plural = "Exportações"
+        ordering = ["-criado_em"]
+        indexes = [
+            models.Index(fields=["tipo", "codigo_unidade", "versao_dados"], name="files_export_versao_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} - {self.codigo_unidade} ({self.status})"
@@ -0,0 +1,32 @@
+from urllib.parse import urlencode
+
+from django.urls import reverse
+from rest_framework import serializers
+
+from .exportacoes import TIPOS_EXPORTACAO
+from .models import ExportacaoJob
+
+
+class ExportacaoSolicitacaoSerializer(serializers.Serializer):
+    """Parâmetros para solicitar uma exportação"""
+    tipo = serializers.ChoiceField(choices=sorted(TIPOS_EXPORTACAO))
+    codigo_unidade = serializers.CharField(max_length=50)
+
+
+class ExportacaoJobSerializer(serializers.ModelSerializer):
+    """Status de uma exportação; ``download_url`` aponta para serve_file quando concluída"""
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportacaoJob
+        fields = [
+            "id", "tipo", "codigo_unidade", "versao_dados", "status", "erro",
+            "criado_em", "concluido_em", "download_url",
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != ExportacaoJob.STATUS_CONCLUIDO or not obj.arquivo:
+            return None
+        url = f"{reverse('files:serve_file')}?{urlencode({'path': obj.arquivo})}"
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,102 @@
+"""
+Tasks Celery para exportações assíncronas de relatórios
+"""
+import logging
+
+from celery import shared_task
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .exportacoes import TIPOS_EXPORTACAO, caminho_artefato, diretorio_artefatos
+from .models import ExportacaoJob
+
+logger = logging.getLogger(__name__)
+
+
+def _versoes_preservadas(tipo: str, codigo_unidade: str) -> set:
+    """
+    Versão do job concluído mais recente da unidade e as dos jobs ainda em andamento.
+    Um job atrasado de uma versão antiga, ao terminar, não apaga a mais nova.
+    """
+    jobs = ExportacaoJob.objects.filter(tipo=tipo, codigo_unidade=codigo_unidade)
+    atual = (
+        jobs.filter(status=ExportacaoJob.STATUS_CONCLUIDO)
+        .order_by("-criado_em")
+        .values_list("versao_dados", flat=True)
+        .first()
+    )
+    em_andamento = jobs.filter(status__in=ExportacaoJob.STATUS_ATIVOS).values_list("versao_dados", flat=True)
+    return {atual, *em_andamento} - {None}
+
+
+def _remover_versoes_antigas(tipo: str, codigo_unidade: str) -> None:
+    """
+    Apaga os artefatos das versões substituídas da unidade e marca os jobs concluídos
+    delas como expirados, para que não devolvam um ``download_url`` sem arquivo.
+    """
+    diretorio = diretorio_artefatos(tipo, codigo_unidade)
+    preservadas = _versoes_preservadas(tipo, codigo_unidade)
+    try:
+        versoes, _ = default_storage.listdir(diretorio)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for versao in versoes:
+        if versao in preservadas:
+            continue
+        try:
+            _, arquivos = default_storage.listdir(f"{diretorio}/{versao}")
+            for nome in arquivos:
+                default_storage.delete(f"{diretorio}/{versao}/{nome}")
+        except Exception as e:
+            logger.warning(f"[Exportação] Falha ao remover versão antiga {diretorio}/{versao}: {e}")
+            continue
+        ExportacaoJob.objects.filter(
+            tipo=tipo, codigo_unidade=codigo_unidade, versao_dados=versao, status=ExportacaoJob.STATUS_CONCLUIDO,
+        ).update(status=ExportacaoJob.STATUS_EXPIRADO, arquivo="")
+
+
+@shared_task(bind=True, soft_time_limit=1800, time_limit=2100)
+def task_gerar_exportacao(self, job_id: str) -> dict:
+    """
+    Gera o artefato de um ExportacaoJob e o grava no storage.
+
+    Se outro job já gerou o artefato da mesma versão, apenas reaproveita o arquivo.
+    """
+    job = ExportacaoJob.objects.get(pk=job_id)
+    definicao = TIPOS_EXPORTACAO[job.tipo]
+    caminho = caminho_artefato(job.tipo, job.codigo_unidade, job.versao_dados)
+
+    ExportacaoJob.objects.filter(pk=job.pk).update(status=ExportacaoJob.STATUS_PROCESSANDO)
+    try:
+        if not default_storage.exists(caminho):
+            arquivo = definicao.gerar_arquivo(job.codigo_unidade)
+            if arquivo is None:
+                raise ValueError(f"Nenhum dado encontrado para a unidade {job.codigo_unidade}")
+            try:
+                salvo = default_storage.save(caminho, File(arquivo))
+            finally:
+                arquivo.close()
+            if salvo != caminho:
+                # Outro worker gravou a mesma versão ao mesmo tempo: fica com o primeiro
+                default_storage.delete(salvo)
+    except Exception as e:
+        logger.error(f"[Exportação] Job {job_id} ({job.tipo}/{job.codigo_unidade}) falhou: {e}", exc_info=True)
+        ExportacaoJob.objects.filter(pk=job.pk).update(
+            status=ExportacaoJob.STATUS_ERRO,
+            erro=str(e),
+            concluido_em=timezone.now(),
+        )
+        return {"job_id": str(job_id), "status": ExportacaoJob.STATUS_ERRO, "erro": str(e)}
+
+    ExportacaoJob.objects.filter(pk=job.pk).update(
+        status=ExportacaoJob.STATUS_CONCLUIDO,
+        arquivo=caminho,
+        concluido_em=timezone.now(),
+    )
+    logger.info(f"[Exportação] Job {job_id} concluído: {caminho}")
+    try:
+        _remover_versoes_antigas(job.tipo, job.codigo_unidade)
+    except Exception as e:
+        logger.warning(f"[Exportação] Falha ao limpar versões antigas de {job.tipo}/{job.codigo_unidade}: {e}")
+    return {"job_id": str(job_id), "status": ExportacaoJob.STATUS_CONCLUIDO, "arquivo": caminho}
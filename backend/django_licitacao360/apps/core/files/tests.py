@@ -0,0 +1,178 @@
+"""
+Testes das exportações assíncronas (criação do job, reaproveitamento e task)
+"""
+import io
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import tasks, views
+from .exportacoes import TipoExportacao, caminho_artefato
+from .models import ExportacaoJob
+from .serializers import ExportacaoJobSerializer
+
+VERSAO = "a" * 40
+
+
+class CriarExportacaoTest(SimpleTestCase):
+    """POST /api/files/exportacoes/: um job por versão dos dados"""
+
+    def _post(self, concluido=None, em_andamento=None, artefato_existe=True):
+        mesma_versao = MagicMock()
+        mesma_versao.filter.side_effect = lambda **filtro: MagicMock(
+            first=MagicMock(return_value=concluido if "status" in filtro else em_andamento)
+        )
+        definicao = MagicMock()
+        definicao.versao_dados.return_value = VERSAO
+        request = APIRequestFactory().post(
+            "/api/files/exportacoes/", {"tipo": "pncp_unidade", "codigo_unidade": " 787010 "}, format="json"
+        )
+        force_authenticate(request, user=get_user_model()(username="analista"))
+
+        with patch.dict(views.TIPOS_EXPORTACAO, {"pncp_unidade": definicao}), \
+                patch.object(ExportacaoJob.objects, "filter", return_value=mesma_versao) as filtro, \
+                patch.object(ExportacaoJob.objects, "create", side_effect=lambda **campos: ExportacaoJob(**campos)) as criar, \
+                patch.object(views.default_storage, "exists", return_value=artefato_existe), \
+                patch.object(views.transaction, "on_commit") as on_commit:
+            response = views.criar_exportacao(request)
+        return response, filtro, criar, on_commit, definicao
+
+    def test_cria_job_e_agenda_task(self):
+        response, filtro, criar, on_commit, definicao = self._post()
+
+        self.assertEqual(response.status_code, 202)
+        definicao.versao_dados.assert_called_once_with("787010")
+        filtro.assert_called_once_with(tipo="pncp_unidade", codigo_unidade="787010", versao_dados=VERSAO)
+        self.assertEqual(criar.call_args.kwargs["versao_dados"], VERSAO)
+        self.assertEqual(response.data["status"], ExportacaoJob.STATUS_PENDENTE)
+        on_commit.assert_called_once()
+
+    def test_artefato_da_mesma_versao_e_reaproveitado(self):
+        concluido = ExportacaoJob(
+            tipo="pncp_unidade",
+            codigo_unidade="787010",
+            versao_dados=VERSAO,
+            status=ExportacaoJob.STATUS_CONCLUIDO,
+            arquivo=caminho_artefato("pncp_unidade", "787010", VERSAO),
+        )
+        response, _, criar, on_commit, _ = self._post(concluido=concluido)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(concluido.pk))
+        self.assertIn("/api/files/serve/?path=exports%2Fpncp_unidade%2F787010", response.data["download_url"])
+        criar.assert_not_called()
+        on_commit.assert_not_called()
+
+    def test_artefato_apagado_gera_novo_job(self):
+        concluido = ExportacaoJob(status=ExportacaoJob.STATUS_CONCLUIDO, arquivo="exports/x.xlsx")
+        response, _, criar, on_commit, _ = self._post(concluido=concluido, artefato_existe=False)
+
+        self.assertEqual(response.status_code, 202)
+        criar.assert_called_once()
+        on_commit.assert_called_once()
+
+    def test_job_em_andamento_da_mesma_versao_e_devolvido(self):
+        em_andamento = ExportacaoJob(tipo="pncp_unidade", codigo_unidade="787010", versao_dados=VERSAO)
+        response, _, criar, on_commit, _ = self._post(em_andamento=em_andamento)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["id"], str(em_andamento.pk))
+        criar.assert_not_called()
+        on_commit.assert_not_called()
+
+
+class TaskGerarExportacaoTest(SimpleTestCase):
+    """task_gerar_exportacao: grava o artefato da versão ou registra o erro"""
+
+    def _executar(self, arquivo=None, artefato_existe=False, erro=None):
+        job = ExportacaoJob(tipo="pncp_unidade", codigo_unidade="787010", versao_dados=VERSAO)
+        caminho = caminho_artefato("pncp_unidade", "787010", VERSAO)
+        storage = MagicMock()
+        storage.exists.return_value = artefato_existe
+        storage.save.return_value = caminho
+
+        with patch.object(ExportacaoJob.objects, "get", return_value=job), \
+                patch.object(ExportacaoJob.objects, "filter") as filtro, \
+                patch.object(TipoExportacao, "gerar_arquivo", return_value=arquivo, side_effect=erro) as gerar, \
+                patch.object(tasks, "default_storage", storage), \
+                patch.object(tasks, "_remover_versoes_antigas") as remover:
+            resultado = tasks.task_gerar_exportacao.run(str(job.pk))
+        atualizacoes = [chamada.kwargs for chamada in filtro.return_value.update.call_args_list]
+        return resultado, atualizacoes, gerar, storage, remover, caminho
+
+    def test_sucesso_grava_artefato_e_conclui_job(self):
+        arquivo = io.BytesIO(b"xlsx")
+        resultado, atualizacoes, gerar, storage, remover, caminho = self._executar(arquivo=arquivo)
+
+        self.assertEqual(resultado["status"], ExportacaoJob.STATUS_CONCLUIDO)
+        self.assertEqual(resultado["arquivo"], caminho)
+        gerar.assert_called_once_with("787010")
+        self.assertEqual(storage.save.call_args.args[0], caminho)
+        self.assertTrue(arquivo.closed)
+        remover.assert_called_once_with("pncp_unidade", "787010")
+        self.assertEqual(atualizacoes[0]["status"], ExportacaoJob.STATUS_PROCESSANDO)
+        self.assertEqual(atualizacoes[-1]["status"], ExportacaoJob.STATUS_CONCLUIDO)
+        self.assertEqual(atualizacoes[-1]["arquivo"], caminho)
+
+    def test_artefato_existente_nao_e_gerado_de_novo(self):
+        resultado, atualizacoes, gerar, storage, _, caminho = self._executar(artefato_existe=True)
+
+        self.assertEqual(resultado["status"], ExportacaoJob.STATUS_CONCLUIDO)
+        gerar.assert_not_called()
+        storage.save.assert_not_called()
+        self.assertEqual(atualizacoes[-1]["arquivo"], caminho)
+
+    def test_unidade_sem_dados_marca_erro(self):
+        resultado, atualizacoes, _, storage, _, _ = self._executar(arquivo=None)
+
+        self.assertEqual(resultado["status"], ExportacaoJob.STATUS_ERRO)
+        self.assertIn("787010", atualizacoes[-1]["erro"])
+        self.assertEqual(atualizacoes[-1]["status"], ExportacaoJob.STATUS_ERRO)
+        storage.save.assert_not_called()
+
+    def test_falha_na_geracao_marca_erro(self):
+        resultado, atualizacoes, *_ = self._executar(erro=RuntimeError("banco indisponível"))
+
+        self.assertEqual(resultado["status"], ExportacaoJob.STATUS_ERRO)
+        self.assertEqual(atualizacoes[-1]["erro"], "banco indisponível")
+
+    def test_falha_na_limpeza_nao_desfaz_a_conclusao(self):
+        with patch.object(tasks, "_remover_versoes_antigas", side_effect=OSError("storage")):
+            resultado, atualizacoes, *_ = self._executar(artefato_existe=True)
+
+        self.assertEqual(resultado["status"], ExportacaoJob.STATUS_CONCLUIDO)
+        self.assertEqual(atualizacoes[-1]["status"], ExportacaoJob.STATUS_CONCLUIDO)
+
+    def _remover(self, versoes, preservadas):
+        storage = MagicMock()
+        storage.listdir.side_effect = lambda caminho: (
+            (versoes, []) if caminho.endswith("787010") else ([], ["compras_787010.xlsx"])
+        )
+        with patch.object(tasks, "default_storage", storage), \
+                patch.object(tasks, "_versoes_preservadas", return_value=set(preservadas)), \
+                patch.object(ExportacaoJob.objects, "filter") as filtro:
+            tasks._remover_versoes_antigas("pncp_unidade", "787010")
+        return storage, filtro
+
+    def test_remove_apenas_versoes_antigas_e_expira_seus_jobs(self):
+        storage, filtro = self._remover(["antiga", VERSAO], [VERSAO])
+
+        storage.delete.assert_called_once_with("exports/pncp_unidade/787010/antiga/compras_787010.xlsx")
+        self.assertEqual(filtro.call_args.kwargs["versao_dados"], "antiga")
+        self.assertEqual(filtro.call_args.kwargs["status"], ExportacaoJob.STATUS_CONCLUIDO)
+        filtro.return_value.update.assert_called_once_with(status=ExportacaoJob.STATUS_EXPIRADO, arquivo="")
+
+    def test_job_atrasado_nao_apaga_versao_mais_nova_nem_em_andamento(self):
+        storage, filtro = self._remover(["nova", "gerando"], ["nova", "gerando"])
+
+        storage.delete.assert_not_called()
+        filtro.assert_not_called()
+
+    def test_job_expirado_nao_tem_download_url(self):
+        job = ExportacaoJob(
+            tipo="pncp_unidade", codigo_unidade="787010", versao_dados=VERSAO,
+            status=ExportacaoJob.STATUS_EXPIRADO, arquivo="",
+        )
+        self.assertIsNone(ExportacaoJobSerializer(job).data["download_url"])
@@ -5,5 +5,7 @@ app_name = "files"
 
 urlpatterns = [
     path("serve/", views.serve_file, name="serve_file"),
+    path("exportacoes/", views.criar_exportacao, name="criar_exportacao"),
+    path("exportacoes/<uuid:job_id>/", views.status_exportacao, name="status_exportacao"),
 ]
 
@@ -2,6 +2,7 @@
 View genérica para servir arquivos de mídia com autenticação
 """
 import os
+from django.db import transaction
 from django.http import FileResponse, Http404
 from django.core.files.storage import default_storage
 from rest_framework.decorators import api_view, permission_classes
@@ -9,6 +10,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from .exportacoes import TIPOS_EXPORTACAO
+from .models import ExportacaoJob
+from .serializers import ExportacaoJobSerializer, ExportacaoSolicitacaoSerializer
+
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -66,6 +71,8 @@ def serve_file(request):
             content_type = "image/jpeg"
         elif filename.lower().endswith(".png"):
             content_type = "image/png"
+        elif filename.lower().endswith(".xlsx"):
+            content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         
         # Criar resposta
         response = FileResponse(
@@ -88,3 +95,64 @@ def serve_file(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def criar_exportacao(request):
+    """
+    Solicita a exportação de um relatório por unidade.
+
+    Body: {"tipo": "pncp_unidade" | "atas_unidade", "codigo_unidade": "787000"}
+
+    Se o artefato da versão atual dos dados já existe, responde 200 com o job concluído
+    (e o download_url); se há um job em andamento para a mesma versão, responde 202 com
+    ele; senão cria um job, dispara a task e responde 202.
+    """
+    entrada = ExportacaoSolicitacaoSerializer(data=request.data)
+    entrada.is_valid(raise_exception=True)
+    tipo = entrada.validated_data["tipo"]
+    codigo_unidade = entrada.validated_data["codigo_unidade"].strip()
+
+    versao = TIPOS_EXPORTACAO[tipo].versao_dados(codigo_unidade)
+    mesma_versao = ExportacaoJob.objects.filter(
+        tipo=tipo, codigo_unidade=codigo_unidade, versao_dados=versao
+    )
+
+    concluido = mesma_versao.filter(status=ExportacaoJob.STATUS_CONCLUIDO).first()
+    if concluido and default_storage.exists(concluido.arquivo):
+        return Response(ExportacaoJobSerializer(concluido, context={"request": request}).data)
+
+    em_andamento = mesma_versao.filter(
+        status__in=ExportacaoJob.STATUS_ATIVOS
+    ).first()
+    if em_andamento:
+        return Response(
+            ExportacaoJobSerializer(em_andamento, context={"request": request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    from .tasks import task_gerar_exportacao
+
+    job = ExportacaoJob.objects.create(
+        tipo=tipo,
+        codigo_unidade=codigo_unidade,
+        versao_dados=versao,
+        solicitado_por=request.user if request.user.is_authenticated else None,
+    )
+    transaction.on_commit(lambda: task_gerar_exportacao.delay(str(job.pk)))
+    return Response(
+        ExportacaoJobSerializer(job, context={"request": request}).data,
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def status_exportacao(request, job_id):
+    """Consulta o status de uma exportação (com download_url quando concluída)."""
+    try:
+        job = ExportacaoJob.objects.get(pk=job_id)
+    except ExportacaoJob.DoesNotExist:
+        raise Http404("Exportação não encontrada")
+    return Response(ExportacaoJobSerializer(job, context={"request": request}).data)
@@ -0,0 +1,233 @@
+"""
+Upsert em lote (INSERT ... ON CONFLICT DO UPDATE) em qualquer modelo com restrição única.
+
+Cada lote é gravado em um único comando SQL. A cláusula ``WHERE ... IS DISTINCT FROM``
+evita reescrever linhas idênticas, e o ``RETURNING (xmax = 0)`` permite separar
+linhas inseridas, atualizadas e inalteradas sem consultas adicionais.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from django.db import DatabaseError, connection, models, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+def empty_stats() -> Dict[str, int]:
+    """Contadores retornados por todas as funções de upsert."""
+    return {"inseridas": 0, "atualizadas": 0, "inalteradas": 0, "ignoradas": 0}
+
+
+def _chunks(rows: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def concrete_fields(model, row: Mapping[str, Any]) -> List[models.Field]:
+    """Campos concretos do modelo presentes no dicionário (por attname ou name)."""
+    return [
+        field for field in model._meta.concrete_fields
+        if field.attname in row or field.name in row
+    ]
+
+
+def build_upsert_sql(
+    model,
+    fields: Sequence[models.Field],
+    conflict_fields: Sequence[str],
+    update_fields: Sequence[str],
+    num_rows: int,
+    returning_pk: bool = False,
+    touch_fields: Sequence[str] = (),
+) -> str:
+    """
+    Monta o comando ``INSERT ... ON CONFLICT`` para ``num_rows`` linhas.
+
+    Retorna uma linha por registro efetivamente gravado, com ``inserted = true``
+    para inserções (e a chave primária, com ``returning_pk``). Linhas cujo conteúdo
+    não mudou não são retornadas. ``touch_fields`` (ex.: ``updated_at``) são gravados
+    junto com a atualização, mas não contam como mudança.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [field.column for field in fields]
+    by_name = {f.name: f.column for f in fields}
+    by_name.update({f.attname: f.column for f in fields})
+
+    conflict_cols = [by_name[name] for name in conflict_fields]
+    update_cols = [by_name[name] for name in update_fields]
+    touch_cols = [by_name[name] for name in touch_fields]
+
+    placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    values_sql = ", ".join([placeholder] * num_rows)
+
+    sql = (
+        f"INSERT INTO {table} AS t ({', '.join(qn(c) for c in columns)}) "
+        f"VALUES {values_sql} "
+        f"ON CONFLICT ({', '.join(qn(c) for c in conflict_cols)}) "
+    )
+    if update_cols:
+        sets = ", ".join(f"{qn(c)} = EXCLUDED.{qn(c)}" for c in update_cols + touch_cols)
+        current = ", ".join(f"t.{qn(c)}" for c in update_cols)
+        excluded = ", ".join(f"EXCLUDED.{qn(c)}" for c in update_cols)
+        sql += (
+            f"DO UPDATE SET {sets} "
+            f"WHERE ROW({current}) IS DISTINCT FROM ROW({excluded}) "
+        )
+    else:
+        sql += "DO NOTHING "
+    sql += "RETURNING (xmax = 0) AS inserted"
+    if returning_pk:
+        sql += f", t.{qn(model._meta.pk.column)}"
+    return sql
+
+
+def _row_params(fields: Sequence[models.Field], row: Mapping[str, Any]) -> List[Any]:
+    params = []
+    for field in fields:
+        if field.attname in row:
+            value = row[field.attname]
+        elif field.name in row:
+            value = row[field.name]
+            if isinstance(value, models.Model):
+                value = value.pk
+        else:
+            value = field.get_default()
+        params.append(field.get_db_prep_save(value, connection))
+    return params
+
+
+def _execute_chunk(
+    model,
+    fields: Sequence[models.Field],
+    conflict_fields: Sequence[str],
+    update_fields: Sequence[str],
+    chunk: Sequence[Mapping[str, Any]],
+    pks: Optional[List[Any]] = None,
+    touch_fields: Sequence[str] = (),
+) -> Dict[str, int]:
+    stats = empty_stats()
+    sql = build_upsert_sql(
+        model,
+        fields,
+        conflict_fields,
+        update_fields,
+        len(chunk),
+        returning_pk=pks is not None,
+        touch_fields=touch_fields,
+    )
+    params: List[Any] = []
+    for row in chunk:
+        params.extend(_row_params(fields, row))
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        returned = cursor.fetchall()
+
+    if pks is not None:
+        pks.extend(row[1] for row in returned)
+    inserted = sum(1 for row in returned if row[0])
+    stats["inseridas"] = inserted
+    stats["atualizadas"] = len(returned) - inserted
+    stats["inalteradas"] = len(chunk) - len(returned)
+    return stats
+
+
+def _merge_stats(total: Dict[str, int], partial: Dict[str, int]) -> None:
+    for key, value in partial.items():
+        total[key] = total.get(key, 0) + value
+
+
+def bulk_upsert(
+    model,
+    rows: Sequence[Mapping[str, Any]],
+    conflict_fields: Sequence[str],
+    update_fields: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    label: str = "Upsert",
+    pks: Optional[List[Any]] = None,
+    touch_fields: Sequence[str] = (),
+) -> Dict[str, int]:
+    """
+    Grava ``rows`` em ``model`` usando ``INSERT ... ON CONFLICT DO UPDATE`` em lotes.
+
+    Args:
+        model: Modelo Django de destino
+        rows: Dicionários com os valores por attname (ex.: ``modalidade_id``)
+        conflict_fields: Campos da restrição única usada no ``ON CONFLICT``
+        update_fields: Campos atualizados em conflito (padrão: todos exceto os de conflito)
+        chunk_size: Quantidade de linhas por comando SQL
+        label: Prefixo usado nos logs
+        pks: Se informada, recebe a chave primária das linhas inseridas ou alteradas
+        touch_fields: Campos regravados quando a linha muda, sem entrar na comparação
+
+    Returns:
+        Dicionário com ``inseridas``, ``atualizadas``, ``inalteradas`` e ``ignoradas``.
+        Se um lote falhar, as linhas são regravadas uma a uma e apenas as inválidas
+        são contadas como ``ignoradas``.
+    """
+    stats = empty_stats()
+    if not rows:
+        return stats
+
+    # Deduplica pela chave de conflito (mantém a última ocorrência); o Postgres não
+    # aceita a mesma chave duas vezes no mesmo INSERT ... ON CONFLICT DO UPDATE.
+    unique_rows: Dict[tuple, Mapping[str, Any]] = {}
+    for row in rows:
+        unique_rows[tuple(row.get(name) for name in conflict_fields)] = row
+    deduplicated = list(unique_rows.values())
+
+    fields = concrete_fields(model, deduplicated[0])
+    if update_fields is None:
+        conflict_set = set(conflict_fields) | set(touch_fields)
+        update_fields = [
+            f.attname for f in fields
+            if f.attname not in conflict_set and f.name not in conflict_set
+        ]
+
+    for chunk in _chunks(deduplicated, max(1, chunk_size)):
+        try:
+            with transaction.atomic():
+                _merge_stats(stats, _execute_chunk(
+                    model, fields, conflict_fields, update_fields, chunk, pks=pks, touch_fields=touch_fields
+                ))
+            continue
+        except DatabaseError as e:
+            logger.warning(
+                f"[{label}] Falha no lote de {len(chunk)} linhas ({e}); regravando linha a linha"
+            )
+
+        for row in chunk:
+            try:
+                with transaction.atomic():
+                    _merge_stats(stats, _execute_chunk(
+                        model, fields, conflict_fields, update_fields, [row], pks=pks, touch_fields=touch_fields
+                    ))
+            except DatabaseError as e:
+                key = {name: row.get(name) for name in conflict_fields}
+                logger.error(f"[{label}] Erro ao gravar {model.__name__} {key}: {e}")
+                stats["ignoradas"] += 1
+
+    return stats
+
+
+def resolve_fk_ids(
+    rows: Sequence[Dict[str, Any]],
+    lookups: Mapping[str, Any],
+) -> None:
+    """
+    Anula, in-place, os IDs de FK que não existem na tabela de lookup.
+
+    Faz uma consulta ``values_list`` por tabela de lookup, sem instanciar objetos.
+    """
+    for attname, lookup_model in lookups.items():
+        ids = {row.get(attname) for row in rows if row.get(attname)}
+        if not ids:
+            continue
+        validos = set(
+            lookup_model.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        for row in rows:
+            if row.get(attname) and row[attname] not in validos:
+                row[attname] = None
@@ -0,0 +1,13 @@
+"""
+Impressão digital (hash) estável de um payload recebido de uma API, usada para
+saber se o conteúdo mudou desde a última sincronização.
+"""
+import hashlib
+import json
+from typing import Any, Mapping
+
+
+def fingerprint(dados: Mapping[str, Any], data_atualizacao: Any = None) -> str:
+    """SHA-1 estável dos dados (chaves ordenadas) concatenados à data de atualização."""
+    conteudo = json.dumps(dados, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(f"{conteudo}|{data_atualizacao or ''}".encode("utf-8")).hexdigest()
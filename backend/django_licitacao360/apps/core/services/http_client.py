@@ -0,0 +1,368 @@
+"""
+Cliente HTTP assíncrono compartilhado pelas integrações com APIs públicas (PNCP,
+ComprasNet).
+
+Concentra em um único lugar o que antes era repetido em cada fetcher:
+- pool de conexões (``aiohttp.TCPConnector``) reaproveitado por toda a execução
+- limitação por token bucket com ajuste AIMD: a taxa sobe aos poucos enquanto as
+  respostas são 2xx e cai pela metade em 429/5xx
+- respeito ao ``Retry-After`` e backoff exponencial com jitter
+- opcionalmente, um token bucket no Redis (``RedisTokenBucket``) compartilhado por
+  todos os processos, para um teto de requisições que não cresce com os workers
+- contadores de latência e erros por endpoint
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import aiohttp
+import redis
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {
+    "User-Agent": "licitacao360",
+    "Accept": "application/json",
+}
+
+# Limites padrão; cada integração passa os seus (ver PncpClient, ComprasNetClient)
+DEFAULT_RATE = 5.0  # requisições/s iniciais
+DEFAULT_MAX_RATE = 20.0
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_TIMEOUT = 60
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+NO_CONTENT_STATUS = {204, 404}
+
+
+class ApiRequestError(Exception):
+    """Falha definitiva de uma requisição à API (após esgotar as tentativas)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket cuja taxa segue AIMD (additive increase / multiplicative decrease).
+
+    ``acquire()`` espera até haver um token. ``on_success()`` soma ``increase`` à taxa;
+    ``on_throttle()`` multiplica a taxa por ``decrease``. A taxa fica entre
+    ``min_rate`` e ``max_rate``.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        burst: Optional[float] = None,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst if burst is not None else max(1.0, self.rate)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, pause: float = 0.0) -> None:
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._tokens = min(self._tokens, 0.0)
+        if pause > 0:
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+
+class RedisTokenBucket:
+    """
+    Token bucket guardado no Redis e consumido por todos os processos que usam a
+    mesma ``key``: ``rate`` é o teto somado de todos os workers, não por processo.
+
+    O refill e a retirada do token rodam num script Lua (atômico) com o relógio do
+    próprio Redis. Se o Redis estiver indisponível, ``acquire()`` libera a
+    requisição (fica valendo só o bucket local do cliente) e tenta o Redis de novo
+    após ``pausa_falha`` segundos.
+    """
+
+    SCRIPT = """
+        local capacidade = tonumber(ARGV[2])
+        local taxa = tonumber(ARGV[1])
+        local relogio = redis.call('TIME')
+        local agora = tonumber(relogio[1]) + tonumber(relogio[2]) / 1000000
+        local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(estado[1]) or capacidade
+        local ts = tonumber(estado[2]) or agora
+        tokens = math.min(capacidade, tokens + math.max(0, agora - ts) * taxa)
+        local espera = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            espera = (1 - tokens) / taxa
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(agora))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(capacidade / taxa * 1000) + 1000)
+        return tostring(espera)
+    """
+
+    def __init__(self, redis_client, key: str, rate: float, burst: Optional[float] = None, pausa_falha: float = 30.0):
+        self.key = key
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.pausa_falha = pausa_falha
+        self._script = redis_client.register_script(self.SCRIPT)
+        self._indisponivel_ate = 0.0
+
+    def tentar(self) -> float:
+        """Retira um token; retorna 0 se conseguiu ou os segundos até haver um."""
+        return float(self._script(keys=[self.key], args=[self.rate, self.burst]))
+
+    async def acquire(self) -> None:
+        while time.monotonic() >= self._indisponivel_ate:
+            try:
+                espera = self.tentar()
+            except redis.RedisError as exc:
+                logger.warning(f"[RedisTokenBucket] {self.key} indisponível ({exc}); seguindo sem o limite global")
+                self._indisponivel_ate = time.monotonic() + self.pausa_falha
+                return
+            if espera <= 0:
+                return
+            await asyncio.sleep(espera)
+
+
+@dataclass
+class EndpointStats:
+    """Contadores de um endpoint."""
+
+    requisicoes: int = 0
+    sucessos: int = 0
+    erros: int = 0
+    retries: int = 0
+    throttled: int = 0
+    status: Dict[int, int] = field(default_factory=dict)
+    latencia_total: float = 0.0
+    latencia_max: float = 0.0
+
+    def registrar(self, status: Optional[int], latencia: float) -> None:
+        self.requisicoes += 1
+        self.latencia_total += latencia
+        self.latencia_max = max(self.latencia_max, latencia)
+        if status is not None:
+            self.status[status] = self.status.get(status, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        media = self.latencia_total / self.requisicoes if self.requisicoes else 0.0
+        return {
+            "requisicoes": self.requisicoes,
+            "sucessos": self.sucessos,
+            "erros": self.erros,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "status": dict(self.status),
+            "latencia_media_ms": round(media * 1000, 1),
+            "latencia_max_ms": round(self.latencia_max * 1000, 1),
+        }
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpreta Retry-After em segundos ou como data HTTP."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, dt.timestamp() - time.time())
+
+
+class ApiClient:
+    """
+    Cliente assíncrono de uma API JSON. Deve ser usado como context manager::
+
+        async with ApiClient() as client:
+            payload = await client.get_json(url, params=params, endpoint="listagem")
+
+    ``get_json`` retorna o JSON decodificado, ``None`` para 204/404 e levanta
+    ``ApiRequestError`` quando a requisição falha após todas as tentativas. Com
+    ``shared_bucket``, cada tentativa também consome um token do bucket global.
+    """
+
+    # Prefixo dos logs
+    label = "API Client"
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: Optional[Dict[str, str]] = None,
+        shared_bucket: Optional[RedisTokenBucket] = None,
+    ):
+        self.bucket = AdaptiveTokenBucket(rate=rate, min_rate=min_rate, max_rate=max_rate)
+        self.shared_bucket = shared_bucket
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(1, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = dict(headers or HEADERS)
+        self.stats: Dict[str, EndpointStats] = {}
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "ApiClient":
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=self.timeout,
+            trust_env=True,
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self.stats:
+            logger.info(f"[{self.label}] Estatísticas por endpoint: {self.stats_summary()}")
+
+    def stats_summary(self) -> Dict[str, Dict[str, Any]]:
+        return {endpoint: stats.as_dict() for endpoint, stats in self.stats.items()}
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial com 'equal jitter'."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        endpoint: str = "default",
+    ) -> Any:
+        if self._session is None:
+            raise RuntimeError(f"{type(self).__name__} deve ser usado dentro de 'async with'")
+
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        last_error = "Erro desconhecido"
+        last_status: Optional[int] = None
+
+        for attempt in range(1, self.max_retries + 1):
+            if attempt > 1:
+                stats.retries += 1
+            await self.bucket.acquire()
+            if self.shared_bucket is not None:
+                await self.shared_bucket.acquire()
+            inicio = time.monotonic()
+            status: Optional[int] = None
+            wait: Optional[float] = None
+            try:
+                async with self._sem:
+                    async with self._session.get(url, params=params) as resp:
+                        status = resp.status
+                        if status in NO_CONTENT_STATUS:
+                            stats.registrar(status, time.monotonic() - inicio)
+                            stats.sucessos += 1
+                            self.bucket.on_success()
+                            return None
+
+                        if status in RETRY_STATUS:
+                            body = (await resp.text())[:240]
+                            last_error = f"API {status}: {body}"
+                            wait = _parse_retry_after(resp.headers.get("Retry-After"))
+                        elif status >= 400:
+                            body = (await resp.text())[:240]
+                            stats.registrar(status, time.monotonic() - inicio)
+                            stats.erros += 1
+                            raise ApiRequestError(f"API {status}: {body}", status=status)
+                        else:
+                            ct = (resp.headers.get("Content-Type") or "").lower()
+                            if "application/json" not in ct:
+                                preview = (await resp.text())[:240].replace("\n", " ")
+                                stats.registrar(status, time.monotonic() - inicio)
+                                stats.erros += 1
+                                raise ApiRequestError(
+                                    f"Content-Type inesperado ({ct}). Body[:240]={preview!r}",
+                                    status=status,
+                                )
+                            data = await resp.json()
+                            stats.registrar(status, time.monotonic() - inicio)
+                            stats.sucessos += 1
+                            self.bucket.on_success()
+                            return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = f"{type(e).__name__}: {e!r}"
+            except ValueError as e:
+                # JSON inválido
+                stats.registrar(status, time.monotonic() - inicio)
+                stats.erros += 1
+                raise ApiRequestError(f"JSONDecodeError: {e!r}", status=status) from e
+
+            # Resposta/erro passível de retry
+            stats.registrar(status, time.monotonic() - inicio)
+            last_status = status
+            if status in THROTTLE_STATUS:
+                stats.throttled += 1
+            if status in RETRY_STATUS:
+                self.bucket.on_throttle(pause=wait or 0.0)
+
+            if attempt == self.max_retries:
+                break
+
+            delay = wait if wait is not None else self._backoff(attempt)
+            logger.debug(
+                f"[{self.label}] {endpoint}: {last_error} (tentativa {attempt}/{self.max_retries}); "
+                f"aguardando {delay:.1f}s, taxa={self.bucket.rate:.2f} req/s"
+            )
+            await asyncio.sleep(delay)
+
+        stats.erros += 1
+        raise ApiRequestError(
+            f"Falha após {self.max_retries} tentativas: {last_error}", status=last_status
+        )
@@ -0,0 +1,19 @@
+"""
+Cliente Redis para locks e limites compartilhados entre workers.
+"""
+from urllib.parse import urlparse
+
+import redis
+from django.conf import settings
+
+
+def get_redis_client():
+    """Retorna cliente Redis usando a configuração do Celery."""
+    broker_url = getattr(settings, "CELERY_BROKER_URL", "redis://redis:6379/0")
+    parsed = urlparse(broker_url)
+    return redis.Redis(
+        host=parsed.hostname or "redis",
+        port=parsed.port or 6379,
+        db=2,  # DB diferente do broker e result backend
+        decode_responses=True,
+    )
@@ -3,6 +3,7 @@ from __future__ import annotations
 from django.core.management.base import BaseCommand
 from django_celery_beat.models import PeriodicTask, CrontabSchedule
 from django.conf import settings
+from django.db.models import Q
 
 
 class Command(BaseCommand):
@@ -21,12 +22,12 @@ class Command(BaseCommand):
         # Obter nomes das tarefas que devem estar ativas
         active_task_names = set(schedule.keys())
 
-        # Desabilitar tarefas que não estão mais no schedule (apenas para tarefas INLABS)
-        inlabs_tasks = PeriodicTask.objects.filter(
-            name__startswith="coletar_inlabs"
+        # Desabilitar tarefas que não estão mais no schedule (INLABS e sincronização por UASG)
+        old_tasks = PeriodicTask.objects.filter(
+            Q(name__startswith="coletar_inlabs") | Q(name__startswith="sync_contratos_uasg_")
         ).exclude(name__in=active_task_names)
         
-        for old_task in inlabs_tasks:
+        for old_task in old_tasks:
             old_task.enabled = False
             old_task.save()
             disabled_count += 1
@@ -24,6 +24,12 @@ from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
 from django_licitacao360.apps.imprensa_nacional.models import InlabsArticle
+from django_licitacao360.apps.imprensa_nacional.services.inlabs_http import (
+    EdicaoIndisponivel,
+    InlabsDownloadError,
+    InlabsHttpClient,
+    usar_selenium,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -87,10 +93,6 @@ class InlabsDownloadConfig:
         return path
 
 
-class InlabsDownloadError(RuntimeError):
-    """Erro específico para fluxo de download do INLABS."""
-
-
 def ensure_download_available(url: str, target_date: str) -> None:
     try:
         response = requests.head(url, allow_redirects=True, timeout=20)
@@ -268,11 +270,21 @@ def collect_marinha_articles(root_dir: Path, keyword: str) -> List[Dict[str, obj
     return results
 
 
-def fetch_inlabs_articles(config: InlabsDownloadConfig) -> Tuple[Path, List[Dict[str, object]]]:
+def download_via_http(config: InlabsDownloadConfig) -> Path:
+    """Baixa o zip com o cliente HTTP compartilhado com a app imprensa_nacional."""
+    with InlabsHttpClient(*get_credentials(), cookie_cache=config.download_root / ".inlabs_cookie.json") as client:
+        return client.download(
+            config.download_url,
+            config.download_dir / config.zip_filename,
+            max_attempts=config.max_attempts,
+            retry_delay=config.retry_delay,
+        )
+
+
+def download_via_selenium(config: InlabsDownloadConfig) -> Path:
     ensure_download_available(config.download_url, config.date_str)
     email, password = get_credentials()
     driver = build_driver(config.download_dir)
-    zip_path: Path
 
     try:
         wait = WebDriverWait(driver, 20)
@@ -289,10 +301,24 @@ def fetch_inlabs_articles(config: InlabsDownloadConfig) -> Tuple[Path, List[Dict
         submit_btn.click()
 
         ensure_login_success(wait, driver)
-        zip_path = perform_download_with_retries(driver, config)
+        return perform_download_with_retries(driver, config)
     finally:
         driver.quit()
 
+
+def fetch_inlabs_articles(config: InlabsDownloadConfig) -> Tuple[Path, List[Dict[str, object]]]:
+    get_credentials()
+    if usar_selenium():
+        zip_path = download_via_selenium(config)
+    else:
+        try:
+            zip_path = download_via_http(config)
+        except EdicaoIndisponivel:
+            raise
+        except InlabsDownloadError as exc:
+            logger.warning("Download HTTP de %s falhou (%s); tentando pelo navegador", config.zip_filename, exc)
+            zip_path = download_via_selenium(config)
+
     extracted_dir = extract_download(zip_path)
     articles = collect_marinha_articles(extracted_dir, config.keyword)
     return zip_path, articles
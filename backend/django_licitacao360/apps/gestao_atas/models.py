@@ -34,6 +34,14 @@ class Ata(models.Model):
         verbose_name = "Ata"
         verbose_name_plural = "Atas"
         ordering = ["-ano_ata", "-data_assinatura"]
+        indexes = [
+            models.Index(fields=["codigo_unidade_orgao", "ano"], name="ata_unidade_ano_idx"),
+            models.Index(fields=["codigo_unidade_orgao", "-ano_ata", "-data_assinatura"], name="ata_unidade_ordem_idx"),
+            models.Index(fields=["cnpj_orgao", "-ano_ata", "-data_assinatura"], name="ata_orgao_ordem_idx"),
+            # Parciais para as actions vigentes e canceladas
+            models.Index(fields=["vigencia_fim"], name="ata_vigentes_idx", condition=models.Q(cancelado=0)),
+            models.Index(fields=["-data_cancelamento", "-ano_ata"], name="ata_canceladas_idx", condition=models.Q(cancelado=1)),
+        ]
 
     def __str__(self):
         return f"{self.numero_ata_registro_preco}/{self.ano_ata} - {self.objeto_contratacao[:50] if self.objeto_contratacao else 'Sem objeto'}..."
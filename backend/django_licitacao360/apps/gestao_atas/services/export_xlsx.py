@@ -0,0 +1,73 @@
+"""
+Exportação XLSX das atas de uma unidade, em modo write-only do openpyxl.
+"""
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, IO, Optional
+
+import openpyxl
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from ..models import Ata
+
+EXPORT_CHUNK_SIZE = int(os.getenv("ATAS_EXPORT_CHUNK_SIZE", "2000"))
+EXPORT_SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+COLUNAS_ATAS = [
+    "numero_controle_pncp_ata", "numero_ata_registro_preco", "ano_ata",
+    "numero_controle_pncp_compra", "numero_compra", "objeto_contratacao",
+    "cnpj_orgao", "nome_orgao", "codigo_unidade_orgao", "nome_unidade_orgao",
+    "data_assinatura", "vigencia_inicio", "vigencia_fim", "cancelado",
+    "data_cancelamento", "data_publicacao_pncp", "data_atualizacao",
+]
+
+
+def _celula(value: Any) -> Any:
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def _atas_unidade(codigo_unidade: str):
+    return Ata.objects.filter(codigo_unidade_orgao=codigo_unidade)
+
+
+def gerar_xlsx_atas_unidade(codigo_unidade: str) -> Optional[IO[bytes]]:
+    """
+    Gera o XLSX com as atas da unidade (aba ``atas``).
+    Retorna o arquivo temporário posicionado no início, ou ``None`` se não há atas.
+    """
+    atas = _atas_unidade(codigo_unidade)
+    if not atas.exists():
+        return None
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("atas")
+    ws.append(COLUNAS_ATAS)
+    linhas = atas.order_by("-ano_ata", "-data_assinatura").values_list(*COLUNAS_ATAS)
+    for row in linhas.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        ws.append([_celula(value) for value in row])
+
+    arquivo = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+    try:
+        wb.save(arquivo)
+    except Exception:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo
+
+
+def versao_dados_atas_unidade(codigo_unidade: str) -> str:
+    """Hash da versão das atas da unidade; muda a cada carga que altera alguma ata."""
+    agregado = _atas_unidade(codigo_unidade).aggregate(
+        total=Count("numero_controle_pncp_ata"),
+        canceladas=Sum("cancelado"),
+        atualizacao=Max("data_atualizacao"),
+        atualizacao_global=Max("data_atualizacao_global"),
+    )
+    chave = "|".join(str(agregado[campo]) for campo in sorted(agregado))
+    return hashlib.sha1(chave.encode("utf-8")).hexdigest()
@@ -11,9 +11,10 @@ logger = logging.getLogger(__name__)
 from .models import Ata
 from .serializers import AtaSerializer, AtaListagemSerializer
 from django_licitacao360.apps.uasgs.models import Uasg
+from django_licitacao360.pagination import KeysetListMixin
 
 
-class AtaViewSet(viewsets.ModelViewSet):
+class AtaViewSet(KeysetListMixin, viewsets.ModelViewSet):
     queryset = Ata.objects.all()
     serializer_class = AtaSerializer
     permission_classes = [AllowAny]
@@ -92,10 +93,8 @@ class AtaViewSet(viewsets.ModelViewSet):
                 cancelado=0,
                 vigencia_inicio__lte=agora,
                 vigencia_fim__gte=agora
-            ).order_by('-ano_ata', '-data_assinatura')
-            
-            serializer = self.get_serializer(atas, many=True)
-            return Response(serializer.data)
+            )
+            return self.listar(atas, ['-ano_ata', '-data_assinatura'])
         except Exception as e:
             logger.error(f"Erro ao buscar atas vigentes: {str(e)}")
             return Response(
@@ -107,9 +106,8 @@ class AtaViewSet(viewsets.ModelViewSet):
     def canceladas(self, request):
         """Retorna apenas atas canceladas"""
         try:
-            atas = self.queryset.filter(cancelado=1).order_by('-data_cancelamento', '-ano_ata')
-            serializer = self.get_serializer(atas, many=True)
-            return Response(serializer.data)
+            atas = self.queryset.filter(cancelado=1)
+            return self.listar(atas, ['-data_cancelamento', '-ano_ata'])
         except Exception as e:
             logger.error(f"Erro ao buscar atas canceladas: {str(e)}")
             return Response(
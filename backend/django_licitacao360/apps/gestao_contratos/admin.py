@@ -15,6 +15,9 @@ from .models import (
     ItemContrato,
     ArquivoContrato,
     DadosManuaisContrato,
+    SincronizacaoContratos,
+    SincronizacaoJob,
+    SincronizacaoUasg,
 )
 
 
@@ -117,3 +120,33 @@ class ArquivoContratoAdmin(admin.ModelAdmin):
     search_fields = ['tipo', 'descricao', 'contrato__id']
     raw_id_fields = ['contrato']
 
+
+class SincronizacaoUasgInline(admin.TabularInline):
+    model = SincronizacaoUasg
+    extra = 0
+    can_delete = False
+    fields = ['uasg_code', 'status', 'iniciada_em', 'finalizada_em', 'erro']
+    readonly_fields = fields
+
+
+@admin.register(SincronizacaoContratos)
+class SincronizacaoContratosAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'status', 'uasgs_total', 'concorrencia', 'contratos_processados',
+        'contratos_alterados', 'iniciada_em', 'finalizada_em',
+    ]
+    list_filter = ['status']
+    readonly_fields = ['iniciada_em', 'finalizada_em']
+    inlines = [SincronizacaoUasgInline]
+
+
+@admin.register(SincronizacaoJob)
+class SincronizacaoJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'tipo', 'uasg_code', 'contrato', 'status', 'etapa',
+        'contratos_processados', 'contratos_total', 'erros', 'criado_em',
+    ]
+    list_filter = ['tipo', 'status']
+    search_fields = ['uasg_code', 'contrato__id']
+    raw_id_fields = ['contrato']
+    readonly_fields = ['criado_em', 'iniciado_em', 'concluido_em']
@@ -27,6 +27,17 @@ class Command(BaseCommand):
             type=str,
             help='ID do contrato para sincronizar detalhes',
         )
+        parser.add_argument(
+            '--detalhes',
+            action='store_true',
+            help='Com --uasg/--all, sincroniza também histórico, empenhos, itens e arquivos dos contratos (em paralelo)',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=None,
+            help='Requisições simultâneas à API na sincronização de detalhes (padrão: COMPRASNET_MAX_CONCURRENCY ou 8)',
+        )
         parser.add_argument(
             '--force',
             action='store_true',
@@ -57,6 +68,8 @@ class Command(BaseCommand):
                     f'✅ Sincronização concluída: {stats}'
                 )
             )
+            if options['detalhes']:
+                self._sync_detalhes(service, [uasg_code], options)
         
         elif options['all']:
             # Sincroniza todas as UASGs cadastradas
@@ -70,6 +83,8 @@ class Command(BaseCommand):
             
             total_stats = {
                 'contratos_processados': 0,
+                'contratos_alterados': 0,
+                'contratos_inalterados': 0,
                 'historicos': 0,
                 'empenhos': 0,
                 'itens': 0,
@@ -88,10 +103,27 @@ class Command(BaseCommand):
                     f'\n✅ Sincronização completa: {total_stats}'
                 )
             )
+            if options['detalhes']:
+                self._sync_detalhes(service, [uasg.uasg for uasg in uasgs], options)
         
         else:
             raise CommandError(
                 'Especifique --uasg, --contrato ou --all. '
                 'Use --help para mais informações.'
             )
-
+    
+    def _sync_detalhes(self, service, uasg_codes, options):
+        """Busca os dados relacionados de todos os contratos das UASGs em paralelo."""
+        from ...models import Contrato
+        
+        contratos = Contrato.objects.filter(uasg__uasg__in=uasg_codes, manual=False)
+        self.stdout.write(f'\nSincronizando detalhes de {contratos.count()} contratos...')
+        client_kwargs = {}
+        if options['concorrencia']:
+            client_kwargs['max_concurrency'] = options['concorrencia']
+        stats = service.sync_detalhes_contratos(contratos, **client_kwargs)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Detalhes sincronizados: {stats}'
+            )
+        )
@@ -9,6 +9,7 @@ from .empenho import Empenho
 from .item import ItemContrato
 from .arquivo import ArquivoContrato
 from .dados_manuais import DadosManuaisContrato
+from .sincronizacao import SincronizacaoContratos, SincronizacaoJob, SincronizacaoUasg
 
 __all__ = [
     'Contrato',
@@ -22,5 +23,8 @@ __all__ = [
     'ItemContrato',
     'ArquivoContrato',
     'DadosManuaisContrato',
+    'SincronizacaoContratos',
+    'SincronizacaoUasg',
+    'SincronizacaoJob',
 ]
 
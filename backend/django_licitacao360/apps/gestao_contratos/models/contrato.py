@@ -133,6 +133,13 @@ class Contrato(models.Model):
         help_text="Payload completo do contrato da API ComprasNet",
         verbose_name="JSON Bruto"
     )
+    raw_json_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        null=True,
+        help_text="Hash do raw_json (chaves ordenadas); contratos com o mesmo hash não são regravados",
+        verbose_name="Hash do JSON Bruto"
+    )
     
     # Campos de status de sincronização detalhada
     historico_atualizado_em = models.DateTimeField(
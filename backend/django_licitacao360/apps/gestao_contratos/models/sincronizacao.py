@@ -0,0 +1,193 @@
+"""
+Models para execuções de sincronização de contratos
+"""
+
+import uuid
+
+from django.db import models
+
+
+class SincronizacaoContratos(models.Model):
+    """
+    Uma execução da sincronização de contratos de várias UASGs.
+    Os totais são consolidados a partir de SincronizacaoUasg ao final.
+    """
+    STATUS_EXECUTANDO = 'executando'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_CONCLUIDA_COM_ERROS = 'concluida_com_erros'
+    STATUS_CHOICES = [
+        (STATUS_EXECUTANDO, 'Executando'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+        (STATUS_CONCLUIDA_COM_ERROS, 'Concluída com erros'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    status = models.CharField(
+        max_length=30,
+        choices=STATUS_CHOICES,
+        default=STATUS_EXECUTANDO,
+        verbose_name="Status"
+    )
+    task_id = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text="ID da task Celery que disparou a execução",
+        verbose_name="Task ID"
+    )
+    concorrencia = models.PositiveIntegerField(
+        default=1,
+        help_text="UASGs sincronizadas ao mesmo tempo",
+        verbose_name="Concorrência"
+    )
+    uasgs_total = models.PositiveIntegerField(default=0, verbose_name="UASGs")
+    contratos_processados = models.PositiveIntegerField(default=0, verbose_name="Contratos Processados")
+    contratos_alterados = models.PositiveIntegerField(default=0, verbose_name="Contratos Alterados")
+    contratos_inalterados = models.PositiveIntegerField(default=0, verbose_name="Contratos Inalterados")
+    iniciada_em = models.DateTimeField(auto_now_add=True, verbose_name="Iniciada Em")
+    finalizada_em = models.DateTimeField(null=True, blank=True, verbose_name="Finalizada Em")
+
+    class Meta:
+        db_table = 'sincronizacao_contratos'
+        verbose_name = 'Sincronização de Contratos'
+        verbose_name_plural = 'Sincronizações de Contratos'
+        ordering = ['-iniciada_em']
+
+    def __str__(self):
+        return f"Sincronização {self.id} ({self.get_status_display()})"
+
+
+class SincronizacaoUasg(models.Model):
+    """Resultado de uma UASG dentro de uma SincronizacaoContratos."""
+    STATUS_PENDENTE = 'pendente'
+    STATUS_EXECUTANDO = 'executando'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_IGNORADA = 'ignorada'
+    STATUS_ERRO = 'erro'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_EXECUTANDO, 'Executando'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+        (STATUS_IGNORADA, 'Ignorada (já em execução)'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+    STATUS_FINAIS = (STATUS_CONCLUIDA, STATUS_IGNORADA, STATUS_ERRO)
+
+    id = models.AutoField(primary_key=True)
+    sincronizacao = models.ForeignKey(
+        SincronizacaoContratos,
+        on_delete=models.CASCADE,
+        related_name='uasgs',
+        verbose_name="Sincronização"
+    )
+    uasg_code = models.CharField(max_length=10, verbose_name="Código UASG")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDENTE,
+        verbose_name="Status"
+    )
+    stats = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Estatísticas retornadas por sync_contratos_por_uasg",
+        verbose_name="Estatísticas"
+    )
+    erro = models.TextField(blank=True, null=True, verbose_name="Erro")
+    iniciada_em = models.DateTimeField(null=True, blank=True, verbose_name="Iniciada Em")
+    finalizada_em = models.DateTimeField(null=True, blank=True, verbose_name="Finalizada Em")
+
+    class Meta:
+        db_table = 'sincronizacao_uasg'
+        verbose_name = 'Sincronização de UASG'
+        verbose_name_plural = 'Sincronizações de UASG'
+        ordering = ['sincronizacao', 'uasg_code']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sincronizacao', 'uasg_code'],
+                name='sincronizacao_uasg_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.uasg_code} ({self.get_status_display()})"
+
+
+class SincronizacaoJob(models.Model):
+    """
+    Sincronização solicitada pela API e executada em segundo plano pelo Celery:
+    os contratos de uma UASG ou um tipo de dado relacionado de um contrato.
+    """
+    TIPO_UASG = 'uasg'
+    TIPO_CHOICES = [
+        (TIPO_UASG, 'Contratos da UASG'),
+        ('historico', 'Histórico do contrato'),
+        ('empenhos', 'Empenhos do contrato'),
+        ('itens', 'Itens do contrato'),
+        ('arquivos', 'Arquivos do contrato'),
+    ]
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_CONCLUIDO = 'concluido'
+    STATUS_ERRO = 'erro'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSANDO, 'Processando'),
+        (STATUS_CONCLUIDO, 'Concluído'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo")
+    uasg_code = models.CharField(max_length=10, blank=True, null=True, verbose_name="Código UASG")
+    contrato = models.ForeignKey(
+        'Contrato',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='sincronizacoes',
+        verbose_name="Contrato"
+    )
+    detalhes = models.BooleanField(
+        default=False,
+        help_text="Sincronizar também histórico, empenhos, itens e arquivos dos contratos da UASG",
+        verbose_name="Com Detalhes"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDENTE,
+        verbose_name="Status"
+    )
+    etapa = models.CharField(
+        max_length=20,
+        blank=True,
+        null=True,
+        help_text="Etapa em andamento: 'contratos' ou 'detalhes' (sincronização de UASG)",
+        verbose_name="Etapa"
+    )
+    contratos_total = models.PositiveIntegerField(default=0, verbose_name="Contratos (Total)")
+    contratos_processados = models.PositiveIntegerField(default=0, verbose_name="Contratos Processados")
+    erros = models.PositiveIntegerField(
+        default=0,
+        help_text="Requisições ou gravações que falharam durante a sincronização",
+        verbose_name="Erros"
+    )
+    stats = models.JSONField(blank=True, null=True, verbose_name="Estatísticas")
+    erro = models.TextField(blank=True, null=True, verbose_name="Erro")
+    task_id = models.CharField(max_length=255, blank=True, null=True, verbose_name="Task ID")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado Em")
+    iniciado_em = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado Em")
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluído Em")
+
+    class Meta:
+        db_table = 'sincronizacao_job'
+        verbose_name = 'Sincronização sob Demanda'
+        verbose_name_plural = 'Sincronizações sob Demanda'
+        ordering = ['-criado_em']
+
+    def __str__(self):
+        alvo = self.uasg_code or self.contrato_id
+        return f"{self.get_tipo_display()} {alvo} ({self.get_status_display()})"
+
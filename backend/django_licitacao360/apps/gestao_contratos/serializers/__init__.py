@@ -23,6 +23,7 @@ from .offline import (
     ArquivoContratoSerializer,
 )
 from .dados_manuais import DadosManuaisContratoSerializer
+from .sincronizacao import SincronizacaoJobSerializer
 
 __all__ = [
     'UasgSerializer',
@@ -40,5 +41,6 @@ __all__ = [
     'ItemContratoSerializer',
     'ArquivoContratoSerializer',
     'DadosManuaisContratoSerializer',
+    'SincronizacaoJobSerializer',
 ]
 
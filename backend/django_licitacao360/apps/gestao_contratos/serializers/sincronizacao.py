@@ -0,0 +1,41 @@
+"""
+Serializers para sincronizações sob demanda
+"""
+
+from rest_framework import serializers
+from ..models import SincronizacaoJob
+
+
+class SincronizacaoJobSerializer(serializers.ModelSerializer):
+    """Status e progresso de uma sincronização em segundo plano"""
+    progresso = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SincronizacaoJob
+        fields = [
+            'id',
+            'tipo',
+            'uasg_code',
+            'contrato',
+            'detalhes',
+            'status',
+            'etapa',
+            'contratos_total',
+            'contratos_processados',
+            'progresso',
+            'erros',
+            'erro',
+            'stats',
+            'criado_em',
+            'iniciado_em',
+            'concluido_em',
+        ]
+        read_only_fields = fields
+
+    def get_progresso(self, obj):
+        """Percentual da etapa atual (0 a 100)."""
+        if obj.status == SincronizacaoJob.STATUS_CONCLUIDO:
+            return 100
+        if not obj.contratos_total:
+            return 0
+        return round(100 * obj.contratos_processados / obj.contratos_total)
@@ -0,0 +1,170 @@
+"""
+Cliente assíncrono da API do ComprasNet Contratos.
+
+Usa o cliente HTTP de ``core.services.http_client`` (pool de conexões ``aiohttp``,
+token bucket AIMD, ``Retry-After`` e backoff com jitter) com limites próprios, e busca os dados
+relacionados (histórico, empenhos, itens, arquivos) de vários contratos em paralelo.
+
+Além do bucket de cada processo, toda requisição consome um token de
+``RedisTokenBucket`` (chave ``comprasnet:rate``), compartilhado por todos os workers:
+``COMPRASNET_GLOBAL_RATE`` é o teto total de requisições/s, não importa quantos
+workers ou faixas estejam sincronizando.
+
+A listagem de contratos de uma UASG (``/contrato/ug/{uasg}``) também passa por
+aqui, com as mesmas retentativas.
+
+Os endpoints de cada contrato vêm de ``raw_json["links"]``, já gravado na
+sincronização da UASG; sem ele, a URL é montada pelo padrão da API
+(``/contrato/{id}/{tipo}``). Não há mais a busca de ``/contrato/{id}`` só para ler
+os links.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from django_licitacao360.apps.core.services.http_client import ApiClient, ApiRequestError, RedisTokenBucket
+from django_licitacao360.apps.core.services.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+COMPRASNET_BASE_URL = "https://contratos.comprasnet.gov.br/api"
+HEADERS = {
+    "User-Agent": "licitacao360",
+    "Accept": "application/json",
+}
+DATA_TYPES = ("historico", "empenhos", "itens", "arquivos")
+
+DEFAULT_RATE = float(os.getenv("COMPRASNET_RATE", "4"))
+DEFAULT_MAX_RATE = float(os.getenv("COMPRASNET_MAX_RATE", "10"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("COMPRASNET_MAX_CONCURRENCY", "8"))
+DEFAULT_MAX_RETRIES = int(os.getenv("COMPRASNET_MAX_RETRIES", "3"))
+DEFAULT_TIMEOUT = 30
+# Teto de requisições/s ao ComprasNet somando todos os workers; 0 desliga o limite global
+GLOBAL_RATE = float(os.getenv("COMPRASNET_GLOBAL_RATE", "10"))
+CHAVE_RATE_GLOBAL = "comprasnet:rate"
+# A listagem da UASG traz todos os contratos numa resposta só
+TIMEOUT_CONTRATOS_UASG = int(os.getenv("COMPRASNET_TIMEOUT_UASG", "120"))
+
+# (id do contrato, tipo de dado) -> lista de registros ou o erro da requisição
+Resultado = Union[List[Dict[str, Any]], ApiRequestError]
+
+
+def bucket_global() -> Optional[RedisTokenBucket]:
+    """Bucket compartilhado do ComprasNet, ou ``None`` com ``COMPRASNET_GLOBAL_RATE=0``."""
+    if GLOBAL_RATE <= 0:
+        return None
+    return RedisTokenBucket(get_redis_client(), CHAVE_RATE_GLOBAL, rate=GLOBAL_RATE)
+
+
+class ComprasNetClient(ApiClient):
+    """
+    ``ApiClient`` com os limites do ComprasNet e, por padrão, o ``bucket_global()``.
+    Uso::
+
+        async with ComprasNetClient() as client:
+            dados = await client.get_json(url, endpoint="historico")
+    """
+
+    label = "ComprasNet Client"
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+        **kwargs,
+    ):
+        kwargs.setdefault("headers", HEADERS)
+        if "shared_bucket" not in kwargs:
+            kwargs["shared_bucket"] = bucket_global()
+        super().__init__(
+            rate=rate,
+            max_rate=max_rate,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            timeout=timeout,
+            **kwargs,
+        )
+
+
+def link_relacionado(
+    contrato_id: str,
+    raw_json: Optional[Mapping[str, Any]],
+    data_type: str,
+    base_url: str = COMPRASNET_BASE_URL,
+) -> str:
+    """URL do tipo de dado do contrato: o link do payload ou, sem ele, o padrão da API."""
+    links = (raw_json or {}).get("links") or {}
+    return links.get(data_type) or f"{base_url}/contrato/{contrato_id}/{data_type}"
+
+
+async def buscar_relacionados(
+    client: ApiClient,
+    contratos: Iterable[Tuple[str, Optional[Mapping[str, Any]]]],
+    data_types: Sequence[str] = DATA_TYPES,
+) -> Dict[Tuple[str, str], Resultado]:
+    """
+    Busca ``data_types`` de todos os ``contratos`` (pares ``(id, raw_json)``) de uma
+    vez; concorrência e taxa ficam a cargo do ``client``. Uma falha não interrompe as
+    demais: o erro volta no lugar da lista.
+    """
+
+    async def buscar(contrato_id: str, raw_json, data_type: str) -> Tuple[Tuple[str, str], Resultado]:
+        url = link_relacionado(contrato_id, raw_json, data_type)
+        try:
+            dados = await client.get_json(url, endpoint=data_type)
+        except ApiRequestError as exc:
+            logger.warning("Falha ao buscar %s do contrato %s: %s", data_type, contrato_id, exc)
+            return (contrato_id, data_type), exc
+        if isinstance(dados, dict):
+            # Alguns endpoints devolvem um objeto em vez de lista
+            dados = [dados]
+        return (contrato_id, data_type), dados or []
+
+    tarefas = [
+        buscar(contrato_id, raw_json, data_type)
+        for contrato_id, raw_json in contratos
+        for data_type in data_types
+    ]
+    return dict(await asyncio.gather(*tarefas))
+
+
+def buscar_relacionados_em_lote(
+    contratos: Iterable[Tuple[str, Optional[Mapping[str, Any]]]],
+    data_types: Sequence[str] = DATA_TYPES,
+    **client_kwargs,
+) -> Dict[Tuple[str, str], Resultado]:
+    """Versão síncrona de ``buscar_relacionados`` (abre e fecha o próprio cliente)."""
+
+    async def executar():
+        async with ComprasNetClient(**client_kwargs) as client:
+            return await buscar_relacionados(client, contratos, data_types)
+
+    return asyncio.run(executar())
+
+
+async def listar_contratos_uasg(
+    client: ApiClient,
+    uasg_code: str,
+    base_url: str = COMPRASNET_BASE_URL,
+) -> List[Dict[str, Any]]:
+    """
+    Contratos de uma UASG (``/contrato/ug/{uasg}``). Devolve lista vazia se a API
+    não tiver a UASG (204/404) e levanta ``ApiRequestError`` se a requisição
+    falhar após as retentativas do ``client``.
+    """
+    return await client.get_json(f"{base_url}/contrato/ug/{uasg_code}", endpoint="contratos") or []
+
+
+def buscar_contratos_uasg(uasg_code: str, **client_kwargs) -> List[Dict[str, Any]]:
+    """Versão síncrona de ``listar_contratos_uasg`` (abre e fecha o próprio cliente)."""
+    client_kwargs.setdefault("timeout", TIMEOUT_CONTRATOS_UASG)
+
+    async def executar():
+        async with ComprasNetClient(**client_kwargs) as client:
+            return await listar_contratos_uasg(client, uasg_code)
+
+    return asyncio.run(executar())
@@ -3,16 +3,16 @@ Serviço de ingestão de dados da API ComprasNet
 Migrado do OfflineDBController do PyQt
 """
 
-import requests
-import time
-import json
+import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, List, Dict, Optional
 from decimal import Decimal, InvalidOperation
 
 from django.db import transaction
 from django.utils import timezone
 
+from django_licitacao360.apps.core.services.bulk_upsert import bulk_upsert
+from django_licitacao360.apps.core.services.fingerprint import fingerprint
 from django_licitacao360.apps.uasgs.models import Uasg
 
 from ..models import (
@@ -23,52 +23,29 @@ from ..models import (
     ArquivoContrato,
 )
 
+from .comprasnet_client import DATA_TYPES, ApiRequestError, buscar_contratos_uasg, buscar_relacionados_em_lote
+from .reconciliacao import reconciliar_filhos
+
+logger = logging.getLogger(__name__)
+
+# Contratos cujos dados relacionados são buscados juntos antes de gravar
+LOTE_DETALHES = 50
+STATS_DETALHES = {
+    'historico': 'historicos',
+    'empenhos': 'empenhos',
+    'itens': 'itens',
+    'arquivos': 'arquivos',
+}
+
+# Callback de progresso: (contratos feitos, total, erros)
+Progresso = Callable[[int, int, int], None]
+
 
 class ComprasNetIngestionService:
     """
     Serviço para ingerir dados da API pública do ComprasNet
     """
     
-    BASE_URL = "https://contratos.comprasnet.gov.br/api"
-    TIMEOUT = 20
-    MAX_RETRIES = 3
-    RETRY_DELAY = 2
-    
-    def _fetch_api_data(self, url: str, tentativas_maximas: int = None) -> List[Dict]:
-        """
-        Busca dados de uma API com retentativas.
-        
-        Args:
-            url: URL da API
-            tentativas_maximas: Número máximo de tentativas (padrão: self.MAX_RETRIES)
-        
-        Returns:
-            Lista de dados JSON ou lista vazia em caso de erro
-        """
-        tentativas_maximas = tentativas_maximas or self.MAX_RETRIES
-        
-        for tentativa in range(1, tentativas_maximas + 1):
-            try:
-                print(f" - Buscando dados em {url} (Tentativa {tentativa}/{tentativas_maximas})")
-                response = requests.get(url, timeout=self.TIMEOUT, stream=False)
-                response.raise_for_status()
-                # Lê o conteúdo de uma vez para evitar problemas com streaming
-                data = response.json()
-                return data
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                print(f"⚠ Erro de conexão/timeout na tentativa {tentativa}/{tentativas_maximas}: {e}")
-                if tentativa < tentativas_maximas:
-                    time.sleep(self.RETRY_DELAY)
-                    continue
-                return []
-            except requests.exceptions.RequestException as e:
-                print(f"   ⚠ Erro na requisição: {e}")
-                if tentativa < tentativas_maximas:
-                    time.sleep(self.RETRY_DELAY)
-                else:
-                    return []
-        return []
-    
     def _parse_date(self, date_str: Optional[str]) -> Optional[datetime]:
         """Converte string de data para datetime"""
         if not date_str:
@@ -83,7 +60,7 @@ class ComprasNetIngestionService:
         if value is None:
             return None
         if len(value) > max_length:
-            print(f"⚠ Valor truncado de {len(value)} para {max_length} caracteres: {value[:50]}...")
+            logger.warning("Valor truncado de %s para %s caracteres: %s...", len(value), max_length, value[:50])
             return value[:max_length]
         return value
     
@@ -131,7 +108,7 @@ class ComprasNetIngestionService:
         hoje = timezone.now().date()
         contratos_a_processar = []
         
-        print(f"Iniciando filtro de {len(contratos)} contratos...")
+        logger.debug("Iniciando filtro de %s contratos...", len(contratos))
         
         for contrato_data in contratos:
             vigencia_fim_str = contrato_data.get("vigencia_fim")
@@ -147,9 +124,9 @@ class ComprasNetIngestionService:
                 if (hoje - vigencia_fim).days <= 100:
                     contratos_a_processar.append(contrato_data)
             except (ValueError, TypeError):
-                print(f"⚠ Aviso: Data de vigência inválida para o contrato {contrato_data.get('id')}. Será ignorado.")
+                logger.warning("Data de vigência inválida para o contrato %s. Será ignorado.", contrato_data.get('id'))
         
-        print(f"Filtro concluído. Serão processados {len(contratos_a_processar)} contratos.")
+        logger.debug("Filtro concluído. Serão processados %s contratos.", len(contratos_a_processar))
         return contratos_a_processar
 
     def _ensure_uasg(self, uasg_code: Optional[str], nome_resumido: Optional[str] = None) -> Optional[Uasg]:
@@ -160,7 +137,7 @@ class ComprasNetIngestionService:
         try:
             uasg_int = int(str(uasg_code))
         except (TypeError, ValueError):
-            print(f"⚠ Código de UASG inválido: {uasg_code}")
+            logger.warning("Código de UASG inválido: %s", uasg_code)
             return None
 
         sigla = (nome_resumido or str(uasg_int))[:50]
@@ -190,224 +167,227 @@ class ComprasNetIngestionService:
 
         return uasg_obj
     
-    def _save_contrato(self, contrato_data: Dict, uasg_code: str) -> Contrato:
+    def _contrato_row(self, contrato_data: Dict, uasg_id: int) -> Dict:
+        """Valores do Contrato (por attname) a partir do payload da API."""
+        fornecedor = contrato_data.get("fornecedor") or {}
+        contratante = contrato_data.get("contratante") or {}
+        orgao = contratante.get("orgao") or {}
+        unidade_gestora = orgao.get("unidade_gestora") or {}
+        
+        return {
+            'id': str(contrato_data.get("id")),
+            'uasg_id': uasg_id,
+            'numero': contrato_data.get("numero"),
+            'licitacao_numero': contrato_data.get("licitacao_numero"),
+            'processo': contrato_data.get("processo"),
+            'fornecedor_nome': fornecedor.get("nome"),
+            'fornecedor_cnpj': fornecedor.get("cnpj_cpf_idgener"),
+            'objeto': contrato_data.get("objeto"),
+            'valor_global': self._parse_decimal(contrato_data.get("valor_global")),
+            'vigencia_inicio': self._parse_date(contrato_data.get("vigencia_inicio")),
+            'vigencia_fim': self._parse_date(contrato_data.get("vigencia_fim")),
+            'tipo': contrato_data.get("tipo"),
+            'modalidade': contrato_data.get("modalidade"),
+            'contratante_orgao_unidade_gestora_codigo': unidade_gestora.get("codigo"),
+            'contratante_orgao_unidade_gestora_nome_resumido': unidade_gestora.get("nome_resumido"),
+            'manual': False,
+            'raw_json': contrato_data,
+            'raw_json_hash': fingerprint(contrato_data),
+        }
+    
+    def _upsert_contratos(self, contratos_data: List[Dict], uasg_id: int) -> Dict[str, int]:
         """
-        Salva ou atualiza um contrato no banco de dados.
+        Grava os contratos em lote (INSERT ... ON CONFLICT).
         
-        Args:
-            contrato_data: Dados do contrato da API
-            uasg_code: Código da UASG
-        
-        Returns:
-            Instância do Contrato salvo
+        Contratos cujo ``raw_json_hash`` é igual ao gravado são descartados antes do
+        INSERT e contados em ``inalteradas_hash``; entre os demais, linhas idênticas às
+        gravadas também não são reescritas. ``updated_at`` só muda quando o contrato muda.
         """
-        contrato_id = str(contrato_data.get("id"))
-        
-        # Extrai dados do fornecedor
-        fornecedor = contrato_data.get("fornecedor", {})
-        contratante = contrato_data.get("contratante", {})
-        orgao = contratante.get("orgao", {})
-        unidade_gestora = orgao.get("unidade_gestora", {})
-
-        uasg_obj = self._ensure_uasg(uasg_code, unidade_gestora.get("nome_resumido"))
-        if not uasg_obj:
-            raise ValueError(f"Não foi possível garantir a existência da UASG {uasg_code}")
-        
-        # Cria ou atualiza o contrato
-        contrato, created = Contrato.objects.update_or_create(
-            id=contrato_id,
-            defaults={
-                'uasg_id': uasg_obj.id_uasg,
-                'numero': contrato_data.get("numero"),
-                'licitacao_numero': contrato_data.get("licitacao_numero"),
-                'processo': contrato_data.get("processo"),
-                'fornecedor_nome': fornecedor.get("nome"),
-                'fornecedor_cnpj': fornecedor.get("cnpj_cpf_idgener"),
-                'objeto': contrato_data.get("objeto"),
-                'valor_global': self._parse_decimal(contrato_data.get("valor_global")),
-                'vigencia_inicio': self._parse_date(contrato_data.get("vigencia_inicio")),
-                'vigencia_fim': self._parse_date(contrato_data.get("vigencia_fim")),
-                'tipo': contrato_data.get("tipo"),
-                'modalidade': contrato_data.get("modalidade"),
-                'contratante_orgao_unidade_gestora_codigo': unidade_gestora.get("codigo"),
-                'contratante_orgao_unidade_gestora_nome_resumido': unidade_gestora.get("nome_resumido"),
-                'manual': False,
-                'raw_json': contrato_data,
-            }
-        )
-        
-        action = "Criado" if created else "Atualizado"
-        print(f"  {action} contrato {contrato.numero or contrato_id}")
-        
-        return contrato
-    
-    def _save_historico(self, contrato: Contrato, historico_data: List[Dict]):
-        """Salva histórico de um contrato"""
-        HistoricoContrato.objects.filter(contrato=contrato).delete()
-        
-        for item_data in historico_data:
+        agora = timezone.now()
+        rows = []
+        for contrato_data in contratos_data:
             try:
-                HistoricoContrato.objects.create(
-                    contrato=contrato,
-                    receita_despesa=self._truncate_string(item_data.get("receita_despesa"), 200),
-                    numero=self._truncate_string(item_data.get("numero"), 100),
-                    observacao=item_data.get("observacao"),
-                    ug=self._truncate_string(item_data.get("ug"), 20),
-                    gestao=self._truncate_string(item_data.get("gestao"), 200),
-                    fornecedor_cnpj=self._truncate_string(item_data.get("fornecedor_cnpj"), 20),
-                    fornecedor_nome=self._truncate_string(item_data.get("fornecedor_nome"), 255),
-                    tipo=self._truncate_string(item_data.get("tipo"), 100),
-                    categoria=self._truncate_string(item_data.get("categoria"), 100),
-                    processo=self._truncate_string(item_data.get("processo"), 100),
-                    objeto=item_data.get("objeto"),
-                    modalidade=self._truncate_string(item_data.get("modalidade"), 100),
-                    licitacao_numero=self._truncate_string(item_data.get("licitacao_numero"), 100),
-                    data_assinatura=self._parse_date(item_data.get("data_assinatura")),
-                    data_publicacao=self._parse_date(item_data.get("data_publicacao")),
-                    vigencia_inicio=self._parse_date(item_data.get("vigencia_inicio")),
-                    vigencia_fim=self._parse_date(item_data.get("vigencia_fim")),
-                    valor_global=self._parse_decimal(item_data.get("valor_global")),
-                    raw_json=item_data,
-                )
+                row = self._contrato_row(contrato_data, uasg_id)
             except Exception as e:
-                print(f"⚠ Erro ao salvar histórico: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("Erro ao processar contrato %s: %s", contrato_data.get('id'), e)
                 continue
-    
-    def _save_empenhos(self, contrato: Contrato, empenhos_data: List[Dict]):
-        """Salva empenhos de um contrato"""
-        Empenho.objects.filter(contrato=contrato).delete()
+            row['created_at'] = agora
+            row['updated_at'] = agora
+            rows.append(row)
         
-        for item_data in empenhos_data:
-            try:
-                Empenho.objects.create(
-                    contrato=contrato,
-                    unidade_gestora=self._truncate_string(item_data.get("unidade_gestora"), 200),
-                    gestao=self._truncate_string(item_data.get("gestao"), 200),
-                    numero=self._truncate_string(item_data.get("numero"), 100),
-                    data_emissao=self._parse_date(item_data.get("data_emissao")),
-                    credor_cnpj=self._truncate_string(item_data.get("credor_cnpj"), 20),
-                    credor_nome=self._truncate_string(item_data.get("credor_nome"), 255),
-                    empenhado=self._parse_decimal(item_data.get("empenhado")),
-                    liquidado=self._parse_decimal(item_data.get("liquidado")),
-                    pago=self._parse_decimal(item_data.get("pago")),
-                    informacao_complementar=item_data.get("informacao_complementar"),
-                    raw_json=item_data,
-                )
-            except Exception as e:
-                print(f"⚠ Erro ao salvar empenho: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+        hashes_gravados = dict(
+            Contrato.objects.filter(id__in=[row['id'] for row in rows]).values_list('id', 'raw_json_hash')
+        )
+        alterados = [row for row in rows if hashes_gravados.get(row['id']) != row['raw_json_hash']]
+        
+        campos_dados = [campo for campo in rows[0] if campo not in ('id', 'created_at', 'updated_at')] if rows else []
+        stats = bulk_upsert(
+            Contrato,
+            alterados,
+            conflict_fields=['id'],
+            update_fields=campos_dados,
+            touch_fields=['updated_at'],
+            label="ComprasNet Contratos",
+        )
+        stats['inalteradas_hash'] = len(rows) - len(alterados)
+        return stats
     
-    def _save_itens(self, contrato: Contrato, itens_data: List[Dict]):
-        """Salva itens de um contrato"""
-        ItemContrato.objects.filter(contrato=contrato).delete()
-        
+    def _linhas(self, build_row, itens_data: List[Dict], descricao: str) -> List[Dict]:
+        """Monta as linhas de uma tabela filha, ignorando registros com erro."""
+        rows = []
         for item_data in itens_data:
             try:
-                ItemContrato.objects.create(
-                    contrato=contrato,
-                    tipo_id=self._truncate_string(item_data.get("tipo_id"), 200),
-                    tipo_material=self._truncate_string(item_data.get("tipo_material"), 500),
-                    grupo_id=self._truncate_string(item_data.get("grupo_id"), 200),
-                    catmatseritem_id=self._truncate_string(item_data.get("catmatseritem_id"), 200),
-                    descricao_complementar=item_data.get("descricao_complementar"),
-                    quantidade=self._parse_decimal(item_data.get("quantidade")),
-                    valorunitario=self._parse_decimal(item_data.get("valorunitario")),
-                    valortotal=self._parse_decimal(item_data.get("valortotal")),
-                    numero_item_compra=self._truncate_string(item_data.get("numero_item_compra"), 100),
-                    raw_json=item_data,
-                )
+                rows.append(build_row(item_data))
             except Exception as e:
-                print(f"⚠ Erro ao salvar item: {e}")
-                import traceback
-                traceback.print_exc()
-                # Continua processando outros itens
+                logger.warning("Erro ao salvar %s: %s", descricao, e)
                 continue
+        return rows
     
-    def _save_arquivos(self, contrato: Contrato, arquivos_data: List[Dict]):
-        """Salva arquivos de um contrato"""
-        ArquivoContrato.objects.filter(contrato=contrato).delete()
-        
-        for item_data in arquivos_data:
-            try:
-                ArquivoContrato.objects.create(
-                    contrato=contrato,
-                    tipo=item_data.get("tipo"),
-                    descricao=item_data.get("descricao"),
-                    path_arquivo=item_data.get("path_arquivo"),
-                    origem=item_data.get("origem"),
-                    link_sei=item_data.get("link_sei"),
-                    raw_json=item_data,
-                )
-            except Exception as e:
-                print(f"⚠ Erro ao salvar arquivo: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+    def _historico_row(self, item_data: Dict) -> Dict:
+        return {
+            'receita_despesa': self._truncate_string(item_data.get("receita_despesa"), 200),
+            'numero': self._truncate_string(item_data.get("numero"), 100),
+            'observacao': item_data.get("observacao"),
+            'ug': self._truncate_string(item_data.get("ug"), 20),
+            'gestao': self._truncate_string(item_data.get("gestao"), 200),
+            'fornecedor_cnpj': self._truncate_string(item_data.get("fornecedor_cnpj"), 20),
+            'fornecedor_nome': self._truncate_string(item_data.get("fornecedor_nome"), 255),
+            'tipo': self._truncate_string(item_data.get("tipo"), 100),
+            'categoria': self._truncate_string(item_data.get("categoria"), 100),
+            'processo': self._truncate_string(item_data.get("processo"), 100),
+            'objeto': item_data.get("objeto"),
+            'modalidade': self._truncate_string(item_data.get("modalidade"), 100),
+            'licitacao_numero': self._truncate_string(item_data.get("licitacao_numero"), 100),
+            'data_assinatura': self._parse_date(item_data.get("data_assinatura")),
+            'data_publicacao': self._parse_date(item_data.get("data_publicacao")),
+            'vigencia_inicio': self._parse_date(item_data.get("vigencia_inicio")),
+            'vigencia_fim': self._parse_date(item_data.get("vigencia_fim")),
+            'valor_global': self._parse_decimal(item_data.get("valor_global")),
+            'raw_json': item_data,
+        }
+    
+    def _empenho_row(self, item_data: Dict) -> Dict:
+        return {
+            'unidade_gestora': self._truncate_string(item_data.get("unidade_gestora"), 200),
+            'gestao': self._truncate_string(item_data.get("gestao"), 200),
+            'numero': self._truncate_string(item_data.get("numero"), 100),
+            'data_emissao': self._parse_date(item_data.get("data_emissao")),
+            'credor_cnpj': self._truncate_string(item_data.get("credor_cnpj"), 20),
+            'credor_nome': self._truncate_string(item_data.get("credor_nome"), 255),
+            'empenhado': self._parse_decimal(item_data.get("empenhado")),
+            'liquidado': self._parse_decimal(item_data.get("liquidado")),
+            'pago': self._parse_decimal(item_data.get("pago")),
+            'informacao_complementar': item_data.get("informacao_complementar"),
+            'raw_json': item_data,
+        }
+    
+    def _item_row(self, item_data: Dict) -> Dict:
+        return {
+            'tipo_id': self._truncate_string(item_data.get("tipo_id"), 200),
+            'tipo_material': self._truncate_string(item_data.get("tipo_material"), 500),
+            'grupo_id': self._truncate_string(item_data.get("grupo_id"), 200),
+            'catmatseritem_id': self._truncate_string(item_data.get("catmatseritem_id"), 200),
+            'descricao_complementar': item_data.get("descricao_complementar"),
+            'quantidade': self._parse_decimal(item_data.get("quantidade")),
+            'valorunitario': self._parse_decimal(item_data.get("valorunitario")),
+            'valortotal': self._parse_decimal(item_data.get("valortotal")),
+            'numero_item_compra': self._truncate_string(item_data.get("numero_item_compra"), 100),
+            'raw_json': item_data,
+        }
+    
+    def _arquivo_row(self, item_data: Dict) -> Dict:
+        return {
+            'tipo': item_data.get("tipo"),
+            'descricao': item_data.get("descricao"),
+            'path_arquivo': item_data.get("path_arquivo"),
+            'origem': item_data.get("origem"),
+            'link_sei': item_data.get("link_sei"),
+            'raw_json': item_data,
+        }
     
-    def sync_contratos_por_uasg(self, uasg_code: str) -> Dict[str, int]:
+    def _save_historico(self, contrato: Contrato, historico_data: List[Dict]) -> Dict[str, int]:
+        """Salva histórico de um contrato (só as linhas que mudaram)"""
+        rows = self._linhas(self._historico_row, historico_data, "histórico")
+        return reconciliar_filhos(HistoricoContrato, contrato.pk, rows)
+    
+    def _save_empenhos(self, contrato: Contrato, empenhos_data: List[Dict]) -> Dict[str, int]:
+        """Salva empenhos de um contrato (só as linhas que mudaram)"""
+        rows = self._linhas(self._empenho_row, empenhos_data, "empenho")
+        return reconciliar_filhos(Empenho, contrato.pk, rows)
+    
+    def _save_itens(self, contrato: Contrato, itens_data: List[Dict]) -> Dict[str, int]:
+        """Salva itens de um contrato (só as linhas que mudaram)"""
+        rows = self._linhas(self._item_row, itens_data, "item")
+        return reconciliar_filhos(ItemContrato, contrato.pk, rows)
+    
+    def _save_arquivos(self, contrato: Contrato, arquivos_data: List[Dict]) -> Dict[str, int]:
+        """Salva arquivos de um contrato (só as linhas que mudaram)"""
+        rows = self._linhas(self._arquivo_row, arquivos_data, "arquivo")
+        return reconciliar_filhos(ArquivoContrato, contrato.pk, rows)
+    
+    def sync_contratos_por_uasg(self, uasg_code: str, progresso: Optional[Progresso] = None) -> Dict[str, int]:
         """
         Sincroniza todos os contratos de uma UASG.
         
+        A UASG é resolvida uma vez e os contratos são gravados em lote; contratos
+        idênticos aos já gravados não são reescritos.
+        
         Args:
             uasg_code: Código da UASG
+            progresso: Chamado com (feitos, total, erros) antes e depois da gravação
         
         Returns:
             Dicionário com estatísticas da sincronização
         """
-        url = f"{self.BASE_URL}/contrato/ug/{uasg_code}"
-        main_data = self._fetch_api_data(url)
-        
-        if not main_data:
-            print(f"⚠ Não foi possível obter dados para a UASG {uasg_code}.")
-            return {'contratos_processados': 0, 'historicos': 0, 'empenhos': 0, 'itens': 0, 'arquivos': 0}
-        
-        # Garante que a UASG existe (fora da transação principal)
-        try:
-            nome_resumido = main_data[0].get("contratante", {}).get("orgao", {}).get("unidade_gestora", {}).get("nome_resumido", "")
-            uasg_obj = self._ensure_uasg(uasg_code, nome_resumido)
-            if not uasg_obj:
-                print(f"⚠ Não foi possível normalizar a UASG {uasg_code}.")
-        except Exception as e:
-            print(f"⚠ Erro ao criar/atualizar UASG {uasg_code}: {e}")
-        
-        # Filtra contratos por vigência
-        contratos_a_processar = self._filter_contracts_by_vigency(main_data)
-        
-        if not contratos_a_processar:
-            return {'contratos_processados': 0, 'historicos': 0, 'empenhos': 0, 'itens': 0, 'arquivos': 0}
-        
-        stats = {
+        vazio = {
             'contratos_processados': 0,
+            'contratos_alterados': 0,
+            'contratos_inalterados': 0,
             'historicos': 0,
             'empenhos': 0,
             'itens': 0,
             'arquivos': 0,
         }
+        try:
+            main_data = buscar_contratos_uasg(uasg_code)
+        except ApiRequestError as e:
+            logger.warning("Não foi possível obter dados para a UASG %s: %s", uasg_code, e)
+            return vazio
         
-        # Processa cada contrato individualmente (cada um em sua própria transação)
-        for i, contrato_data in enumerate(contratos_a_processar, 1):
-            contrato_id = str(contrato_data.get("id"))
-            print(f"Processando contrato {i}/{len(contratos_a_processar)}: {contrato_data.get('numero', contrato_id)}")
-            
-            try:
-                with transaction.atomic():
-                    # Salva apenas o contrato (dados básicos)
-                    # Dados detalhados (histórico, empenhos, itens, arquivos) serão
-                    # sincronizados sob demanda quando o usuário selecionar a aba correspondente
-                    contrato = self._save_contrato(contrato_data, uasg_code)
-                    stats['contratos_processados'] += 1
-            except Exception as e:
-                print(f"⚠ Erro ao processar contrato {contrato_id}: {e}")
-                import traceback
-                traceback.print_exc()
-                # Continua processando os próximos contratos mesmo se um falhar
-                continue
+        if not main_data:
+            logger.info("Nenhum contrato retornado para a UASG %s.", uasg_code)
+            return vazio
+        
+        # Garante que a UASG existe (uma vez por execução)
+        nome_resumido = (
+            ((main_data[0].get("contratante") or {}).get("orgao") or {}).get("unidade_gestora") or {}
+        ).get("nome_resumido", "")
+        uasg_obj = self._ensure_uasg(uasg_code, nome_resumido)
+        if not uasg_obj:
+            logger.warning("Não foi possível normalizar a UASG %s.", uasg_code)
+            return vazio
         
-        print(f"✅ Sincronização da UASG {uasg_code} concluída: {stats}")
+        # Filtra contratos por vigência
+        contratos_a_processar = self._filter_contracts_by_vigency(main_data)
+        
+        if not contratos_a_processar:
+            return vazio
+        
+        # Dados detalhados (histórico, empenhos, itens, arquivos) são sincronizados
+        # sob demanda ou por sync_detalhes_contratos
+        total = len(contratos_a_processar)
+        if progresso:
+            progresso(0, total, 0)
+        upsert = self._upsert_contratos(contratos_a_processar, uasg_obj.id_uasg)
+        stats = dict(vazio)
+        stats['contratos_alterados'] = upsert['inseridas'] + upsert['atualizadas']
+        stats['contratos_inalterados'] = upsert['inalteradas'] + upsert['inalteradas_hash']
+        stats['contratos_processados'] = stats['contratos_alterados'] + stats['contratos_inalterados']
+        stats['upsert'] = upsert
+        if progresso:
+            progresso(total, total, total - stats['contratos_processados'])
+        
+        logger.info("Sincronização da UASG %s concluída: %s", uasg_code, stats)
         return stats
     
     def sync_contrato_detalhes(
@@ -427,32 +407,99 @@ class ComprasNetIngestionService:
         Returns:
             Dicionário com estatísticas da sincronização
         """
-        try:
-            contrato = Contrato.objects.get(id=contrato_id)
-        except Contrato.DoesNotExist:
-            print(f"⚠ Contrato {contrato_id} não encontrado.")
+        if not Contrato.objects.filter(id=contrato_id).exists():
+            logger.warning("Contrato %s não encontrado.", contrato_id)
             return {'historicos': 0, 'empenhos': 0, 'itens': 0, 'arquivos': 0}
         
-        # Se não especificado, sincroniza todos
-        if data_types is None:
-            data_types = ['historico', 'empenhos', 'itens', 'arquivos']
+        stats = self.sync_detalhes_contratos(
+            Contrato.objects.filter(id=contrato_id),
+            data_types=data_types,
+        )
+        stats.pop('contratos', None)
+        stats.pop('erros', None)
+        logger.info("Detalhes do contrato %s sincronizados: %s", contrato_id, stats)
+        return stats
+    
+    def sync_detalhes_contratos(
+        self,
+        contratos: Iterable[Contrato],
+        data_types: Optional[List[str]] = None,
+        lote: int = LOTE_DETALHES,
+        progresso: Optional[Progresso] = None,
+        **client_kwargs,
+    ) -> Dict[str, int]:
+        """
+        Sincroniza os dados relacionados de vários contratos.
         
-        stats = {
-            'historicos': 0,
-            'empenhos': 0,
-            'itens': 0,
-            'arquivos': 0,
-        }
+        As requisições de cada lote de ``lote`` contratos (todos os tipos) saem em
+        paralelo pelo ``ComprasNetClient``, usando os links de ``raw_json``; a gravação
+        é feita em seguida, contrato a contrato, nesta thread.
         
-        # Sincroniza cada tipo solicitado
-        for data_type in data_types:
-            if data_type in ['historico', 'empenhos', 'itens', 'arquivos']:
-                result = self._sync_single_related_dataset(contrato, data_type)
-                stats.update(result)
+        Args:
+            contratos: Contratos (ou queryset) a sincronizar
+            data_types: Tipos de dados; se None, todos
+            lote: Contratos buscados por vez
+            progresso: Chamado com (feitos, total, erros) ao fim de cada lote
+            client_kwargs: Limites repassados ao ComprasNetClient (rate, max_concurrency...)
+        
+        Returns:
+            Dicionário com contratos, registros gravados por tipo e erros de requisição
+        """
+        data_types = [t for t in (data_types or DATA_TYPES) if t in DATA_TYPES]
+        stats = {'contratos': 0, 'historicos': 0, 'empenhos': 0, 'itens': 0, 'arquivos': 0, 'erros': 0}
+        if hasattr(contratos, 'only'):
+            contratos = contratos.only('id', 'raw_json')
+        contratos = list(contratos)
+        
+        for inicio in range(0, len(contratos), max(1, lote)):
+            bloco = contratos[inicio:inicio + lote]
+            resultados = buscar_relacionados_em_lote(
+                [(c.id, c.raw_json) for c in bloco], data_types, **client_kwargs
+            )
+            for contrato in bloco:
+                for data_type in data_types:
+                    dados = resultados[(contrato.id, data_type)]
+                    if isinstance(dados, Exception):
+                        stats['erros'] += 1
+                        continue
+                    try:
+                        stats[STATS_DETALHES[data_type]] += self._aplicar_relacionados(contrato, data_type, dados)
+                    except Exception as e:
+                        logger.warning("Erro ao gravar %s do contrato %s: %s", data_type, contrato.id, e)
+                        stats['erros'] += 1
+                stats['contratos'] += 1
+            logger.info("Detalhes: %s/%s contratos", stats['contratos'], len(contratos))
+            if progresso:
+                progresso(stats['contratos'], len(contratos), stats['erros'])
         
-        print(f"✅ Detalhes do contrato {contrato_id} sincronizados: {stats}")
         return stats
     
+    def _aplicar_relacionados(self, contrato: Contrato, data_type: str, data: List[Dict]) -> int:
+        """Grava os registros de um tipo de dado e marca a data de sincronização."""
+        if not data:
+            return 0
+        
+        # Mapeia tipo de dado para método de salvamento
+        save_methods = {
+            'historico': (self._save_historico, 'historico_atualizado_em'),
+            'empenhos': (self._save_empenhos, 'empenhos_atualizados_em'),
+            'itens': (self._save_itens, 'itens_atualizados_em'),
+            'arquivos': (self._save_arquivos, 'arquivos_atualizados_em'),
+        }
+        
+        save_method, field_name = save_methods[data_type]
+        with transaction.atomic():
+            alteracoes = save_method(contrato, data)
+            # Atualiza timestamp de sincronização
+            setattr(contrato, field_name, timezone.now())
+            contrato.save(update_fields=[field_name])
+        
+        logger.info(
+            "%s do contrato %s sincronizado: %s registros %s",
+            data_type.capitalize(), contrato.id, len(data), alteracoes,
+        )
+        return len(data)
+    
     def _sync_single_related_dataset(
         self, 
         contrato: Contrato, 
@@ -467,56 +514,19 @@ class ComprasNetIngestionService:
         
         Returns:
             Dicionário com estatísticas da sincronização
-        """
-        from django.utils import timezone
         
+        Raises:
+            RuntimeError: a API não retornou os dados
+        """
         # Validação do tipo de dado
-        valid_types = ['historico', 'empenhos', 'itens', 'arquivos']
-        if data_type not in valid_types:
-            raise ValueError(f"Tipo de dado inválido: {data_type}. Deve ser um de {valid_types}")
-        
-        print(f"🔄 Sincronizando {data_type} do contrato {contrato.id}...")
-        
-        # Busca dados atualizados do contrato para obter links atualizados
-        url = f"{self.BASE_URL}/contrato/{contrato.id}"
-        contrato_data = self._fetch_api_data(url)
-        
-        if not contrato_data:
-            print(f"⚠ Não foi possível obter dados atualizados do contrato {contrato.id}.")
-            return {data_type: 0}
-        
-        # Se retornou lista, pega o primeiro item
-        if isinstance(contrato_data, list) and contrato_data:
-            contrato_data = contrato_data[0]
-        
-        links = contrato_data.get("links", {})
-        link_key = data_type
-        
-        if link_key not in links:
-            print(f"⚠ Link para {data_type} não encontrado no contrato {contrato.id}.")
-            return {data_type: 0}
-        
-        # Busca e salva dados
-        data = self._fetch_api_data(links[link_key])
-        count = 0
-        
-        if data:
-            # Mapeia tipo de dado para método de salvamento
-            save_methods = {
-                'historico': (self._save_historico, 'historico_atualizado_em'),
-                'empenhos': (self._save_empenhos, 'empenhos_atualizados_em'),
-                'itens': (self._save_itens, 'itens_atualizados_em'),
-                'arquivos': (self._save_arquivos, 'arquivos_atualizados_em'),
-            }
-            
-            save_method, field_name = save_methods[data_type]
-            save_method(contrato, data)
-            count = len(data)
-            
-            # Atualiza timestamp de sincronização
-            setattr(contrato, field_name, timezone.now())
-            contrato.save(update_fields=[field_name])
-            
-            print(f"✅ {data_type.capitalize()} do contrato {contrato.id} sincronizado: {count} registros")
+        if data_type not in DATA_TYPES:
+            raise ValueError(f"Tipo de dado inválido: {data_type}. Deve ser um de {list(DATA_TYPES)}")
+        
+        logger.info("Sincronizando %s do contrato %s...", data_type, contrato.id)
+        
+        # O link vem do raw_json já gravado; não é preciso buscar /contrato/{id} de novo
+        dados = buscar_relacionados_em_lote([(contrato.id, contrato.raw_json)], [data_type])[(contrato.id, data_type)]
+        if isinstance(dados, Exception):
+            raise RuntimeError(f"Não foi possível obter {data_type} do contrato {contrato.id}: {dados}") from dados
         
-        return {data_type: count}
+        return {data_type: self._aplicar_relacionados(contrato, data_type, dados)}
@@ -0,0 +1,100 @@
+"""
+Reconciliação das tabelas filhas do contrato (histórico, empenhos, itens, arquivos).
+
+Em vez de apagar e recriar todas as linhas a cada sincronização, compara o que veio
+da API com o que está gravado, pela chave natural do registro:
+
+- o ``id`` do payload do ComprasNet (``raw_json["id"]``), quando existe;
+- senão, os campos de ``CHAVES_NATURAIS`` do modelo.
+
+Registros com a mesma chave no mesmo contrato são diferenciados pela ordem em que
+aparecem. Só as linhas novas são inseridas (``bulk_create``), só as que mudaram são
+atualizadas (``bulk_update``) e só as que sumiram da API são apagadas.
+"""
+from typing import Any, Dict, Hashable, List, Mapping, Sequence, Tuple
+
+from ..models import ArquivoContrato, Empenho, HistoricoContrato, ItemContrato
+
+BATCH_SIZE = 500
+
+CHAVES_NATURAIS = {
+    HistoricoContrato: ("numero", "tipo", "data_assinatura"),
+    Empenho: ("numero", "unidade_gestora", "gestao"),
+    ItemContrato: ("numero_item_compra", "catmatseritem_id", "tipo_id"),
+    ArquivoContrato: ("path_arquivo", "tipo"),
+}
+
+
+def empty_stats() -> Dict[str, int]:
+    return {"inseridos": 0, "atualizados": 0, "removidos": 0, "inalterados": 0}
+
+
+def _campos(model) -> List[str]:
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if not field.primary_key and field.attname != "contrato_id"
+    ]
+
+
+def _normalizar(model, row: Mapping[str, Any]) -> Dict[str, Any]:
+    """Converte os valores para os tipos lidos do banco (ex.: datetime -> date)."""
+    opts = model._meta
+    return {nome: opts.get_field(nome).to_python(valor) for nome, valor in row.items()}
+
+
+def _chave_base(model, row: Mapping[str, Any]) -> Tuple[Hashable, ...]:
+    raw_json = row.get("raw_json")
+    raw_id = raw_json.get("id") if isinstance(raw_json, dict) else None
+    if raw_id not in (None, ""):
+        return ("id", str(raw_id))
+    return ("campos",) + tuple(row.get(campo) for campo in CHAVES_NATURAIS[model])
+
+
+def chaves_naturais(model, rows: Sequence[Mapping[str, Any]]) -> List[Tuple[Hashable, ...]]:
+    """Chave de cada linha, com o número da ocorrência para desempatar repetidas."""
+    vistas: Dict[Tuple[Hashable, ...], int] = {}
+    chaves = []
+    for row in rows:
+        base = _chave_base(model, row)
+        ocorrencia = vistas.get(base, 0)
+        vistas[base] = ocorrencia + 1
+        chaves.append(base + (ocorrencia,))
+    return chaves
+
+
+def reconciliar_filhos(model, contrato_id: str, rows: Sequence[Mapping[str, Any]]) -> Dict[str, int]:
+    """
+    Deixa as linhas de ``model`` do contrato iguais a ``rows`` (dicionários por
+    attname, sem ``contrato_id``), gravando apenas as diferenças. Deve rodar dentro
+    de uma transação.
+    """
+    stats = empty_stats()
+    campos = _campos(model)
+    novas = [_normalizar(model, row) for row in rows]
+
+    existentes = list(model.objects.filter(contrato_id=contrato_id).order_by("pk").values("pk", *campos))
+    por_chave = dict(zip(chaves_naturais(model, existentes), existentes))
+
+    inserir, atualizar = [], []
+    for chave, row in zip(chaves_naturais(model, novas), novas):
+        atual = por_chave.pop(chave, None)
+        if atual is None:
+            inserir.append(model(contrato_id=contrato_id, **row))
+            continue
+        if all(atual.get(campo) == row.get(campo) for campo in campos):
+            stats["inalterados"] += 1
+            continue
+        atualizar.append(model(pk=atual["pk"], contrato_id=contrato_id, **row))
+
+    remover = [atual["pk"] for atual in por_chave.values()]
+    if remover:
+        model.objects.filter(pk__in=remover).delete()
+    if atualizar:
+        model.objects.bulk_update(atualizar, campos, batch_size=BATCH_SIZE)
+    if inserir:
+        model.objects.bulk_create(inserir, batch_size=BATCH_SIZE)
+
+    stats["inseridos"] = len(inserir)
+    stats["atualizados"] = len(atualizar)
+    stats["removidos"] = len(remover)
+    return stats
@@ -0,0 +1,139 @@
+"""
+Orquestração da sincronização de contratos de todas as UASGs ativas.
+
+A lista de UASGs vem de ``uasgs.Uasg`` (``ativa=True``): cadastrar ou desativar uma
+OM basta para incluí-la ou retirá-la da sincronização, sem editar o settings.
+
+Cada execução gera um ``SincronizacaoContratos`` com uma linha ``SincronizacaoUasg``
+por UASG. As UASGs são distribuídas em ``concorrencia`` faixas; cada faixa roda em
+sequência, então nunca há mais de ``concorrencia`` UASGs sincronizando ao mesmo tempo.
+Quando a última UASG termina, os totais são consolidados na execução. Se uma faixa
+for interrompida (subtask morta por limite de tempo ou perda do worker), as UASGs
+que ficaram sem resultado são marcadas com erro por ``encerrar_faixa``.
+"""
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from django_licitacao360.apps.uasgs.models import Uasg
+
+from ..models import SincronizacaoContratos, SincronizacaoUasg
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCORRENCIA = int(os.getenv("CONTRATOS_SYNC_CONCORRENCIA", "3"))
+TOTAIS = ("contratos_processados", "contratos_alterados", "contratos_inalterados")
+
+
+def uasgs_ativas() -> List[str]:
+    """Códigos das UASGs ativas, em ordem."""
+    return [str(codigo) for codigo in Uasg.objects.filter(ativa=True).order_by("uasg").values_list("uasg", flat=True)]
+
+
+def dividir_em_faixas(codigos: Sequence[str], concorrencia: int) -> List[List[str]]:
+    """Distribui os códigos em até ``concorrencia`` faixas, alternando entre elas."""
+    concorrencia = max(1, min(concorrencia, len(codigos)))
+    return [list(codigos[inicio::concorrencia]) for inicio in range(concorrencia)] if codigos else []
+
+
+def consolidar_stats(resultados: Iterable[Tuple[str, Optional[Mapping[str, Any]]]]) -> Dict[str, Any]:
+    """Soma os totais das UASGs (pares ``(status, stats)``) e conta as que falharam."""
+    totais: Dict[str, Any] = {campo: 0 for campo in TOTAIS}
+    totais["uasgs_com_erro"] = 0
+    for status, stats in resultados:
+        if status == SincronizacaoUasg.STATUS_ERRO:
+            totais["uasgs_com_erro"] += 1
+        for campo in TOTAIS:
+            totais[campo] += (stats or {}).get(campo, 0) or 0
+    return totais
+
+
+def iniciar_sincronizacao(
+    codigos: Sequence[str],
+    concorrencia: int,
+    task_id: Optional[str] = None,
+) -> SincronizacaoContratos:
+    """Cria o registro da execução e uma linha pendente por UASG."""
+    with transaction.atomic():
+        execucao = SincronizacaoContratos.objects.create(
+            task_id=task_id,
+            concorrencia=concorrencia,
+            uasgs_total=len(codigos),
+        )
+        SincronizacaoUasg.objects.bulk_create([
+            SincronizacaoUasg(sincronizacao=execucao, uasg_code=codigo)
+            for codigo in codigos
+        ])
+    return execucao
+
+
+def registrar_inicio(sincronizacao_id: int, uasg_code: str) -> None:
+    SincronizacaoUasg.objects.filter(
+        sincronizacao_id=sincronizacao_id, uasg_code=uasg_code
+    ).update(status=SincronizacaoUasg.STATUS_EXECUTANDO, iniciada_em=timezone.now())
+
+
+def registrar_resultado(
+    sincronizacao_id: int,
+    uasg_code: str,
+    status: str,
+    stats: Optional[Dict[str, Any]] = None,
+    erro: Optional[str] = None,
+) -> None:
+    """Grava o resultado da UASG e, se foi a última, consolida a execução."""
+    SincronizacaoUasg.objects.filter(
+        sincronizacao_id=sincronizacao_id, uasg_code=uasg_code
+    ).update(status=status, stats=stats, erro=erro, finalizada_em=timezone.now())
+    finalizar_se_concluida(sincronizacao_id)
+
+
+def finalizar_se_concluida(sincronizacao_id: int) -> bool:
+    """
+    Consolida os totais da execução quando nenhuma UASG está pendente.
+
+    Retorna ``True`` se a execução foi finalizada nesta chamada. O filtro por
+    ``finalizada_em`` nulo garante que só uma chamada grava o resultado.
+    """
+    linhas = SincronizacaoUasg.objects.filter(sincronizacao_id=sincronizacao_id)
+    if linhas.exclude(status__in=SincronizacaoUasg.STATUS_FINAIS).exists():
+        return False
+
+    totais = consolidar_stats(linhas.values_list("status", "stats"))
+    status = (
+        SincronizacaoContratos.STATUS_CONCLUIDA_COM_ERROS
+        if totais.pop("uasgs_com_erro")
+        else SincronizacaoContratos.STATUS_CONCLUIDA
+    )
+    finalizada = SincronizacaoContratos.objects.filter(
+        pk=sincronizacao_id, finalizada_em__isnull=True
+    ).update(status=status, finalizada_em=timezone.now(), **totais)
+    if finalizada:
+        logger.info(
+            "Sincronização de contratos %s finalizada (%s): %s",
+            sincronizacao_id, status, totais,
+        )
+    return bool(finalizada)
+
+
+def encerrar_faixa(sincronizacao_id: int, codigos: Sequence[str], erro: str) -> int:
+    """
+    Marca com erro as UASGs de uma faixa interrompida que ainda não têm resultado
+    (a que estava executando e as que não chegaram a começar) e consolida a execução.
+
+    Retorna quantas UASGs foram marcadas.
+    """
+    marcadas = SincronizacaoUasg.objects.filter(
+        sincronizacao_id=sincronizacao_id, uasg_code__in=list(codigos)
+    ).exclude(status__in=SincronizacaoUasg.STATUS_FINAIS).update(
+        status=SincronizacaoUasg.STATUS_ERRO, erro=erro, finalizada_em=timezone.now()
+    )
+    if marcadas:
+        logger.warning(
+            "Faixa da sincronização %s interrompida; %s UASGs marcadas com erro: %s",
+            sincronizacao_id, marcadas, erro,
+        )
+    finalizar_se_concluida(sincronizacao_id)
+    return marcadas
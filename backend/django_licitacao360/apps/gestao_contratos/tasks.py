@@ -5,28 +5,59 @@ Tasks Celery para sincronização de contratos do ComprasNet
 from __future__ import annotations
 
 import logging
-from urllib.parse import urlparse
+import uuid
+from typing import Optional
 
-import redis
-from celery import shared_task
-from django.conf import settings
-from django.db import connections
+from celery import chain, group, shared_task
+from django.db import connections, transaction
+from django.utils import timezone
 
+from django_licitacao360.apps.core.services.redis_client import get_redis_client
+
+from .models import Contrato, SincronizacaoJob, SincronizacaoUasg
+from .services import sincronizacao
 from .services.ingestion import ComprasNetIngestionService
 
 logger = logging.getLogger(__name__)
 
+LOCK_TIMEOUT = 3600  # 1 hora (tempo máximo de execução de uma UASG)
 
-def get_redis_client():
-    """Retorna cliente Redis usando a configuração do Celery."""
-    broker_url = getattr(settings, "CELERY_BROKER_URL", "redis://redis:6379/0")
-    parsed = urlparse(broker_url)
-    return redis.Redis(
-        host=parsed.hostname or "redis",
-        port=parsed.port or 6379,
-        db=2,  # DB diferente do broker e result backend
-        decode_responses=True,
-    )
+
+class SincronizacaoEmAndamento(Exception):
+    """Já há uma sincronização do mesmo alvo que não foi disparada pela API."""
+
+
+def lock_key_uasg(uasg_code: str) -> str:
+    return f"contratos:lock:{uasg_code}"
+
+
+def lock_key_job(job: SincronizacaoJob) -> str:
+    """Jobs de UASG usam o mesmo lock das tasks agendadas; os de contrato, um por tipo."""
+    if job.tipo == SincronizacaoJob.TIPO_UASG:
+        return lock_key_uasg(job.uasg_code)
+    return f"contratos:lock:contrato:{job.contrato_id}:{job.tipo}"
+
+
+def adquirir_lock_uasg(redis_client, uasg_code: str, dono: Optional[str] = None) -> Optional[str]:
+    """
+    Lock distribuído por UASG, compartilhado por todas as tasks de sincronização.
+    Retorna o token gravado como valor do lock (``dono`` ou um UUID novo), ou
+    ``None`` se a UASG já estiver com lock.
+    """
+    token = dono or str(uuid.uuid4())
+    if redis_client.set(lock_key_uasg(uasg_code), token, nx=True, ex=LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def liberar_lock_uasg(redis_client, uasg_code: str, token: str) -> None:
+    """Remove o lock apenas se ele ainda pertence a ``token``."""
+    lock_key = lock_key_uasg(uasg_code)
+    try:
+        if redis_client.get(lock_key) == token:
+            redis_client.delete(lock_key)
+    except Exception as exc:
+        logger.warning("Erro ao remover lock %s: %s", lock_key, exc)
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=120, retry_kwargs={"max_retries": 3})
@@ -42,14 +73,11 @@ def sync_contratos_uasg(self, uasg_code: str) -> dict:
     Returns:
         Dicionário com estatísticas da sincronização
     """
-    lock_key = f"contratos:lock:{uasg_code}"
-    lock_timeout = 3600  # 1 hora (tempo máximo de execução)
     redis_client = get_redis_client()
 
     # Tenta adquirir lock distribuído
-    lock_acquired = redis_client.set(lock_key, "locked", nx=True, ex=lock_timeout)
-    
-    if not lock_acquired:
+    token = adquirir_lock_uasg(redis_client, uasg_code, self.request.id)
+    if token is None:
         logger.warning(
             "Sincronização de contratos já em execução para UASG %s. Ignorando execução duplicada.",
             uasg_code
@@ -69,9 +97,11 @@ def sync_contratos_uasg(self, uasg_code: str) -> dict:
         connections.close_all()
         
         logger.info(
-            "Sincronização de contratos finalizada. uasg=%s contratos=%s",
+            "Sincronização de contratos finalizada. uasg=%s contratos=%s alterados=%s inalterados=%s",
             uasg_code,
             result.get("contratos_processados", 0),
+            result.get("contratos_alterados", 0),
+            result.get("contratos_inalterados", 0),
         )
         
         return {
@@ -88,10 +118,250 @@ def sync_contratos_uasg(self, uasg_code: str) -> dict:
         raise
     finally:
         # Remove o lock ao finalizar (mesmo em caso de erro)
-        try:
-            redis_client.delete(lock_key)
-        except Exception as exc:
-            logger.warning("Erro ao remover lock %s: %s", lock_key, exc)
+        liberar_lock_uasg(redis_client, uasg_code, token)
         # Garantir fechamento de conexões
         connections.close_all()
 
+
+
+@shared_task(bind=True, soft_time_limit=LOCK_TIMEOUT - 60, time_limit=LOCK_TIMEOUT)
+def sync_contratos_uasg_execucao(self, sincronizacao_id: int, uasg_code: str) -> dict:
+    """
+    Sincroniza uma UASG como parte de uma execução de ``sync_contratos_uasgs_ativas``.
+
+    Nunca propaga exceções: o erro é registrado na linha da UASG para que a faixa
+    siga para a próxima UASG e a execução seja consolidada ao final.
+    """
+    redis_client = get_redis_client()
+    token = adquirir_lock_uasg(redis_client, uasg_code, self.request.id)
+    if token is None:
+        logger.warning(
+            "Sincronização de contratos já em execução para UASG %s. Ignorando nesta execução.",
+            uasg_code,
+        )
+        sincronizacao.registrar_resultado(sincronizacao_id, uasg_code, SincronizacaoUasg.STATUS_IGNORADA)
+        return {"uasg_code": uasg_code, "skipped": True}
+
+    try:
+        sincronizacao.registrar_inicio(sincronizacao_id, uasg_code)
+        result = ComprasNetIngestionService().sync_contratos_por_uasg(uasg_code)
+        sincronizacao.registrar_resultado(
+            sincronizacao_id, uasg_code, SincronizacaoUasg.STATUS_CONCLUIDA, stats=result
+        )
+    except Exception as exc:
+        logger.error("Erro ao sincronizar contratos para UASG %s: %s", uasg_code, exc, exc_info=True)
+        sincronizacao.registrar_resultado(
+            sincronizacao_id, uasg_code, SincronizacaoUasg.STATUS_ERRO, erro=str(exc)
+        )
+        return {"uasg_code": uasg_code, "erro": str(exc)}
+    finally:
+        liberar_lock_uasg(redis_client, uasg_code, token)
+        connections.close_all()
+
+    return {"uasg_code": uasg_code, **result}
+
+
+@shared_task(bind=True)
+def sync_contratos_uasgs_ativas(self, concorrencia: Optional[int] = None) -> dict:
+    """
+    Sincroniza os contratos de todas as UASGs ativas (``Uasg.ativa=True``).
+
+    Distribui as UASGs em ``concorrencia`` faixas (padrão: ``CONTRATOS_SYNC_CONCORRENCIA``),
+    cada uma encadeando ``sync_contratos_uasg_execucao`` em sequência, e registra
+    o progresso e os totais em ``SincronizacaoContratos``.
+
+    Returns:
+        ID da execução, quantidade de UASGs e concorrência usada
+    """
+    concorrencia = max(1, concorrencia or sincronizacao.DEFAULT_CONCORRENCIA)
+    codigos = sincronizacao.uasgs_ativas()
+    execucao = sincronizacao.iniciar_sincronizacao(codigos, concorrencia, task_id=self.request.id)
+
+    faixas = sincronizacao.dividir_em_faixas(codigos, concorrencia)
+    if faixas:
+        group([_cadeia_da_faixa(execucao.pk, faixa) for faixa in faixas]).apply_async()
+    else:
+        sincronizacao.finalizar_se_concluida(execucao.pk)
+
+    logger.info(
+        "Sincronização de contratos %s iniciada: %s UASGs em %s faixas",
+        execucao.pk, len(codigos), len(faixas),
+    )
+    connections.close_all()
+    return {
+        "sincronizacao_id": execucao.pk,
+        "uasgs": len(codigos),
+        "concorrencia": len(faixas),
+    }
+
+
+def _cadeia_da_faixa(sincronizacao_id: int, faixa: list) -> chain:
+    """
+    Subtasks da faixa em sequência. Cada uma leva um ``link_error``: se for morta
+    (``time_limit``, worker perdido), a chain para e as UASGs restantes da faixa são
+    encerradas com erro, para que a execução não fique aberta.
+    """
+    errback = sync_contratos_faixa_interrompida.s(sincronizacao_id, list(faixa))
+    return chain([
+        sync_contratos_uasg_execucao.si(sincronizacao_id, codigo).on_error(errback)
+        for codigo in faixa
+    ])
+
+
+@shared_task
+def sync_contratos_faixa_interrompida(request, exc, traceback, sincronizacao_id: int, codigos: list) -> int:
+    """
+    Errback das subtasks de ``sync_contratos_uasgs_ativas``. Recebe ``(request, exc,
+    traceback)`` do Celery, seguidos dos argumentos da assinatura.
+    """
+    try:
+        return sincronizacao.encerrar_faixa(
+            sincronizacao_id,
+            codigos,
+            erro=f"Faixa interrompida na task {getattr(request, 'id', None)}: {exc!r}",
+        )
+    finally:
+        connections.close_all()
+
+
+def _uuid_ou_none(valor: Optional[str]) -> Optional[str]:
+    try:
+        return str(uuid.UUID(valor)) if valor else None
+    except ValueError:
+        return None
+
+
+def liberar_lock_job(redis_client, job: SincronizacaoJob) -> None:
+    """Remove o lock apenas se ele ainda pertence ao job."""
+    lock_key = lock_key_job(job)
+    try:
+        if redis_client.get(lock_key) == str(job.pk):
+            redis_client.delete(lock_key)
+    except Exception as exc:
+        logger.warning("Erro ao remover lock %s: %s", lock_key, exc)
+
+
+def enfileirar_sincronizacao(
+    tipo: str,
+    uasg_code: Optional[str] = None,
+    contrato: Optional[Contrato] = None,
+    detalhes: bool = False,
+) -> tuple[SincronizacaoJob, bool]:
+    """
+    Cria um ``SincronizacaoJob`` e o envia ao Celery, sem esperar a sincronização.
+
+    O job é gravado antes de o lock Redis do alvo ser adquirido com o ID do job como
+    valor, para que quem encontrar o lock sempre ache o job. Se o lock já estiver
+    ocupado por outro job, o novo é descartado e o existente é devolvido.
+
+    Returns:
+        ``(job, criado)``
+
+    Raises:
+        SincronizacaoEmAndamento: o lock pertence a uma task agendada
+    """
+    job = SincronizacaoJob(tipo=tipo, uasg_code=uasg_code, contrato=contrato, detalhes=detalhes)
+    job.save()
+    redis_client = get_redis_client()
+    lock_key = lock_key_job(job)
+
+    try:
+        adquirido = redis_client.set(lock_key, str(job.pk), nx=True, ex=LOCK_TIMEOUT)
+    except Exception:
+        job.delete()
+        raise
+
+    if not adquirido:
+        job.delete()
+        existente = SincronizacaoJob.objects.filter(pk=_uuid_ou_none(redis_client.get(lock_key))).first()
+        if existente is None:
+            raise SincronizacaoEmAndamento(
+                "Já existe uma sincronização em andamento para este alvo. Tente novamente mais tarde."
+            )
+        return existente, False
+
+    transaction.on_commit(lambda: _despachar_job(redis_client, job))
+    return job, True
+
+
+def _despachar_job(redis_client, job: SincronizacaoJob) -> None:
+    """Envia o job ao Celery; se o envio falhar, libera o lock e marca o job com erro."""
+    try:
+        executar_sincronizacao_job.delay(str(job.pk))
+    except Exception as exc:
+        logger.error("Falha ao enviar a sincronização %s ao Celery: %s", job.pk, exc, exc_info=True)
+        liberar_lock_job(redis_client, job)
+        job.status = SincronizacaoJob.STATUS_ERRO
+        job.erro = f"Falha ao enviar ao Celery: {exc}"
+        job.concluido_em = timezone.now()
+        _atualizar_job(job.pk, status=job.status, erro=job.erro, concluido_em=job.concluido_em)
+
+
+def _atualizar_job(job_id, **campos) -> None:
+    SincronizacaoJob.objects.filter(pk=job_id).update(**campos)
+
+
+@shared_task(bind=True, soft_time_limit=LOCK_TIMEOUT - 60, time_limit=LOCK_TIMEOUT)
+def executar_sincronizacao_job(self, job_id: str) -> dict:
+    """
+    Executa um ``SincronizacaoJob`` criado por ``enfileirar_sincronizacao``,
+    registrando o progresso (contratos feitos/total e erros) a cada etapa.
+    """
+    job = SincronizacaoJob.objects.select_related('contrato').get(pk=job_id)
+    alvo = f"{job.tipo} {job.uasg_code or job.contrato_id}"
+    redis_client = get_redis_client()
+    lock_key = lock_key_job(job)
+
+    # O lock foi adquirido ao enfileirar; se expirou enquanto o job aguardava, tenta de novo
+    dono = redis_client.get(lock_key)
+    if dono != str(job.pk) and not redis_client.set(lock_key, str(job.pk), nx=True, ex=LOCK_TIMEOUT):
+        erro = "Já existe uma sincronização em andamento para este alvo"
+        _atualizar_job(job.pk, status=SincronizacaoJob.STATUS_ERRO, erro=erro, concluido_em=timezone.now())
+        return {"job_id": job_id, "status": SincronizacaoJob.STATUS_ERRO, "erro": erro}
+
+    _atualizar_job(
+        job.pk,
+        status=SincronizacaoJob.STATUS_PROCESSANDO,
+        iniciado_em=timezone.now(),
+        task_id=self.request.id,
+    )
+
+    def progresso(feitos: int, total: int, erros: int, erros_anteriores: int = 0) -> None:
+        _atualizar_job(
+            job.pk,
+            contratos_processados=feitos,
+            contratos_total=total,
+            erros=erros_anteriores + erros,
+        )
+
+    try:
+        service = ComprasNetIngestionService()
+        if job.tipo == SincronizacaoJob.TIPO_UASG:
+            _atualizar_job(job.pk, etapa='contratos')
+            stats = service.sync_contratos_por_uasg(job.uasg_code, progresso=progresso)
+            if job.detalhes:
+                erros_contratos = SincronizacaoJob.objects.values_list('erros', flat=True).get(pk=job.pk)
+                _atualizar_job(job.pk, etapa='detalhes', contratos_processados=0)
+                stats['detalhes'] = service.sync_detalhes_contratos(
+                    Contrato.objects.filter(uasg__uasg=job.uasg_code, manual=False),
+                    progresso=lambda feitos, total, erros: progresso(feitos, total, erros, erros_contratos),
+                )
+        else:
+            progresso(0, 1, 0)
+            try:
+                stats = service._sync_single_related_dataset(job.contrato, job.tipo)
+            except Exception:
+                progresso(1, 1, 1)
+                raise
+            progresso(1, 1, 0)
+    except Exception as exc:
+        logger.error("Sincronização %s (%s) falhou: %s", job_id, alvo, exc, exc_info=True)
+        _atualizar_job(job.pk, status=SincronizacaoJob.STATUS_ERRO, erro=str(exc), concluido_em=timezone.now())
+        return {"job_id": job_id, "status": SincronizacaoJob.STATUS_ERRO, "erro": str(exc)}
+    finally:
+        liberar_lock_job(redis_client, job)
+        connections.close_all()
+
+    _atualizar_job(job.pk, status=SincronizacaoJob.STATUS_CONCLUIDO, stats=stats, concluido_em=timezone.now())
+    logger.info("Sincronização %s (%s) concluída: %s", job_id, alvo, stats)
+    return {"job_id": job_id, "status": SincronizacaoJob.STATUS_CONCLUIDO, **stats}
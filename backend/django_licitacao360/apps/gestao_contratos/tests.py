@@ -1,18 +1,36 @@
 """
 Testes para o modelo Contrato e serviço de ingestão
 """
+import asyncio
 import json
+from contextlib import asynccontextmanager
 from decimal import Decimal
 from datetime import datetime, date
 from unittest.mock import patch, MagicMock
 
-from django.test import TestCase
+import redis
+from aiohttp import web
+from rest_framework.test import APIRequestFactory
+from django.test import SimpleTestCase, TestCase
 from django.core.exceptions import ValidationError
 
+from django_licitacao360.apps.core.services.fingerprint import fingerprint
+from django_licitacao360.apps.core.services.http_client import RedisTokenBucket
 from django_licitacao360.apps.uasgs.models import Uasg
 
-from .models import Contrato
+from . import tasks
+from .models import Contrato, Empenho, HistoricoContrato, SincronizacaoJob, SincronizacaoUasg
+from .services import comprasnet_client, ingestion, sincronizacao
+from .services.comprasnet_client import (
+    ApiRequestError,
+    ComprasNetClient,
+    buscar_relacionados,
+    link_relacionado,
+    listar_contratos_uasg,
+)
 from .services.ingestion import ComprasNetIngestionService
+from .services.reconciliacao import _normalizar, chaves_naturais
+from .views import ContratoViewSet
 
 
 class ContratoModelTest(TestCase):
@@ -145,14 +163,11 @@ class ComprasNetIngestionServiceTest(TestCase):
             }
         }
     
-    @patch('gestao_contratos.services.ingestion.requests.get')
-    def test_save_contrato_with_valor_global_string_com_virgula(self, mock_get):
+    @patch.object(ingestion, 'buscar_contratos_uasg')
+    def test_save_contrato_with_valor_global_string_com_virgula(self, mock_buscar):
         """Testa salvamento de contrato com valor_global como string com vírgula"""
         # Mock da resposta da API
-        mock_response = MagicMock()
-        mock_response.json.return_value = [self._create_mock_contrato_data(valor_global="1.000.000,50")]
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+        mock_buscar.return_value = [self._create_mock_contrato_data(valor_global="1.000.000,50")]
         
         # Executa a sincronização
         stats = self.service.sync_contratos_por_uasg('123456')
@@ -168,13 +183,10 @@ class ComprasNetIngestionServiceTest(TestCase):
         self.assertEqual(contrato.valor_global, Decimal('1000000.50'))
         self.assertEqual(str(contrato.valor_global), '1000000.50')
     
-    @patch('gestao_contratos.services.ingestion.requests.get')
-    def test_save_contrato_with_valor_global_string_com_ponto(self, mock_get):
+    @patch.object(ingestion, 'buscar_contratos_uasg')
+    def test_save_contrato_with_valor_global_string_com_ponto(self, mock_buscar):
         """Testa salvamento de contrato com valor_global como string com ponto"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = [self._create_mock_contrato_data(valor_global="500000.75")]
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+        mock_buscar.return_value = [self._create_mock_contrato_data(valor_global="500000.75")]
         
         stats = self.service.sync_contratos_por_uasg('123456')
         
@@ -184,13 +196,10 @@ class ComprasNetIngestionServiceTest(TestCase):
         self.assertIsNotNone(contrato.valor_global)
         self.assertEqual(contrato.valor_global, Decimal('500000.75'))
     
-    @patch('gestao_contratos.services.ingestion.requests.get')
-    def test_save_contrato_with_valor_global_numerico(self, mock_get):
+    @patch.object(ingestion, 'buscar_contratos_uasg')
+    def test_save_contrato_with_valor_global_numerico(self, mock_buscar):
         """Testa salvamento de contrato com valor_global como número"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = [self._create_mock_contrato_data(valor_global=750000.25)]
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+        mock_buscar.return_value = [self._create_mock_contrato_data(valor_global=750000.25)]
         
         stats = self.service.sync_contratos_por_uasg('123456')
         
@@ -201,13 +210,10 @@ class ComprasNetIngestionServiceTest(TestCase):
         # Float pode ter pequenas diferenças, então verificamos se está próximo
         self.assertAlmostEqual(float(contrato.valor_global), 750000.25, places=2)
     
-    @patch('gestao_contratos.services.ingestion.requests.get')
-    def test_save_contrato_with_valor_global_none(self, mock_get):
+    @patch.object(ingestion, 'buscar_contratos_uasg')
+    def test_save_contrato_with_valor_global_none(self, mock_buscar):
         """Testa salvamento de contrato com valor_global None"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = [self._create_mock_contrato_data(valor_global=None)]
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+        mock_buscar.return_value = [self._create_mock_contrato_data(valor_global=None)]
         
         stats = self.service.sync_contratos_por_uasg('123456')
         
@@ -217,13 +223,10 @@ class ComprasNetIngestionServiceTest(TestCase):
         # valor_global pode ser None
         self.assertIsNone(contrato.valor_global)
     
-    @patch('gestao_contratos.services.ingestion.requests.get')
-    def test_save_contrato_with_valor_global_string_vazia(self, mock_get):
+    @patch.object(ingestion, 'buscar_contratos_uasg')
+    def test_save_contrato_with_valor_global_string_vazia(self, mock_buscar):
         """Testa salvamento de contrato com valor_global como string vazia"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = [self._create_mock_contrato_data(valor_global="")]
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+        mock_buscar.return_value = [self._create_mock_contrato_data(valor_global="")]
         
         stats = self.service.sync_contratos_por_uasg('123456')
         
@@ -233,8 +236,8 @@ class ComprasNetIngestionServiceTest(TestCase):
         # String vazia deve resultar em None
         self.assertIsNone(contrato.valor_global)
     
-    @patch('gestao_contratos.services.ingestion.requests.get')
-    def test_save_contrato_with_all_fields_from_api(self, mock_get):
+    @patch.object(ingestion, 'buscar_contratos_uasg')
+    def test_save_contrato_with_all_fields_from_api(self, mock_buscar):
         """Testa salvamento de contrato com TODOS os campos da API"""
         contrato_data = {
             "id": "test-completo-001",
@@ -261,10 +264,7 @@ class ComprasNetIngestionServiceTest(TestCase):
             }
         }
         
-        mock_response = MagicMock()
-        mock_response.json.return_value = [contrato_data]
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+        mock_buscar.return_value = [contrato_data]
         
         stats = self.service.sync_contratos_por_uasg('123456')
         
@@ -319,8 +319,8 @@ class ComprasNetIngestionServiceTest(TestCase):
         result = self.service._parse_decimal("abc")
         self.assertIsNone(result)
     
-    @patch('gestao_contratos.services.ingestion.requests.get')
-    def test_save_contrato_valor_global_com_formatos_diferentes(self, mock_get):
+    @patch.object(ingestion, 'buscar_contratos_uasg')
+    def test_save_contrato_valor_global_com_formatos_diferentes(self, mock_buscar):
         """Testa diferentes formatos de valor_global que podem vir da API"""
         formatos_teste = [
             ("1.000.000,50", Decimal('1000000.50')),
@@ -337,10 +337,7 @@ class ComprasNetIngestionServiceTest(TestCase):
                 contrato_data = self._create_mock_contrato_data(valor_global=valor_input)
                 contrato_data["id"] = f"test-format-{idx}"
                 
-                mock_response = MagicMock()
-                mock_response.json.return_value = [contrato_data]
-                mock_response.raise_for_status = MagicMock()
-                mock_get.return_value = mock_response
+                mock_buscar.return_value = [contrato_data]
                 
                 stats = self.service.sync_contratos_por_uasg('123456')
                 
@@ -353,3 +350,504 @@ class ComprasNetIngestionServiceTest(TestCase):
                     self.assertEqual(contrato.valor_global, valor_esperado,
                                    f"valor_global incorreto para entrada: {valor_input}")
 
+
+class ComprasNetClientTest(SimpleTestCase):
+    """Testes da busca paralela de dados relacionados contra um servidor aiohttp local"""
+
+    @asynccontextmanager
+    async def _serve(self, handler):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        try:
+            port = site._server.sockets[0].getsockname()[1]
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            await runner.cleanup()
+
+    def _client(self, **kwargs):
+        kwargs.setdefault("rate", 1000)
+        kwargs.setdefault("max_rate", 1000)
+        kwargs.setdefault("backoff_base", 0.01)
+        kwargs.setdefault("shared_bucket", None)
+        return ComprasNetClient(**kwargs)
+
+    def test_link_do_raw_json_ou_padrao_da_api(self):
+        raw = {"links": {"historico": "https://exemplo/api/contrato/1/historico"}}
+        self.assertEqual(link_relacionado("1", raw, "historico"), "https://exemplo/api/contrato/1/historico")
+        self.assertEqual(
+            link_relacionado("1", raw, "empenhos"),
+            "https://contratos.comprasnet.gov.br/api/contrato/1/empenhos",
+        )
+        self.assertEqual(
+            link_relacionado("2", None, "itens"),
+            "https://contratos.comprasnet.gov.br/api/contrato/2/itens",
+        )
+
+    async def test_busca_contratos_em_paralelo_com_limite(self):
+        em_voo = {"atual": 0, "max": 0}
+        caminhos = []
+
+        async def handler(request):
+            caminhos.append(request.path)
+            em_voo["atual"] += 1
+            em_voo["max"] = max(em_voo["max"], em_voo["atual"])
+            await asyncio.sleep(0.02)
+            em_voo["atual"] -= 1
+            if request.path.endswith("/arquivos"):
+                return web.json_response({"id": 1})
+            return web.json_response([{"path": request.path}])
+
+        async with self._serve(handler) as base, self._client(max_concurrency=4) as client:
+            contratos = [
+                (str(n), {"links": {t: f"{base}/contrato/{n}/{t}" for t in ("historico", "empenhos", "itens", "arquivos")}})
+                for n in range(5)
+            ]
+            resultados = await buscar_relacionados(client, contratos)
+
+        self.assertEqual(len(resultados), 20)
+        self.assertEqual(len(caminhos), 20)
+        self.assertNotIn("/contrato/0", caminhos)
+        self.assertEqual(resultados[("3", "itens")], [{"path": "/contrato/3/itens"}])
+        self.assertEqual(resultados[("3", "arquivos")], [{"id": 1}])
+        self.assertGreater(em_voo["max"], 1)
+        self.assertLessEqual(em_voo["max"], 4)
+
+    async def test_falha_de_um_contrato_nao_interrompe_os_demais(self):
+        async def handler(request):
+            if "/contrato/ruim/" in request.path:
+                return web.Response(status=503, text="indisponível")
+            if "/contrato/vazio/" in request.path:
+                return web.Response(status=404)
+            return web.json_response([{"ok": True}])
+
+        async with self._serve(handler) as base, self._client(max_retries=2) as client:
+            contratos = [
+                (nome, {"links": {"empenhos": f"{base}/contrato/{nome}/empenhos"}})
+                for nome in ("bom", "ruim", "vazio")
+            ]
+            resultados = await buscar_relacionados(client, contratos, ["empenhos"])
+
+        self.assertEqual(resultados[("bom", "empenhos")], [{"ok": True}])
+        self.assertIsInstance(resultados[("ruim", "empenhos")], ApiRequestError)
+        self.assertEqual(resultados[("vazio", "empenhos")], [])
+
+
+    async def test_listagem_da_uasg_repete_apos_erro_temporario(self):
+        tentativas = []
+
+        async def handler(request):
+            tentativas.append(request.path)
+            if request.path.endswith("/999999"):
+                return web.Response(status=404)
+            if len(tentativas) == 1:
+                return web.Response(status=503, text="indisponível")
+            return web.json_response([{"id": 1}, {"id": 2}])
+
+        async with self._serve(handler) as base, self._client(max_retries=3) as client:
+            contratos = await listar_contratos_uasg(client, "787010", base_url=base)
+            inexistente = await listar_contratos_uasg(client, "999999", base_url=base)
+
+        self.assertEqual(contratos, [{"id": 1}, {"id": 2}])
+        self.assertEqual(tentativas[:2], ["/contrato/ug/787010", "/contrato/ug/787010"])
+        self.assertEqual(inexistente, [])
+
+    def test_cliente_usa_o_bucket_global_do_redis(self):
+        redis_client = MagicMock()
+        with patch.object(comprasnet_client, "get_redis_client", return_value=redis_client):
+            client = ComprasNetClient()
+            with patch.object(comprasnet_client, "GLOBAL_RATE", 0):
+                sem_limite = ComprasNetClient()
+
+        self.assertIsInstance(client.shared_bucket, RedisTokenBucket)
+        self.assertEqual(client.shared_bucket.key, "comprasnet:rate")
+        self.assertEqual(client.shared_bucket.rate, comprasnet_client.GLOBAL_RATE)
+        redis_client.register_script.assert_called_once_with(RedisTokenBucket.SCRIPT)
+        self.assertIsNone(sem_limite.shared_bucket)
+
+    async def test_cada_tentativa_consome_um_token_global(self):
+        tokens = []
+
+        class BucketGlobal:
+            async def acquire(self):
+                tokens.append(1)
+
+        async def handler(request):
+            if len(tokens) == 1:
+                return web.Response(status=503, text="indisponível")
+            return web.json_response([])
+
+        async with self._serve(handler) as base, self._client(shared_bucket=BucketGlobal()) as client:
+            await listar_contratos_uasg(client, "787010", base_url=base)
+            await listar_contratos_uasg(client, "787011", base_url=base)
+
+        self.assertEqual(len(tokens), 3)
+
+    async def test_bucket_global_espera_o_tempo_devolvido_pelo_redis(self):
+        redis_client = MagicMock()
+        redis_client.register_script.return_value.side_effect = ["0.01", "0.01", "0"]
+        bucket = RedisTokenBucket(redis_client, "comprasnet:rate", rate=10)
+
+        await bucket.acquire()
+
+        self.assertEqual(redis_client.register_script.return_value.call_count, 3)
+        redis_client.register_script.return_value.assert_called_with(keys=["comprasnet:rate"], args=[10, 10])
+
+    async def test_bucket_global_sem_redis_nao_bloqueia_as_requisicoes(self):
+        redis_client = MagicMock()
+        redis_client.register_script.return_value.side_effect = redis.ConnectionError("recusada")
+        bucket = RedisTokenBucket(redis_client, "comprasnet:rate", rate=10)
+
+        await bucket.acquire()
+        await bucket.acquire()
+
+        # Depois da falha, o Redis só é consultado de novo após a pausa
+        self.assertEqual(redis_client.register_script.return_value.call_count, 1)
+
+
+class ReconciliacaoTest(SimpleTestCase):
+    """Chaves naturais das tabelas filhas e gravação em lote dos contratos"""
+
+    def test_chave_usa_id_do_payload_quando_existe(self):
+        rows = [
+            {"numero": "2024NE1", "raw_json": {"id": 10}},
+            {"numero": "2024NE1", "raw_json": {"id": 11}},
+        ]
+        self.assertEqual(chaves_naturais(Empenho, rows), [("id", "10", 0), ("id", "11", 0)])
+
+    def test_chave_por_campos_desempata_repetidos(self):
+        rows = [
+            {"numero": "2024NE1", "unidade_gestora": "787010", "gestao": "00001", "raw_json": {}},
+            {"numero": "2024NE1", "unidade_gestora": "787010", "gestao": "00001", "raw_json": {}},
+        ]
+        chaves = chaves_naturais(Empenho, rows)
+        self.assertEqual(chaves[0][:-1], chaves[1][:-1])
+        self.assertEqual([chaves[0][-1], chaves[1][-1]], [0, 1])
+
+    def test_normalizacao_iguala_payload_e_banco(self):
+        servico = ComprasNetIngestionService()
+        novo = _normalizar(HistoricoContrato, servico._historico_row({
+            "numero": "1", "tipo": "Termo Aditivo", "data_assinatura": "2024-03-01", "valor_global": "1.500,00",
+        }))
+        gravado = dict(novo, data_assinatura=date(2024, 3, 1), valor_global=Decimal("1500.00"))
+        self.assertEqual(novo, gravado)
+        self.assertEqual(chaves_naturais(HistoricoContrato, [novo]), chaves_naturais(HistoricoContrato, [gravado]))
+
+    def _upsert(self, contratos, hashes_gravados=()):
+        filtro = MagicMock()
+        filtro.return_value.values_list.return_value = list(hashes_gravados)
+        with patch.object(ingestion.Contrato.objects, "filter", filtro), \
+                patch.object(ingestion, "bulk_upsert", return_value={}) as upsert:
+            stats = ComprasNetIngestionService()._upsert_contratos(contratos, uasg_id=787010)
+        return stats, upsert
+
+    def test_upsert_de_contratos_nao_reescreve_created_at(self):
+        contrato = {"id": 7, "numero": "1/2024", "fornecedor": None, "contratante": {}}
+        _, upsert = self._upsert([contrato])
+
+        (model, rows), kwargs = upsert.call_args
+        self.assertIs(model, Contrato)
+        self.assertEqual(rows[0]["id"], "7")
+        self.assertEqual(rows[0]["uasg_id"], 787010)
+        self.assertEqual(kwargs["conflict_fields"], ["id"])
+        self.assertEqual(kwargs["touch_fields"], ["updated_at"])
+        self.assertNotIn("created_at", kwargs["update_fields"])
+        self.assertNotIn("updated_at", kwargs["update_fields"])
+
+    def test_hash_igual_ao_gravado_nao_vai_para_o_upsert(self):
+        igual = {"id": 1, "numero": "1/2024", "objeto": "Serviço"}
+        mudou = {"id": 2, "numero": "2/2024", "objeto": "Obra"}
+        novo = {"id": 3, "numero": "3/2024"}
+        gravados = [("1", fingerprint(dict(igual))), ("2", fingerprint({"id": 2, "numero": "2/2024"}))]
+
+        stats, upsert = self._upsert([igual, mudou, novo], gravados)
+
+        (_, rows), _ = upsert.call_args
+        self.assertEqual([row["id"] for row in rows], ["2", "3"])
+        self.assertEqual(stats["inalteradas_hash"], 1)
+
+    def test_hash_independe_da_ordem_das_chaves(self):
+        self.assertEqual(
+            fingerprint({"id": 1, "fornecedor": {"nome": "A", "cnpj": "1"}}),
+            fingerprint({"fornecedor": {"cnpj": "1", "nome": "A"}, "id": 1}),
+        )
+
+
+class SincronizacaoUasgsAtivasTest(SimpleTestCase):
+    """Distribuição das UASGs ativas em faixas e consolidação da execução"""
+
+    def test_faixas_respeitam_concorrencia(self):
+        faixas = sincronizacao.dividir_em_faixas(["1", "2", "3", "4", "5"], 2)
+        self.assertEqual(faixas, [["1", "3", "5"], ["2", "4"]])
+
+    def test_faixas_nao_excedem_quantidade_de_uasgs(self):
+        self.assertEqual(sincronizacao.dividir_em_faixas(["1", "2"], 8), [["1"], ["2"]])
+        self.assertEqual(sincronizacao.dividir_em_faixas([], 3), [])
+
+    def test_consolidar_soma_totais_e_conta_erros(self):
+        totais = sincronizacao.consolidar_stats([
+            (SincronizacaoUasg.STATUS_CONCLUIDA, {"contratos_processados": 10, "contratos_alterados": 3, "contratos_inalterados": 7}),
+            (SincronizacaoUasg.STATUS_CONCLUIDA, {"contratos_processados": 2, "contratos_alterados": 2, "contratos_inalterados": 0}),
+            (SincronizacaoUasg.STATUS_ERRO, None),
+            (SincronizacaoUasg.STATUS_IGNORADA, None),
+        ])
+        self.assertEqual(totais, {
+            "contratos_processados": 12,
+            "contratos_alterados": 5,
+            "contratos_inalterados": 7,
+            "uasgs_com_erro": 1,
+        })
+
+    def _executar_uasg(self, lock=True, erro=None, redis_client=None):
+        if redis_client is None:
+            redis_client = FakeRedis() if lock else FakeRedis(**{"contratos:lock:787010": "outra-task"})
+        service = MagicMock()
+        service.return_value.sync_contratos_por_uasg.side_effect = erro
+        service.return_value.sync_contratos_por_uasg.return_value = {"contratos_processados": 4}
+        with patch.object(tasks, "get_redis_client", return_value=redis_client), \
+                patch.object(tasks, "ComprasNetIngestionService", service), \
+                patch.object(tasks.sincronizacao, "registrar_inicio"), \
+                patch.object(tasks.sincronizacao, "registrar_resultado") as registrar, \
+                patch.object(tasks, "connections"):
+            resultado = tasks.sync_contratos_uasg_execucao.apply(args=(7, "787010"), task_id="task-7").get()
+        return resultado, registrar, redis_client
+
+    def test_uasg_concluida_registra_stats_e_libera_lock(self):
+        resultado, registrar, redis_client = self._executar_uasg()
+        self.assertEqual(resultado["contratos_processados"], 4)
+        registrar.assert_called_once_with(
+            7, "787010", SincronizacaoUasg.STATUS_CONCLUIDA, stats={"contratos_processados": 4}
+        )
+        self.assertIsNone(redis_client.get("contratos:lock:787010"))
+
+    def test_uasg_com_lock_ocupado_e_ignorada(self):
+        _, registrar, redis_client = self._executar_uasg(lock=False)
+        registrar.assert_called_once_with(7, "787010", SincronizacaoUasg.STATUS_IGNORADA)
+        self.assertEqual(redis_client.get("contratos:lock:787010"), "outra-task")
+
+    def test_lock_usa_o_id_da_task_e_nao_remove_o_de_outra(self):
+        class RedisComLockTomado(FakeRedis):
+            # O lock expira durante a sincronização e outra task o adquire
+            def set(self, key, value, nx=False, ex=None):
+                self.valores_gravados.append(value)
+                criado = super().set(key, value, nx=nx, ex=ex)
+                self.dados[key] = "outra-task"
+                return criado
+
+        redis_client = RedisComLockTomado()
+        redis_client.valores_gravados = []
+        self._executar_uasg(redis_client=redis_client)
+
+        self.assertEqual(redis_client.valores_gravados, ["task-7"])
+        self.assertEqual(redis_client.get("contratos:lock:787010"), "outra-task")
+
+    def test_erro_da_uasg_e_registrado_sem_interromper_a_faixa(self):
+        resultado, registrar, redis_client = self._executar_uasg(erro=RuntimeError("API fora do ar"))
+        self.assertEqual(resultado["erro"], "API fora do ar")
+        registrar.assert_called_once_with(
+            7, "787010", SincronizacaoUasg.STATUS_ERRO, erro="API fora do ar"
+        )
+        self.assertIsNone(redis_client.get("contratos:lock:787010"))
+
+    def test_orquestrador_lanca_uma_cadeia_por_faixa(self):
+        execucao = MagicMock(pk=42)
+        with patch.object(tasks.sincronizacao, "uasgs_ativas", return_value=["1", "2", "3"]), \
+                patch.object(tasks.sincronizacao, "iniciar_sincronizacao", return_value=execucao) as iniciar, \
+                patch.object(tasks, "group") as grupo, \
+                patch.object(tasks, "connections"):
+            resultado = tasks.sync_contratos_uasgs_ativas.run(concorrencia=2)
+
+        self.assertEqual(resultado, {"sincronizacao_id": 42, "uasgs": 3, "concorrencia": 2})
+        self.assertEqual(iniciar.call_args.args, (["1", "2", "3"], 2))
+        (cadeias,), _ = grupo.call_args
+        self.assertEqual(
+            [[sig.args for sig in cadeia.tasks] for cadeia in cadeias],
+            [[(42, "1"), (42, "3")], [(42, "2")]],
+        )
+        grupo.return_value.apply_async.assert_called_once()
+        # Toda subtask leva o errback que encerra a própria faixa
+        self.assertEqual(
+            [[tuple(sig.options["link_error"][0]["args"]) for sig in cadeia.tasks] for cadeia in cadeias],
+            [[(42, ["1", "3"]), (42, ["1", "3"])], [(42, ["2"])]],
+        )
+
+    def test_faixa_interrompida_encerra_uasgs_restantes(self):
+        errback = tasks._cadeia_da_faixa(42, ["1", "3"]).tasks[0].options["link_error"][0]
+        with patch.object(tasks.sincronizacao, "encerrar_faixa", return_value=2) as encerrar, \
+                patch.object(tasks, "connections"):
+            # O worker chama o errback com (request, exc, traceback) antes dos argumentos da assinatura
+            tasks.sync_contratos_faixa_interrompida.app.signature(errback)(MagicMock(id="abc"), RuntimeError("WorkerLostError"), None)
+
+        args, kwargs = encerrar.call_args
+        self.assertEqual(args, (42, ["1", "3"]))
+        self.assertIn("abc", kwargs["erro"])
+
+    def test_encerrar_faixa_marca_pendentes_e_finaliza(self):
+        linhas = MagicMock()
+        linhas.exclude.return_value.update.return_value = 1
+        with patch.object(SincronizacaoUasg.objects, "filter", return_value=linhas) as filtro, \
+                patch.object(sincronizacao, "finalizar_se_concluida") as finalizar:
+            marcadas = sincronizacao.encerrar_faixa(42, ["1", "3"], erro="morta")
+
+        self.assertEqual(marcadas, 1)
+        filtro.assert_called_once_with(sincronizacao_id=42, uasg_code__in=["1", "3"])
+        linhas.exclude.assert_called_once_with(status__in=SincronizacaoUasg.STATUS_FINAIS)
+        self.assertEqual(linhas.exclude.return_value.update.call_args.kwargs["status"], SincronizacaoUasg.STATUS_ERRO)
+        finalizar.assert_called_once_with(42)
+
+
+class FakeRedis:
+    """Redis em memória com o subconjunto usado pelos locks (set NX, get, delete)"""
+
+    def __init__(self, **dados):
+        self.dados = dict(dados)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.dados:
+            return None
+        self.dados[key] = value
+        return True
+
+    def get(self, key):
+        return self.dados.get(key)
+
+    def delete(self, key):
+        self.dados.pop(key, None)
+
+
+class SincronizacaoJobTest(SimpleTestCase):
+    """Sincronizações da API enfileiradas no Celery, com deduplicação pelo lock Redis"""
+
+    def _enfileirar(self, redis_client, **kwargs):
+        with patch.object(tasks, "get_redis_client", return_value=redis_client), \
+                patch.object(SincronizacaoJob, "save") as save, \
+                patch.object(SincronizacaoJob, "delete") as delete, \
+                patch.object(tasks.transaction, "on_commit") as on_commit:
+            resultado = tasks.enfileirar_sincronizacao(SincronizacaoJob.TIPO_UASG, uasg_code="787010", **kwargs)
+        return resultado, save, delete, on_commit
+
+    def test_enfileira_job_e_guarda_id_no_lock_da_uasg(self):
+        redis_client = FakeRedis()
+        (job, criado), save, delete, on_commit = self._enfileirar(redis_client)
+        self.assertTrue(criado)
+        save.assert_called_once()
+        delete.assert_not_called()
+        on_commit.assert_called_once()
+        self.assertEqual(redis_client.get("contratos:lock:787010"), str(job.pk))
+
+    def test_job_em_andamento_e_reaproveitado(self):
+        existente = SincronizacaoJob(tipo=SincronizacaoJob.TIPO_UASG, uasg_code="787010")
+        redis_client = FakeRedis(**{"contratos:lock:787010": str(existente.pk)})
+        with patch.object(SincronizacaoJob.objects, "filter") as filtro:
+            filtro.return_value.first.return_value = existente
+            (job, criado), save, delete, on_commit = self._enfileirar(redis_client)
+        self.assertIs(job, existente)
+        self.assertFalse(criado)
+        filtro.assert_called_once_with(pk=str(existente.pk))
+        # O job novo é gravado antes do lock e descartado ao perder a disputa
+        save.assert_called_once()
+        delete.assert_called_once()
+        on_commit.assert_not_called()
+
+    def test_falha_ao_enviar_ao_celery_libera_lock_e_marca_erro(self):
+        redis_client = FakeRedis()
+        with patch.object(tasks, "get_redis_client", return_value=redis_client), \
+                patch.object(SincronizacaoJob, "save"), \
+                patch.object(tasks.transaction, "on_commit", side_effect=lambda funcao: funcao()), \
+                patch.object(tasks.executar_sincronizacao_job, "delay", side_effect=ConnectionError("broker")), \
+                patch.object(tasks, "_atualizar_job") as atualizar:
+            job, criado = tasks.enfileirar_sincronizacao(SincronizacaoJob.TIPO_UASG, uasg_code="787010")
+        self.assertTrue(criado)
+        self.assertEqual(job.status, SincronizacaoJob.STATUS_ERRO)
+        self.assertEqual(atualizar.call_args.kwargs["status"], SincronizacaoJob.STATUS_ERRO)
+        self.assertIsNone(redis_client.get("contratos:lock:787010"))
+
+    def test_lock_da_task_agendada_recusa_nova_sincronizacao(self):
+        redis_client = FakeRedis(**{"contratos:lock:787010": "locked"})
+        with patch.object(SincronizacaoJob.objects, "filter") as filtro:
+            filtro.return_value.first.return_value = None
+            with self.assertRaises(tasks.SincronizacaoEmAndamento):
+                self._enfileirar(redis_client)
+        filtro.assert_called_once_with(pk=None)
+
+    def test_lock_de_contrato_separado_por_tipo(self):
+        historico = SincronizacaoJob(tipo="historico", contrato_id="10")
+        empenhos = SincronizacaoJob(tipo="empenhos", contrato_id="10")
+        self.assertNotEqual(tasks.lock_key_job(historico), tasks.lock_key_job(empenhos))
+
+    def _executar(self, job, redis_client):
+        service = MagicMock()
+        service.return_value.sync_contratos_por_uasg.side_effect = (
+            lambda uasg_code, progresso: progresso(3, 3, 1) or {"contratos_processados": 2}
+        )
+        with patch.object(SincronizacaoJob.objects, "select_related") as select_related, \
+                patch.object(tasks, "get_redis_client", return_value=redis_client), \
+                patch.object(tasks, "ComprasNetIngestionService", service), \
+                patch.object(tasks, "_atualizar_job") as atualizar, \
+                patch.object(tasks, "connections"):
+            select_related.return_value.get.return_value = job
+            resultado = tasks.executar_sincronizacao_job.run(str(job.pk))
+        return resultado, atualizar
+
+    def test_job_registra_progresso_e_libera_lock(self):
+        job = SincronizacaoJob(tipo=SincronizacaoJob.TIPO_UASG, uasg_code="787010")
+        redis_client = FakeRedis(**{"contratos:lock:787010": str(job.pk)})
+
+        resultado, atualizar = self._executar(job, redis_client)
+
+        self.assertEqual(resultado["status"], SincronizacaoJob.STATUS_CONCLUIDO)
+        atualizar.assert_any_call(job.pk, contratos_processados=3, contratos_total=3, erros=1)
+        ultimo = atualizar.call_args.kwargs
+        self.assertEqual(ultimo["status"], SincronizacaoJob.STATUS_CONCLUIDO)
+        self.assertEqual(ultimo["stats"], {"contratos_processados": 2})
+        self.assertIsNone(redis_client.get("contratos:lock:787010"))
+
+    def test_falha_ao_buscar_dados_do_contrato_conta_erro(self):
+        job = SincronizacaoJob(tipo="historico", contrato=Contrato(id="10"))
+        redis_client = FakeRedis(**{tasks.lock_key_job(job): str(job.pk)})
+        service = MagicMock()
+        service.return_value._sync_single_related_dataset.side_effect = RuntimeError("timeout")
+        with patch.object(SincronizacaoJob.objects, "select_related") as select_related, \
+                patch.object(tasks, "get_redis_client", return_value=redis_client), \
+                patch.object(tasks, "ComprasNetIngestionService", service), \
+                patch.object(tasks, "_atualizar_job") as atualizar, \
+                patch.object(tasks, "connections"):
+            select_related.return_value.get.return_value = job
+            resultado = tasks.executar_sincronizacao_job.run(str(job.pk))
+
+        self.assertEqual(resultado["status"], SincronizacaoJob.STATUS_ERRO)
+        atualizar.assert_any_call(job.pk, contratos_processados=1, contratos_total=1, erros=1)
+        self.assertEqual(atualizar.call_args.kwargs["status"], SincronizacaoJob.STATUS_ERRO)
+        self.assertIsNone(redis_client.get(tasks.lock_key_job(job)))
+
+    def test_job_nao_roda_com_lock_de_outra_execucao(self):
+        job = SincronizacaoJob(tipo=SincronizacaoJob.TIPO_UASG, uasg_code="787010")
+        redis_client = FakeRedis(**{"contratos:lock:787010": "locked"})
+
+        resultado, atualizar = self._executar(job, redis_client)
+
+        self.assertEqual(resultado["status"], SincronizacaoJob.STATUS_ERRO)
+        self.assertEqual(atualizar.call_args.kwargs["status"], SincronizacaoJob.STATUS_ERRO)
+        self.assertEqual(redis_client.get("contratos:lock:787010"), "locked")
+
+    def _post_sync(self, **patch_kwargs):
+        view = ContratoViewSet.as_view({"post": "sync"})
+        request = APIRequestFactory().post("/api/contratos/sync/?uasg=787010")
+        with patch.object(tasks, "enfileirar_sincronizacao", **patch_kwargs) as enfileirar:
+            return view(request), enfileirar
+
+    def test_endpoint_sync_responde_202_com_job(self):
+        job = SincronizacaoJob(tipo=SincronizacaoJob.TIPO_UASG, uasg_code="787010")
+        response, enfileirar = self._post_sync(return_value=(job, True))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["id"], str(job.pk))
+        self.assertTrue(response.data["status_url"].endswith(f"/sincronizacoes/{job.pk}/"))
+        enfileirar.assert_called_once_with(tipo=SincronizacaoJob.TIPO_UASG, uasg_code="787010", detalhes=False)
+
+    def test_endpoint_sync_responde_409_se_task_agendada_em_andamento(self):
+        response, _ = self._post_sync(side_effect=tasks.SincronizacaoEmAndamento("em andamento"))
+        self.assertEqual(response.status_code, 409)
+
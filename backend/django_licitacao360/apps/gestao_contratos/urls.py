@@ -18,6 +18,7 @@ from .views import (
     EmpenhoViewSet,
     ItemContratoViewSet,
     ArquivoContratoViewSet,
+    SincronizacaoJobViewSet,
 )
 
 router = DefaultRouter()
@@ -32,6 +33,7 @@ router.register(r'historico', HistoricoContratoViewSet, basename='historico-cont
 router.register(r'empenhos', EmpenhoViewSet, basename='empenho')
 router.register(r'itens', ItemContratoViewSet, basename='item-contrato')
 router.register(r'arquivos', ArquivoContratoViewSet, basename='arquivo-contrato')
+router.register(r'sincronizacoes', SincronizacaoJobViewSet, basename='sincronizacao-job')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -13,6 +13,7 @@ from .offline_views import (
     ItemContratoViewSet,
     ArquivoContratoViewSet,
 )
+from .sincronizacao_views import SincronizacaoJobViewSet
 
 __all__ = [
     'UasgViewSet',
@@ -27,5 +28,6 @@ __all__ = [
     'EmpenhoViewSet',
     'ItemContratoViewSet',
     'ArquivoContratoViewSet',
+    'SincronizacaoJobViewSet',
 ]
 
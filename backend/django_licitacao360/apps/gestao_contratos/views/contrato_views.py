@@ -11,16 +11,19 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters import rest_framework as filters
 from django.utils import timezone
 from django.db import models
+from django.urls import reverse
 from datetime import timedelta
 
-from ..models import Contrato
+from django_licitacao360.pagination import KeysetListMixin
+
+from ..models import Contrato, SincronizacaoJob
 from ..serializers import (
     ContratoSerializer,
     ContratoDetailSerializer,
     ContratoCreateSerializer,
     ContratoUpdateSerializer,
+    SincronizacaoJobSerializer,
 )
-from ..services.ingestion import ComprasNetIngestionService
 
 
 class ContratoFilter(filters.FilterSet):
@@ -37,7 +40,7 @@ class ContratoFilter(filters.FilterSet):
         fields = ['uasg', 'status', 'manual', 'tipo', 'modalidade']
 
 
-class ContratoViewSet(viewsets.ModelViewSet):
+class ContratoViewSet(KeysetListMixin, viewsets.ModelViewSet):
     """
     ViewSet para Contrato
     """
@@ -67,8 +70,7 @@ class ContratoViewSet(viewsets.ModelViewSet):
         """Retorna contratos vencidos"""
         hoje = timezone.now().date()
         contratos = self.queryset.filter(vigencia_fim__lt=hoje)
-        serializer = self.get_serializer(contratos, many=True)
-        return Response(serializer.data)
+        return self.listar(contratos, self.ordering)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def proximos_vencer(self, request):
@@ -79,8 +81,7 @@ class ContratoViewSet(viewsets.ModelViewSet):
             vigencia_fim__gte=hoje,
             vigencia_fim__lte=proximos_30_dias
         )
-        serializer = self.get_serializer(contratos, many=True)
-        return Response(serializer.data)
+        return self.listar(contratos, self.ordering)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def ativos(self, request):
@@ -89,16 +90,41 @@ class ContratoViewSet(viewsets.ModelViewSet):
         Inclui contratos ativos, vencidos e sem data de fim.
         """
         contratos = self.queryset.all()
-        serializer = self.get_serializer(contratos, many=True)
-        return Response(serializer.data)
+        return self.listar(contratos, self.ordering)
+    
+    def _enfileirar(self, request, **job_kwargs):
+        """
+        Envia a sincronização ao Celery e responde 202 com o job, sem esperar.
+        Se o mesmo alvo já está sincronizando, devolve o job em andamento.
+        """
+        from ..tasks import SincronizacaoEmAndamento, enfileirar_sincronizacao
+        
+        try:
+            job, criado = enfileirar_sincronizacao(**job_kwargs)
+        except SincronizacaoEmAndamento as e:
+            response = Response({'success': False, 'error': str(e)}, status=status.HTTP_409_CONFLICT)
+            response['Access-Control-Allow-Origin'] = '*'
+            return response
+        
+        data = SincronizacaoJobSerializer(job).data
+        data['success'] = True
+        data['status_url'] = request.build_absolute_uri(
+            reverse('sincronizacao-job-detail', kwargs={'pk': job.pk})
+        )
+        data['message'] = (
+            'Sincronização enviada para processamento'
+            if criado else 'Sincronização já em andamento'
+        )
+        response = Response(data, status=status.HTTP_202_ACCEPTED)
+        response['Access-Control-Allow-Origin'] = '*'
+        return response
     
     @action(detail=False, methods=['post'], permission_classes=[AllowAny], url_path='sync')
     def sync(self, request):
-        """Sincroniza contratos de uma UASG específica"""
-        import traceback
-        import logging
-        
-        logger = logging.getLogger(__name__)
+        """
+        Enfileira a sincronização dos contratos de uma UASG (``?detalhes=true`` inclui
+        histórico, empenhos, itens e arquivos). Acompanhe em ``status_url``.
+        """
         uasg_code = request.query_params.get('uasg') or request.data.get('uasg')
         
         if not uasg_code:
@@ -110,48 +136,15 @@ class ContratoViewSet(viewsets.ModelViewSet):
             response['Access-Control-Allow-Origin'] = '*'
             return response
         
-        try:
-            logger.info(f'Iniciando sincronização da UASG {uasg_code}')
-            service = ComprasNetIngestionService()
-            stats = service.sync_contratos_por_uasg(uasg_code)
-            
-            logger.info(f'Sincronização da UASG {uasg_code} concluída: {stats}')
-            response = Response({
-                'success': True,
-                'uasg': uasg_code,
-                'stats': stats,
-                'message': f'Sincronização da UASG {uasg_code} concluída com sucesso'
-            })
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-                    
-        except (SystemExit, KeyboardInterrupt) as e:
-            # Captura SystemExit do Gunicorn (quando worker é morto)
-            logger.error(f'Worker abortado durante sincronização da UASG {uasg_code}: {str(e)}')
-            response = Response(
-                {
-                    'success': False,
-                    'error': 'Sincronização interrompida pelo servidor. A operação pode ter demorado muito tempo.',
-                    'message': f'A sincronização da UASG {uasg_code} foi interrompida. Tente novamente ou sincronize em lotes menores.'
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-        except Exception as e:
-            error_traceback = traceback.format_exc()
-            logger.error(f'Erro ao sincronizar UASG {uasg_code}: {str(e)}\n{error_traceback}')
-            response = Response(
-                {
-                    'success': False,
-                    'error': str(e),
-                    'traceback': error_traceback if request.query_params.get('debug') == 'true' else None,
-                    'message': f'Erro ao sincronizar UASG {uasg_code}'
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
+        detalhes = str(
+            request.query_params.get('detalhes') or request.data.get('detalhes') or ''
+        ).lower() in ('1', 'true', 'sim')
+        return self._enfileirar(
+            request,
+            tipo=SincronizacaoJob.TIPO_UASG,
+            uasg_code=str(uasg_code).strip(),
+            detalhes=detalhes,
+        )
     
     @action(detail=True, methods=['get'], url_path='detalhes', permission_classes=[AllowAny])
     def detalhes(self, request, pk=None):
@@ -212,37 +205,8 @@ class ContratoViewSet(viewsets.ModelViewSet):
         permission_classes=[AllowAny]
     )
     def sincronizar_historico(self, request, pk=None):
-        """Sincroniza histórico de um contrato específico"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        try:
-            contrato = self.get_object()
-            service = ComprasNetIngestionService()
-            result = service._sync_single_related_dataset(contrato, 'historico')
-            
-            logger.info(f'Histórico do contrato {pk} sincronizado: {result}')
-            response = Response({
-                'success': True,
-                'contrato_id': pk,
-                'stats': result,
-                'message': 'Histórico sincronizado com sucesso'
-            })
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-        except Exception as e:
-            import traceback
-            logger.error(f'Erro ao sincronizar histórico do contrato {pk}: {str(e)}')
-            response = Response(
-                {
-                    'success': False,
-                    'error': str(e),
-                    'traceback': traceback.format_exc() if request.query_params.get('debug') == 'true' else None
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
+        """Enfileira a sincronização de histórico de um contrato específico"""
+        return self._enfileirar(request, tipo='historico', contrato=self.get_object())
 
     @action(
         detail=True, 
@@ -251,37 +215,8 @@ class ContratoViewSet(viewsets.ModelViewSet):
         permission_classes=[AllowAny]
     )
     def sincronizar_empenhos(self, request, pk=None):
-        """Sincroniza empenhos de um contrato específico"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        try:
-            contrato = self.get_object()
-            service = ComprasNetIngestionService()
-            result = service._sync_single_related_dataset(contrato, 'empenhos')
-            
-            logger.info(f'Empenhos do contrato {pk} sincronizados: {result}')
-            response = Response({
-                'success': True,
-                'contrato_id': pk,
-                'stats': result,
-                'message': 'Empenhos sincronizados com sucesso'
-            })
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-        except Exception as e:
-            import traceback
-            logger.error(f'Erro ao sincronizar empenhos do contrato {pk}: {str(e)}')
-            response = Response(
-                {
-                    'success': False,
-                    'error': str(e),
-                    'traceback': traceback.format_exc() if request.query_params.get('debug') == 'true' else None
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
+        """Enfileira a sincronização de empenhos de um contrato específico"""
+        return self._enfileirar(request, tipo='empenhos', contrato=self.get_object())
 
     @action(
         detail=True, 
@@ -290,37 +225,8 @@ class ContratoViewSet(viewsets.ModelViewSet):
         permission_classes=[AllowAny]
     )
     def sincronizar_itens(self, request, pk=None):
-        """Sincroniza itens de um contrato específico"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        try:
-            contrato = self.get_object()
-            service = ComprasNetIngestionService()
-            result = service._sync_single_related_dataset(contrato, 'itens')
-            
-            logger.info(f'Itens do contrato {pk} sincronizados: {result}')
-            response = Response({
-                'success': True,
-                'contrato_id': pk,
-                'stats': result,
-                'message': 'Itens sincronizados com sucesso'
-            })
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-        except Exception as e:
-            import traceback
-            logger.error(f'Erro ao sincronizar itens do contrato {pk}: {str(e)}')
-            response = Response(
-                {
-                    'success': False,
-                    'error': str(e),
-                    'traceback': traceback.format_exc() if request.query_params.get('debug') == 'true' else None
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
+        """Enfileira a sincronização de itens de um contrato específico"""
+        return self._enfileirar(request, tipo='itens', contrato=self.get_object())
 
     @action(
         detail=True, 
@@ -329,37 +235,8 @@ class ContratoViewSet(viewsets.ModelViewSet):
         permission_classes=[AllowAny]
     )
     def sincronizar_arquivos(self, request, pk=None):
-        """Sincroniza arquivos de um contrato específico"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        try:
-            contrato = self.get_object()
-            service = ComprasNetIngestionService()
-            result = service._sync_single_related_dataset(contrato, 'arquivos')
-            
-            logger.info(f'Arquivos do contrato {pk} sincronizados: {result}')
-            response = Response({
-                'success': True,
-                'contrato_id': pk,
-                'stats': result,
-                'message': 'Arquivos sincronizados com sucesso'
-            })
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-        except Exception as e:
-            import traceback
-            logger.error(f'Erro ao sincronizar arquivos do contrato {pk}: {str(e)}')
-            response = Response(
-                {
-                    'success': False,
-                    'error': str(e),
-                    'traceback': traceback.format_exc() if request.query_params.get('debug') == 'true' else None
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
+        """Enfileira a sincronização de arquivos de um contrato específico"""
+        return self._enfileirar(request, tipo='arquivos', contrato=self.get_object())
 
 
 class ContratoDetalhesView(viewsets.ReadOnlyModelViewSet):
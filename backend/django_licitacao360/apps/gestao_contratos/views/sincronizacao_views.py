@@ -0,0 +1,20 @@
+"""
+Views para acompanhar sincronizações sob demanda
+"""
+
+from rest_framework import viewsets
+from rest_framework.permissions import AllowAny
+
+from ..models import SincronizacaoJob
+from ..serializers import SincronizacaoJobSerializer
+
+
+class SincronizacaoJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status e progresso das sincronizações disparadas por
+    ``POST /contratos/sync/`` e ``POST /contratos/{id}/sincronizar/{tipo}/``
+    """
+    queryset = SincronizacaoJob.objects.all()
+    serializer_class = SincronizacaoJobSerializer
+    permission_classes = [AllowAny]
+    filterset_fields = ['tipo', 'status', 'uasg_code', 'contrato']
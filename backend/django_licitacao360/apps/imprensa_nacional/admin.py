@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import InlabsArticle, AvisoLicitacao, Credenciamento
+from .models import InlabsArticle, AvisoLicitacao, Credenciamento, InlabsEdicao
 
 
 @admin.register(InlabsArticle)
@@ -139,3 +139,14 @@ class CredenciamentoAdmin(admin.ModelAdmin):
             "fields": ("nome_responsavel", "cargo")
         }),
     )
+
+
+@admin.register(InlabsEdicao)
+class InlabsEdicaoAdmin(admin.ModelAdmin):
+    """Admin para a situação das edições no backfill."""
+
+    list_display = ("data", "secao", "status", "artigos", "tentativas", "atualizado_em")
+    list_filter = ("status", "secao")
+    search_fields = ("mensagem",)
+    ordering = ("-data", "secao")
+    readonly_fields = ("atualizado_em",)
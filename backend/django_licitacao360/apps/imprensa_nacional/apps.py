@@ -1,7 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate
 
 
 class ImprensaNacionalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "django_licitacao360.apps.imprensa_nacional"
     verbose_name = "Imprensa Nacional"
+
+    def ready(self):
+        from .services.busca import criar_extensoes_busca
+
+        pre_migrate.connect(criar_extensoes_busca, sender=self, dispatch_uid="imprensa_nacional_extensoes_busca")
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...services.backfill import DOWNLOADS_SIMULTANEOS, backfill_inlabs
+from ...services.inlabs_downloader import InlabsDownloadError
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa as edições do INLABS de um intervalo de datas com downloads simultâneos "
+        "e uma única sessão autenticada, pulando as já importadas ou inexistentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start-date",
+            dest="start_date",
+            required=True,
+            help="Data inicial (YYYY-MM-DD) do intervalo a importar.",
+        )
+        parser.add_argument(
+            "--end-date",
+            dest="end_date",
+            help="Data final (YYYY-MM-DD) do intervalo. Se omitido, usa a data atual.",
+        )
+        parser.add_argument(
+            "--downloads",
+            type=int,
+            default=DOWNLOADS_SIMULTANEOS,
+            help=f"Edições baixadas ao mesmo tempo (padrão: {DOWNLOADS_SIMULTANEOS}).",
+        )
+        parser.add_argument(
+            "--manter-zips",
+            action="store_true",
+            help="Mantém os zips baixados (padrão: apaga após importar).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options["start_date"])
+            end_date = date.fromisoformat(options["end_date"]) if options.get("end_date") else timezone.localdate()
+        except ValueError as exc:
+            raise CommandError("Datas inválidas. Use formato YYYY-MM-DD.") from exc
+        if start_date > end_date:
+            raise CommandError("start-date deve ser anterior ou igual a end-date.")
+
+        self.stdout.write(self.style.NOTICE(f"Backfill INLABS de {start_date} a {end_date}..."))
+        try:
+            resultado = backfill_inlabs(
+                start_date,
+                end_date,
+                downloads=options["downloads"],
+                manter_zips=options["manter_zips"],
+            )
+        except InlabsDownloadError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(self.style.SUCCESS("RESUMO DO BACKFILL"))
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"⏭️  Puladas (já importadas ou inexistentes): {resultado.puladas}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Importadas: {resultado.importadas}"))
+        self.stdout.write(self.style.WARNING(f"⚠️  Indisponíveis (fim de semana/feriado): {resultado.indisponiveis}"))
+        self.stdout.write(self.style.ERROR(f"❌ Erros: {len(resultado.erros)}"))
+        self.stdout.write(f"📊 Artigos: {resultado.artigos}")
+        self.stdout.write(f"📋 Avisos de licitação: {resultado.avisos}")
+        self.stdout.write(f"📝 Credenciamentos: {resultado.credenciamentos}")
+
+        if resultado.erros:
+            self.stdout.write("\n" + self.style.ERROR("ERROS (serão refeitos na próxima execução):"))
+            for data, mensagem in resultado.erros.items():
+                self.stdout.write(f"  - {data}: {mensagem}")
@@ -0,0 +1,159 @@
+"""
+Management command para medir o parsing de uma edição do INLABS.
+
+Gera um zip sintético no formato DO3 (um XML por artigo, parte deles com
+``artCategory`` do Comando da Marinha, metade desses avisos de licitação) e compara:
+
+- legado: extrai o zip para disco, ``ET.parse`` em todos os XMLs e só então filtra;
+- streaming: lê os membros direto do zip, filtra pelo cabeçalho e faz o parse num
+  único processo;
+- paralelo: o mesmo, com o parse em ``ProcessPoolExecutor``.
+
+Uso:
+    python manage.py benchmark_inlabs_parser
+    python manage.py benchmark_inlabs_parser --artigos 8000 --fracao-marinha 0.05 --processos 4
+"""
+
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from xml.etree import ElementTree as ET
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.inlabs_downloader import DEFAULT_KEYWORD
+from ...services.inlabs_parser import coletar_artigos_zip, parse_artigo_xml, processos_disponiveis
+
+_CATEGORIAS_OUTRAS = [
+    "Ministério da Saúde/Fundação Oswaldo Cruz",
+    "Ministério da Educação/Universidade Federal de Minas Gerais",
+    "Ministério da Defesa/Comando do Exército/Comando Militar do Sul",
+    "Ministério da Fazenda/Receita Federal do Brasil",
+]
+
+_PARAGRAFOS_AVISO = (
+    '&lt;p class="identifica"&gt;PREGÃO ELETRÔNICO Nº {n}/2025 - UASG 787000&lt;/p&gt;'
+    "&lt;p&gt;Nº Processo: 63000.{n:06d}/2025. Objeto: Aquisição de material de consumo. "
+    "Total de Itens Licitados: 12. Edital: 02/01/2025 das 08h00 às 12h00. "
+    "Entrega das Propostas: a partir de 02/01/2025 às 08h00 no site www.gov.br/compras. "
+    "Abertura das Propostas: 15/01/2025 às 09h00 no site www.gov.br/compras.&lt;/p&gt;"
+    '&lt;p class="assina"&gt;FULANO DE TAL&lt;/p&gt;&lt;p class="cargo"&gt;Ordenador de Despesas&lt;/p&gt;'
+)
+_PARAGRAFO_OUTRO = "&lt;p&gt;" + "Texto de publicação sem relação com licitações da Marinha. " * 20 + "&lt;/p&gt;"
+
+
+def _xml_artigo(n, categoria, art_type, texto):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<xml><article '
+        f'id="{n}" name="Artigo {n}" idOficio="{n}" pubName="DO3" artType="{art_type}" '
+        f'pubDate="02/01/2025" artClass="00001" artCategory="{categoria}" artSize="12" '
+        f'artNotes="" numberPage="{n // 40 + 1}" pdfPage="" editionNumber="1" '
+        f'highlightType="" highlightPriority="" highlight="" highlightimage="" '
+        f'highlightimagename="" idMateria="{100000 + n}">'
+        f"<body><Identifica>{art_type.upper()} Nº {n}/2025 - UASG 787000</Identifica>"
+        f"<Data/><Ementa/><Titulo/><SubTitulo/><Texto>{texto}</Texto></body></article></xml>"
+    ).encode("utf-8")
+
+
+def gerar_edicao(destino, artigos, fracao_marinha):
+    """Grava em ``destino`` um zip sintético e retorna quantos artigos são da Marinha."""
+    passo = max(1, round(1 / fracao_marinha)) if fracao_marinha > 0 else 0
+    marinha = 0
+    with ZipFile(destino, "w", ZIP_DEFLATED) as archive:
+        for n in range(artigos):
+            if passo and n % passo == 0:
+                marinha += 1
+                categoria = f"Ministério da Defesa/{DEFAULT_KEYWORD}/Centro de Intendência {n}"
+                if marinha % 2:
+                    art_type, texto = "Aviso de Licitação-Pregão", _PARAGRAFOS_AVISO.format(n=n)
+                else:
+                    art_type, texto = "Extrato de Contrato", _PARAGRAFO_OUTRO
+            else:
+                categoria = _CATEGORIAS_OUTRAS[n % len(_CATEGORIAS_OUTRAS)]
+                art_type, texto = "Extrato de Contrato", _PARAGRAFO_OUTRO
+            archive.writestr(f"{n:06d}.xml", _xml_artigo(n, categoria, art_type, texto))
+    return marinha
+
+
+def _coleta_legada(zip_path, keyword):
+    """Caminho anterior (extração + parse de todos os XMLs), mantido apenas para comparação."""
+    destino = zip_path.with_suffix("")
+    with ZipFile(zip_path, "r") as archive:
+        archive.extractall(destino)
+    artigos = []
+    try:
+        for xml_file in destino.rglob("*.xml"):
+            article = ET.parse(xml_file).getroot().find("article")
+            if keyword.lower() not in article.attrib.get("artCategory", "").lower():
+                continue
+            artigos.append(parse_artigo_xml(xml_file.read_bytes(), xml_file.name))
+    finally:
+        shutil.rmtree(destino, ignore_errors=True)
+    return artigos
+
+
+class Command(BaseCommand):
+    help = "Compara a coleta de artigos INLABS legada com o parsing em streaming/paralelo"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--artigos",
+            type=int,
+            default=5000,
+            help="XMLs na edição sintética (padrão: 5000)",
+        )
+        parser.add_argument(
+            "--fracao-marinha",
+            type=float,
+            default=0.05,
+            help="Fração dos artigos com a categoria da Marinha (padrão: 0.05)",
+        )
+        parser.add_argument(
+            "--processos",
+            type=int,
+            default=None,
+            help="Processos do caminho paralelo (padrão: um por CPU)",
+        )
+        parser.add_argument(
+            "--repeticoes",
+            type=int,
+            default=3,
+            help="Execuções por caminho; reporta a melhor (padrão: 3)",
+        )
+
+    def handle(self, *args, **options):
+        if options["artigos"] <= 0 or not 0 <= options["fracao_marinha"] <= 1:
+            raise CommandError("--artigos deve ser positivo e --fracao-marinha estar entre 0 e 1")
+
+        processos = processos_disponiveis(options["processos"])
+        with tempfile.TemporaryDirectory(prefix="inlabs-bench-") as tmp:
+            zip_path = Path(tmp) / "2025-01-02-DO3.zip"
+            marinha = gerar_edicao(zip_path, options["artigos"], options["fracao_marinha"])
+            tamanho_mb = zip_path.stat().st_size / 1024 / 1024
+            self.stdout.write(
+                f"📦 Edição sintética: {options['artigos']} XMLs ({marinha} da Marinha), {tamanho_mb:.1f} MB"
+            )
+
+            caminhos = [
+                ("legado", lambda: _coleta_legada(zip_path, DEFAULT_KEYWORD)),
+                ("streaming", lambda: coletar_artigos_zip(zip_path, DEFAULT_KEYWORD, processos=1)),
+                (f"paralelo ({processos} proc.)", lambda: coletar_artigos_zip(zip_path, DEFAULT_KEYWORD, processos)),
+            ]
+            tempos = {}
+            for nome, coletar in caminhos:
+                melhor = None
+                for _ in range(max(1, options["repeticoes"])):
+                    inicio = time.perf_counter()
+                    artigos = coletar()
+                    decorrido = time.perf_counter() - inicio
+                    melhor = decorrido if melhor is None else min(melhor, decorrido)
+                if len(artigos) != marinha:
+                    raise CommandError(f"{nome}: {len(artigos)} artigos coletados, esperado {marinha}")
+                tempos[nome] = melhor
+
+        base = tempos["legado"]
+        for nome, tempo in tempos.items():
+            self.stdout.write(f"  {nome:<22} {tempo * 1000:9.1f} ms  ({base / tempo:4.1f}x)")
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark concluído"))
@@ -0,0 +1,42 @@
+"""
+Remove artigos INLABS duplicados em (article_id, pub_date, materia_id), tratando
+``materia_id`` nulo como igual, antes do ``migrate`` que cria a constraint
+``inlabs_article_pub_materia_uniq`` (NULLS NOT DISTINCT). Mantém a linha de maior id.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+# Linhas com outra de mesma chave e id maior (a mais recente fica)
+CONDICAO_DUPLICADA = """
+    FROM inlabs_articles a
+    WHERE EXISTS (
+        SELECT 1 FROM inlabs_articles b
+        WHERE b.article_id = a.article_id
+          AND b.pub_date = a.pub_date
+          AND b.materia_id IS NOT DISTINCT FROM a.materia_id
+          AND b.id > a.id
+    )
+"""
+SQL_CONTAR = f"SELECT COUNT(*) {CONDICAO_DUPLICADA}"
+SQL_REMOVER = f"DELETE {CONDICAO_DUPLICADA}"
+
+
+class Command(BaseCommand):
+    help = "Remove artigos INLABS duplicados (inclusive com materia_id nulo) mantendo o mais recente"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta as linhas duplicadas, sem apagar",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(SQL_CONTAR)
+            duplicadas = cursor.fetchone()[0]
+            if options["dry_run"] or not duplicadas:
+                self.stdout.write(f"Artigos duplicados: {duplicadas}")
+                return
+            cursor.execute(SQL_REMOVER)
+            self.stdout.write(self.style.SUCCESS(f"✅ Removidos {cursor.rowcount} artigos duplicados"))
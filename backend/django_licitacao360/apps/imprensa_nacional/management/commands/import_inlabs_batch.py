@@ -90,11 +90,11 @@ class Command(BaseCommand):
             from ...models import InlabsArticle
 
             existing_dates = set(
-                InlabsArticle.objects.filter(edition_date__in=dates_to_import)
-                .values_list("edition_date", flat=True)
+                InlabsArticle.objects.filter(pub_date__in=[d.isoformat() for d in dates_to_import])
+                .values_list("pub_date", flat=True)
                 .distinct()
             )
-            dates_to_import = [d for d in dates_to_import if d not in existing_dates]
+            dates_to_import = [d for d in dates_to_import if d.isoformat() not in existing_dates]
             self.stdout.write(
                 self.style.WARNING(f"Pulando {len(existing_dates)} datas que já possuem artigos.")
             )
@@ -114,6 +114,7 @@ class Command(BaseCommand):
         total_articles = 0
         total_avisos = 0
         total_credenciamentos = 0
+        upsert_totais: dict[str, dict[str, int]] = {}
         errors: List[tuple[date, str]] = []
 
         delay = options.get("delay", 2)
@@ -138,6 +139,10 @@ class Command(BaseCommand):
                 total_articles += articles_count
                 total_avisos += avisos_count
                 total_credenciamentos += credenciamentos_count
+                for tabela, stats in result.get("upsert", {}).items():
+                    totais = upsert_totais.setdefault(tabela, {})
+                    for chave, valor in stats.items():
+                        totais[chave] = totais.get(chave, 0) + valor
                 self.stdout.write(
                     self.style.SUCCESS(
                         f"✅ {target_date}: {articles_count} artigos"
@@ -188,6 +193,11 @@ class Command(BaseCommand):
             self.stdout.write(f"📋 Total de avisos de licitação: {total_avisos}")
         if total_credenciamentos > 0:
             self.stdout.write(f"📝 Total de credenciamentos: {total_credenciamentos}")
+        for tabela, stats in upsert_totais.items():
+            self.stdout.write(
+                f"   {tabela}: {stats.get('inseridas', 0)} inseridos, {stats.get('atualizadas', 0)} atualizados, "
+                f"{stats.get('inalteradas', 0)} inalterados, {stats.get('ignoradas', 0)} com erro"
+            )
 
         if errors:
             self.stdout.write("\n" + self.style.ERROR("ERROS ENCONTRADOS:"))
@@ -8,7 +8,9 @@ from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
-from ...models import InlabsArticle, AvisoLicitacao, Credenciamento
+from django_licitacao360.apps.core.services.bulk_upsert import empty_stats
+
+from ...services.gravacao import upsert_artigos, upsert_avisos, upsert_credenciamentos
 
 
 class Command(BaseCommand):
@@ -177,24 +179,8 @@ class Command(BaseCommand):
         return count
 
     def _bulk_create_articles(self, batch):
-        """Cria artigos em lote usando update_or_create"""
-        for item in batch:
-            try:
-                article_id = item.pop('article_id')
-                pub_date = item.pop('pub_date')
-                materia_id = item.pop('materia_id')
-
-                InlabsArticle.objects.update_or_create(
-                    article_id=article_id,
-                    pub_date=pub_date,
-                    materia_id=materia_id,
-                    defaults=item
-                )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Erro ao criar artigo {article_id}: {str(e)}')
-                )
-                raise
+        """Grava artigos em lote (INSERT ... ON CONFLICT) e atualiza o vetor de busca"""
+        self._acumular('artigos', upsert_artigos(batch, chunk_size=len(batch)))
 
     def _migrate_avisos(self, conn, dry_run=False, batch_size=1000):
         """Migra tabela aviso_licitacao"""
@@ -254,20 +240,8 @@ class Command(BaseCommand):
         return count
 
     def _bulk_create_avisos(self, batch):
-        """Cria avisos em lote usando update_or_create"""
-        for item in batch:
-            try:
-                article_id = item.pop('article_id')
-
-                AvisoLicitacao.objects.update_or_create(
-                    article_id=article_id,
-                    defaults=item
-                )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Erro ao criar aviso {article_id}: {str(e)}')
-                )
-                raise
+        """Grava avisos em lote (INSERT ... ON CONFLICT)"""
+        self._acumular('avisos', upsert_avisos(batch, chunk_size=len(batch)))
 
     def _migrate_credenciamentos(self, conn, dry_run=False, batch_size=1000):
         """Migra tabela credenciamento"""
@@ -332,26 +306,20 @@ class Command(BaseCommand):
         return count
 
     def _bulk_create_credenciamentos(self, batch):
-        """Cria credenciamentos em lote usando update_or_create"""
-        for item in batch:
-            try:
-                article_id = item.pop('article_id')
+        """Grava credenciamentos em lote (INSERT ... ON CONFLICT)"""
+        self._acumular('credenciamentos', upsert_credenciamentos(batch, chunk_size=len(batch)))
 
-                Credenciamento.objects.update_or_create(
-                    article_id=article_id,
-                    defaults=item
-                )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Erro ao criar credenciamento {article_id}: {str(e)}')
-                )
-                raise
+    def _acumular(self, tabela, stats):
+        total = self.upsert_stats.setdefault(tabela, empty_stats())
+        for chave, valor in stats.items():
+            total[chave] += valor
 
     def handle(self, *args, **options):
         db_path = options.get('db_path')
         dry_run = options.get('dry_run', False)
         batch_size = options.get('batch_size', 1000)
         table = options.get('table', 'all')
+        self.upsert_stats = {}
 
         db_path = self._get_db_path(db_path)
 
@@ -396,6 +364,11 @@ class Command(BaseCommand):
             self.stdout.write(f'  Artigos: {articles_count}')
             self.stdout.write(f'  Avisos de Licitação: {avisos_count}')
             self.stdout.write(f'  Credenciamentos: {credenciamentos_count}')
+            for tabela, stats in self.upsert_stats.items():
+                self.stdout.write(
+                    f"  {tabela}: {stats['inseridas']} inseridos, {stats['atualizadas']} atualizados, "
+                    f"{stats['inalteradas']} inalterados, {stats['ignoradas']} com erro"
+                )
 
         except Exception as e:
             raise CommandError(f'Erro durante a migração: {str(e)}') from e
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from ...services.busca import atualizar_search_vector
+
+
+class Command(BaseCommand):
+    help = "Recalcula o vetor de busca textual (search_vector) dos artigos INLABS."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--todos",
+            action="store_true",
+            help="Recalcula todos os artigos (padrão: apenas os que ainda não têm vetor).",
+        )
+
+    def handle(self, *args, **options):
+        somente_pendentes = not options.get("todos")
+        escopo = "pendentes" if somente_pendentes else "todos os artigos"
+        self.stdout.write(self.style.NOTICE(f"Recalculando vetor de busca ({escopo})..."))
+
+        total = atualizar_search_vector(somente_pendentes=somente_pendentes)
+
+        self.stdout.write(self.style.SUCCESS(f"Vetor de busca atualizado em {total} artigos"))
@@ -1,5 +1,8 @@
 import re
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
 
 
 class InlabsArticle(models.Model):
@@ -27,10 +30,25 @@ class InlabsArticle(models.Model):
     body_identifica = models.TextField(blank=True, null=True)
     uasg = models.CharField(max_length=64, blank=True, null=True)
     body_texto = models.TextField(blank=True, null=True)
+    # Mantido pela ingestão (services/busca.py); não editar manualmente
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["-pub_date", "article_id"]
-        unique_together = ("article_id", "pub_date", "materia_id")
+        constraints = [
+            # NULLS NOT DISTINCT: artigos sem materia_id também conflitam no upsert em lote
+            models.UniqueConstraint(
+                fields=["article_id", "pub_date", "materia_id"],
+                name="inlabs_article_pub_materia_uniq",
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["uasg", "-pub_date"], name="inlabs_uasg_pub_date_idx", condition=models.Q(uasg__isnull=False)),
+            GinIndex(fields=["search_vector"], name="inlabs_search_vector_gin"),
+            # nome_om__icontains vira UPPER(nome_om) LIKE UPPER('%...%')
+            GinIndex(OpClass(Upper("nome_om"), name="gin_trgm_ops"), name="inlabs_nome_om_trgm"),
+        ]
         verbose_name = "Matéria INLABS"
         verbose_name_plural = "Matérias INLABS"
         db_table = "inlabs_articles"
@@ -127,3 +145,40 @@ class Credenciamento(models.Model):
     def article(self):
         """Retorna o primeiro artigo relacionado (pode haver múltiplos com mesmo article_id)."""
         return InlabsArticle.objects.filter(article_id=self.article_id).first()
+
+
+class InlabsEdicao(models.Model):
+    """Situação de cada edição do INLABS no backfill (ver services/backfill.py).
+
+    Edições ``indisponivel`` (fins de semana, feriados) e ``importada`` não são
+    baixadas de novo; ``erro`` é refeita na próxima execução.
+    """
+
+    STATUS_IMPORTADA = "importada"
+    STATUS_INDISPONIVEL = "indisponivel"
+    STATUS_ERRO = "erro"
+    STATUS_CHOICES = [
+        (STATUS_IMPORTADA, "Importada"),
+        (STATUS_INDISPONIVEL, "Indisponível"),
+        (STATUS_ERRO, "Erro"),
+    ]
+
+    data = models.DateField()
+    secao = models.CharField(max_length=8)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES)
+    artigos = models.IntegerField(default=0)
+    tentativas = models.IntegerField(default=0)
+    mensagem = models.TextField(blank=True, null=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-data", "secao"]
+        constraints = [
+            models.UniqueConstraint(fields=["data", "secao"], name="inlabs_edicao_data_secao_uniq"),
+        ]
+        verbose_name = "Edição INLABS"
+        verbose_name_plural = "Edições INLABS"
+        db_table = "inlabs_edicao"
+
+    def __str__(self) -> str:
+        return f"{self.data} {self.secao} ({self.status})"
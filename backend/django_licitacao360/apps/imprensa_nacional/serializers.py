@@ -63,6 +63,9 @@ class InlabsArticleSerializer(serializers.ModelSerializer):
     om_name = serializers.SerializerMethodField()
     aviso_licitacao = serializers.SerializerMethodField()
     credenciamento = serializers.SerializerMethodField()
+    # Presentes apenas em buscas (?search=): relevância e trecho com os termos em <mark>
+    rank = serializers.FloatField(read_only=True, required=False)
+    trecho = serializers.CharField(read_only=True, required=False)
 
     class Meta:
         model = InlabsArticle
@@ -90,6 +93,8 @@ class InlabsArticleSerializer(serializers.ModelSerializer):
             "om_name",
             "aviso_licitacao",
             "credenciamento",
+            "rank",
+            "trecho",
         ]
 
     def get_uasg(self, obj) -> str | None:
@@ -0,0 +1,183 @@
+"""
+Backfill do INLABS para um intervalo de datas.
+
+- Datas com artigos em ``InlabsArticle.pub_date`` ou com a edição marcada em
+  ``InlabsEdicao`` como importada/indisponível são puladas.
+- Um único login abre a sessão HTTP (``inlabs_http``) usada em todos os downloads;
+  até ``downloads`` edições são baixadas ao mesmo tempo, em threads, retomando
+  downloads interrompidos.
+- Cada zip baixado entra numa fila consumida pelo processo principal, que faz o parse
+  (em processos, ver ``inlabs_parser``), grava em lote e registra a edição.
+- Edições passadas que não existem (404: fins de semana, feriados) ficam marcadas como
+  indisponíveis e não são pedidas de novo; falhas ficam como ``erro`` e são refeitas.
+- ``ao_processar`` é chamado depois de cada edição; a task do Celery o usa para
+  renovar o lock do backfill enquanto ele avança.
+"""
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from celery.exceptions import SoftTimeLimitExceeded
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import InlabsArticle, InlabsEdicao
+from .inlabs_downloader import (
+    DEFAULT_DOWNLOAD_ROOT,
+    DEFAULT_SECTION,
+    InlabsDownloadConfig,
+    collect_marinha_articles,
+    http_client,
+    persist_inlabs_articles,
+)
+from .inlabs_http import EdicaoIndisponivel, InlabsHttpClient
+
+logger = logging.getLogger(__name__)
+
+DOWNLOADS_SIMULTANEOS = int(os.getenv("INLABS_BACKFILL_DOWNLOADS", "3"))
+
+
+@dataclass
+class ResultadoBackfill:
+    puladas: int = 0
+    importadas: int = 0
+    indisponiveis: int = 0
+    artigos: int = 0
+    avisos: int = 0
+    credenciamentos: int = 0
+    erros: Dict[str, str] = field(default_factory=dict)
+
+
+def intervalo_datas(inicio: date, fim: date) -> List[date]:
+    return [inicio + timedelta(days=n) for n in range((fim - inicio).days + 1)]
+
+
+def datas_pendentes(datas: Sequence[date], secao: str = DEFAULT_SECTION) -> List[date]:
+    """Datas sem artigos gravados e sem edição importada ou indisponível registrada."""
+    com_artigos = set(
+        InlabsArticle.objects.filter(pub_date__in=[d.isoformat() for d in datas])
+        .values_list("pub_date", flat=True)
+        .distinct()
+    )
+    resolvidas = set(
+        InlabsEdicao.objects.filter(
+            data__in=datas,
+            secao=secao,
+            status__in=[InlabsEdicao.STATUS_IMPORTADA, InlabsEdicao.STATUS_INDISPONIVEL],
+        ).values_list("data", flat=True)
+    )
+    return [d for d in datas if d.isoformat() not in com_artigos and d not in resolvidas]
+
+
+def registrar_edicao(data: date, secao: str, status: str, artigos: int = 0, mensagem: Optional[str] = None) -> None:
+    InlabsEdicao.objects.update_or_create(
+        data=data,
+        secao=secao,
+        defaults={"status": status, "artigos": artigos, "mensagem": mensagem},
+    )
+    InlabsEdicao.objects.filter(data=data, secao=secao).update(tentativas=F("tentativas") + 1)
+
+
+def baixar_edicao(client: InlabsHttpClient, config: InlabsDownloadConfig) -> Path:
+    """Baixa o zip da edição com a sessão autenticada, retomando um ``.part`` anterior."""
+    return client.download(
+        config.download_url,
+        config.download_dir / config.zip_filename,
+        max_attempts=config.max_attempts,
+        retry_delay=config.retry_delay,
+    )
+
+
+def backfill_inlabs(
+    inicio: date,
+    fim: date,
+    downloads: int = DOWNLOADS_SIMULTANEOS,
+    secao: str = DEFAULT_SECTION,
+    manter_zips: bool = False,
+    download_root: Path = DEFAULT_DOWNLOAD_ROOT,
+    ao_processar: Optional[Callable[[date], None]] = None,
+) -> ResultadoBackfill:
+    """
+    Importa as edições pendentes entre ``inicio`` e ``fim``. Os downloads rodam em
+    ``downloads`` threads; parse e gravação, no chamador, na ordem em que os zips ficam
+    prontos. Sem ``manter_zips``, o zip é apagado depois de importado. ``ao_processar``
+    recebe a data de cada edição já registrada em ``InlabsEdicao``.
+    """
+    resultado = ResultadoBackfill()
+    datas = intervalo_datas(inicio, fim)
+    pendentes = datas_pendentes(datas, secao)
+    resultado.puladas = len(datas) - len(pendentes)
+    if not pendentes:
+        return resultado
+
+    logger.info("Backfill INLABS: %s edições pendentes de %s a %s", len(pendentes), inicio, fim)
+    hoje = timezone.localdate()
+    downloads = max(1, min(downloads, len(pendentes)))
+    client = http_client(download_root, pool_size=downloads)
+    prontos: "queue.Queue" = queue.Queue()
+    parar = threading.Event()
+
+    def baixar(data: date) -> None:
+        if parar.is_set():
+            return
+        config = InlabsDownloadConfig(target_date=data, section=secao, download_root=download_root)
+        try:
+            prontos.put((config, baixar_edicao(client, config), None))
+        except Exception as exc:
+            prontos.put((config, None, exc))
+
+    try:
+        with ThreadPoolExecutor(max_workers=downloads, thread_name_prefix="inlabs-download") as executor:
+            for data in pendentes:
+                executor.submit(baixar, data)
+            try:
+                for _ in pendentes:
+                    config, zip_path, erro = prontos.get()
+                    _importar(config, zip_path, erro, hoje, manter_zips, resultado)
+                    if ao_processar is not None:
+                        ao_processar(config.target_date)
+            finally:
+                parar.set()
+    finally:
+        client.close()
+    return resultado
+
+
+def _importar(config, zip_path, erro, hoje, manter_zips, resultado: ResultadoBackfill) -> None:
+    data, secao = config.target_date, config.section
+    if isinstance(erro, EdicaoIndisponivel) and data < hoje:
+        registrar_edicao(data, secao, InlabsEdicao.STATUS_INDISPONIVEL, mensagem=str(erro))
+        resultado.indisponiveis += 1
+        logger.info("Edição %s indisponível; não será pedida de novo", data)
+        return
+    if erro is not None:
+        # Edição do dia ainda não publicada cai aqui e é tentada de novo depois
+        registrar_edicao(data, secao, InlabsEdicao.STATUS_ERRO, mensagem=str(erro))
+        resultado.erros[data.isoformat()] = str(erro)
+        return
+
+    try:
+        artigos = collect_marinha_articles(zip_path, config.keyword, config.processos)
+        stats = persist_inlabs_articles(data, artigos, source_zip=zip_path.name)
+    except SoftTimeLimitExceeded:
+        # Fim do tempo da task, não da edição: ela continua pendente e é retomada
+        raise
+    except Exception as exc:
+        logger.error("Erro ao importar a edição %s: %s", data, exc, exc_info=True)
+        registrar_edicao(data, secao, InlabsEdicao.STATUS_ERRO, mensagem=str(exc))
+        resultado.erros[data.isoformat()] = str(exc)
+        return
+
+    registrar_edicao(data, secao, InlabsEdicao.STATUS_IMPORTADA, artigos=stats["saved_articles"])
+    resultado.importadas += 1
+    resultado.artigos += stats["saved_articles"]
+    resultado.avisos += stats["saved_avisos"]
+    resultado.credenciamentos += stats["saved_credenciamentos"]
+    if not manter_zips:
+        zip_path.unlink(missing_ok=True)
@@ -0,0 +1,112 @@
+"""
+Busca textual dos artigos INLABS com tsvector do PostgreSQL.
+
+Cada artigo guarda em ``search_vector`` o texto de ``name`` (peso A), ``nome_om`` e
+``body_identifica`` (peso B) e ``body_texto`` sem as tags HTML (peso C), analisado com
+a configuração ``portuguese_unaccent`` (dicionário português + unaccent, criada por
+``criar_extensoes_busca`` antes das migrações). O índice GIN sobre a coluna atende
+``search_vector @@ websearch_to_tsquery(...)``.
+
+A ingestão chama ``atualizar_search_vector`` com os ids gravados em cada lote;
+``atualizar_search_vector(somente_pendentes=True)`` preenche o que ficou sem vetor
+(ex.: cargas em massa).
+"""
+import logging
+from typing import Iterable, Optional
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Func, TextField, Value
+from django.db.models.functions import Cast, Coalesce
+
+from ..models import InlabsArticle
+
+logger = logging.getLogger(__name__)
+
+CONFIG_BUSCA = "portuguese_unaccent"
+
+# Vetor ponderado por campo; body_texto chega como HTML e as tags são removidas
+SQL_VETOR = f"""
+    setweight(to_tsvector('{CONFIG_BUSCA}', coalesce(name, '')), 'A')
+    || setweight(to_tsvector('{CONFIG_BUSCA}', coalesce(nome_om, '') || ' ' || coalesce(body_identifica, '')), 'B')
+    || setweight(to_tsvector('{CONFIG_BUSCA}', regexp_replace(coalesce(body_texto, ''), '<[^>]+>', ' ', 'g')), 'C')
+"""
+
+
+def criar_extensoes_busca(sender=None, using="default", **kwargs) -> None:
+    """
+    Garante unaccent, pg_trgm e a configuração ``portuguese_unaccent``. Ligado ao
+    ``pre_migrate`` do app: os índices GIN/trigram da migração dependem deles.
+    """
+    from django.db import connections
+
+    conexao = connections[using]
+    if conexao.vendor != "postgresql":
+        return
+    with conexao.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [CONFIG_BUSCA])
+        if cursor.fetchone() is None:
+            cursor.execute(f"CREATE TEXT SEARCH CONFIGURATION {CONFIG_BUSCA} (COPY = portuguese)")
+            cursor.execute(
+                f"ALTER TEXT SEARCH CONFIGURATION {CONFIG_BUSCA} "
+                "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem"
+            )
+
+
+def atualizar_search_vector(ids: Optional[Iterable[int]] = None, somente_pendentes: bool = False) -> int:
+    """
+    Recalcula ``search_vector`` dos artigos ``ids`` (todos quando ``None``; com
+    ``somente_pendentes``, apenas os que ainda não têm vetor). Retorna as linhas
+    atualizadas.
+    """
+    condicoes, params = [], []
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return 0
+        condicoes.append("id = ANY(%s)")
+        params.append(ids)
+    if somente_pendentes:
+        condicoes.append("search_vector IS NULL")
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    tabela = connection.ops.quote_name(InlabsArticle._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"UPDATE {tabela} SET search_vector = {SQL_VETOR} {where}", params)
+        return cursor.rowcount
+
+
+class _SemTags(Func):
+    function = "REGEXP_REPLACE"
+    template = "%(function)s(%(expressions)s, '<[^>]+>', ' ', 'g')"
+    output_field = TextField()
+
+
+def buscar(queryset, termo: str, trecho: bool = True):
+    """
+    Filtra ``queryset`` pelos artigos que casam com ``termo`` (sintaxe de busca web:
+    aspas, ``-exclusão``, ``or``), anotando ``rank`` e, com ``trecho``, um fragmento
+    de ``body_texto`` com os termos marcados em ``<mark>``. Ordena por relevância.
+    """
+    consulta = SearchQuery(termo, config=CONFIG_BUSCA, search_type="websearch")
+    # ts_rank devolve real; comparado com o valor do cursor (double precision), o
+    # próprio rank não se igualaria e a paginação por cursor repetiria os empates
+    queryset = queryset.filter(search_vector=consulta).annotate(
+        rank=Cast(SearchRank(F("search_vector"), consulta), FloatField()),
+    )
+    if trecho:
+        queryset = queryset.annotate(
+            trecho=SearchHeadline(
+                _SemTags(Coalesce("body_texto", Value(""))),
+                consulta,
+                config=CONFIG_BUSCA,
+                start_sel="<mark>",
+                stop_sel="</mark>",
+                max_fragments=2,
+                max_words=30,
+                min_words=10,
+            ),
+        )
+    return queryset.order_by("-rank", "-pub_date", "article_id")
@@ -0,0 +1,95 @@
+"""
+Gravação em lote dos artigos INLABS e dos avisos/credenciamentos extraídos deles.
+
+Usa o upsert em lote de ``core.services.bulk_upsert`` (``INSERT ... ON CONFLICT DO
+UPDATE`` por lote) com as chaves únicas dos modelos: ``(article_id, pub_date, materia_id)`` para os artigos e
+``article_id`` para avisos e credenciamentos. O vetor de busca é recalculado apenas
+para os artigos inseridos ou alterados.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from django.db import models
+
+from django_licitacao360.apps.core.services.bulk_upsert import DEFAULT_CHUNK_SIZE, bulk_upsert
+
+from ..models import AvisoLicitacao, Credenciamento, InlabsArticle
+from .busca import atualizar_search_vector
+
+logger = logging.getLogger(__name__)
+
+CHAVE_ARTIGO = ["article_id", "pub_date", "materia_id"]
+CHAVE_DETALHE = ["article_id"]
+
+# Campos que, ausentes todos, indicam que o parsing não reconheceu o texto
+CAMPOS_MINIMOS_AVISO = ("modalidade", "numero", "processo")
+CAMPOS_MINIMOS_CREDENCIAMENTO = ("tipo", "numero", "processo")
+
+
+def _campos(model) -> List[str]:
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if not field.primary_key and field.editable and field.attname != "article_id"
+    ]
+
+
+def _ajustar_tamanhos(model, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Corta, in-place, os textos maiores que o ``max_length`` do campo."""
+    for field in model._meta.concrete_fields:
+        valor = row.get(field.attname)
+        if isinstance(field, models.CharField) and isinstance(valor, str) and len(valor) > field.max_length:
+            row[field.attname] = valor[:field.max_length]
+    return row
+
+
+def linha_detalhe(model, article_id: str, dados: Mapping[str, Any], minimos: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Linha de ``AvisoLicitacao``/``Credenciamento`` a partir do dicionário do parser, ou
+    ``None`` quando nenhum dos campos ``minimos`` foi extraído.
+    """
+    if not any(dados.get(campo) for campo in minimos):
+        return None
+    row = {"article_id": article_id}
+    row.update({campo: dados.get(campo) for campo in _campos(model)})
+    return _ajustar_tamanhos(model, row)
+
+
+def upsert_artigos(rows: List[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """Grava os artigos e atualiza o vetor de busca dos que mudaram."""
+    alterados: List[int] = []
+    stats = bulk_upsert(
+        InlabsArticle,
+        [_ajustar_tamanhos(InlabsArticle, row) for row in rows],
+        conflict_fields=CHAVE_ARTIGO,
+        chunk_size=chunk_size,
+        label="INLABS Artigos",
+        pks=alterados,
+    )
+    # Vetor de busca só dos inseridos/alterados (ver services/busca.py)
+    atualizar_search_vector(alterados)
+    return stats
+
+
+def upsert_avisos(rows: List[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    return bulk_upsert(
+        AvisoLicitacao,
+        [_ajustar_tamanhos(AvisoLicitacao, row) for row in rows],
+        conflict_fields=CHAVE_DETALHE,
+        chunk_size=chunk_size,
+        label="INLABS Avisos",
+    )
+
+
+def upsert_credenciamentos(rows: List[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    return bulk_upsert(
+        Credenciamento,
+        [_ajustar_tamanhos(Credenciamento, row) for row in rows],
+        conflict_fields=CHAVE_DETALHE,
+        chunk_size=chunk_size,
+        label="INLABS Credenciamentos",
+    )
+
+
+def total_gravado(stats: Mapping[str, int]) -> int:
+    """Linhas presentes no banco após o upsert (inseridas, atualizadas ou já iguais)."""
+    return stats["inseridas"] + stats["atualizadas"] + stats["inalteradas"]
@@ -0,0 +1,277 @@
+"""
+Cliente HTTP do INLABS: login por formulário, cookie de sessão em cache e download
+dos zips em streaming, sem navegador.
+
+- O login (``POST logar.php``) devolve o cookie ``inlabs_session_cookie``, que fica
+  salvo em ``cookie_cache`` e é reaproveitado entre execuções até expirar
+  (``INLABS_COOKIE_TTL``) ou o servidor recusar a sessão, quando o login é refeito.
+- O zip é gravado em ``<arquivo>.part`` por blocos; se a conexão cair, a próxima
+  tentativa continua de onde parou com ``Range``. Ao final o tamanho é comparado com o
+  anunciado pelo servidor e o zip é verificado (CRC de todos os membros) antes de
+  ganhar o nome definitivo.
+
+O Selenium continua disponível em ``inlabs_downloader`` como alternativa.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+from zipfile import BadZipFile, ZipFile
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://inlabs.in.gov.br"
+COOKIE_NAME = "inlabs_session_cookie"
+# Cabeçalho enviado pelos scripts oficiais de download do INLABS
+ORIGEM_HEADER = {"origem": "736372697074"}
+COOKIE_TTL = int(os.getenv("INLABS_COOKIE_TTL", str(2 * 3600)))
+TAMANHO_BLOCO = 64 * 1024
+
+
+def usar_selenium() -> bool:
+    """``INLABS_DOWNLOAD_MODE=selenium`` força o navegador; lido a cada chamada."""
+    return os.getenv("INLABS_DOWNLOAD_MODE", "http").lower() == "selenium"
+
+
+class InlabsDownloadError(RuntimeError):
+    """Erro específico para fluxo de download do INLABS."""
+
+
+class InlabsAuthError(InlabsDownloadError):
+    """Login recusado ou sessão expirada."""
+
+
+class EdicaoIndisponivel(InlabsDownloadError):
+    """A edição não existe no INLABS (HTTP 404)."""
+
+
+class InlabsHttpClient:
+    """
+    Sessão HTTP autenticada no INLABS, com pool de conexões para downloads simultâneos.
+
+    Uso::
+
+        with InlabsHttpClient(email, senha, cookie_cache=Path("/tmp/inlabs/.cookie.json")) as client:
+            client.download(url, destino)
+    """
+
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        base_url: str = BASE_URL,
+        cookie_cache: Optional[Path] = None,
+        pool_size: int = 4,
+        timeout: Tuple[int, int] = (20, 120),
+        cookie_ttl: int = COOKIE_TTL,
+    ):
+        self.email = email
+        self.password = password
+        self.base_url = base_url.rstrip("/")
+        self.cookie_cache = cookie_cache
+        self.timeout = timeout
+        self.cookie_ttl = cookie_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(ORIGEM_HEADER)
+        self._autenticado = False
+        # Downloads em threads compartilham a sessão; o login é feito por uma de cada vez
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "InlabsHttpClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    @property
+    def _dominio(self) -> str:
+        return requests.utils.urlparse(self.base_url).hostname or ""
+
+    def usar_cookie(self, valor: str) -> None:
+        # Troca o pote de cookies de uma vez: downloads em andamento em outras threads
+        # nunca veem a sessão sem cookie
+        cookies = requests.cookies.RequestsCookieJar()
+        cookies.set(COOKIE_NAME, valor, domain=self._dominio, path="/")
+        self.session.cookies = cookies
+        self._autenticado = True
+
+    def cookie_atual(self) -> Optional[str]:
+        return self.session.cookies.get(COOKIE_NAME)
+
+    def _cookie_em_cache(self) -> Optional[str]:
+        if not self.cookie_cache or not self.cookie_cache.exists():
+            return None
+        try:
+            dados = json.loads(self.cookie_cache.read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - dados.get("obtido_em", 0) > self.cookie_ttl:
+            return None
+        return dados.get("cookie")
+
+    def _salvar_cookie(self, valor: str) -> None:
+        if not self.cookie_cache:
+            return
+        try:
+            self.cookie_cache.parent.mkdir(parents=True, exist_ok=True)
+            self.cookie_cache.write_text(json.dumps({"cookie": valor, "obtido_em": time.time()}))
+            self.cookie_cache.chmod(0o600)
+        except OSError as exc:
+            logger.warning("Não foi possível gravar o cookie do INLABS em %s: %s", self.cookie_cache, exc)
+
+    def login(self, force: bool = False, recusado: Optional[str] = None) -> None:
+        """
+        Autentica, reaproveitando o cookie em cache quando ainda válido.
+
+        Com ``force``, refaz o login; se ``recusado`` (o cookie que o servidor rejeitou)
+        já foi trocado por outra thread, a sessão nova é aproveitada.
+        """
+        with self._lock:
+            if force and recusado is not None and self.cookie_atual() != recusado:
+                return
+            self._login(force)
+
+    def _login(self, force: bool) -> None:
+        if not force:
+            if self._autenticado:
+                return
+            em_cache = self._cookie_em_cache()
+            if em_cache:
+                self.usar_cookie(em_cache)
+                return
+
+        # O POST usa uma sessão própria para não mexer nos cookies da sessão compartilhada
+        try:
+            with requests.Session() as sessao_login:
+                sessao_login.headers.update(ORIGEM_HEADER)
+                sessao_login.post(
+                    f"{self.base_url}/logar.php",
+                    data={"email": self.email, "password": self.password},
+                    timeout=self.timeout,
+                    # O cookie vem no próprio redirect; não há por que carregar a página seguinte
+                    allow_redirects=False,
+                )
+                valor = sessao_login.cookies.get(COOKIE_NAME)
+        except requests.RequestException as exc:
+            raise InlabsDownloadError(f"Falha ao autenticar no INLABS: {exc}") from exc
+
+        if not valor:
+            self._autenticado = False
+            raise InlabsAuthError("Não foi possível autenticar no INLABS. Verifique credenciais.")
+        self.usar_cookie(valor)
+        self._salvar_cookie(valor)
+        logger.info("Sessão INLABS autenticada por HTTP")
+
+    def edition_url(self, date_str: str, section: str) -> str:
+        return f"{self.base_url}/index.php?p={date_str}&dl={date_str}-{section}.zip"
+
+    def download(self, url: str, destino: Path, max_attempts: int = 3, retry_delay: int = 5) -> Path:
+        """
+        Baixa ``url`` para ``destino``, retomando downloads parciais. Refaz o login uma
+        vez se a sessão tiver expirado; 404 vira ``EdicaoIndisponivel``.
+        """
+        self.login()
+        relogin_feito = False
+        tentativa = 1
+        while True:
+            cookie = self.cookie_atual()
+            try:
+                return self._baixar(url, destino)
+            except InlabsAuthError:
+                if relogin_feito:
+                    raise
+                logger.info("Sessão INLABS expirada; refazendo login")
+                self.login(force=True, recusado=cookie)
+                relogin_feito = True
+            except EdicaoIndisponivel:
+                raise
+            except (requests.RequestException, InlabsDownloadError) as exc:
+                logger.warning(
+                    "Download de %s falhou (tentativa %s/%s): %s", destino.name, tentativa, max_attempts, exc
+                )
+                if tentativa >= max_attempts:
+                    raise InlabsDownloadError(f"Falha ao baixar {destino.name}: {exc}") from exc
+                tentativa += 1
+                time.sleep(retry_delay)
+
+    def _baixar(self, url: str, destino: Path) -> Path:
+        parcial = destino.with_name(destino.name + ".part")
+        ja_baixado = parcial.stat().st_size if parcial.exists() else 0
+        headers = {"Range": f"bytes={ja_baixado}-"} if ja_baixado else {}
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 404:
+                raise EdicaoIndisponivel(f"Nenhum arquivo disponível em {url}. HTTP 404.")
+            if response.status_code in (401, 403) or _pagina_html(response):
+                raise InlabsAuthError(f"Sessão recusada ao baixar {destino.name} (HTTP {response.status_code}).")
+            if response.status_code == 416:
+                # O parcial já tem o arquivo inteiro (ou está corrompido); verifica abaixo
+                total = ja_baixado
+                modo = None
+            elif response.status_code == 206:
+                total = _tamanho_total(response, ja_baixado)
+                modo = "ab"
+            elif response.status_code == 200:
+                # Servidor ignorou o Range: recomeça do zero
+                total = int(response.headers["Content-Length"]) if "Content-Length" in response.headers else None
+                modo = "wb"
+            else:
+                raise InlabsDownloadError(f"HTTP {response.status_code} ao baixar {destino.name}.")
+
+            if modo:
+                with open(parcial, modo) as arquivo:
+                    for bloco in response.iter_content(TAMANHO_BLOCO):
+                        arquivo.write(bloco)
+
+        tamanho = parcial.stat().st_size
+        if total is not None and tamanho < total:
+            # Conexão interrompida: mantém o parcial para retomar na próxima tentativa
+            raise InlabsDownloadError(f"Download incompleto de {destino.name}: {tamanho} de {total} bytes.")
+        if total is not None and tamanho > total:
+            parcial.unlink()
+            raise InlabsDownloadError(f"{destino.name} maior que o anunciado: {tamanho} de {total} bytes.")
+        verificar_zip(parcial)
+        parcial.replace(destino)
+        logger.info("Arquivo %s baixado (%s bytes)", destino.name, tamanho)
+        return destino
+
+
+def verificar_zip(caminho: Path) -> None:
+    """Confere o CRC de todos os membros; apaga o arquivo e levanta erro se inválido."""
+    try:
+        with ZipFile(caminho) as archive:
+            corrompido = archive.testzip()
+    except (BadZipFile, OSError) as exc:
+        caminho.unlink(missing_ok=True)
+        raise InlabsDownloadError(f"{caminho.name} não é um zip válido: {exc}") from exc
+    if corrompido is not None:
+        caminho.unlink(missing_ok=True)
+        raise InlabsDownloadError(f"{caminho.name} corrompido (membro {corrompido}).")
+
+
+def _pagina_html(response: requests.Response) -> bool:
+    return "text/html" in response.headers.get("Content-Type", "") or "acessar.php" in response.url
+
+
+def _tamanho_total(response: requests.Response, inicio: int) -> Optional[int]:
+    # Content-Range: bytes 100-999/1000
+    faixa = response.headers.get("Content-Range", "")
+    if "/" in faixa and not faixa.endswith("/*"):
+        return int(faixa.rsplit("/", 1)[1])
+    if "Content-Length" in response.headers:
+        return inicio + int(response.headers["Content-Length"])
+    return None
@@ -0,0 +1,476 @@
+"""
+Parsing dos XMLs de uma edição do INLABS.
+
+Os membros são lidos direto do zip, sem extrair para disco. Antes do parse completo,
+``categoria_artigo`` lê só o início de cada XML e extrai o atributo ``artCategory``
+com uma busca em bytes (``iterparse`` quando o atributo não está no início): numa
+edição DO3 a maior parte dos artigos não é da Marinha e é descartada sem ser
+descomprimida por inteiro. Os selecionados são divididos em lotes e processados num
+``ProcessPoolExecutor`` (parse do XML + ``parse_aviso_licitacao``/``parse_credenciamento``).
+
+O módulo não depende do Django, para que os processos de trabalho não precisem
+carregar o projeto e para poder ser usado pelo ``zip_xml_to_sqlite.py``.
+"""
+from __future__ import annotations
+
+import html
+import io
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from xml.etree import ElementTree as ET
+from zipfile import ZipFile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Bytes lidos de cada XML para achar artCategory (o atributo vem no início de <article>)
+TAMANHO_CABECALHO = 4096
+# Artigos por lote enviado a um processo
+TAMANHO_LOTE = 64
+# Abaixo disso o custo de subir os processos supera o ganho
+MIN_ARTIGOS_PARALELO = 2 * TAMANHO_LOTE
+
+_RE_ART_CATEGORY = re.compile(rb"""\bartCategory\s*=\s*(["'])(.*?)\1""", re.DOTALL)
+
+# Padrões regex para parsing (compatíveis com zip_xml_to_sqlite.py)
+UASG_PATTERN = re.compile(r"\bUASG\s*(\d+)\b", re.IGNORECASE)
+AVISO_ART_TYPES = {"Aviso de Licitação-Pregão", "Aviso de Licitação", "Aviso de Licitação-Concorrência"}
+AVISO_IDENT_PATTERN = re.compile(
+    r"^(?P<modalidade>.+?)\s+N[ºo]\s*(?P<numero>\d+)/(?:\s*)?(?P<ano>\d{4})\s*-\s*UASG\s*(?P<uasg>\d+)",
+    re.IGNORECASE,
+)
+CRED_IDENT_PATTERN = re.compile(
+    r"^(?P<tipo>.+?)\s+N[ºo]\s*(?P<numero>\d+)/(?:\s*)?(?P<ano>\d{4})\s*-\s*UASG\s*(?P<uasg>\d+)",
+    re.IGNORECASE,
+)
+CRED_PROCES_PATTERN = re.compile(
+    r"^Nº Processo:\s*(?P<processo>.+)$",
+    re.IGNORECASE,
+)
+CRED_CONTRATANTE_PATTERN = re.compile(
+    r"^(?P<tipo_processo>[^.]+?)\s+N[ºo]\s*(?P<numero_processo>\d+)/(?:\s*)?(?P<ano_processo>\d{4})\.\s*Contratante:\s*(?P<contratante>.+?)\.$",
+    re.IGNORECASE,
+)
+CRED_CONTRATADO_PATTERN = re.compile(
+    r"^Contratado:\s*(?P<contratado>.+?)\.\s*Objeto:\s*(?P<objeto>.+?)\.$",
+    re.IGNORECASE,
+)
+CRED_FUNDAMENTO_PATTERN = re.compile(
+    r"^Fundamento Legal:\s*(?P<fundamento_legal>.+?)\.\s*Vigência:\s*(?P<vigencia>.+?)\.\s*Valor Total:\s*(?P<valor_total>.+?)\.\s*Data de Assinatura:\s*(?P<data_assinatura>.+?)\.$",
+    re.IGNORECASE,
+)
+CRED_ASSINA_PATTERN = re.compile(r"^(?P<nome>.+?)\s*\((?P<cargo>[^)]+)\)$")
+
+def extract_paragraphs(body_html: str | None) -> List[Tuple[str | None, str]]:
+    """Extrai parágrafos do HTML com suas classes."""
+    if not body_html:
+        return []
+    paragraphs = re.findall(r"<p(?:\s+class=\"([^\"]*)\")?>(.*?)</p>", body_html, re.DOTALL | re.IGNORECASE)
+    results: List[Tuple[str | None, str]] = []
+    for class_name, content in paragraphs:
+        text = re.sub(r"<[^>]+>", "", content)
+        text = html.unescape(text).strip()
+        results.append((class_name, text))
+    return results
+
+
+def extract_labeled_fields(text: str) -> Dict[str, str]:
+    """Extrai campos rotulados do texto."""
+    labels = [
+        "Nº Processo",
+        "Objeto",
+        "Total de Itens Licitados",
+        "Edital",
+        "Endereço",
+        "Entrega das Propostas",
+        "Abertura das Propostas",
+        "Informações Gerais",
+    ]
+    pattern = re.compile(
+        r"(Nº Processo|Objeto|Total de Itens Licitados|Edital|Endereço|Entrega das Propostas|Abertura das Propostas|Informações Gerais):",
+        re.IGNORECASE,
+    )
+    matches = list(pattern.finditer(text))
+    results: Dict[str, str] = {}
+    for idx, match in enumerate(matches):
+        label = match.group(1)
+        start = match.end()
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+        value = text[start:end].strip()
+        results[label] = value
+    return results
+
+
+def parse_aviso_licitacao(body_html: str | None) -> Dict[str, str | None]:
+    """Extrai dados de aviso de licitação do HTML."""
+    data: Dict[str, str | None] = {
+        "modalidade": None,
+        "numero": None,
+        "ano": None,
+        "uasg": None,
+        "processo": None,
+        "objeto": None,
+        "itens_licitados": None,
+        "publicacao": None,
+        "entrega_propostas": None,
+        "abertura_propostas": None,
+        "nome_responsavel": None,
+        "cargo": None,
+    }
+
+    paragraphs = extract_paragraphs(body_html)
+    if not paragraphs:
+        return data
+
+    identifica_text = None
+    info_texts: List[str] = []
+    for class_name, text in paragraphs:
+        class_name_lower = (class_name or "").lower()
+        if class_name_lower == "identifica":
+            if AVISO_IDENT_PATTERN.search(text):
+                identifica_text = text
+        elif class_name_lower == "assina":
+            data["nome_responsavel"] = text
+        elif class_name_lower == "cargo":
+            data["cargo"] = text
+        else:
+            if "siasgnet" not in text.lower():
+                info_texts.append(text)
+
+    if identifica_text:
+        match = AVISO_IDENT_PATTERN.search(identifica_text)
+        if match:
+            data.update(match.groupdict())
+
+    if info_texts:
+        joined = " ".join(info_texts)
+        fields = extract_labeled_fields(joined)
+        data["processo"] = fields.get("Nº Processo")
+        data["objeto"] = fields.get("Objeto")
+        itens_raw = fields.get("Total de Itens Licitados")
+        if itens_raw:
+            data["itens_licitados"] = itens_raw.rstrip(".")
+        publicacao_raw = fields.get("Edital")
+        if publicacao_raw:
+            data["publicacao"] = publicacao_raw.split()[0]
+
+        entrega_raw = fields.get("Entrega das Propostas")
+        if entrega_raw:
+            match = re.search(r"\d{2}/\d{2}/\d{4}", entrega_raw)
+            data["entrega_propostas"] = match.group(0) if match else None
+        abertura_raw = fields.get("Abertura das Propostas")
+        if abertura_raw:
+            match = re.search(
+                r"\d{2}/\d{2}/\d{4}\s+às\s+\d{2}h\d{2}\s+no\s+site\s+www\.gov\.br/compras\.?",
+                abertura_raw,
+                re.IGNORECASE,
+            )
+            if match:
+                data["abertura_propostas"] = match.group(0)
+            else:
+                match = re.search(r"\d{2}/\d{2}/\d{4}", abertura_raw)
+                data["abertura_propostas"] = match.group(0) if match else None
+
+    return data
+
+
+def parse_credenciamento(body_html: str | None) -> Dict[str, str | None]:
+    """Extrai dados de credenciamento do HTML."""
+    data: Dict[str, str | None] = {
+        "tipo": None,
+        "numero": None,
+        "ano": None,
+        "uasg": None,
+        "processo": None,
+        "tipo_processo": None,
+        "numero_processo": None,
+        "ano_processo": None,
+        "contratante": None,
+        "contratado": None,
+        "objeto": None,
+        "fundamento_legal": None,
+        "vigencia": None,
+        "valor_total": None,
+        "data_assinatura": None,
+        "nome_responsavel": None,
+        "cargo": None,
+    }
+
+    paragraphs = extract_paragraphs(body_html)
+    if not paragraphs:
+        return data
+
+    identifica_text = None
+    for class_name, text in paragraphs:
+        class_name_lower = (class_name or "").lower()
+        if class_name_lower == "identifica":
+            if CRED_IDENT_PATTERN.search(text):
+                identifica_text = text
+        elif class_name_lower == "assina":
+            data["nome_responsavel"] = text
+        elif class_name_lower == "cargo":
+            data["cargo"] = text
+        else:
+            if "comprasnet" in text.lower():
+                continue
+
+            match = CRED_PROCES_PATTERN.match(text)
+            if match:
+                data["processo"] = match.group("processo").strip().rstrip(".")
+                continue
+
+            match = CRED_CONTRATANTE_PATTERN.match(text)
+            if match:
+                data.update(match.groupdict())
+                continue
+
+            match = CRED_CONTRATADO_PATTERN.match(text)
+            if match:
+                data.update(match.groupdict())
+                continue
+
+            match = CRED_FUNDAMENTO_PATTERN.match(text)
+            if match:
+                data.update(match.groupdict())
+                continue
+
+            match = CRED_ASSINA_PATTERN.match(text)
+            if match:
+                data["nome_responsavel"] = match.group("nome")
+                data["cargo"] = match.group("cargo")
+
+    if identifica_text:
+        match = CRED_IDENT_PATTERN.search(identifica_text)
+        if match:
+            data.update(match.groupdict())
+
+    return data
+
+def categoria_artigo(cabecalho: bytes) -> Optional[str]:
+    """
+    ``artCategory`` do ``<article>`` contido em ``cabecalho`` (início ou todo o XML),
+    ou ``None`` se o atributo não aparecer nesses bytes.
+    """
+    match = _RE_ART_CATEGORY.search(cabecalho)
+    if match:
+        return html.unescape(match.group(2).decode("utf-8", errors="replace"))
+    try:
+        for _, elem in ET.iterparse(io.BytesIO(cabecalho), events=("start",)):
+            if elem.tag == "article":
+                return elem.get("artCategory")
+    except ET.ParseError:
+        pass
+    return None
+
+
+def _categoria_confere(categoria: Optional[str], keyword: str) -> bool:
+    return keyword.lower() in (categoria or "").lower()
+
+
+def membro_da_categoria(archive: ZipFile, nome: str, keyword: str) -> bool:
+    """Indica se o membro ``nome`` do zip pertence à categoria, lendo só o início dele."""
+    with archive.open(nome) as membro:
+        cabecalho = membro.read(TAMANHO_CABECALHO)
+        categoria = categoria_artigo(cabecalho)
+        if categoria is None and len(cabecalho) == TAMANHO_CABECALHO:
+            categoria = categoria_artigo(cabecalho + membro.read())
+    return _categoria_confere(categoria, keyword)
+
+
+def filtrar_membros_zip(archive: ZipFile, keyword: str) -> Tuple[List[str], int]:
+    """Membros ``.xml`` da categoria ``keyword`` e a quantidade de descartados."""
+    selecionados: List[str] = []
+    descartados = 0
+    for nome in archive.namelist():
+        if not nome.lower().endswith(".xml"):
+            continue
+        if membro_da_categoria(archive, nome, keyword):
+            selecionados.append(nome)
+        else:
+            descartados += 1
+    return selecionados, descartados
+
+
+def _arquivo_da_categoria(caminho: Path, keyword: str) -> bool:
+    with open(caminho, "rb") as arquivo:
+        cabecalho = arquivo.read(TAMANHO_CABECALHO)
+        categoria = categoria_artigo(cabecalho)
+        if categoria is None and len(cabecalho) == TAMANHO_CABECALHO:
+            categoria = categoria_artigo(cabecalho + arquivo.read())
+    return _categoria_confere(categoria, keyword)
+
+
+def em_lotes(itens: Sequence[T], tamanho: int = TAMANHO_LOTE) -> List[Sequence[T]]:
+    return [itens[inicio:inicio + tamanho] for inicio in range(0, len(itens), tamanho)]
+
+
+def processos_disponiveis(processos: Optional[int] = None) -> int:
+    """
+    Processos a usar: ``processos`` ou um por CPU. Dentro de um processo daemônico
+    (ex.: worker prefork do Celery) não é possível criar filhos, então retorna 1.
+    """
+    if multiprocessing.current_process().daemon:
+        return 1
+    return max(1, processos or os.cpu_count() or 1)
+
+
+def executar_lotes(
+    funcao: Callable[[T], List[R]],
+    tarefas: Sequence[T],
+    processos: Optional[int] = None,
+    total_itens: Optional[int] = None,
+) -> List[R]:
+    """
+    Aplica ``funcao`` (de módulo, para ser serializável) a cada tarefa e concatena os
+    resultados na ordem das tarefas. Usa um ``ProcessPoolExecutor`` quando há mais de
+    um processo disponível e ``total_itens`` justifica; senão executa no processo atual.
+    """
+    processos = min(processos_disponiveis(processos), len(tarefas))
+    if total_itens is None:
+        total_itens = len(tarefas)
+    resultados: List[R] = []
+    if processos <= 1 or total_itens < MIN_ARTIGOS_PARALELO:
+        for tarefa in tarefas:
+            resultados.extend(funcao(tarefa))
+        return resultados
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        for parcial in executor.map(funcao, tarefas):
+            resultados.extend(parcial)
+    return resultados
+
+
+def _texto_html(texto_elem: ET.Element) -> Optional[str]:
+    # O elemento <Texto> pode conter HTML de duas formas:
+    # 1. Como texto escapado dentro do elemento (texto_elem.text) - ex: &lt;p&gt;texto&lt;/p&gt;
+    # 2. Como elementos XML filhos (tags <p> como elementos XML) - ex: <p>texto</p>
+    if len(texto_elem) > 0:
+        # Tem elementos filhos XML - converte para HTML, desescapando texto e tails
+        texto_parts = []
+        if texto_elem.text:
+            texto_parts.append(html.unescape(texto_elem.text))
+        for child in texto_elem:
+            child_html = ET.tostring(child, encoding="unicode", method="html")
+            texto_parts.append(html.unescape(child_html))
+            if child.tail:
+                texto_parts.append(html.unescape(child.tail))
+        texto_html = "".join(texto_parts)
+        return texto_html if texto_html else None
+
+    # Não tem elementos filhos - pega o texto direto (que contém HTML escapado)
+    texto_html = texto_elem.text or ""
+    return html.unescape(texto_html) if texto_html else None
+
+
+def parse_artigo_xml(xml_bytes: bytes, source_filename: str) -> Optional[Dict[str, object]]:
+    """
+    Converte um XML do INLABS no dicionário usado por ``persist_inlabs_articles``.
+    Avisos de licitação e credenciamentos já saem com os campos extraídos em
+    ``aviso``/``credenciamento``. Retorna ``None`` se não houver ``<article>``.
+    """
+    root = ET.fromstring(xml_bytes)
+    article = root if root.tag == "article" else root.find("article")
+    if article is None:
+        return None
+
+    art_category = article.attrib.get("artCategory", "")
+    body_elem = article.find("body")
+    body_html = ET.tostring(body_elem, encoding="unicode") if body_elem is not None else ""
+
+    # Extrai body_identifica e body_texto (compatível com zip_xml_to_sqlite.py)
+    body_identifica = None
+    body_texto = None
+    if body_elem is not None:
+        identifica_elem = body_elem.find("Identifica")
+        if identifica_elem is not None:
+            body_identifica = identifica_elem.text or ""
+        texto_elem = body_elem.find("Texto")
+        if texto_elem is not None:
+            body_texto = _texto_html(texto_elem)
+
+    nome_om = art_category.rsplit("/", 1)[-1].strip() if art_category else None
+
+    uasg = None
+    if body_identifica:
+        uasg_match = UASG_PATTERN.search(body_identifica)
+        if uasg_match:
+            uasg = uasg_match.group(1)
+
+    dados: Dict[str, object] = {
+        "attributes": dict(article.attrib),
+        "body_html": body_html,
+        "body_identifica": body_identifica,
+        "body_texto": body_texto,
+        "nome_om": nome_om,
+        "uasg": uasg,
+        "source_filename": source_filename,
+    }
+
+    # body_texto contém o HTML decodificado de <Texto>; body_html, a estrutura XML
+    art_type = article.attrib.get("artType", "")
+    body_para_parsing = body_texto or body_html
+    if art_type in AVISO_ART_TYPES:
+        dados["aviso"] = parse_aviso_licitacao(body_para_parsing)
+    if art_type and "credenciamento" in art_type.lower():
+        dados["credenciamento"] = parse_credenciamento(body_para_parsing)
+    return dados
+
+
+def _parse_seguro(xml_bytes: bytes, nome: str) -> Optional[Dict[str, object]]:
+    try:
+        return parse_artigo_xml(xml_bytes, nome)
+    except ET.ParseError:
+        logger.warning("XML inválido ignorado: %s", nome)
+        return None
+
+
+def _parse_lote_zip(tarefa: Tuple[str, Sequence[str]]) -> List[Dict[str, object]]:
+    zip_path, nomes = tarefa
+    artigos = []
+    with ZipFile(zip_path, "r") as archive:
+        for nome in nomes:
+            artigo = _parse_seguro(archive.read(nome), Path(nome).name)
+            if artigo is not None:
+                artigos.append(artigo)
+    return artigos
+
+
+def _parse_lote_arquivos(caminhos: Sequence[str]) -> List[Dict[str, object]]:
+    artigos = []
+    for caminho in caminhos:
+        artigo = _parse_seguro(Path(caminho).read_bytes(), Path(caminho).name)
+        if artigo is not None:
+            artigos.append(artigo)
+    return artigos
+
+
+def coletar_artigos_zip(
+    zip_path: Path, keyword: str, processos: Optional[int] = None
+) -> List[Dict[str, object]]:
+    """Artigos da categoria ``keyword`` lidos direto do zip da edição."""
+    with ZipFile(zip_path, "r") as archive:
+        nomes, descartados = filtrar_membros_zip(archive, keyword)
+    logger.info(
+        "%s: %s XMLs da categoria '%s', %s descartados pelo cabeçalho",
+        Path(zip_path).name, len(nomes), keyword, descartados,
+    )
+    tarefas = [(str(zip_path), lote) for lote in em_lotes(nomes)]
+    return executar_lotes(_parse_lote_zip, tarefas, processos, total_itens=len(nomes))
+
+
+def coletar_artigos_diretorio(
+    root_dir: Path, keyword: str, processos: Optional[int] = None
+) -> List[Dict[str, object]]:
+    """Artigos da categoria ``keyword`` nos XMLs de um diretório já extraído."""
+    caminhos = [
+        str(caminho) for caminho in sorted(root_dir.rglob("*.xml"))
+        if _arquivo_da_categoria(caminho, keyword)
+    ]
+    return executar_lotes(_parse_lote_arquivos, em_lotes(caminhos), processos, total_itens=len(caminhos))
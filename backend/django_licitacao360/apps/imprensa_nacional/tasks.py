@@ -1,19 +1,32 @@
 from __future__ import annotations
 
 import logging
+import os
+from dataclasses import asdict
 from datetime import date
 from urllib.parse import urlparse
 
 from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
 from django.db import connections
 from django.utils import timezone
 import redis
 
+from .services.backfill import DOWNLOADS_SIMULTANEOS, backfill_inlabs
 from .services.inlabs_downloader import ingest_inlabs_articles, InlabsDownloadError
 
 logger = logging.getLogger(__name__)
 
+BACKFILL_LOCK_KEY = "inlabs:lock:backfill"
+# Tempo máximo de um backfill (o padrão global do Celery, 5 min, não comporta nem
+# poucas edições). Ao estourar, a task para e as datas restantes ficam pendentes
+# para a próxima execução
+BACKFILL_SOFT_TIME_LIMIT = int(os.getenv("INLABS_BACKFILL_TIME_LIMIT", str(12 * 3600)))
+# Em vez de um TTL do tamanho do limite acima, o lock é renovado a cada edição
+# processada: um worker perdido o libera em até uma hora
+BACKFILL_LOCK_TIMEOUT = 3600
+
 
 def get_redis_client():
     """Retorna cliente Redis usando a configuração do Celery."""
@@ -83,3 +96,63 @@ def collect_inlabs_articles(self, target_date: str | None = None) -> dict:
             logger.warning("Erro ao remover lock %s: %s", lock_key, exc)
         # Garantir fechamento de conexões
         connections.close_all()
+
+
+def renovar_lock(redis_client, lock_key: str, dono: str, timeout: int) -> bool:
+    """Estende o TTL de ``lock_key`` enquanto ele ainda pertence a ``dono``."""
+    try:
+        if redis_client.get(lock_key) != dono:
+            logger.warning("Lock %s não pertence mais a %s; não foi renovado", lock_key, dono)
+            return False
+        return bool(redis_client.expire(lock_key, timeout))
+    except redis.RedisError as exc:
+        logger.warning("Erro ao renovar lock %s: %s", lock_key, exc)
+        return False
+
+
+@shared_task(bind=True, soft_time_limit=BACKFILL_SOFT_TIME_LIMIT, time_limit=BACKFILL_SOFT_TIME_LIMIT + 600)
+def backfill_inlabs_articles(self, start_date: str, end_date: str | None = None, downloads: int | None = None) -> dict:
+    """
+    Task Celery para importar um intervalo de datas do INLABS (ver services/backfill.py).
+
+    Usa um lock distribuído único para o backfill, independente do lock diário, com
+    o ID da task como dono. O TTL é renovado a cada edição processada. Se o backfill
+    passar de ``BACKFILL_SOFT_TIME_LIMIT``, as datas restantes ficam para a próxima execução.
+    """
+    inicio = date.fromisoformat(start_date)
+    fim = date.fromisoformat(end_date) if end_date else timezone.localdate()
+
+    lock_key = BACKFILL_LOCK_KEY
+    dono = self.request.id or "backfill"
+    redis_client = get_redis_client()
+    if not redis_client.set(lock_key, dono, nx=True, ex=BACKFILL_LOCK_TIMEOUT):
+        logger.warning("Backfill INLABS já em execução. Ignorando execução duplicada.")
+        return {"skipped": True, "reason": "Já existe um backfill em andamento"}
+
+    def ao_processar(_data: date) -> None:
+        renovar_lock(redis_client, lock_key, dono, BACKFILL_LOCK_TIMEOUT)
+
+    try:
+        resultado = backfill_inlabs(
+            inicio, fim, downloads=downloads or DOWNLOADS_SIMULTANEOS, ao_processar=ao_processar
+        )
+        logger.info(
+            "Backfill INLABS finalizado. %s a %s: importadas=%s indisponiveis=%s erros=%s artigos=%s",
+            inicio, fim, resultado.importadas, resultado.indisponiveis, len(resultado.erros), resultado.artigos,
+        )
+        return {"start_date": inicio.isoformat(), "end_date": fim.isoformat(), **asdict(resultado)}
+    except SoftTimeLimitExceeded:
+        logger.warning(
+            "Backfill INLABS de %s a %s interrompido pelo limite de tempo (%ss); "
+            "as datas restantes serão retomadas na próxima execução",
+            inicio, fim, BACKFILL_SOFT_TIME_LIMIT,
+        )
+        raise
+    finally:
+        try:
+            # Só remove o lock se ainda for desta task (pode ter expirado e sido tomado)
+            if redis_client.get(lock_key) == dono:
+                redis_client.delete(lock_key)
+        except Exception as exc:
+            logger.warning("Erro ao remover lock %s: %s", lock_key, exc)
+        connections.close_all()
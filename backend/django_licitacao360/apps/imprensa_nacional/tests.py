@@ -0,0 +1,619 @@
+"""
+Testes do cliente HTTP do INLABS (contra um servidor local), do parser das edições,
+da gravação em lote, do backfill e da busca textual
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from urllib.parse import parse_qs, urlparse
+from unittest.mock import MagicMock, patch
+from zipfile import ZipFile
+
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchHeadline
+from django.db.models import QuerySet
+from django.test import SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from django_licitacao360.pagination import decodificar_cursor
+
+from . import tasks, zip_xml_to_sqlite
+from .management.commands import dedup_inlabs_articles
+from .models import AvisoLicitacao, InlabsArticle, InlabsEdicao
+from .services import backfill, busca, gravacao, inlabs_parser
+from .services.inlabs_downloader import InlabsDownloadConfig
+from .services.inlabs_http import (
+    EdicaoIndisponivel,
+    COOKIE_NAME,
+    EdicaoIndisponivel,
+    InlabsAuthError,
+    InlabsDownloadError,
+    InlabsHttpClient,
+)
+from .views import BuscaTextualFilter, InlabsArticleViewSet
+
+
+def _zip_edicao() -> bytes:
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as archive:
+        for n in range(20):
+            # Conteúdo aleatório para o zip ter vários blocos de download
+            archive.writestr(f"{n:03d}.xml", os.urandom(32 * 1024))
+    return buffer.getvalue()
+
+
+class InlabsStub(BaseHTTPRequestHandler):
+    """Imita o INLABS: ``logar.php`` devolve o cookie; ``index.php`` serve o zip."""
+
+    estado: dict
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        estado = self.server.estado
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        estado["logins"] += 1
+        self.send_response(302)
+        if "password=certa" in corpo:
+            estado["cookie"] = f"sessao-{estado['logins']}"
+            self.send_header("Set-Cookie", f"{COOKIE_NAME}={estado['cookie']}; Path=/")
+        self.send_header("Location", "/index.php")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        estado = self.server.estado
+        estado["ranges"].append(self.headers.get("Range"))
+        if f"{COOKIE_NAME}={estado['cookie']}" not in (self.headers.get("Cookie") or "") or not estado["cookie"]:
+            self._responder(200, b"<html>login</html>", {"Content-Type": "text/html"})
+            return
+        if "404" in self.path:
+            self._responder(404, b"", {})
+            return
+
+        dados = estado["zip"]
+        inicio = 0
+        faixa = self.headers.get("Range")
+        if faixa and estado["aceita_range"]:
+            inicio = int(faixa.split("=")[1].rstrip("-"))
+        enviar = dados[inicio:]
+        if estado["cortar"]:
+            # Anuncia o tamanho completo, mas entrega só metade (conexão interrompida)
+            estado["cortar"] -= 1
+            enviar = enviar[: len(enviar) // 2]
+        headers = {"Content-Type": "application/zip", "Content-Length": str(len(dados) - inicio)}
+        if inicio:
+            headers["Content-Range"] = f"bytes {inicio}-{len(dados) - 1}/{len(dados)}"
+        self._responder(206 if inicio else 200, enviar, headers, fechar=True)
+
+    def _responder(self, status, corpo, headers, fechar=False):
+        self.send_response(status)
+        for nome, valor in headers.items():
+            self.send_header(nome, valor)
+        if "Content-Length" not in headers:
+            self.send_header("Content-Length", str(len(corpo)))
+        if fechar:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class InlabsHttpClientTest(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), InlabsStub)
+        self.server.estado = {
+            "logins": 0,
+            "cookie": None,
+            "ranges": [],
+            "zip": _zip_edicao(),
+            "aceita_range": True,
+            "cortar": 0,
+        }
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.tmp = Path(self.enterContext(TemporaryDirectory()))
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _client(self, password="certa"):
+        client = InlabsHttpClient(
+            "user@mb", password, base_url=self.base_url, cookie_cache=self.tmp / ".cookie.json"
+        )
+        self.addCleanup(client.close)
+        return client
+
+    def _url(self, nome="2025-01-02-DO3.zip"):
+        return f"{self.base_url}/index.php?p=2025-01-02&dl={nome}"
+
+    def test_download_grava_zip_valido(self):
+        destino = self._client().download(self._url(), self.tmp / "edicao.zip", retry_delay=0)
+        self.assertEqual(destino.read_bytes(), self.server.estado["zip"])
+        self.assertFalse((self.tmp / "edicao.zip.part").exists())
+
+    def test_cookie_reaproveitado_entre_execucoes(self):
+        self._client().download(self._url(), self.tmp / "a.zip", retry_delay=0)
+        self._client().download(self._url(), self.tmp / "b.zip", retry_delay=0)
+        self.assertEqual(self.server.estado["logins"], 1)
+
+    def test_sessao_expirada_refaz_login(self):
+        self._client().login()
+        self.server.estado["cookie"] = "outra-sessao"
+        self._client().download(self._url(), self.tmp / "edicao.zip", retry_delay=0)
+        self.assertEqual(self.server.estado["logins"], 2)
+
+    def test_downloads_simultaneos_refazem_login_uma_vez(self):
+        client = self._client()
+        client.login()
+        self.server.estado["cookie"] = "outra-sessao"
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            destinos = list(executor.map(
+                lambda n: client.download(self._url(), self.tmp / f"edicao-{n}.zip", retry_delay=0),
+                range(4),
+            ))
+        self.assertTrue(all(destino.exists() for destino in destinos))
+        self.assertEqual(self.server.estado["logins"], 2)
+        self.assertEqual(client.cookie_atual(), self.server.estado["cookie"])
+
+    def test_credenciais_invalidas(self):
+        with self.assertRaises(InlabsAuthError):
+            self._client(password="errada").login()
+
+    def test_retoma_download_interrompido_com_range(self):
+        self.server.estado["cortar"] = 1
+        destino = self._client().download(self._url(), self.tmp / "edicao.zip", retry_delay=0)
+        self.assertEqual(destino.read_bytes(), self.server.estado["zip"])
+        primeira, retomada = self.server.estado["ranges"]
+        self.assertIsNone(primeira)
+        self.assertRegex(retomada, r"^bytes=[1-9]\d*-$")
+
+    def test_servidor_sem_range_recomeca(self):
+        self.server.estado.update(cortar=1, aceita_range=False)
+        destino = self._client().download(self._url(), self.tmp / "edicao.zip", retry_delay=0)
+        self.assertEqual(destino.read_bytes(), self.server.estado["zip"])
+
+    def test_download_incompleto_esgota_tentativas(self):
+        self.server.estado.update(cortar=10, aceita_range=False)
+        with self.assertRaises(InlabsDownloadError):
+            self._client().download(self._url(), self.tmp / "edicao.zip", max_attempts=2, retry_delay=0)
+        self.assertFalse((self.tmp / "edicao.zip").exists())
+
+    def test_zip_corrompido_rejeitado(self):
+        dados = bytearray(self.server.estado["zip"])
+        dados[100:110] = b"x" * 10
+        self.server.estado["zip"] = bytes(dados)
+        with self.assertRaises(InlabsDownloadError):
+            self._client().download(self._url(), self.tmp / "edicao.zip", max_attempts=1, retry_delay=0)
+        self.assertFalse((self.tmp / "edicao.zip").exists())
+        self.assertFalse((self.tmp / "edicao.zip.part").exists())
+
+    def test_404_vira_edicao_indisponivel(self):
+        with self.assertRaises(EdicaoIndisponivel):
+            self._client().download(self._url("404.zip"), self.tmp / "edicao.zip", retry_delay=0)
+
+
+class BuscaTextualTest(SimpleTestCase):
+    """SQL gerado pela busca por tsvector e pelo filtro ``?search=``"""
+
+    def _sql(self, queryset):
+        return queryset.query.sql_with_params()
+
+    def test_websearch_com_configuracao_sem_acentos(self):
+        termo = 'pregão "material de limpeza" -cancelado'
+        sql, params = self._sql(busca.buscar(InlabsArticle.objects.all(), termo, trecho=False))
+
+        self.assertIn('"inlabs_articles"."search_vector" @@ (websearch_to_tsquery(%s::regconfig, %s))', sql)
+        self.assertIn("ts_rank(", sql)
+        self.assertEqual(params, (busca.CONFIG_BUSCA, termo) * 2)
+
+    def test_ordena_por_relevancia_e_desempata_por_data(self):
+        queryset = busca.buscar(InlabsArticle.objects.all(), "pregão", trecho=False)
+        self.assertEqual(queryset.query.order_by, ("-rank", "-pub_date", "article_id"))
+
+    def test_trecho_marca_termos_no_texto_sem_tags(self):
+        queryset = busca.buscar(InlabsArticle.objects.all(), "pregão")
+        trecho = queryset.query.annotations["trecho"]
+
+        self.assertIsInstance(trecho, SearchHeadline)
+        config, texto, consulta = trecho.source_expressions
+        self.assertEqual(config.config.value, busca.CONFIG_BUSCA)
+        self.assertIsInstance(texto, busca._SemTags)
+        self.assertEqual(consulta.config.config.value, busca.CONFIG_BUSCA)
+        self.assertEqual(trecho.options["StartSel"], "<mark>")
+        self.assertEqual(trecho.options["StopSel"], "</mark>")
+
+    def test_rank_e_double_precision(self):
+        sql, _ = self._sql(busca.buscar(InlabsArticle.objects.all(), "pregão", trecho=False))
+        self.assertIn("))::double precision AS \"rank\"", sql)
+
+    def test_busca_paginada_por_cursor_retoma_do_rank_exato(self):
+        # ts_rank em real (ex.: 0.0607927) lido como float: o cursor precisa casar de novo com ele
+        rank = 0.0607927
+        consultas = []
+
+        def executar(queryset):
+            # O SearchHeadline do trecho só compila com conexão; o WHERE do cursor não depende dele
+            query = queryset.query.clone()
+            del query.annotations["trecho"]
+            query.set_annotation_mask(set(query.annotations))
+            consultas.append(query.sql_with_params())
+            queryset._result_cache = []
+            for pk in (7, 8, 9):
+                artigo = InlabsArticle(id=pk, article_id=f"a{pk}", pub_date="2025-01-02")
+                artigo.rank, artigo.trecho = rank, "<mark>pregão</mark>"
+                queryset._result_cache.append(artigo)
+
+        def listar(**params):
+            request = APIRequestFactory().get("/api/inlabs/", {"search": "pregão", "page_size": 2, "fields": "article_id,pub_date", **params})
+            force_authenticate(request, user=get_user_model()(username="analista"))
+            return InlabsArticleViewSet.as_view({"get": "list"})(request)
+
+        with patch.object(QuerySet, "_fetch_all", autospec=True, side_effect=executar):
+            primeira = listar()
+            proxima = parse_qs(urlparse(primeira.data["next"]).query)
+            segunda = listar(cursor=proxima["cursor"][0])
+
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(decodificar_cursor(proxima["cursor"][0], 4), [rank, "2025-01-02", "a8", 8])
+        sql, params = consultas[-1]
+        self.assertIn(")))::double precision < %s OR", sql)
+        self.assertIn(")))::double precision = %s AND \"inlabs_articles\".\"pub_date\" < %s", sql)
+        self.assertEqual([param for param in params if isinstance(param, float)], [rank] * 4)
+
+    def test_vetor_pondera_titulo_orgao_e_corpo(self):
+        self.assertIn("setweight(to_tsvector('portuguese_unaccent', coalesce(name, '')), 'A')", busca.SQL_VETOR)
+        self.assertIn("coalesce(body_identifica, '')), 'B')", busca.SQL_VETOR)
+        self.assertIn("regexp_replace(coalesce(body_texto, ''), '<[^>]+>', ' ', 'g')), 'C')", busca.SQL_VETOR)
+
+    def test_atualizar_search_vector_filtra_ids_e_pendentes(self):
+        with patch.object(busca, "connection") as connection:
+            connection.ops.quote_name = lambda nome: f'"{nome}"'
+            cursor = connection.cursor.return_value.__enter__.return_value
+            cursor.rowcount = 2
+            self.assertEqual(busca.atualizar_search_vector([], somente_pendentes=True), 0)
+            connection.cursor.assert_not_called()
+            self.assertEqual(busca.atualizar_search_vector(iter([1, 2]), somente_pendentes=True), 2)
+
+        sql, params = cursor.execute.call_args.args
+        self.assertTrue(sql.startswith('UPDATE "inlabs_articles" SET search_vector ='))
+        self.assertTrue(sql.rstrip().endswith("WHERE id = ANY(%s) AND search_vector IS NULL"))
+        self.assertEqual(params, [[1, 2]])
+
+    def _filtrar(self, query_string):
+        request = Request(APIRequestFactory().get(f"/api/inlabs/{query_string}"))
+        queryset = InlabsArticle.objects.order_by("pub_date")
+        return BuscaTextualFilter().filter_queryset(request, queryset, view=None)
+
+    def test_filtro_sem_termo_nao_altera_consulta(self):
+        queryset = self._filtrar("?search=%20%20")
+        self.assertNotIn("rank", queryset.query.annotations)
+        self.assertEqual(queryset.query.order_by, ("pub_date",))
+
+    def test_filtro_ordena_por_relevancia_salvo_ordering_explicito(self):
+        self.assertEqual(self._filtrar("?search=preg%C3%A3o").query.order_by[0], "-rank")
+        self.assertEqual(self._filtrar("?search=preg%C3%A3o&ordering=pub_date").query.order_by, ("pub_date",))
+
+    def test_filtro_por_orgao_usa_upper_like_do_indice_trigram(self):
+        view = InlabsArticleViewSet()
+        view.request = Request(APIRequestFactory().get("/api/inlabs/?nome_om=marinha"))
+        view.format_kwarg = None
+        sql, params = self._sql(view.get_queryset())
+
+        self.assertIn('UPPER("inlabs_articles"."nome_om"::text) LIKE UPPER(%s)', sql)
+        self.assertEqual(params, ("%marinha%",))
+        self.assertNotIn('"search_vector"', sql.split("FROM")[0])
+
+
+def _xml_artigo(indice: int, categoria: str, preambulo: str = "") -> bytes:
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>{preambulo}<xml><article id="{indice}" '
+        f'artCategory="{categoria}" artType="Aviso de Licitação-Pregão" pubDate="02/01/2025">'
+        f"<body><Identifica>PREGÃO ELETRÔNICO Nº {indice}/2025 - UASG 787010</Identifica>"
+        f"<Texto>&lt;p&gt;Nº Processo: 63{indice:04d}. Objeto: Material de consumo.&lt;/p&gt;</Texto>"
+        f"</body></article></xml>"
+    ).encode("utf-8")
+
+
+class InlabsParserTest(SimpleTestCase):
+    """Pré-filtro pelo cabeçalho do XML e parse em lotes"""
+
+    MARINHA = "Ministério da Defesa/Comando da Marinha/Centro de Intendência"
+
+    def test_categoria_no_inicio_do_xml(self):
+        cabecalho = _xml_artigo(1, self.MARINHA)[:inlabs_parser.TAMANHO_CABECALHO]
+        self.assertEqual(inlabs_parser.categoria_artigo(cabecalho), self.MARINHA)
+
+    def test_categoria_com_entidades_e_aspas_simples(self):
+        cabecalho = b"<xml><article artCategory='Minist&#233;rio da Sa&#250;de/FUNASA' id='1'>"
+        self.assertEqual(inlabs_parser.categoria_artigo(cabecalho), "Ministério da Saúde/FUNASA")
+
+    def test_cabecalho_sem_atributo_retorna_none(self):
+        self.assertIsNone(inlabs_parser.categoria_artigo(b'<?xml version="1.0"?><xml><article id="1" art'))
+
+    def _zip(self, destino: Path, artigos) -> Path:
+        caminho = destino / "edicao.zip"
+        with ZipFile(caminho, "w") as archive:
+            for nome, conteudo in artigos:
+                archive.writestr(nome, conteudo)
+        return caminho
+
+    def test_filtro_do_zip_aceita_e_rejeita_pelo_cabecalho(self):
+        # O comentário empurra artCategory para além dos primeiros 4 KB: exige a leitura completa
+        preambulo = "<!--" + "x" * inlabs_parser.TAMANHO_CABECALHO + "-->"
+        artigos = [
+            ("marinha.xml", _xml_artigo(1, self.MARINHA)),
+            ("saude.xml", _xml_artigo(2, "Ministério da Saúde/FUNASA")),
+            ("marinha-longo.xml", _xml_artigo(3, self.MARINHA, preambulo)),
+            ("saude-longo.xml", _xml_artigo(4, "Ministério da Saúde/FUNASA", preambulo)),
+            ("sem-categoria.xml", b"<xml><article id='5'><body/></article></xml>"),
+            ("imagem.jpg", b"\xff\xd8"),
+        ]
+        with TemporaryDirectory() as tmp, ZipFile(self._zip(Path(tmp), artigos)) as archive:
+            selecionados, descartados = inlabs_parser.filtrar_membros_zip(archive, "comando da marinha")
+
+        self.assertEqual(selecionados, ["marinha.xml", "marinha-longo.xml"])
+        self.assertEqual(descartados, 3)
+
+    def test_lotes_em_processos_retornam_o_mesmo_que_o_parse_serial(self):
+        total = 2 * inlabs_parser.MIN_ARTIGOS_PARALELO
+        artigos = [
+            (f"{indice:04d}.xml", _xml_artigo(indice, self.MARINHA if indice % 3 else "Ministério da Saúde"))
+            for indice in range(total)
+        ]
+        artigos.append(("9999.xml", b"<xml><article artCategory='" + self.MARINHA.encode() + b"'><body>"))
+        with TemporaryDirectory() as tmp:
+            caminho = self._zip(Path(tmp), artigos)
+            with ZipFile(caminho) as archive:
+                nomes, _ = inlabs_parser.filtrar_membros_zip(archive, "Marinha")
+                serial = [inlabs_parser.parse_artigo_xml(archive.read(nome), nome) for nome in nomes[:-1]]
+
+            with patch.object(inlabs_parser, "ProcessPoolExecutor", wraps=inlabs_parser.ProcessPoolExecutor) as pool:
+                em_lotes = inlabs_parser.coletar_artigos_zip(caminho, "Marinha", processos=2)
+            pool.assert_called_once_with(max_workers=2)
+            sem_pool = inlabs_parser.coletar_artigos_zip(caminho, "Marinha", processos=1)
+
+        self.assertGreater(len(nomes), inlabs_parser.TAMANHO_LOTE)
+        self.assertEqual(em_lotes, serial)
+        self.assertEqual(sem_pool, serial)
+        self.assertEqual(em_lotes[0]["uasg"], "787010")
+        self.assertEqual(em_lotes[0]["aviso"]["objeto"], "Material de consumo.")
+
+    def test_processo_daemonico_executa_no_proprio_processo(self):
+        tarefas = [[indice] for indice in range(inlabs_parser.MIN_ARTIGOS_PARALELO)]
+        with patch.object(inlabs_parser.multiprocessing, "current_process") as atual, \
+                patch.object(inlabs_parser, "ProcessPoolExecutor") as pool:
+            atual.return_value.daemon = True
+            resultado = inlabs_parser.executar_lotes(list, tarefas, processos=4)
+
+        pool.assert_not_called()
+        self.assertEqual(resultado, list(range(inlabs_parser.MIN_ARTIGOS_PARALELO)))
+
+    def test_script_sqlite_usa_o_parser_do_pacote(self):
+        artigos = [("marinha.xml", _xml_artigo(7, self.MARINHA))]
+        with TemporaryDirectory() as tmp:
+            caminho = self._zip(Path(tmp), artigos)
+            [(dados, aviso, cred)] = zip_xml_to_sqlite._parse_lote((str(caminho), ["marinha.xml"]))
+
+        self.assertIs(zip_xml_to_sqlite.parse_aviso_licitacao, inlabs_parser.parse_aviso_licitacao)
+        self.assertEqual(dados["uasg"], "787010")
+        self.assertEqual(aviso["objeto"], "Material de consumo.")
+        self.assertIsNone(cred)
+
+
+class GravacaoTest(SimpleTestCase):
+    """Linhas de avisos/credenciamentos e vetor de busca dos artigos gravados"""
+
+    def test_detalhe_sem_campos_minimos_e_descartado(self):
+        dados = {"objeto": "Aquisição de material", "uasg": "787010", "modalidade": "", "numero": None}
+
+        linha = gravacao.linha_detalhe(AvisoLicitacao, "art-1", dados, gravacao.CAMPOS_MINIMOS_AVISO)
+
+        self.assertIsNone(linha)
+
+    def test_detalhe_corta_textos_maiores_que_o_campo(self):
+        dados = {"modalidade": "Pregão Eletrônico", "numero": "9" * 100, "ano": "20255", "objeto": "x" * 5000}
+
+        linha = gravacao.linha_detalhe(AvisoLicitacao, "art-1", dados, gravacao.CAMPOS_MINIMOS_AVISO)
+
+        self.assertEqual(linha["article_id"], "art-1")
+        self.assertEqual(linha["modalidade"], "Pregão Eletrônico")
+        self.assertEqual(linha["numero"], "9" * 64)
+        self.assertEqual(linha["ano"], "2025")
+        self.assertEqual(len(linha["objeto"]), 5000)
+        self.assertIsNone(linha["processo"])
+
+    def test_vetor_de_busca_so_dos_artigos_inseridos_ou_alterados(self):
+        def upsert(model, rows, pks, **kwargs):
+            pks.extend([11, 13])
+            return {"inseridas": 1, "atualizadas": 1, "inalteradas": 1, "ignoradas": 0}
+
+        rows = [{"article_id": str(i), "pub_date": "2025-01-10", "materia_id": None, "name": "n" * 300} for i in range(3)]
+        with patch.object(gravacao, "bulk_upsert", side_effect=upsert) as bulk, \
+                patch.object(gravacao, "atualizar_search_vector") as atualizar:
+            stats = gravacao.upsert_artigos(rows)
+
+        atualizar.assert_called_once_with([11, 13])
+        self.assertEqual(gravacao.total_gravado(stats), 3)
+        self.assertEqual(bulk.call_args.kwargs["conflict_fields"], gravacao.CHAVE_ARTIGO)
+        self.assertEqual(len(bulk.call_args.args[1][0]["name"]), 255)
+
+    def test_dedup_conta_sem_apagar_no_dry_run(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (4,)
+        with patch.object(dedup_inlabs_articles, "connection") as conexao, \
+                patch.object(dedup_inlabs_articles, "transaction"):
+            conexao.cursor.return_value.__enter__.return_value = cursor
+            dedup_inlabs_articles.Command(stdout=io.StringIO()).handle(dry_run=True)
+
+        cursor.execute.assert_called_once_with(dedup_inlabs_articles.SQL_CONTAR)
+        self.assertIn("IS NOT DISTINCT FROM", dedup_inlabs_articles.SQL_REMOVER)
+
+
+class BackfillTest(SimpleTestCase):
+    """Situação das edições em InlabsEdicao, retomada e lock do backfill"""
+
+    HOJE = date(2025, 1, 10)
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+
+    def _importar(self, data, zip_path=None, erro=None, artigos=None, falha_persistir=None):
+        config = InlabsDownloadConfig(target_date=data, download_root=self.root)
+        resultado = backfill.ResultadoBackfill()
+        stats = {"saved_articles": 5, "saved_avisos": 2, "saved_credenciamentos": 1}
+        with patch.object(backfill, "registrar_edicao") as registrar, \
+                patch.object(backfill, "collect_marinha_articles", return_value=artigos or []), \
+                patch.object(backfill, "persist_inlabs_articles", return_value=stats, side_effect=falha_persistir):
+            backfill._importar(config, zip_path, erro, self.HOJE, False, resultado)
+        return registrar, resultado
+
+    def test_edicao_passada_inexistente_fica_indisponivel(self):
+        registrar, resultado = self._importar(date(2025, 1, 4), erro=EdicaoIndisponivel("404"))
+
+        registrar.assert_called_once_with(
+            date(2025, 1, 4), "DO3", InlabsEdicao.STATUS_INDISPONIVEL, mensagem="404"
+        )
+        self.assertEqual(resultado.indisponiveis, 1)
+        self.assertEqual(resultado.erros, {})
+
+    def test_edicao_do_dia_ainda_nao_publicada_fica_com_erro(self):
+        registrar, resultado = self._importar(self.HOJE, erro=EdicaoIndisponivel("404"))
+
+        self.assertEqual(registrar.call_args.args[2], InlabsEdicao.STATUS_ERRO)
+        self.assertEqual(resultado.indisponiveis, 0)
+        self.assertIn("2025-01-10", resultado.erros)
+
+    def test_falha_na_gravacao_fica_com_erro_e_mantem_o_zip(self):
+        zip_path = self.root / "edicao.zip"
+        zip_path.write_bytes(b"zip")
+        registrar, resultado = self._importar(
+            date(2025, 1, 6), zip_path=zip_path, falha_persistir=RuntimeError("deadlock")
+        )
+
+        registrar.assert_called_once_with(date(2025, 1, 6), "DO3", InlabsEdicao.STATUS_ERRO, mensagem="deadlock")
+        self.assertEqual(resultado.importadas, 0)
+        self.assertTrue(zip_path.exists())
+
+    def test_limite_de_tempo_da_task_nao_marca_a_edicao_com_erro(self):
+        zip_path = self.root / "edicao.zip"
+        zip_path.write_bytes(b"zip")
+        with self.assertRaises(SoftTimeLimitExceeded):
+            self._importar(date(2025, 1, 6), zip_path=zip_path, falha_persistir=SoftTimeLimitExceeded())
+
+    def test_task_tem_limite_de_tempo_proprio(self):
+        task = tasks.backfill_inlabs_articles
+        self.assertEqual(task.soft_time_limit, tasks.BACKFILL_SOFT_TIME_LIMIT)
+        self.assertGreater(task.time_limit, task.soft_time_limit)
+        self.assertGreater(task.soft_time_limit, settings.CELERY_TASK_SOFT_TIME_LIMIT)
+
+    def test_edicao_gravada_fica_importada_e_o_zip_e_apagado(self):
+        zip_path = self.root / "edicao.zip"
+        zip_path.write_bytes(b"zip")
+        registrar, resultado = self._importar(date(2025, 1, 6), zip_path=zip_path)
+
+        registrar.assert_called_once_with(date(2025, 1, 6), "DO3", InlabsEdicao.STATUS_IMPORTADA, artigos=5)
+        self.assertEqual((resultado.importadas, resultado.artigos, resultado.avisos), (1, 5, 2))
+        self.assertFalse(zip_path.exists())
+
+    def test_registrar_edicao_grava_situacao_e_conta_tentativa(self):
+        with patch.object(InlabsEdicao.objects, "update_or_create") as gravar, \
+                patch.object(InlabsEdicao.objects, "filter") as filtro:
+            backfill.registrar_edicao(date(2025, 1, 6), "DO3", InlabsEdicao.STATUS_ERRO, mensagem="timeout")
+
+        gravar.assert_called_once_with(
+            data=date(2025, 1, 6),
+            secao="DO3",
+            defaults={"status": InlabsEdicao.STATUS_ERRO, "artigos": 0, "mensagem": "timeout"},
+        )
+        filtro.assert_called_once_with(data=date(2025, 1, 6), secao="DO3")
+        self.assertEqual(list(filtro.return_value.update.call_args.kwargs), ["tentativas"])
+
+    def test_retomada_pula_datas_com_artigos_importadas_e_indisponiveis(self):
+        datas = backfill.intervalo_datas(date(2025, 1, 1), date(2025, 1, 5))
+        artigos = MagicMock()
+        artigos.values_list.return_value.distinct.return_value = ["2025-01-01"]
+        edicoes = MagicMock()
+        edicoes.values_list.return_value = [date(2025, 1, 2), date(2025, 1, 4)]
+        with patch.object(InlabsArticle.objects, "filter", return_value=artigos), \
+                patch.object(InlabsEdicao.objects, "filter", return_value=edicoes) as filtro_edicoes:
+            pendentes = backfill.datas_pendentes(datas)
+
+        # 03/01 (com erro na execução anterior) e 05/01 são pedidas de novo
+        self.assertEqual(pendentes, [date(2025, 1, 3), date(2025, 1, 5)])
+        self.assertEqual(
+            filtro_edicoes.call_args.kwargs["status__in"],
+            [InlabsEdicao.STATUS_IMPORTADA, InlabsEdicao.STATUS_INDISPONIVEL],
+        )
+
+    def test_backfill_processa_so_pendentes_e_avisa_cada_edicao(self):
+        pendentes = [date(2025, 1, 3), date(2025, 1, 5)]
+        processadas = []
+        with patch.object(backfill, "datas_pendentes", return_value=pendentes), \
+                patch.object(backfill, "http_client") as client, \
+                patch.object(backfill, "baixar_edicao", side_effect=lambda _c, config: self.root / config.zip_filename), \
+                patch.object(backfill, "_importar") as importar:
+            resultado = backfill.backfill_inlabs(
+                date(2025, 1, 1), date(2025, 1, 5), downloads=4,
+                download_root=self.root, ao_processar=processadas.append,
+            )
+
+        self.assertEqual(resultado.puladas, 3)
+        self.assertEqual(sorted(chamada.args[0].target_date for chamada in importar.call_args_list), pendentes)
+        self.assertEqual(sorted(processadas), pendentes)
+        client.assert_called_once_with(self.root, pool_size=2)
+        client.return_value.close.assert_called_once()
+
+    def _task_backfill(self, redis_client, datas):
+        def backfill_falso(inicio, fim, downloads, ao_processar):
+            for data in datas:
+                ao_processar(data)
+            return backfill.ResultadoBackfill(importadas=len(datas))
+
+        with patch.object(tasks, "get_redis_client", return_value=redis_client), \
+                patch.object(tasks, "backfill_inlabs", side_effect=backfill_falso), \
+                patch.object(tasks.connections, "close_all"):
+            return tasks.backfill_inlabs_articles.apply(
+                args=("2025-01-01", "2025-01-03"), task_id="task-backfill"
+            ).get()
+
+    def test_lock_do_backfill_e_renovado_a_cada_edicao(self):
+        redis_client = MagicMock()
+        redis_client.set.return_value = True
+        redis_client.get.return_value = "task-backfill"
+        resultado = self._task_backfill(redis_client, [date(2025, 1, 1), date(2025, 1, 2)])
+
+        self.assertEqual(resultado["importadas"], 2)
+        redis_client.set.assert_called_once_with(
+            tasks.BACKFILL_LOCK_KEY, "task-backfill", nx=True, ex=tasks.BACKFILL_LOCK_TIMEOUT
+        )
+        self.assertEqual(redis_client.expire.call_count, 2)
+        redis_client.expire.assert_called_with(tasks.BACKFILL_LOCK_KEY, tasks.BACKFILL_LOCK_TIMEOUT)
+        redis_client.delete.assert_called_once_with(tasks.BACKFILL_LOCK_KEY)
+
+    def test_lock_tomado_por_outro_backfill_nao_e_renovado_nem_removido(self):
+        redis_client = MagicMock()
+        redis_client.set.return_value = True
+        redis_client.get.return_value = "outro-backfill"
+        self._task_backfill(redis_client, [date(2025, 1, 1)])
+
+        redis_client.expire.assert_not_called()
+        redis_client.delete.assert_not_called()
+
+    def test_backfill_em_andamento_e_ignorado(self):
+        redis_client = MagicMock()
+        redis_client.set.return_value = False
+        resultado = self._task_backfill(redis_client, [])
+
+        self.assertTrue(resultado["skipped"])
+        redis_client.delete.assert_not_called()
@@ -1,7 +1,10 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters
 
+from django_licitacao360.pagination import KeysetListMixin
+
 from .models import InlabsArticle, AvisoLicitacao, Credenciamento
+from .services.busca import buscar
 from .serializers import (
     InlabsArticleSerializer,
     AvisoLicitacaoSerializer,
@@ -9,12 +12,33 @@ from .serializers import (
 )
 
 
-class InlabsArticleViewSet(viewsets.ReadOnlyModelViewSet):
+class BuscaTextualFilter(filters.BaseFilterBackend):
+    """
+    ``?search=`` sobre o ``search_vector`` (GIN) em vez de ``icontains`` nos textos.
+    Ordena por relevância, exceto quando ``?ordering=`` é informado; fica depois do
+    OrderingFilter para não ter a ordenação sobrescrita pela padrão.
+    """
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        termo = request.query_params.get(self.search_param, "").strip()
+        if not termo:
+            return queryset
+        ordenacao = queryset.query.order_by
+        queryset = buscar(queryset, termo)
+        if request.query_params.get("ordering"):
+            queryset = queryset.order_by(*ordenacao)
+        return queryset
+
+
+class InlabsArticleViewSet(KeysetListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet para artigos INLABS."""
 
-    queryset = InlabsArticle.objects.all().order_by("-pub_date", "article_id")
+    # search_vector só é usado no WHERE da busca; não precisa vir no SELECT
+    queryset = InlabsArticle.objects.defer("search_vector").order_by("-pub_date", "article_id")
     serializer_class = InlabsArticleSerializer
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, BuscaTextualFilter)
     filterset_fields = [
         # pub_date removido - será filtrado manualmente no get_queryset para aceitar múltiplos formatos
         "article_id",
@@ -24,12 +48,6 @@ class InlabsArticleViewSet(viewsets.ReadOnlyModelViewSet):
         "nome_om",
         "materia_id",
     ]
-    search_fields = [
-        "name",
-        "nome_om",
-        "body_identifica",
-        "body_texto",
-    ]
     ordering_fields = [
         "pub_date",
         "article_id",
@@ -72,6 +90,13 @@ class InlabsArticleViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """Com ``?cursor=``/``?page_size=`` pagina por cursor (sem COUNT); senão, por página."""
+        if not self.keyset_pagination_class().solicitada(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.listar(queryset, queryset.query.order_by or self.ordering)
+
 
 class AvisoLicitacaoViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para avisos de licitação."""
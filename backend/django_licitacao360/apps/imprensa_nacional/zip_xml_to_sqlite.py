@@ -1,44 +1,40 @@
 from __future__ import annotations
 
 import argparse
-import html
 import re
 import sqlite3
+import sys
 import zipfile
 from pathlib import Path
 import xml.etree.ElementTree as ET
 
+try:
+    from django_licitacao360.apps.imprensa_nacional.services.inlabs_parser import (
+        AVISO_ART_TYPES,
+        UASG_PATTERN,
+        em_lotes,
+        executar_lotes,
+        filtrar_membros_zip,
+        parse_aviso_licitacao,
+        parse_credenciamento,
+    )
+except ImportError:
+    # Executado como script (python zip_xml_to_sqlite.py), fora do pacote do projeto
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from services.inlabs_parser import (
+        AVISO_ART_TYPES,
+        UASG_PATTERN,
+        em_lotes,
+        executar_lotes,
+        filtrar_membros_zip,
+        parse_aviso_licitacao,
+        parse_credenciamento,
+    )
+
 DOWNLOADS_DIR = Path(__file__).resolve().parent / "downloads"
 DEFAULT_DB = Path(__file__).resolve().parent / "inlabs_articles.sqlite3"
 ZIP_PATTERN = re.compile(r"^S03\d{2}\d{4}\.zip$")
 DEFAULT_KEYWORD = "Comando da Marinha"
-UASG_PATTERN = re.compile(r"\bUASG\s*(\d+)\b", re.IGNORECASE)
-AVISO_ART_TYPES = {"Aviso de Licitação-Pregão", "Aviso de Licitação", "Aviso de Licitação-Concorrência"}
-AVISO_IDENT_PATTERN = re.compile(
-    r"^(?P<modalidade>.+?)\s+N[ºo]\s*(?P<numero>\d+)/(?:\s*)?(?P<ano>\d{4})\s*-\s*UASG\s*(?P<uasg>\d+)",
-    re.IGNORECASE,
-)
-CRED_IDENT_PATTERN = re.compile(
-    r"^(?P<tipo>.+?)\s+N[ºo]\s*(?P<numero>\d+)/(?:\s*)?(?P<ano>\d{4})\s*-\s*UASG\s*(?P<uasg>\d+)",
-    re.IGNORECASE,
-)
-CRED_PROCES_PATTERN = re.compile(
-    r"^Nº Processo:\s*(?P<processo>.+)$",
-    re.IGNORECASE,
-)
-CRED_CONTRATANTE_PATTERN = re.compile(
-    r"^(?P<tipo_processo>[^.]+?)\s+N[ºo]\s*(?P<numero_processo>\d+)/(?:\s*)?(?P<ano_processo>\d{4})\.\s*Contratante:\s*(?P<contratante>.+?)\.$",
-    re.IGNORECASE,
-)
-CRED_CONTRATADO_PATTERN = re.compile(
-    r"^Contratado:\s*(?P<contratado>.+?)\.\s*Objeto:\s*(?P<objeto>.+?)\.$",
-    re.IGNORECASE,
-)
-CRED_FUNDAMENTO_PATTERN = re.compile(
-    r"^Fundamento Legal:\s*(?P<fundamento_legal>.+?)\.\s*Vigência:\s*(?P<vigencia>.+?)\.\s*Valor Total:\s*(?P<valor_total>.+?)\.\s*Data de Assinatura:\s*(?P<data_assinatura>.+?)\.$",
-    re.IGNORECASE,
-)
-CRED_ASSINA_PATTERN = re.compile(r"^(?P<nome>.+?)\s*\((?P<cargo>[^)]+)\)$")
 
 
 def create_schema(conn: sqlite3.Connection) -> None:
@@ -181,189 +177,6 @@ def parse_article(xml_bytes: bytes) -> dict[str, str | None]:
     }
 
 
-def extract_paragraphs(body_html: str | None) -> list[tuple[str | None, str]]:
-    if not body_html:
-        return []
-    paragraphs = re.findall(r"<p(?:\s+class=\"([^\"]*)\")?>(.*?)</p>", body_html, re.DOTALL | re.IGNORECASE)
-    results: list[tuple[str | None, str]] = []
-    for class_name, content in paragraphs:
-        text = re.sub(r"<[^>]+>", "", content)
-        text = html.unescape(text).strip()
-        results.append((class_name, text))
-    return results
-
-
-def extract_labeled_fields(text: str) -> dict[str, str]:
-    labels = [
-        "Nº Processo",
-        "Objeto",
-        "Total de Itens Licitados",
-        "Edital",
-        "Endereço",
-        "Entrega das Propostas",
-        "Abertura das Propostas",
-        "Informações Gerais",
-    ]
-    pattern = re.compile(
-        r"(Nº Processo|Objeto|Total de Itens Licitados|Edital|Endereço|Entrega das Propostas|Abertura das Propostas|Informações Gerais):",
-        re.IGNORECASE,
-    )
-    matches = list(pattern.finditer(text))
-    results: dict[str, str] = {}
-    for idx, match in enumerate(matches):
-        label = match.group(1)
-        start = match.end()
-        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
-        value = text[start:end].strip()
-        results[label] = value
-    return results
-
-
-def parse_aviso_licitacao(body_html: str | None) -> dict[str, str | None]:
-    data: dict[str, str | None] = {
-        "modalidade": None,
-        "numero": None,
-        "ano": None,
-        "uasg": None,
-        "processo": None,
-        "objeto": None,
-        "itens_licitados": None,
-        "publicacao": None,
-        "entrega_propostas": None,
-        "abertura_propostas": None,
-        "nome_responsavel": None,
-        "cargo": None,
-    }
-
-    paragraphs = extract_paragraphs(body_html)
-    if not paragraphs:
-        return data
-
-    identifica_text = None
-    info_texts: list[str] = []
-    for class_name, text in paragraphs:
-        class_name_lower = (class_name or "").lower()
-        if class_name_lower == "identifica":
-            if AVISO_IDENT_PATTERN.search(text):
-                identifica_text = text
-        elif class_name_lower == "assina":
-            data["nome_responsavel"] = text
-        elif class_name_lower == "cargo":
-            data["cargo"] = text
-        else:
-            if "siasgnet" not in text.lower():
-                info_texts.append(text)
-
-    if identifica_text:
-        match = AVISO_IDENT_PATTERN.search(identifica_text)
-        if match:
-            data.update(match.groupdict())
-
-    if info_texts:
-        joined = " ".join(info_texts)
-        fields = extract_labeled_fields(joined)
-        data["processo"] = fields.get("Nº Processo")
-        data["objeto"] = fields.get("Objeto")
-        itens_raw = fields.get("Total de Itens Licitados")
-        if itens_raw:
-            data["itens_licitados"] = itens_raw.rstrip(".")
-        publicacao_raw = fields.get("Edital")
-        if publicacao_raw:
-            data["publicacao"] = publicacao_raw.split()[0]
-
-        entrega_raw = fields.get("Entrega das Propostas")
-        if entrega_raw:
-            match = re.search(r"\d{2}/\d{2}/\d{4}", entrega_raw)
-            data["entrega_propostas"] = match.group(0) if match else None
-        abertura_raw = fields.get("Abertura das Propostas")
-        if abertura_raw:
-            match = re.search(
-                r"\d{2}/\d{2}/\d{4}\s+às\s+\d{2}h\d{2}\s+no\s+site\s+www\.gov\.br/compras\.?",
-                abertura_raw,
-                re.IGNORECASE,
-            )
-            if match:
-                data["abertura_propostas"] = match.group(0)
-            else:
-                match = re.search(r"\d{2}/\d{2}/\d{4}", abertura_raw)
-                data["abertura_propostas"] = match.group(0) if match else None
-        data.pop("informacoes_gerais", None)
-
-    return data
-
-
-def parse_credenciamento(body_html: str | None) -> dict[str, str | None]:
-    data: dict[str, str | None] = {
-        "tipo": None,
-        "numero": None,
-        "ano": None,
-        "uasg": None,
-        "processo": None,
-        "tipo_processo": None,
-        "numero_processo": None,
-        "ano_processo": None,
-        "contratante": None,
-        "contratado": None,
-        "objeto": None,
-        "fundamento_legal": None,
-        "vigencia": None,
-        "valor_total": None,
-        "data_assinatura": None,
-        "nome_responsavel": None,
-        "cargo": None,
-    }
-
-    paragraphs = extract_paragraphs(body_html)
-    if not paragraphs:
-        return data
-
-    identifica_text = None
-    for class_name, text in paragraphs:
-        class_name_lower = (class_name or "").lower()
-        if class_name_lower == "identifica":
-            if CRED_IDENT_PATTERN.search(text):
-                identifica_text = text
-        elif class_name_lower == "assina":
-            data["nome_responsavel"] = text
-        elif class_name_lower == "cargo":
-            data["cargo"] = text
-        else:
-            if "comprasnet" in text.lower():
-                continue
-
-            match = CRED_PROCES_PATTERN.match(text)
-            if match:
-                data["processo"] = match.group("processo").strip().rstrip(".")
-                continue
-
-            match = CRED_CONTRATANTE_PATTERN.match(text)
-            if match:
-                data.update(match.groupdict())
-                continue
-
-            match = CRED_CONTRATADO_PATTERN.match(text)
-            if match:
-                data.update(match.groupdict())
-                continue
-
-            match = CRED_FUNDAMENTO_PATTERN.match(text)
-            if match:
-                data.update(match.groupdict())
-                continue
-
-            match = CRED_ASSINA_PATTERN.match(text)
-            if match:
-                data["nome_responsavel"] = match.group("nome")
-                data["cargo"] = match.group("cargo")
-
-    if identifica_text:
-        match = CRED_IDENT_PATTERN.search(identifica_text)
-        if match:
-            data.update(match.groupdict())
-
-    return data
-
-
 def insert_article(cursor: sqlite3.Cursor, data: dict[str, str | None]) -> None:
     cursor.execute(
         """
@@ -476,48 +289,57 @@ def iter_zip_files(only_zip: str | None) -> list[Path]:
     )
 
 
-def process_zip(conn: sqlite3.Connection, zip_path: Path, keyword: str) -> None:
+def _parse_lote(tarefa: tuple[str, list[str]]) -> list[tuple[dict, dict | None, dict | None]]:
+    """Parse de um lote de membros do zip; executado nos processos de trabalho."""
+    zip_path, nomes = tarefa
+    resultados = []
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for name in nomes:
+            try:
+                data = parse_article(zf.read(name))
+            except Exception:
+                continue
+            art_type = data.get("art_type")
+            aviso = None
+            cred = None
+            if art_type in AVISO_ART_TYPES:
+                aviso = parse_aviso_licitacao(data.get("body_texto"))
+                if not data.get("uasg") and aviso.get("uasg"):
+                    data["uasg"] = aviso.get("uasg")
+
+            if art_type and "credenciamento" in art_type.lower():
+                cred = parse_credenciamento(data.get("body_texto"))
+                if not data.get("uasg") and cred.get("uasg"):
+                    data["uasg"] = cred.get("uasg")
+            resultados.append((data, aviso, cred))
+    return resultados
+
+
+def process_zip(
+    conn: sqlite3.Connection, zip_path: Path, keyword: str, processos: int | None = None
+) -> None:
     cursor = conn.cursor()
     inserted = 0
-    skipped = 0
 
+    # Só os membros da categoria (pelo cabeçalho do XML) são lidos por inteiro
     with zipfile.ZipFile(zip_path, "r") as zf:
-        for name in zf.namelist():
-            if not name.lower().endswith(".xml"):
-                continue
-            try:
-                xml_bytes = zf.read(name)
-                data = parse_article(xml_bytes)
-                art_category = (data.get("art_category") or "").lower()
-                if keyword.lower() not in art_category:
-                    skipped += 1
-                    continue
-                art_type = data.get("art_type")
-                aviso = None
-                cred = None
-                if art_type in AVISO_ART_TYPES:
-                    aviso = parse_aviso_licitacao(data.get("body_texto"))
-                    if not data.get("uasg") and aviso.get("uasg"):
-                        data["uasg"] = aviso.get("uasg")
-
-                if art_type and "credenciamento" in art_type.lower():
-                    cred = parse_credenciamento(data.get("body_texto"))
-                    if not data.get("uasg") and cred.get("uasg"):
-                        data["uasg"] = cred.get("uasg")
-
-                insert_article(cursor, data)
-
-                if aviso is not None:
-                    article_id = data.get("article_id")
-                    if article_id:
-                        insert_aviso(cursor, article_id, aviso)
-                if cred is not None:
-                    article_id = data.get("article_id")
-                    if article_id:
-                        insert_credenciamento(cursor, article_id, cred)
-                inserted += 1
-            except Exception:
-                skipped += 1
+        nomes, skipped = filtrar_membros_zip(zf, keyword)
+    tarefas = [(str(zip_path), list(lote)) for lote in em_lotes(nomes)]
+    resultados = executar_lotes(_parse_lote, tarefas, processos, total_itens=len(nomes))
+    skipped += len(nomes) - len(resultados)
+
+    for data, aviso, cred in resultados:
+        try:
+            insert_article(cursor, data)
+
+            article_id = data.get("article_id")
+            if aviso is not None and article_id:
+                insert_aviso(cursor, article_id, aviso)
+            if cred is not None and article_id:
+                insert_credenciamento(cursor, article_id, cred)
+            inserted += 1
+        except Exception:
+            skipped += 1
 
     conn.commit()
     print(f"{zip_path.name}: inseridos={inserted} ignorados={skipped}")
@@ -548,6 +370,12 @@ def main() -> None:
         action="store_true",
         help="Processa todos os zips S03{MM}{YYYY}.zip na pasta downloads.",
     )
+    parser.add_argument(
+        "--processos",
+        type=int,
+        default=None,
+        help="Processos para o parsing dos XMLs (padrão: um por CPU).",
+    )
 
     args = parser.parse_args()
 
@@ -565,7 +393,7 @@ def main() -> None:
         return
 
     for zip_path in zip_files:
-        process_zip(conn, zip_path, args.keyword)
+        process_zip(conn, zip_path, args.keyword, args.processos)
 
     conn.close()
 
@@ -1,5 +1,16 @@
 from django.contrib import admin
-from .models import AmparoLegal, Compra, ItemCompra, Modalidade, ModoDisputa, ResultadoItem, Fornecedor
+from .models import (
+    AmparoLegal,
+    Compra,
+    EstadoSincronizacao,
+    ItemCompra,
+    Modalidade,
+    ModoDisputa,
+    ResultadoItem,
+    Fornecedor,
+    ResumoCompraUnidade,
+    ResumoFornecedorUnidade,
+)
 
 
 @admin.register(AmparoLegal)
@@ -111,3 +122,48 @@ class ResultadoItemAdmin(admin.ModelAdmin):
         return "-"
     item_compra_info.short_description = "Compra/Item"
     item_compra_info.admin_order_field = "item_compra__compra__ano_compra"
+
+
+@admin.register(EstadoSincronizacao)
+class EstadoSincronizacaoAdmin(admin.ModelAdmin):
+    list_display = (
+        "cnpj",
+        "etapa",
+        "modalidade",
+        "janela_inicio",
+        "janela_fim",
+        "max_data_atualizacao",
+        "atualizado_em",
+    )
+    list_filter = ("etapa", "modalidade")
+    search_fields = ("cnpj",)
+    readonly_fields = ("atualizado_em",)
+
+
+@admin.register(ResumoCompraUnidade)
+class ResumoCompraUnidadeAdmin(admin.ModelAdmin):
+    list_display = (
+        "codigo_unidade",
+        "ano_compra",
+        "modalidade",
+        "quantidade_compras",
+        "valor_total_estimado",
+        "valor_total_homologado",
+        "atualizado_em",
+    )
+    list_filter = ("ano_compra", "modalidade")
+    search_fields = ("codigo_unidade",)
+    readonly_fields = ("atualizado_em",)
+
+
+@admin.register(ResumoFornecedorUnidade)
+class ResumoFornecedorUnidadeAdmin(admin.ModelAdmin):
+    list_display = (
+        "codigo_unidade",
+        "fornecedor",
+        "quantidade_resultados",
+        "valor_total_homologado",
+        "atualizado_em",
+    )
+    search_fields = ("codigo_unidade", "fornecedor__cnpj_fornecedor", "fornecedor__razao_social")
+    readonly_fields = ("atualizado_em",)
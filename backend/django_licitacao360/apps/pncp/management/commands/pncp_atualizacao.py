@@ -0,0 +1,127 @@
+"""
+Management command para executar a sincronização do PNCP (compras, itens e resultados)
+de forma síncrona, usando o mesmo estado incremental das tasks do Celery.
+
+Uso:
+    python manage.py pncp_atualizacao
+    python manage.py pncp_atualizacao --etapas itens resultados --modalidades 6,8
+    python manage.py pncp_atualizacao --full   # reprocessa a janela padrão (reparo)
+    python manage.py pncp_atualizacao --paralelo --cnpj 00394502000144,00394452000138
+    python manage.py pncp_atualizacao --paralelo --data-inicial 2025-01-01 --data-final 2025-03-31
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...tasks import (
+    DEFAULT_MODALIDADES,
+    task_atualizacao_compras_pncp,
+    task_atualizacao_itens_pncp,
+    task_atualizacao_resultados_pncp,
+    task_atualizacao_seq_pncp,
+    task_orquestrar_pncp,
+)
+
+ETAPAS = {
+    "publicacoes": task_atualizacao_seq_pncp,
+    "compras": task_atualizacao_compras_pncp,
+    "itens": task_atualizacao_itens_pncp,
+    "resultados": task_atualizacao_resultados_pncp,
+}
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza compras, itens e resultados do PNCP (incremental por padrão)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--etapas',
+            nargs='+',
+            choices=list(ETAPAS.keys()),
+            default=["publicacoes", "itens", "resultados"],
+            help='Etapas a executar, na ordem informada (padrão: publicacoes itens resultados)',
+        )
+        parser.add_argument(
+            '--cnpj',
+            type=str,
+            default=None,
+            help='CNPJ do órgão (padrão: PNCP_CNPJ ou DEFAULT_CNPJ)',
+        )
+        parser.add_argument(
+            '--modalidades',
+            type=str,
+            default=None,
+            help='Códigos de modalidade separados por vírgula (padrão: todas)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignora o estado incremental e reprocessa a janela padrão de 10 dias',
+        )
+        parser.add_argument(
+            '--paralelo',
+            action='store_true',
+            help='Dispara o orquestrador no Celery: shards (cnpj × modalidade × período) em paralelo',
+        )
+        parser.add_argument(
+            '--data-inicial',
+            type=str,
+            default=None,
+            help='Com --paralelo: início do período (YYYY-MM-DD); sem período usa o estado incremental',
+        )
+        parser.add_argument(
+            '--data-final',
+            type=str,
+            default=None,
+            help='Com --paralelo: fim do período (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--dias-por-shard',
+            type=int,
+            default=None,
+            help='Com --paralelo: dias do período de cada shard (padrão: PNCP_SHARD_DIAS ou 5)',
+        )
+    
+    def _parse_modalidades(self, value):
+        if not value:
+            return None
+        try:
+            modalidades = [int(m.strip()) for m in value.split(",") if m.strip()]
+        except ValueError:
+            raise CommandError(f'Modalidades inválidas: {value}')
+        invalidas = [m for m in modalidades if m not in DEFAULT_MODALIDADES]
+        if invalidas:
+            raise CommandError(f'Modalidades desconhecidas: {invalidas}')
+        return modalidades
+    
+    def handle(self, *args, **options):
+        modalidades = self._parse_modalidades(options['modalidades'])
+        if options['paralelo']:
+            self._disparar_orquestrador(modalidades, options)
+            return
+        modo = 'completo (--full)' if options['full'] else 'incremental'
+        self.stdout.write(f'Sincronização PNCP - modo {modo}')
+        
+        for etapa in options['etapas']:
+            self.stdout.write(f'Executando etapa "{etapa}"...')
+            totals = ETAPAS[etapa](
+                cnpj=options['cnpj'],
+                modalidades=modalidades,
+                full=options['full'],
+            )
+            self.stdout.write(self.style.SUCCESS(f'Etapa "{etapa}" concluída: {totals}'))
+    
+    def _disparar_orquestrador(self, modalidades, options):
+        if bool(options['data_inicial']) != bool(options['data_final']):
+            raise CommandError('Informe --data-inicial e --data-final juntas')
+        cnpjs = [c.strip() for c in options['cnpj'].split(",") if c.strip()] if options['cnpj'] else None
+        kwargs = {
+            'cnpjs': cnpjs,
+            'modalidades': modalidades,
+            'data_inicial': options['data_inicial'],
+            'data_final': options['data_final'],
+            'full': options['full'],
+        }
+        if options['dias_por_shard']:
+            kwargs['dias_por_shard'] = options['dias_por_shard']
+        resultado = task_orquestrar_pncp.delay(**kwargs)
+        self.stdout.write(self.style.SUCCESS(f'Orquestrador disparado no Celery (task_id={resultado.id})'))
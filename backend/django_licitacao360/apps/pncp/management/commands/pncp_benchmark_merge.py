@@ -0,0 +1,149 @@
+"""
+Management command para medir o merge itens/resultados.
+
+Compara o caminho antigo (lista de compra_ids + prefetch + laço em Python com Decimal)
+com ``ItemCompra.objects.merge_resultados`` (uma consulta com ROW_NUMBER). Os dados
+sintéticos são gravados dentro de uma transação desfeita ao final, então o comando
+pode ser rodado em qualquer banco.
+
+Uso:
+    python manage.py pncp_benchmark_merge
+    python manage.py pncp_benchmark_merge --itens 10000,100000 --repeticoes 3
+"""
+
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ...models import Compra, Fornecedor, ItemCompra, ResultadoItem
+
+UNIDADE_BENCHMARK = "BENCH-MERGE"
+ITENS_POR_COMPRA = 50
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _merge_legado(codigo_unidade):
+    """Caminho anterior a merge_resultados, mantido aqui apenas para comparação."""
+    compra_ids = list(Compra.objects.filter(codigo_unidade=codigo_unidade).values_list('compra_id', flat=True))
+    itens = ItemCompra.objects.filter(
+        compra_id__in=compra_ids
+    ).select_related('compra').prefetch_related('resultados__fornecedor')
+
+    result_data = []
+    for item in itens:
+        resultado = item.resultados.first()
+        percentual_desconto = None
+        if item.valor_total_estimado and resultado and resultado.valor_total_homologado:
+            if item.valor_total_estimado > 0:
+                percentual_desconto = (
+                    (item.valor_total_estimado - resultado.valor_total_homologado)
+                    / item.valor_total_estimado
+                ) * 100
+        result_data.append({
+            'ano_compra': item.compra.ano_compra,
+            'sequencial_compra': item.compra.sequencial_compra,
+            'numero_item': item.numero_item,
+            'cnpj_fornecedor': resultado.fornecedor.cnpj_fornecedor if resultado else None,
+            'valor_total_homologado': resultado.valor_total_homologado if resultado else None,
+            'percentual_desconto': percentual_desconto,
+        })
+    return result_data
+
+
+def _merge_sql(codigo_unidade):
+    return list(ItemCompra.objects.merge_resultados(codigo_unidade))
+
+
+class Command(BaseCommand):
+    help = 'Compara o merge itens/resultados antigo (Python) com a consulta única merge_resultados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--itens',
+            type=str,
+            default='10000,100000',
+            help='Quantidades de itens sintéticos separadas por vírgula (padrão: 10000,100000)',
+        )
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=3,
+            help='Execuções por caminho; reporta a melhor (padrão: 3)',
+        )
+
+    def handle(self, *args, **options):
+        tamanhos = [int(n) for n in options['itens'].split(',') if n.strip()]
+        repeticoes = max(1, options['repeticoes'])
+
+        for total in tamanhos:
+            try:
+                with transaction.atomic():
+                    self._popular(total)
+                    legado = self._medir(_merge_legado, repeticoes)
+                    sql = self._medir(_merge_sql, repeticoes)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+            self.stdout.write(self.style.SUCCESS(f'📊 {total} itens'))
+            self.stdout.write(f"  Python (legado): {legado[0]:.3f}s, {legado[1]} linhas")
+            self.stdout.write(f"  merge_resultados: {sql[0]:.3f}s, {sql[1]} linhas")
+            if sql[0] > 0:
+                self.stdout.write(f"  Ganho: {legado[0] / sql[0]:.1f}x")
+
+    def _medir(self, funcao, repeticoes):
+        melhor = None
+        linhas = 0
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            linhas = len(funcao(UNIDADE_BENCHMARK))
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return melhor, linhas
+
+    def _popular(self, total):
+        """Compras de ITENS_POR_COMPRA itens; dois resultados por item par, nenhum nos ímpares."""
+        fornecedores = [
+            Fornecedor(cnpj_fornecedor=f"BENCH{n:014d}", razao_social=f"Fornecedor {n}")
+            for n in range(10)
+        ]
+        Fornecedor.objects.bulk_create(fornecedores, ignore_conflicts=True)
+
+        compras, itens, resultados = [], [], []
+        for n in range(total):
+            seq, numero = divmod(n, ITENS_POR_COMPRA)
+            compra_id = f"{UNIDADE_BENCHMARK}-{seq}"
+            if numero == 0:
+                compras.append(Compra(
+                    compra_id=compra_id, ano_compra=2025, sequencial_compra=seq,
+                    numero_compra=str(seq), codigo_unidade=UNIDADE_BENCHMARK,
+                    objeto_compra="benchmark", numero_processo=str(seq),
+                ))
+            item_id = f"{compra_id}-{numero}"
+            itens.append(ItemCompra(
+                item_id=item_id, compra_id=compra_id, numero_item=numero + 1,
+                descricao="item", unidade_medida="UN", valor_unitario_estimado=Decimal("10"),
+                valor_total_estimado=Decimal("100"), quantidade=Decimal("10"),
+                situacao_compra_item_nome="Homologado", tem_resultado=numero % 2 == 0,
+            ))
+            if numero % 2 == 0:
+                for r in range(2):
+                    resultados.append(ResultadoItem(
+                        resultado_id=f"{item_id}-{r}", item_compra_id=item_id,
+                        fornecedor=fornecedores[(n + r) % len(fornecedores)],
+                        valor_total_homologado=Decimal("80") + r, quantidade_homologada=10,
+                        valor_unitario_homologado=Decimal("8"), status="Informado",
+                    ))
+
+        lote = 5000
+        Compra.objects.bulk_create(compras, batch_size=lote)
+        ItemCompra.objects.bulk_create(itens, batch_size=lote)
+        ResultadoItem.objects.bulk_create(resultados, batch_size=lote)
+        with connection.cursor() as cursor:
+            for model in (Compra, ItemCompra, ResultadoItem):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
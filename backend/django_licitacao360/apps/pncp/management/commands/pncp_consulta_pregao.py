@@ -5,17 +5,16 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import os
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-import aiohttp
 from django.db import transaction
 from django.db.models import Q
 
 from ...models import AmparoLegal, Compra, Modalidade, ModoDisputa
+from ...services.client import PNCP_CONSULTA_BASE, PncpClient, PncpRequestError
 
 
 def _dedup(rows: Iterable[Tuple], key_fn: Callable[[Tuple], Any]) -> List[Tuple]:
@@ -36,53 +35,23 @@ def _to_decimal(value: Any) -> Optional[Decimal]:
         return Decimal(str(value))
     except (InvalidOperation, TypeError, ValueError):
         return None
-PNCP_BASE = "https://pncp.gov.br/api/consulta/v1"
-HEADERS = {
-    "User-Agent": "curl/8.8",           # cabeçalho “neutro” que os gateways costumam aceitar bem
-    "Accept": "application/json",
-}
+PNCP_BASE = PNCP_CONSULTA_BASE
 async def _get_publications_page(
-    session: aiohttp.ClientSession,
+    client: PncpClient,
     params: Dict[str, str],
-    max_retries: int = 3,
-    backoff_base: float = 1.0,
 ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
-    Faz GET assíncrono com retry/backoff simples.
+    Faz GET assíncrono de uma página (retry/rate limit no PncpClient).
     Retorna (payload_json, erro_str)
     """
     url = f"{PNCP_BASE}/contratacoes/publicacao"
-    timeout = aiohttp.ClientTimeout(total=60)
-    for attempt in range(1, max_retries + 1):
-        try:
-            async with session.get(url, params=params, headers=HEADERS, timeout=timeout) as resp:
-                # print(f"[DEBUG] GET {resp.status} {resp.url}")
-                if resp.status != 200:
-                    body = (await resp.text())[:240]
-                    err = f"API {resp.status}: {body}"
-                    if attempt < max_retries and resp.status in (500, 502, 503, 504):
-                        await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                        continue
-                    return None, err
-                ct = (resp.headers.get("Content-Type") or "").lower()
-                if "application/json" not in ct:
-                    preview = (await resp.text())[:240].replace("\n", " ")
-                    return None, f"Content-Type inesperado ({ct}). Body[:240]={preview!r}"
-                data = await resp.json()
-                return data, None
-        except aiohttp.ClientError as e:
-            if attempt < max_retries:
-                await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                continue
-            return None, f"ClientError: {repr(e)}"
-        except asyncio.TimeoutError as e:
-            if attempt < max_retries:
-                await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                continue
-            return None, f"TimeoutError: {repr(e)}"
-        except json.JSONDecodeError as e:
-            return None, f"JSONDecodeError: {repr(e)}"
-    return None, "Erro desconhecido"
+    try:
+        data = await client.get_json(url, params=params, endpoint="publicacao")
+    except PncpRequestError as e:
+        return None, str(e)
+    return data or {}, None
+
+
 def _extract_list(payload: Dict[str, Any]) -> Tuple[Iterable[Dict[str, Any]], int, int]:
     """
     Extrai a lista de publicações e info de paginação, lidando com variações de chave:
@@ -356,7 +325,7 @@ async def etapa1_publicacoes(
     if unidade_param:
         base_params["codigoUnidadeAdministrativa"] = unidade_param
     totals = {"orgaos": 0, "unidades": 0, "compras": 0, "ignoradas": 0, "paginas": 0}
-    async with aiohttp.ClientSession(trust_env=True) as session:
+    async with PncpClient() as client:
         def process_payload(payload: Dict[str, Any]) -> Tuple[int, int]:
             pubs, total_paginas, numero_pagina = _extract_list(payload)
             print(f"[INFO] Pagina {numero_pagina}/{total_paginas} - publicacoes: {len(pubs)}")
@@ -379,41 +348,38 @@ async def etapa1_publicacoes(
                 totals["ignoradas"] += len(pubs)
             totals["paginas"] += 1
             return total_paginas, numero_pagina
-            first_page = int(pagina_inicial)
-            params = dict(base_params)
-            params["pagina"] = str(first_page)
-            payload, err = await _get_publications_page(session, params)
-            if err:
-                print(f"[WARN] Falha ao buscar pagina {first_page}: {err}")
-                print(f"[Etapa 1] upsert orgaos={totals['orgaos']}, unidades={totals['unidades']}, compras={totals['compras']}, ignoradas={totals['ignoradas']}")
-                print(f"Etapa 1 concluida. Paginas processadas={totals['paginas']}")
-                print(f"[Etapa 1] Totais: {totals}")
-                return totals
-            total_paginas_known, numero_pagina = process_payload(payload)
-            if modo != "rapido":
-                last_page = total_paginas_known
-                if paginas_max is not None:
-                    last_page = min(last_page, first_page + paginas_max - 1)
-
-                sem = asyncio.Semaphore(10)
+        first_page = int(pagina_inicial)
+        params = dict(base_params)
+        params["pagina"] = str(first_page)
+        payload, err = await _get_publications_page(client, params)
+        if err:
+            print(f"[WARN] Falha ao buscar pagina {first_page}: {err}")
+            print(f"[Etapa 1] upsert orgaos={totals['orgaos']}, unidades={totals['unidades']}, compras={totals['compras']}, ignoradas={totals['ignoradas']}")
+            print(f"Etapa 1 concluida. Paginas processadas={totals['paginas']}")
+            print(f"[Etapa 1] Totais: {totals}")
+            return totals
+        total_paginas_known, numero_pagina = process_payload(payload)
+        if modo != "rapido":
+            last_page = total_paginas_known
+            if paginas_max is not None:
+                last_page = min(last_page, first_page + paginas_max - 1)
 
-                async def fetch_page(pg: int):
-                    params = dict(base_params)
-                    params["pagina"] = str(pg)
-                    async with sem:
-                        payload, err = await _get_publications_page(session, params)
-                    return pg, payload, err
+            async def fetch_page(pg: int):
+                params = dict(base_params)
+                params["pagina"] = str(pg)
+                payload, err = await _get_publications_page(client, params)
+                return pg, payload, err
 
-                tasks = [asyncio.create_task(fetch_page(pg))
-                         for pg in range(numero_pagina + 1, last_page + 1)]
+            tasks = [asyncio.create_task(fetch_page(pg))
+                     for pg in range(numero_pagina + 1, last_page + 1)]
 
-                for coro in asyncio.as_completed(tasks):
-                    pg, payload, err = await coro
-                    if err:
-                        print(f"[WARN] Falha ao buscar pagina {pg}: {err}")
-                        continue
-                    process_payload(payload)
-                    print(f"[INFO] Pagina processada: {pg}")
+            for coro in asyncio.as_completed(tasks):
+                pg, payload, err = await coro
+                if err:
+                    print(f"[WARN] Falha ao buscar pagina {pg}: {err}")
+                    continue
+                process_payload(payload)
+                print(f"[INFO] Pagina processada: {pg}")
     print(f"[Etapa 1] upsert orgaos={totals['orgaos']}, unidades={totals['unidades']}, compras={totals['compras']}, ignoradas={totals['ignoradas']}")
     print(f"Etapa 1 concluida. Paginas processadas={totals['paginas']}")
     print(f"[Etapa 1] Totais: {totals}")
@@ -0,0 +1,122 @@
+"""
+Management command para revisar índices a partir de uma carga de consultas.
+
+Reexecuta cada SELECT com EXPLAIN ANALYZE (em transação desfeita), lista as leituras
+sequenciais que descartam muitas linhas no filtro e sugere o índice correspondente.
+
+A carga pode vir de um arquivo gravado com ``services.index_advisor.gravar_workload``
+(JSONL) ou de um ``.sql``; com ``--unidade`` o comando monta a carga dos endpoints por
+unidade (compras, merge itens/resultados, atas e INLABS).
+
+Uso:
+    python manage.py pncp_index_advisor --workload /tmp/workload.jsonl
+    python manage.py pncp_index_advisor --unidade 787000 --uasg 787000
+    python manage.py pncp_index_advisor --workload consultas.sql --sem-analyze --min-linhas 100
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_licitacao360.apps.gestao_atas.models import Ata
+from django_licitacao360.apps.imprensa_nacional.models import InlabsArticle
+
+from ...models import Compra, ItemCompra
+from ...services.index_advisor import (
+    MIN_LINHAS_REMOVIDAS,
+    agrupar_sugestoes,
+    analisar_workload,
+    carregar_workload,
+)
+
+
+def _workload_unidade(codigo_unidade, uasg=None):
+    """Consultas dos endpoints quentes para uma unidade, como o ORM as gera."""
+    querysets = [
+        Compra.objects.filter(codigo_unidade=codigo_unidade).order_by("-ano_compra", "-sequencial_compra")[:100],
+        ItemCompra.objects.merge_resultados(codigo_unidade),
+        Ata.objects.filter(codigo_unidade_orgao=codigo_unidade).order_by("-ano_ata", "-data_assinatura"),
+        Ata.objects.filter(cancelado=1).order_by("-data_cancelamento", "-ano_ata")[:100],
+    ]
+    if uasg:
+        querysets.append(InlabsArticle.objects.filter(uasg=uasg).order_by("-pub_date", "article_id")[:100])
+    return [qs.query.sql_with_params() for qs in querysets]
+
+
+class Command(BaseCommand):
+    help = 'Reexecuta uma carga de consultas com EXPLAIN ANALYZE e sugere índices para leituras sequenciais'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workload',
+            type=str,
+            default=None,
+            help='Arquivo da carga: JSONL ({"sql", "params"} por linha) ou .sql',
+        )
+        parser.add_argument(
+            '--unidade',
+            type=str,
+            default=None,
+            help='Monta a carga dos endpoints por unidade para este código de unidade',
+        )
+        parser.add_argument(
+            '--uasg',
+            type=str,
+            default=None,
+            help='UASG usada nas consultas de INLABS da carga de --unidade',
+        )
+        parser.add_argument(
+            '--min-linhas',
+            type=int,
+            default=MIN_LINHAS_REMOVIDAS,
+            help=f'Linhas descartadas pelo filtro para reportar a leitura (padrão: {MIN_LINHAS_REMOVIDAS})',
+        )
+        parser.add_argument(
+            '--sem-analyze',
+            action='store_true',
+            help='Usa só EXPLAIN (estimativas), sem executar as consultas',
+        )
+
+    def handle(self, *args, **options):
+        consultas = []
+        if options.get('workload'):
+            try:
+                consultas.extend(carregar_workload(options['workload']))
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Não foi possível ler a carga {options['workload']}: {e}")
+        if options.get('unidade'):
+            consultas.extend(_workload_unidade(options['unidade'], options.get('uasg')))
+        if not consultas:
+            raise CommandError('Informe --workload e/ou --unidade')
+
+        self.stdout.write(f"🔎 Analisando {len(consultas)} consultas...")
+        achados, erros = analisar_workload(
+            consultas,
+            analyze=not options['sem_analyze'],
+            min_linhas_removidas=options['min_linhas'],
+        )
+
+        for numero, erro in erros:
+            self.stdout.write(self.style.WARNING(f"  Consulta {numero}: {erro}"))
+
+        if not achados:
+            self.stdout.write(self.style.SUCCESS('✅ Nenhuma leitura sequencial relevante encontrada'))
+            return
+
+        self.stdout.write(self.style.WARNING(f"⚠️  {len(achados)} leituras sequenciais com filtro:"))
+        for achado in achados:
+            self.stdout.write(
+                f"  [consulta {achado.consulta}] {achado.relacao}: {achado.linhas_removidas} linhas descartadas, "
+                f"{achado.linhas} retornadas, {achado.tempo_ms:.1f} ms"
+            )
+            self.stdout.write(f"      Filtro: {achado.filtro}")
+
+        self.stdout.write('')
+        self.stdout.write('📌 Índices sugeridos (maior tempo evitado primeiro):')
+        for grupo in agrupar_sugestoes(achados):
+            consultas_txt = ', '.join(str(n) for n in sorted(grupo['consultas']))
+            if grupo['sugestao']:
+                self.stdout.write(f"  {grupo['sugestao']}")
+            else:
+                self.stdout.write(f"  {grupo['relacao']}: filtro sem coluna indexável por B-tree (LIKE/ILIKE com curinga inicial?)")
+            self.stdout.write(
+                f"      consultas {consultas_txt}; {grupo['linhas_removidas']} linhas descartadas, {grupo['tempo_ms']:.1f} ms"
+            )
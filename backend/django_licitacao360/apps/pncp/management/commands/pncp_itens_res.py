@@ -3,19 +3,22 @@
 
 import asyncio
 import logging
-import random
 from typing import Any, Dict, List, Optional, Tuple
 
-import aiohttp
-from aiolimiter import AsyncLimiter
-
 from decimal import Decimal
 
 from db import get_connection
+from django_licitacao360.apps.pncp.services.checkpoint import (
+    DEFAULT_CHECKPOINT_PATH,
+    CheckpointJournal,
+    ProgressoETA,
+    dividir_meses,
+)
+from django_licitacao360.apps.pncp.services.client import PNCP_API_BASE, PncpClient
 
 UA = {"User-Agent": "GerATA Worker/1.0 (+https://example.local)"}
-BASE_URL = "https://pncp.gov.br/api/pncp/v1"
-limiter = AsyncLimiter(5, 1)  # até 5 requisições por segundo
+BASE_URL = PNCP_API_BASE
+RATE = 5  # requisições/s iniciais; o PncpClient ajusta conforme 429/5xx
 
 logger = logging.getLogger(__name__)
 
@@ -275,60 +278,40 @@ def upsert_resultado(
 
 
 async def fetch_resultados(
-    session: aiohttp.ClientSession,
+    client: PncpClient,
     orgao_cnpj: str,
     ano: int,
     seq: int,
     numero_item: int,
-    max_retries: int = 3,
 ) -> List[Dict[str, Any]]:
     url = f"{BASE_URL}/orgaos/{orgao_cnpj}/compras/{ano}/{seq}/itens/{numero_item}/resultados"
 
-    for attempt in range(1, max_retries + 1):
-        async with limiter:
-            async with session.get(url, headers=UA, timeout=60) as resp:
-                if resp.status == 404:
-                    return []
-                if resp.status == 429:
-                    retry_after = int(resp.headers.get("Retry-After", "5"))
-                    backoff = retry_after * 2 ** (attempt - 1) + random.uniform(0, 1)
-                    logger.warning(
-                        "429 recebido para %s (tentativa %s/%s). Aguardando %.1fs antes de tentar novamente.",
-                        url,
-                        attempt,
-                        max_retries,
-                        backoff,
-                    )
-                    await asyncio.sleep(backoff)
-                    continue
-                resp.raise_for_status()
-                data = await resp.json()
+    data = await client.get_json(url, endpoint="resultados")
 
-        if data is None:
-            logger.debug(
-                "Sem resultados para %s/%s/%s/%s", orgao_cnpj, ano, seq, numero_item
-            )
-            return []
-        if isinstance(data, list):
-            return [d for d in data if isinstance(d, dict)]
-        if isinstance(data, dict):
-            inner = data.get("data")
-            if isinstance(inner, list):
-                return [d for d in inner if isinstance(d, dict)]
-        logger.warning(
-            "Unexpected resultados structure for %s/%s/%s/%s: %r",
-            orgao_cnpj,
-            ano,
-            seq,
-            numero_item,
-            data,
+    if data is None:
+        logger.debug(
+            "Sem resultados para %s/%s/%s/%s", orgao_cnpj, ano, seq, numero_item
         )
         return []
-
-    logger.error(
-        "Falha ao obter resultados para %s após %s tentativas", url, max_retries
+    if isinstance(data, list):
+        return [d for d in data if isinstance(d, dict)]
+    if isinstance(data, dict):
+        inner = data.get("data")
+        if isinstance(inner, list):
+            return [d for d in inner if isinstance(d, dict)]
+    logger.warning(
+        "Unexpected resultados structure for %s/%s/%s/%s: %r",
+        orgao_cnpj,
+        ano,
+        seq,
+        numero_item,
+        data,
     )
-    raise RuntimeError(f"Too many 429 responses for {url}")
+    return []
+
+
+def _unidade_item(orgao_cnpj: str, ano: int, seq: int, num: int) -> str:
+    return f"item:{orgao_cnpj.zfill(14)}:{ano}:{seq}:{num}"
 
 
 async def processar_resultados(
@@ -336,41 +319,61 @@ async def processar_resultados(
     data_final: str,
     modalidades: List[str],
     orgao_cnpj: str,
-):
+    journal: Optional[CheckpointJournal] = None,
+) -> int:
+    """
+    Busca e grava os resultados dos itens do período. Com ``journal``, pula os itens
+    já concluídos em execuções anteriores e registra cada item gravado ou com falha.
+    Retorna o número de itens com falha.
+    """
     itens = get_itens_para_resultados(
         data_inicial, data_final, modalidades, orgao_cnpj
     )
     if not itens:
         print("[Etapa 3] Nenhum item encontrado para buscar resultados.")
-        return
+        return 0
+
+    if journal is not None:
+        total_periodo = len(itens)
+        concluidas = journal.concluidas(f"item:{orgao_cnpj.zfill(14)}:")
+        itens = [
+            it
+            for it in itens
+            if _unidade_item(it["orgao_cnpj"], it["ano_compra"], it["sequencial_compra"], it["numero_item"])
+            not in concluidas
+        ]
+        if total_periodo != len(itens):
+            print(
+                f"[Etapa 3] Checkpoint: {total_periodo - len(itens)} item(ns) já concluído(s), "
+                f"{len(itens)} pendente(s)."
+            )
+        if not itens:
+            return 0
+    progresso = ProgressoETA(len(itens), "Etapa 3")
 
     conn = get_connection()
     cur = conn.cursor()
 
     total_res = forn_up = falhas = 0
     concurrency = 5
-    max_retries = 3
-    sem = asyncio.Semaphore(concurrency)
 
-    async with aiohttp.ClientSession(headers=UA, trust_env=True) as session:
+    async with PncpClient(rate=RATE, max_concurrency=concurrency, max_retries=3, headers=UA) as client:
         async def worker(it):
-            async with sem:
-                ano = it["ano_compra"]
-                seq = it["sequencial_compra"]
-                num = it["numero_item"]
-                cnpj = it["orgao_cnpj"]
-                try:
-                    resultados = await fetch_resultados(
-                        session,
-                        cnpj,
-                        ano,
-                        seq,
-                        num,
-                        max_retries=max_retries,
-                    )
-                    return it, None, resultados
-                except Exception as e:
-                    return it, e, []
+            ano = it["ano_compra"]
+            seq = it["sequencial_compra"]
+            num = it["numero_item"]
+            cnpj = it["orgao_cnpj"]
+            try:
+                resultados = await fetch_resultados(
+                    client,
+                    cnpj,
+                    ano,
+                    seq,
+                    num,
+                )
+                return it, None, resultados
+            except Exception as e:
+                return it, e, []
 
         tasks = [asyncio.create_task(worker(it)) for it in itens]
 
@@ -384,9 +387,16 @@ async def processar_resultados(
                 f"[Etapa 3] Resultados do item {num} — compra {ano}/{seq} (órgão {cnpj})..."
             )
 
+            unidade = _unidade_item(cnpj, ano, seq, num)
+
             if err:
                 print(f"  ! Falha ao buscar resultados {ano}/{seq}/{num}: {err}")
                 falhas += 1
+                if journal is not None:
+                    journal.marcar(unidade, erro=str(err))
+                linha = progresso.avancar(falha=True)
+                if linha:
+                    print(linha)
                 continue
 
             for r in resultados:
@@ -427,6 +437,12 @@ async def processar_resultados(
                 total_res += 1
 
             conn.commit()
+            # Só marca o item depois que os resultados foram efetivados no banco
+            if journal is not None:
+                journal.marcar(unidade)
+            linha = progresso.avancar()
+            if linha:
+                print(linha)
 
     cur.close()
     conn.close()
@@ -434,6 +450,7 @@ async def processar_resultados(
     print(
         f"[Etapa 3] resultados upsertados: {total_res}, fornecedores upsertados: {forn_up}, falhas: {falhas}"
     )
+    return falhas
 
 
 def _chunk_anos(ano_inicial: int, ano_final: int, chunk_size: int):
@@ -489,6 +506,21 @@ async def _cli_main():
         type=str,
         help="CNPJ do órgão (sem máscara).",
     )
+    parser.add_argument(
+        "--checkpoint",
+        default=DEFAULT_CHECKPOINT_PATH,
+        help="Arquivo SQLite com os checkpoints da carga (padrão: PNCP_CHECKPOINT_DB).",
+    )
+    parser.add_argument(
+        "--sem-checkpoint",
+        action="store_true",
+        help="Não lê nem grava checkpoints (reprocessa tudo).",
+    )
+    parser.add_argument(
+        "--reiniciar",
+        action="store_true",
+        help="Apaga os checkpoints deste órgão antes de começar.",
+    )
     args, extras = parser.parse_known_args()
     if extras:
         print(
@@ -522,12 +554,52 @@ async def _cli_main():
     print(
         f"\n[Etapa 3] Intervalo em execução: {args.data_inicial} - {args.data_final}"
     )
-    await processar_resultados(
-        args.data_inicial.isoformat(),
-        args.data_final.isoformat(),
-        modalidades,
-        args.orgao_cnpj.strip(),
-    )
+    orgao_cnpj = args.orgao_cnpj.strip()
+    if args.sem_checkpoint:
+        await processar_resultados(
+            args.data_inicial.isoformat(),
+            args.data_final.isoformat(),
+            modalidades,
+            orgao_cnpj,
+        )
+        return
+
+    # Processa mês a mês; cada mês concluído sem falhas é pulado ao reiniciar
+    meses = list(dividir_meses(args.data_inicial, args.data_final))
+    with CheckpointJournal("resultados", args.checkpoint) as journal:
+        if args.reiniciar:
+            removidos = journal.limpar(f"item:{orgao_cnpj.zfill(14)}:")
+            removidos += journal.limpar(f"mes:{orgao_cnpj}:")
+            print(f"[Etapa 3] Checkpoints removidos: {removidos}")
+
+        progresso = ProgressoETA(len(meses), "Etapa 3 - meses", intervalo=0)
+        falhas_total = 0
+        for inicio, fim in meses:
+            unidade = f"mes:{orgao_cnpj}:{modalidade_raw}:{inicio.isoformat()}:{fim.isoformat()}"
+            if journal.concluida(unidade):
+                print(f"[Etapa 3] Período {inicio} - {fim} já concluído (checkpoint); pulando.")
+                progresso.avancar()
+                continue
+            print(f"[Etapa 3] Período {inicio} - {fim}")
+            falhas = await processar_resultados(
+                inicio.isoformat(),
+                fim.isoformat(),
+                modalidades,
+                orgao_cnpj,
+                journal=journal,
+            )
+            falhas_total += falhas
+            if falhas:
+                journal.marcar(unidade, erro=f"{falhas} item(ns) com falha")
+            else:
+                journal.marcar(unidade)
+            print(progresso.avancar(falha=bool(falhas)))
+
+    if falhas_total:
+        print(
+            f"[Etapa 3] {falhas_total} item(ns) com falha; execute novamente para "
+            f"refazer apenas os pendentes."
+        )
 
 
 if __name__ == "__main__":
@@ -3,12 +3,17 @@ import os
 from decimal import Decimal, InvalidOperation
 from typing import Any, Dict, List, Optional, Tuple
 
-import aiohttp
 from db import get_connection
+from django_licitacao360.apps.pncp.services.checkpoint import (
+    DEFAULT_CHECKPOINT_PATH,
+    CheckpointJournal,
+    ProgressoETA,
+    dividir_meses,
+)
+from django_licitacao360.apps.pncp.services.client import PNCP_API_BASE, PncpClient
 
 UA = {"User-Agent": "GerATA Worker/1.0 (+https://example.local)"}
 MAX_CONCURRENCY = 5
-MAX_RETRIES = 5
 PAGE_SIZE = 999_999_999  # força a API a retornar todos os itens em uma única página
 DEBUG = os.getenv("PNCP_DEBUG", "1").lower() not in ("0", "false", "no")
 
@@ -197,71 +202,40 @@ def _to_decimal(value: Optional[Any]) -> Optional[Decimal]:
 
 
 async def fetch_itens(
-    session: aiohttp.ClientSession,
+    client: PncpClient,
     orgao_cnpj: str,
     ano: int,
     seq: int,
-    max_retries: int = MAX_RETRIES,
 ) -> List[Dict[str, Any]]:
     """
     Busca TODOS os itens da compra da API do PNCP.
     IMPORTANTE: A API retorna TODOS os itens, não apenas os homologados.
     O numeroItem retornado deve ser o número REAL do item na compra.
+    Retry, Retry-After e limitação de taxa ficam a cargo do PncpClient.
     """
-    url = f"https://pncp.gov.br/api/pncp/v1/orgaos/{orgao_cnpj}/compras/{ano}/{seq}/itens"
+    url = f"{PNCP_API_BASE}/orgaos/{orgao_cnpj}/compras/{ano}/{seq}/itens"
     params = {"tamanhoPagina": PAGE_SIZE}
     _debug(f"GET {url} params={params} (buscando TODOS os itens da compra)")
-    for attempt in range(1, max_retries + 1):
-        try:
-            async with session.get(url, timeout=60, params=params) as resp:
-                _debug(
-                    f"Resposta {resp.status} para {ano}/{seq} (tentativa {attempt}/{max_retries})"
-                )
-                if resp.status == 404:
-                    _debug(f"Nenhum item (404) para {ano}/{seq}")
-                    return []
-                if resp.status == 429:
-                    retry_after = resp.headers.get("Retry-After")
-                    wait = (
-                        int(retry_after)
-                        if retry_after and retry_after.isdigit()
-                        else 2 ** attempt
-                    )
-                    _debug(
-                        f"Rate limit para {ano}/{seq}; aguardando {wait}s antes de retry"
-                    )
-                    await asyncio.sleep(wait)
-                    continue
-                resp.raise_for_status()
-                data = await resp.json()
-                itens_list = data if isinstance(data, list) else data.get("data", [])
-                _debug(
-                    f"Itens recebidos para {ano}/{seq}: {len(itens_list)}"
-                )
-                # Log detalhado dos primeiros itens para debug
-                if itens_list and len(itens_list) <= 3:
-                    for idx, item in enumerate(itens_list):
-                        _debug(
-                            f"  Item[{idx}]: numeroItem={item.get('numeroItem')}, "
-                            f"descricao={item.get('descricao', '')[:50]}..."
-                        )
-                return itens_list
-        except asyncio.CancelledError:
-            _debug(f"Cancelado durante fetch {ano}/{seq}")
-            raise
-        except aiohttp.ClientError as e:
+    data = await client.get_json(url, params=params, endpoint="itens")
+    if data is None:
+        _debug(f"Nenhum item (404) para {ano}/{seq}")
+        return []
+    itens_list = data if isinstance(data, list) else data.get("data", [])
+    _debug(
+        f"Itens recebidos para {ano}/{seq}: {len(itens_list)}"
+    )
+    # Log detalhado dos primeiros itens para debug
+    if itens_list and len(itens_list) <= 3:
+        for idx, item in enumerate(itens_list):
             _debug(
-                f"Erro de rede em {ano}/{seq} (tentativa {attempt}/{max_retries}): {e}"
+                f"  Item[{idx}]: numeroItem={item.get('numeroItem')}, "
+                f"descricao={item.get('descricao', '')[:50]}..."
             )
-            if attempt == max_retries:
-                raise
-            await asyncio.sleep(2 ** attempt)
-    raise RuntimeError(f"Falha após {max_retries} tentativas")
+    return itens_list
 
 
 async def worker(
-    session: aiohttp.ClientSession,
-    sem: asyncio.Semaphore,
+    client: PncpClient,
     it: Dict[str, Any],
 ) -> Tuple[int, int, List[Dict[str, Any]], Optional[str]]:
     ano = it["ano_compra"]
@@ -269,8 +243,7 @@ async def worker(
     cnpj = it["orgao_cnpj"]
     try:
         _debug(f"Iniciando worker {ano}/{seq} orgao={cnpj}")
-        async with sem:
-            itens = await fetch_itens(session, cnpj, ano, seq)
+        itens = await fetch_itens(client, cnpj, ano, seq)
         _debug(f"Worker concluido {ano}/{seq} itens={len(itens)}")
         return ano, seq, itens, None
     except asyncio.CancelledError:
@@ -281,23 +254,51 @@ async def worker(
         return ano, seq, [], str(e)
 
 
+def _unidade_compra(orgao_cnpj: str, ano: int, seq: int) -> str:
+    return f"compra:{orgao_cnpj.zfill(14)}:{ano}:{seq}"
+
+
 async def processar_itens(
     data_inicial: str,
     data_final: str,
     modalidades: List[str],
     orgao_cnpj: str,
-) -> None:
+    journal: Optional[CheckpointJournal] = None,
+) -> int:
+    """
+    Busca e grava os itens das compras do período. Com ``journal``, pula as compras
+    já concluídas em execuções anteriores e registra cada compra gravada ou com falha.
+    Retorna o número de compras com falha.
+    """
     compras = get_compras_para_itens(
         data_inicial, data_final, modalidades, orgao_cnpj
     )
     if not compras:
         print("[Etapa 2] Nenhuma compra encontrada para buscar itens.")
-        return
+        return 0
+
+    if journal is not None:
+        total_periodo = len(compras)
+        concluidas = journal.concluidas(f"compra:{orgao_cnpj.zfill(14)}:")
+        compras = [
+            comp
+            for comp in compras
+            if _unidade_compra(comp["orgao_cnpj"], comp["ano_compra"], comp["sequencial_compra"])
+            not in concluidas
+        ]
+        if total_periodo != len(compras):
+            print(
+                f"[Etapa 2] Checkpoint: {total_periodo - len(compras)} compra(s) já concluída(s), "
+                f"{len(compras)} pendente(s)."
+            )
+        if not compras:
+            return 0
+    progresso = ProgressoETA(len(compras), "Etapa 2")
 
     _debug(
         f"Compras carregadas: {len(compras)} | intervalo={data_inicial}-{data_final}"
     )
-    _debug(f"MAX_CONCURRENCY={MAX_CONCURRENCY} MAX_RETRIES={MAX_RETRIES}")
+    _debug(f"MAX_CONCURRENCY={MAX_CONCURRENCY}")
 
     conn = get_connection()
     cur = conn.cursor()
@@ -312,19 +313,23 @@ async def processar_itens(
     total_upserts = 0
     falhas = 0
 
-    sem = asyncio.Semaphore(MAX_CONCURRENCY)
-
-    async with aiohttp.ClientSession(headers=UA, trust_env=True) as session:
+    async with PncpClient(headers=UA, max_concurrency=MAX_CONCURRENCY) as client:
         tasks = [
-            asyncio.create_task(worker(session, sem, comp)) for comp in compras
+            asyncio.create_task(worker(client, comp)) for comp in compras
         ]
         _debug(f"Tasks criadas: {len(tasks)}")
         try:
             for t in asyncio.as_completed(tasks):
                 ano, seq, itens, err = await t
+                unidade = _unidade_compra(orgao_cnpj, ano, seq)
                 if err:
                     print(f"  ! Falha ao buscar itens {ano}/{seq}: {err}")
                     falhas += 1
+                    if journal is not None:
+                        journal.marcar(unidade, erro=err)
+                    linha = progresso.avancar(falha=True)
+                    if linha:
+                        print(linha)
                     continue
 
                 # IMPORTANTE: Quando há apenas um item homologado, a API pode retornar numeroItem: 1
@@ -403,6 +408,12 @@ async def processar_itens(
                     )
                     total_upserts += 1
                 conn.commit()
+                # Só marca a compra depois que os itens foram efetivados no banco
+                if journal is not None:
+                    journal.marcar(unidade)
+                linha = progresso.avancar()
+                if linha:
+                    print(linha)
         except asyncio.CancelledError:
             _debug("Cancelamento recebido; aguardando finalização das tasks...")
             raise
@@ -419,6 +430,7 @@ async def processar_itens(
     print(
         f"[Etapa 2] Itens upsertados: {total_upserts} | requisições com falha: {falhas}"
     )
+    return falhas
 
 
 async def _cli_main():
@@ -463,6 +475,21 @@ async def _cli_main():
         type=str,
         help="CNPJ do órgão (sem máscara).",
     )
+    parser.add_argument(
+        "--checkpoint",
+        default=DEFAULT_CHECKPOINT_PATH,
+        help="Arquivo SQLite com os checkpoints da carga (padrão: PNCP_CHECKPOINT_DB).",
+    )
+    parser.add_argument(
+        "--sem-checkpoint",
+        action="store_true",
+        help="Não lê nem grava checkpoints (reprocessa tudo).",
+    )
+    parser.add_argument(
+        "--reiniciar",
+        action="store_true",
+        help="Apaga os checkpoints deste órgão antes de começar.",
+    )
     args, extras = parser.parse_known_args()
     if extras:
         print(
@@ -496,12 +523,52 @@ async def _cli_main():
     else:
         modalidades = [modalidade_raw]
 
-    await processar_itens(
-        args.data_inicial.isoformat(),
-        args.data_final.isoformat(),
-        modalidades,
-        args.orgao_cnpj.strip(),
-    )
+    orgao_cnpj = args.orgao_cnpj.strip()
+    if args.sem_checkpoint:
+        await processar_itens(
+            args.data_inicial.isoformat(),
+            args.data_final.isoformat(),
+            modalidades,
+            orgao_cnpj,
+        )
+        return
+
+    # Processa mês a mês; cada mês concluído sem falhas é pulado ao reiniciar
+    meses = list(dividir_meses(args.data_inicial, args.data_final))
+    with CheckpointJournal("itens", args.checkpoint) as journal:
+        if args.reiniciar:
+            removidos = journal.limpar(f"compra:{orgao_cnpj.zfill(14)}:")
+            removidos += journal.limpar(f"mes:{orgao_cnpj}:")
+            print(f"[Etapa 2] Checkpoints removidos: {removidos}")
+
+        progresso = ProgressoETA(len(meses), "Etapa 2 - meses", intervalo=0)
+        falhas_total = 0
+        for inicio, fim in meses:
+            unidade = f"mes:{orgao_cnpj}:{modalidade_raw}:{inicio.isoformat()}:{fim.isoformat()}"
+            if journal.concluida(unidade):
+                print(f"[Etapa 2] Período {inicio} - {fim} já concluído (checkpoint); pulando.")
+                progresso.avancar()
+                continue
+            print(f"[Etapa 2] Período {inicio} - {fim}")
+            falhas = await processar_itens(
+                inicio.isoformat(),
+                fim.isoformat(),
+                modalidades,
+                orgao_cnpj,
+                journal=journal,
+            )
+            falhas_total += falhas
+            if falhas:
+                journal.marcar(unidade, erro=f"{falhas} compra(s) com falha")
+            else:
+                journal.marcar(unidade)
+            print(progresso.avancar(falha=bool(falhas)))
+
+    if falhas_total:
+        print(
+            f"[Etapa 2] {falhas_total} compra(s) com falha; execute novamente para "
+            f"refazer apenas as pendentes."
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+"""
+Management command para reconstruir as tabelas de resumo dos painéis do PNCP.
+
+As tasks de ingestão mantêm os resumos atualizados lote a lote; este comando serve
+para a carga inicial e depois de cargas em massa (load_compras, load_resultados_item,
+load_pncp_from_sqlite), que gravam direto nas tabelas.
+
+Uso:
+    python manage.py pncp_resumos
+    python manage.py pncp_resumos --unidades 787000,787010
+"""
+
+from django.core.management.base import BaseCommand
+
+from ...services.resumos import atualizar_resumos
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os resumos de compras e fornecedores por unidade usados nos painéis do PNCP'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--unidades',
+            type=str,
+            default=None,
+            help='Códigos de unidade separados por vírgula (padrão: todas)',
+        )
+
+    def handle(self, *args, **options):
+        unidades = None
+        if options.get('unidades'):
+            unidades = [u.strip() for u in options['unidades'].split(',') if u.strip()]
+
+        totals = atualizar_resumos(unidades)
+        self.stdout.write(self.style.SUCCESS('✅ Resumos reconstruídos'))
+        self.stdout.write(f"  Compras por unidade/ano/modalidade: {totals['resumo_compras']}")
+        self.stdout.write(f"  Fornecedores por unidade: {totals['resumo_fornecedores']}")
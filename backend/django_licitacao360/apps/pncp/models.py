@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Value, When, Window
+from django.db.models.functions import RowNumber
 
 
 class AmparoLegal(models.Model):
@@ -83,16 +85,80 @@ class Compra(models.Model):
     valor_total_estimado = models.DecimalField("Valor Total Estimado", max_digits=19, decimal_places=4, null=True, blank=True)
     valor_total_homologado = models.DecimalField("Valor Total Homologado", max_digits=19, decimal_places=4, null=True, blank=True)
     percentual_desconto = models.DecimalField("Percentual de Desconto", max_digits=7, decimal_places=4, null=True, blank=True)
+    hash_conteudo = models.CharField("Hash do Conteúdo", max_length=40, null=True, blank=True)
+    hash_itens_sincronizados = models.CharField("Hash na Última Busca de Itens", max_length=40, null=True, blank=True)
 
     class Meta:
         verbose_name = "Compra"
         verbose_name_plural = "Compras"
         ordering = ["-ano_compra", "-sequencial_compra"]
+        indexes = [
+            # Endpoints por unidade (filtro + ordenação -ano_compra, -sequencial_compra)
+            models.Index(fields=["codigo_unidade", "ano_compra", "sequencial_compra"], name="pncp_compra_unid_ano_seq_idx"),
+            models.Index(fields=["ano_compra", "sequencial_compra"], name="pncp_compra_ano_seq_idx"),
+            # Janelas de busca de itens nas tasks (data de publicação ou de atualização)
+            models.Index(fields=["data_publicacao_pncp"], name="pncp_compra_data_pub_idx"),
+            models.Index(fields=["data_atualizacao"], name="pncp_compra_data_atual_idx"),
+        ]
 
     def __str__(self):
         return f"{self.numero_compra}/{self.ano_compra} - {self.objeto_compra[:50]}..."
 
 
+class ItemCompraQuerySet(models.QuerySet):
+    def merge_resultados(self, codigo_unidade, modalidade_id=None):
+        """
+        Itens da unidade unidos ao primeiro resultado de cada item (menor resultado_id),
+        com o percentual de desconto calculado no banco, em uma única consulta.
+
+        Retorna linhas ``.values()`` com as chaves de ItemResultadoMergeSerializer e
+        ``modalidade_id``, ordenadas por compra e número do item.
+        """
+        itens = self.filter(compra__codigo_unidade=codigo_unidade)
+        if modalidade_id:
+            itens = itens.filter(compra__modalidade_id=modalidade_id)
+
+        estimado = F("valor_total_estimado")
+        homologado = F("resultados__valor_total_homologado")
+        return (
+            itens
+            .annotate(
+                ordem_resultado=Window(
+                    RowNumber(),
+                    partition_by=[F("item_id")],
+                    order_by=F("resultados__resultado_id").asc(nulls_last=True),
+                ),
+            )
+            .filter(ordem_resultado=1)
+            .order_by("compra_id", "numero_item")
+            .values(
+                "numero_item", "descricao", "unidade_medida", "valor_unitario_estimado",
+                "valor_total_estimado", "quantidade", "situacao_compra_item_nome",
+                ano_compra=F("compra__ano_compra"),
+                sequencial_compra=F("compra__sequencial_compra"),
+                modalidade_id=F("compra__modalidade_id"),
+                cnpj_fornecedor=F("resultados__fornecedor_id"),
+                razao_social=F("resultados__fornecedor__razao_social"),
+                valor_total_homologado=homologado,
+                valor_unitario_homologado=F("resultados__valor_unitario_homologado"),
+                quantidade_homologada=F("resultados__quantidade_homologada"),
+                percentual_desconto=Case(
+                    When(
+                        Q(valor_total_estimado__gt=0)
+                        & Q(resultados__valor_total_homologado__isnull=False)
+                        & ~Q(resultados__valor_total_homologado=0),
+                        then=ExpressionWrapper(
+                            (estimado - homologado) * Value(100) / estimado,
+                            output_field=DecimalField(max_digits=19, decimal_places=4),
+                        ),
+                    ),
+                    default=None,
+                    output_field=DecimalField(max_digits=19, decimal_places=4),
+                ),
+            )
+        )
+
+
 class ItemCompra(models.Model):
     item_id = models.CharField("ID do Item", max_length=100, primary_key=True)
     compra = models.ForeignKey(Compra, on_delete=models.CASCADE, related_name="itens", verbose_name="Compra")
@@ -105,11 +171,20 @@ class ItemCompra(models.Model):
     percentual_economia = models.DecimalField("Percentual de Economia", max_digits=7, decimal_places=4, null=True, blank=True)
     situacao_compra_item_nome = models.CharField("Situação do Item", max_length=100)
     tem_resultado = models.BooleanField("Tem Resultado", default=False)
+    hash_conteudo = models.CharField("Hash do Conteúdo", max_length=40, null=True, blank=True)
+    hash_resultados_sincronizados = models.CharField("Hash na Última Busca de Resultados", max_length=40, null=True, blank=True)
+    # Gravado só quando o upsert altera o item; usado na versão dos dados exportados
+    atualizado_em = models.DateTimeField("Atualizado em", null=True, blank=True)
+
+    objects = ItemCompraQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Item de Compra"
         verbose_name_plural = "Itens de Compra"
         ordering = ["compra", "numero_item"]
+        indexes = [
+            models.Index(fields=["compra", "numero_item"], name="pncp_item_compra_numero_idx"),
+        ]
 
     def __str__(self):
         return f"Item {self.numero_item} - {self.compra.numero_compra}"
@@ -129,6 +204,91 @@ class ResultadoItem(models.Model):
     class Meta:
         verbose_name = "Resultado do Item"
         verbose_name_plural = "Resultados dos Itens"
+        indexes = [
+            # Primeiro resultado de cada item (ItemCompraQuerySet.merge_resultados)
+            models.Index(fields=["item_compra", "resultado_id"], name="pncp_resultado_item_idx"),
+        ]
 
     def __str__(self):
         return f"Resultado {self.resultado_id} - {self.item_compra}"
+
+
+class EstadoSincronizacao(models.Model):
+    """Marca d'água da sincronização incremental do PNCP por (cnpj, modalidade, etapa)"""
+    ETAPA_COMPRAS = "compras"
+    ETAPA_ITENS = "itens"
+    ETAPA_RESULTADOS = "resultados"
+    ETAPA_CHOICES = [
+        (ETAPA_COMPRAS, "Compras"),
+        (ETAPA_ITENS, "Itens"),
+        (ETAPA_RESULTADOS, "Resultados"),
+    ]
+
+    cnpj = models.CharField("CNPJ do Órgão", max_length=20)
+    modalidade = models.IntegerField("Código da Modalidade")
+    etapa = models.CharField("Etapa", max_length=20, choices=ETAPA_CHOICES)
+    janela_inicio = models.DateField("Início da Última Janela", null=True, blank=True)
+    janela_fim = models.DateField("Fim da Última Janela", null=True, blank=True)
+    max_data_atualizacao = models.DateTimeField("Maior Data de Atualização Vista", null=True, blank=True)
+    ultimo_resultado = models.JSONField("Contadores da Última Execução", default=dict, blank=True)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Estado de Sincronização"
+        verbose_name_plural = "Estados de Sincronização"
+        ordering = ["cnpj", "etapa", "modalidade"]
+        constraints = [
+            models.UniqueConstraint(fields=["cnpj", "modalidade", "etapa"], name="pncp_estado_sync_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.cnpj} - {self.etapa} - modalidade {self.modalidade} até {self.janela_fim}"
+
+
+class ResumoCompraUnidade(models.Model):
+    """Totais de compras por (ano, unidade, modalidade), mantidos pela ingestão (ver services/resumos.py)"""
+    ano_compra = models.IntegerField("Ano da Compra")
+    codigo_unidade = models.CharField("Código da Unidade", max_length=50)
+    modalidade = models.ForeignKey(Modalidade, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+", verbose_name="Modalidade")
+    quantidade_compras = models.IntegerField("Quantidade de Compras", default=0)
+    valor_total_estimado = models.DecimalField("Valor Total Estimado", max_digits=19, decimal_places=4, null=True, blank=True)
+    valor_total_homologado = models.DecimalField("Valor Total Homologado", max_digits=19, decimal_places=4, null=True, blank=True)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumo de Compras por Unidade"
+        verbose_name_plural = "Resumos de Compras por Unidade"
+        ordering = ["ano_compra", "codigo_unidade", "modalidade"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ano_compra", "codigo_unidade", "modalidade"],
+                name="pncp_resumo_compra_unidade_unico",
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["codigo_unidade", "ano_compra"], name="pncp_resumo_compra_unid_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.codigo_unidade} - {self.ano_compra} - modalidade {self.modalidade_id}"
+
+
+class ResumoFornecedorUnidade(models.Model):
+    """Totais homologados por (unidade, fornecedor), mantidos pela ingestão (ver services/resumos.py)"""
+    codigo_unidade = models.CharField("Código da Unidade", max_length=50)
+    fornecedor = models.ForeignKey(Fornecedor, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Fornecedor")
+    quantidade_resultados = models.IntegerField("Quantidade de Resultados", default=0)
+    valor_total_homologado = models.DecimalField("Valor Total Homologado", max_digits=19, decimal_places=4, default=0)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumo de Fornecedores por Unidade"
+        verbose_name_plural = "Resumos de Fornecedores por Unidade"
+        ordering = ["codigo_unidade", "fornecedor"]
+        constraints = [
+            models.UniqueConstraint(fields=["codigo_unidade", "fornecedor"], name="pncp_resumo_fornecedor_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.codigo_unidade} - {self.fornecedor_id}"
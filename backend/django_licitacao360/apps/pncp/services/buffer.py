@@ -0,0 +1,139 @@
+"""
+Buffer assíncrono que acumula linhas vindas da API e grava em lotes fora do event loop.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncUpsertBuffer:
+    """
+    Acumula linhas e chama ``flush_func(linhas) -> dict`` numa thread do pool.
+
+    Um lote é gravado quando o buffer atinge ``flush_size`` linhas ou quando a linha
+    mais antiga está há ``flush_interval`` segundos no buffer. No máximo um lote fica
+    em gravação por vez; enquanto ele grava, o event loop continua recebendo dados.
+    Os contadores retornados por ``flush_func`` são somados em ``totals``.
+
+    Um lote cuja gravação falha volta ao buffer; o erro é repassado na próxima
+    chamada a ``add``/``flush`` e na saída do ``async with``, que antes tenta
+    gravar mais uma vez tudo o que ficou pendente.
+
+    Uso::
+
+        async with AsyncUpsertBuffer(_upsert_itens_sync, 5000, 5.0) as buffer:
+            await buffer.add(linhas)
+        buffer.totals
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[List[Dict[str, Any]]], Dict[str, int]],
+        flush_size: int,
+        flush_interval: float,
+        label: str = "PNCP Buffer",
+    ):
+        self._flush_async = sync_to_async(flush_func, thread_sensitive=False)
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval = max(0.1, float(flush_interval))
+        self.label = label
+        self.totals: Dict[str, int] = {}
+        self.lotes = 0
+        self._rows: List[Dict[str, Any]] = []
+        self._first_row_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._erro: Optional[BaseException] = None
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncUpsertBuffer":
+        self._ticker = asyncio.create_task(self._tick())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._ticker:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+        try:
+            async with self._lock:
+                await self._wait_inflight()
+        except Exception as erro:
+            # O lote voltou ao buffer e é regravado abaixo
+            self._erro = self._erro or erro
+        # Grava o que já foi recebido (inclusive lotes que falharam) mesmo em caso de erro
+        await self._flush()
+        async with self._lock:
+            await self._wait_inflight()
+        if self._erro is not None and exc is None:
+            raise self._erro
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    async def add(self, rows: List[Dict[str, Any]]) -> None:
+        """Adiciona linhas ao buffer e dispara a gravação se o lote encheu."""
+        self._verificar_erro()
+        if not rows:
+            return
+        if self._first_row_at is None:
+            self._first_row_at = asyncio.get_running_loop().time()
+        self._rows.extend(rows)
+        if len(self._rows) >= self.flush_size:
+            await self._flush()
+
+    async def flush(self) -> None:
+        """Envia o conteúdo atual do buffer para gravação."""
+        self._verificar_erro()
+        await self._flush()
+
+    def _verificar_erro(self) -> None:
+        """Repassa ao produtor o erro de uma gravação disparada pelo ticker."""
+        if self._erro is not None:
+            raise self._erro
+
+    async def _flush(self) -> None:
+        async with self._lock:
+            # Espera o lote anterior antes de retirar as linhas: se ele falhar, volta
+            # ao buffer e o erro é propagado sem perder o lote atual
+            await self._wait_inflight()
+            if not self._rows:
+                return
+            batch, self._rows = self._rows, []
+            self._first_row_at = None
+            self._inflight = asyncio.create_task(self._write(batch))
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            stats = await self._flush_async(batch)
+        except Exception:
+            # Mantém o lote até ele ser gravado com sucesso
+            self._rows[:0] = batch
+            if self._first_row_at is None:
+                self._first_row_at = asyncio.get_running_loop().time()
+            raise
+        self.lotes += 1
+        for key, value in (stats or {}).items():
+            self.totals[key] = self.totals.get(key, 0) + value
+        logger.debug(f"[{self.label}] Lote gravado ({len(batch)} linhas): {stats}")
+
+    async def _wait_inflight(self) -> None:
+        if self._inflight is not None:
+            task, self._inflight = self._inflight, None
+            await task
+
+    async def _tick(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval / 2)
+            if self._first_row_at is not None and loop.time() - self._first_row_at >= self.flush_interval:
+                try:
+                    await self._flush()
+                except Exception as erro:
+                    logger.error(f"[{self.label}] Falha ao gravar lote: {erro}", exc_info=True)
+                    self._erro = erro
+                    return
@@ -0,0 +1,73 @@
+"""
+Upsert em lote das compras do PNCP.
+
+O ``INSERT ... ON CONFLICT`` genérico fica em ``core.services.bulk_upsert``; aqui
+ficam as regras da Compra (FKs de lookup e campos recalculados).
+"""
+from typing import Any, Dict, Iterable, Mapping, Union
+
+from django_licitacao360.apps.core.services.bulk_upsert import (
+    DEFAULT_CHUNK_SIZE,
+    bulk_upsert,
+    concrete_fields,
+    empty_stats,
+    resolve_fk_ids,
+)
+
+from ..models import AmparoLegal, Compra, Modalidade, ModoDisputa
+
+__all__ = [
+    "COMPRA_CAMPOS_RECALCULADOS",
+    "COMPRA_FK_LOOKUPS",
+    "DEFAULT_CHUNK_SIZE",
+    "bulk_upsert",
+    "empty_stats",
+    "upsert_compras",
+]
+
+# Colunas FK da Compra -> modelo de lookup (a chave é o attname gravado no banco)
+COMPRA_FK_LOOKUPS = {
+    "modalidade_id": Modalidade,
+    "amparo_legal_id": AmparoLegal,
+    "modo_disputa_id": ModoDisputa,
+}
+
+# Campos da Compra recalculados a partir dos resultados (services/economia.py): o valor
+# da API só é gravado na inserção, para não sobrescrever o recálculo a cada sincronização
+COMPRA_CAMPOS_RECALCULADOS = ("valor_total_homologado", "percentual_desconto")
+
+
+def upsert_compras(
+    compras_data: Union[Mapping[Any, Dict[str, Any]], Iterable[Dict[str, Any]]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, int]:
+    """
+    Grava as compras processadas por ``_process_publicacao``/``_process_atualizacao``.
+
+    Aceita o dicionário deduplicado ``{(ano, seq): dados}`` ou uma lista de dados.
+    Os dicionários de entrada não são alterados. ``COMPRA_CAMPOS_RECALCULADOS`` só
+    são gravados em compras novas.
+
+    Returns:
+        ``{"compras", "inseridas", "atualizadas", "inalteradas", "ignoradas"}``
+    """
+    if isinstance(compras_data, Mapping):
+        compras_data = compras_data.values()
+    rows = [dict(compra) for compra in compras_data]
+
+    resolve_fk_ids(rows, COMPRA_FK_LOOKUPS)
+    excluidos = {"compra_id", *COMPRA_CAMPOS_RECALCULADOS}
+    update_fields = [
+        field.attname for field in concrete_fields(Compra, rows[0])
+        if field.attname not in excluidos and field.name not in excluidos
+    ] if rows else None
+    stats = bulk_upsert(
+        Compra,
+        rows,
+        conflict_fields=["compra_id"],
+        update_fields=update_fields,
+        chunk_size=chunk_size,
+        label="PNCP Task",
+    )
+    stats["compras"] = stats["inseridas"] + stats["atualizadas"] + stats["inalteradas"]
+    return stats
@@ -0,0 +1,187 @@
+"""
+Checkpoints duráveis para as cargas longas do PNCP (backfill de itens e resultados).
+
+Um diário SQLite local registra cada unidade de trabalho concluída (um mês de um
+órgão/modalidade, uma compra, um item) ou que falhou. Ao reiniciar, a carga pula
+as unidades concluídas e refaz apenas as pendentes e as que falharam.
+
+O diário é independente do banco principal: funciona mesmo que a carga seja
+interrompida no meio de uma transação, e pode ser apagado para recomeçar do zero.
+"""
+import os
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("PNCP_CHECKPOINT_DB", ".pncp_checkpoints.sqlite3")
+
+STATUS_OK = "ok"
+STATUS_FALHA = "falha"
+
+
+class CheckpointJournal:
+    """
+    Diário de unidades concluídas de uma carga (``job``), por exemplo ``"itens"``.
+
+    Uso::
+
+        with CheckpointJournal("itens") as journal:
+            pendentes = journal.pendentes(unidades)
+            ...
+            journal.marcar(unidade)                       # concluída
+            journal.marcar(unidade, erro="HTTP 500")      # falhou (será refeita)
+    """
+
+    def __init__(self, job: str, path: Optional[str] = None):
+        self.job = job
+        self.path = path or DEFAULT_CHECKPOINT_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def __enter__(self) -> "CheckpointJournal":
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                job TEXT NOT NULL,
+                unidade TEXT NOT NULL,
+                status TEXT NOT NULL,
+                erro TEXT,
+                tentativas INTEGER NOT NULL DEFAULT 1,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (job, unidade)
+            )
+            """
+        )
+        self._conn.commit()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise RuntimeError("CheckpointJournal deve ser usado dentro de 'with'")
+        return self._conn
+
+    def concluidas(self, prefixo: str = "") -> Set[str]:
+        """Unidades concluídas do job (opcionalmente só as que começam com ``prefixo``)."""
+        cur = self.conn.execute(
+            "SELECT unidade FROM checkpoints WHERE job = ? AND status = ? AND substr(unidade, 1, ?) = ?",
+            (self.job, STATUS_OK, len(prefixo), prefixo),
+        )
+        return {row[0] for row in cur}
+
+    def concluida(self, unidade: str) -> bool:
+        cur = self.conn.execute(
+            "SELECT 1 FROM checkpoints WHERE job = ? AND unidade = ? AND status = ?",
+            (self.job, unidade, STATUS_OK),
+        )
+        return cur.fetchone() is not None
+
+    def pendentes(self, unidades: Iterable[str], prefixo: str = "") -> List[str]:
+        """Filtra ``unidades`` mantendo a ordem e descartando as já concluídas."""
+        feitas = self.concluidas(prefixo)
+        return [unidade for unidade in unidades if unidade not in feitas]
+
+    def falhas(self) -> List[str]:
+        cur = self.conn.execute(
+            "SELECT unidade FROM checkpoints WHERE job = ? AND status = ? ORDER BY unidade",
+            (self.job, STATUS_FALHA),
+        )
+        return [row[0] for row in cur]
+
+    def marcar(self, unidade: str, erro: Optional[str] = None) -> None:
+        """Registra a unidade como concluída, ou como falha quando ``erro`` é informado."""
+        self.conn.execute(
+            """
+            INSERT INTO checkpoints (job, unidade, status, erro, tentativas, atualizado_em)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT (job, unidade) DO UPDATE
+               SET status = excluded.status,
+                   erro = excluded.erro,
+                   tentativas = checkpoints.tentativas + 1,
+                   atualizado_em = excluded.atualizado_em
+            """,
+            (self.job, unidade, STATUS_FALHA if erro else STATUS_OK, erro, time.time()),
+        )
+        self.conn.commit()
+
+    def limpar(self, prefixo: str = "") -> int:
+        """Apaga o diário do job (ou só as unidades com ``prefixo``) para recomeçar."""
+        cur = self.conn.execute(
+            "DELETE FROM checkpoints WHERE job = ? AND substr(unidade, 1, ?) = ?",
+            (self.job, len(prefixo), prefixo),
+        )
+        self.conn.commit()
+        return cur.rowcount
+
+
+def dividir_meses(inicio: date, fim: date) -> Iterator[Tuple[date, date]]:
+    """Divide ``inicio..fim`` em períodos mensais (o primeiro e o último podem ser parciais)."""
+    atual = inicio
+    while atual <= fim:
+        proximo_mes = (atual.replace(day=28) + timedelta(days=4)).replace(day=1)
+        limite = min(proximo_mes - timedelta(days=1), fim)
+        yield atual, limite
+        atual = limite + timedelta(days=1)
+
+
+def _formatar_duracao(segundos: float) -> str:
+    segundos = int(max(0, segundos))
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    if horas:
+        return f"{horas}h{minutos:02d}m"
+    if minutos:
+        return f"{minutos}m{segundos:02d}s"
+    return f"{segundos}s"
+
+
+class ProgressoETA:
+    """
+    Contador de progresso com estimativa de término pela taxa média observada.
+    ``avancar()`` devolve a linha de progresso quando é hora de exibi-la
+    (a cada ``intervalo`` segundos e ao terminar), senão ``None``.
+    """
+
+    def __init__(self, total: int, label: str, intervalo: float = 10.0, relogio=time.monotonic):
+        self.total = total
+        self.label = label
+        self.intervalo = intervalo
+        self.feitas = 0
+        self.falhas = 0
+        self._relogio = relogio
+        self._inicio = relogio()
+        self._ultimo = self._inicio
+
+    def eta(self) -> Optional[float]:
+        decorrido = self._relogio() - self._inicio
+        if not self.feitas or decorrido <= 0:
+            return None
+        return (self.total - self.feitas) * decorrido / self.feitas
+
+    def linha(self) -> str:
+        percentual = (self.feitas / self.total * 100) if self.total else 100.0
+        eta = self.eta()
+        return (
+            f"[{self.label}] {self.feitas}/{self.total} ({percentual:.1f}%) | "
+            f"falhas: {self.falhas} | decorrido: {_formatar_duracao(self._relogio() - self._inicio)} | "
+            f"ETA: {_formatar_duracao(eta) if eta is not None else '-'}"
+        )
+
+    def avancar(self, quantidade: int = 1, falha: bool = False) -> Optional[str]:
+        self.feitas += quantidade
+        if falha:
+            self.falhas += quantidade
+        agora = self._relogio()
+        if self.feitas >= self.total or agora - self._ultimo >= self.intervalo:
+            self._ultimo = agora
+            return self.linha()
+        return None
@@ -0,0 +1,76 @@
+"""
+Cliente HTTP das APIs do PNCP.
+
+``PncpClient`` é o ``ApiClient`` de ``core.services.http_client`` (pool de conexões,
+token bucket AIMD, ``Retry-After`` e backoff com jitter, contadores por endpoint)
+com os limites e cabeçalhos do PNCP.
+"""
+import os
+from typing import Dict, Optional
+
+from django_licitacao360.apps.core.services.http_client import (
+    AdaptiveTokenBucket,
+    ApiClient,
+    ApiRequestError,
+    EndpointStats,
+)
+
+__all__ = [
+    "AdaptiveTokenBucket",
+    "EndpointStats",
+    "PNCP_API_BASE",
+    "PNCP_CONSULTA_BASE",
+    "PncpClient",
+    "PncpRequestError",
+]
+
+PNCP_CONSULTA_BASE = "https://pncp.gov.br/api/consulta/v1"
+PNCP_API_BASE = "https://pncp.gov.br/api/pncp/v1"
+HEADERS = {
+    "User-Agent": "curl/8.8",
+    "Accept": "application/json",
+}
+
+# Limites padrão (podem ser ajustados por variável de ambiente)
+DEFAULT_RATE = float(os.getenv("PNCP_RATE", "5"))  # requisições/s iniciais
+DEFAULT_MAX_RATE = float(os.getenv("PNCP_MAX_RATE", "20"))
+DEFAULT_MIN_RATE = float(os.getenv("PNCP_MIN_RATE", "0.5"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("PNCP_MAX_CONCURRENCY", "10"))
+DEFAULT_MAX_RETRIES = int(os.getenv("PNCP_MAX_RETRIES", "5"))
+DEFAULT_TIMEOUT = 60
+
+# Nome mantido para o código do PNCP; é o erro genérico do ApiClient
+PncpRequestError = ApiRequestError
+
+
+class PncpClient(ApiClient):
+    """
+    ``ApiClient`` com os limites do PNCP. Uso::
+
+        async with PncpClient() as client:
+            payload = await client.get_json(url, params=params, endpoint="publicacao")
+    """
+
+    label = "PNCP Client"
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            rate=rate,
+            max_rate=max_rate,
+            min_rate=min_rate,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            timeout=timeout,
+            headers=headers or HEADERS,
+            **kwargs,
+        )
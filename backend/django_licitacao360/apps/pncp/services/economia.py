@@ -0,0 +1,99 @@
+"""
+Recalcula, em SQL set-based, os campos derivados dos resultados homologados:
+ItemCompra.percentual_economia e Compra.valor_total_homologado/percentual_desconto.
+"""
+import logging
+from typing import Dict, Iterable
+
+from django.db import connection
+
+from ..models import Compra, ItemCompra, ResultadoItem
+
+logger = logging.getLogger(__name__)
+
+# Limite de numeric(7, 4): valores fora da faixa viram NULL em vez de abortar o UPDATE
+_PERCENTUAL_MAX = 1000
+
+
+def _percentual_sql(estimado: str, homologado: str, casas: int) -> str:
+    """Expressão SQL de ((estimado - homologado) / estimado) * 100, protegida contra /0 e overflow."""
+    valor = f"ROUND((({estimado} - {homologado}) / NULLIF({estimado}, 0)) * 100, {casas})"
+    return f"CASE WHEN ABS({valor}) >= {_PERCENTUAL_MAX} THEN NULL ELSE {valor} END"
+
+
+def recalcular_economia_itens(item_ids: Iterable[str]) -> int:
+    """
+    Atualiza percentual_economia dos itens informados a partir da soma dos resultados.
+    Retorna o número de itens cujo valor mudou.
+    """
+    item_ids = list(set(item_ids))
+    if not item_ids:
+        return 0
+
+    qn = connection.ops.quote_name
+    itens = qn(ItemCompra._meta.db_table)
+    resultados = qn(ResultadoItem._meta.db_table)
+    percentual = _percentual_sql("ic.valor_total_estimado", "agg.total", 2)
+
+    sql = f"""
+        UPDATE {itens} AS ic
+           SET percentual_economia = {percentual}
+          FROM (
+                SELECT item_compra_id, SUM(valor_total_homologado) AS total
+                  FROM {resultados}
+                 WHERE item_compra_id = ANY(%s)
+                 GROUP BY item_compra_id
+               ) AS agg
+         WHERE ic.item_id = agg.item_compra_id
+           AND ic.percentual_economia IS DISTINCT FROM ({percentual})
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [item_ids])
+        return cursor.rowcount
+
+
+def recalcular_homologado_compras(item_ids: Iterable[str]) -> int:
+    """
+    Atualiza valor_total_homologado e percentual_desconto das compras dos itens informados
+    somando todos os resultados de cada compra.
+    Retorna o número de compras cujo valor mudou.
+    """
+    item_ids = list(set(item_ids))
+    if not item_ids:
+        return 0
+
+    qn = connection.ops.quote_name
+    compras = qn(Compra._meta.db_table)
+    itens = qn(ItemCompra._meta.db_table)
+    resultados = qn(ResultadoItem._meta.db_table)
+    percentual = _percentual_sql("c.valor_total_estimado", "agg.total", 4)
+
+    sql = f"""
+        UPDATE {compras} AS c
+           SET valor_total_homologado = agg.total,
+               percentual_desconto = {percentual}
+          FROM (
+                SELECT ic.compra_id, SUM(ri.valor_total_homologado) AS total
+                  FROM {itens} AS ic
+                  JOIN {resultados} AS ri ON ri.item_compra_id = ic.item_id
+                 WHERE ic.compra_id IN (
+                        SELECT compra_id FROM {itens} WHERE item_id = ANY(%s)
+                       )
+                 GROUP BY ic.compra_id
+               ) AS agg
+         WHERE c.compra_id = agg.compra_id
+           AND ROW(c.valor_total_homologado, c.percentual_desconto)
+               IS DISTINCT FROM ROW(agg.total, {percentual})
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [item_ids])
+        return cursor.rowcount
+
+
+def recalcular_derivados(item_ids: Iterable[str]) -> Dict[str, int]:
+    """Recalcula itens e compras afetados por um lote de resultados."""
+    item_ids = list(set(item_ids))
+    return {
+        "itens_recalculados": recalcular_economia_itens(item_ids),
+        "compras_recalculadas": recalcular_homologado_compras(item_ids),
+    }
@@ -0,0 +1,226 @@
+"""
+Exportação XLSX de uma unidade em memória constante.
+
+O workbook é gerado em modo write-only do openpyxl (cada aba é gravada em disco à
+medida que as linhas chegam) e salvo num arquivo temporário "spooled", que o view
+devolve em blocos. Cada aba é alimentada por uma única consulta lida com
+``.iterator(chunk_size=...)`` (a de itens vem de ``ItemCompra.objects.merge_resultados``);
+as abas por modalidade são preenchidas na mesma passada da aba
+``itens_resultado_merge``.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, IO, Iterator, Optional
+
+import openpyxl
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import (
+    Compra,
+    ItemCompra,
+    Modalidade,
+    ResumoCompraUnidade,
+    ResumoFornecedorUnidade,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = int(os.getenv("PNCP_EXPORT_CHUNK_SIZE", "2000"))
+# Acima deste tamanho o arquivo temporário sai da memória e vai para o disco
+EXPORT_SPOOL_MAX_BYTES = int(os.getenv("PNCP_EXPORT_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+COLUNAS_COMPRAS = [
+    "compra_id", "ano_compra", "sequencial_compra", "numero_compra", "codigo_unidade",
+    "objeto_compra", "modalidade", "amparo_legal", "modo_disputa", "numero_processo",
+    "data_publicacao_pncp", "data_atualizacao", "valor_total_estimado",
+    "valor_total_homologado", "percentual_desconto",
+]
+COLUNAS_MERGE = [
+    "ano_compra", "sequencial_compra", "numero_item", "descricao", "unidade_medida",
+    "valor_unitario_estimado", "valor_total_estimado", "quantidade",
+    "situacao_compra_item_nome", "cnpj_fornecedor", "valor_total_homologado",
+    "valor_unitario_homologado", "quantidade_homologada", "percentual_desconto",
+    "razao_social",
+]
+COLUNAS_MODALIDADE = [
+    "ano_compra", "sequencial_compra", "numero_item", "cnpj_fornecedor", "razao_social",
+    "descricao", "quantidade", "valor_total_estimado", "valor_total_homologado",
+    "percentual_desconto",
+]
+
+
+def nome_aba(nome: Optional[str]) -> str:
+    """Nome de aba válido no Excel (sem caracteres proibidos, até 31 caracteres)."""
+    if not nome:
+        return "modalidade"
+    nome = str(nome).strip()
+    nome = nome.replace("/", "-").replace("\\", "-").replace(":", "-")
+    nome = nome.replace("*", " ").replace("?", " ").replace("[", "(").replace("]", ")")
+    nome = " ".join(nome.split())
+    return nome[:31] if nome else "modalidade"
+
+
+def _celula(value: Any) -> Any:
+    """O Excel não aceita datetimes com fuso: converte para o horário local sem tzinfo."""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def _linha(row: Dict[str, Any], colunas) -> list:
+    return [_celula(row.get(coluna)) for coluna in colunas]
+
+
+def _iter_compras(codigo_unidade: str) -> Iterator[Dict[str, Any]]:
+    return (
+        Compra.objects
+        .filter(codigo_unidade=codigo_unidade)
+        .order_by("-ano_compra", "-sequencial_compra")
+        .values(
+            "compra_id", "ano_compra", "sequencial_compra", "numero_compra",
+            "codigo_unidade", "objeto_compra", "numero_processo",
+            "data_publicacao_pncp", "data_atualizacao", "valor_total_estimado",
+            "valor_total_homologado", "percentual_desconto",
+            modalidade_nome=F("modalidade__nome"),
+            amparo_legal_nome=F("amparo_legal__nome"),
+            modo_disputa_nome=F("modo_disputa__nome"),
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def gerar_xlsx_unidade(codigo_unidade: str) -> Optional[IO[bytes]]:
+    """
+    Gera o XLSX da unidade (abas compras, itens_resultado_merge, modalidades,
+    fornecedores, inexigibilidade e uma aba por modalidade).
+
+    Retorna o arquivo temporário posicionado no início, ou ``None`` se a unidade não
+    tem compras. Quem chama é responsável por fechá-lo.
+    """
+    if not Compra.objects.filter(codigo_unidade=codigo_unidade).exists():
+        return None
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws_compras = wb.create_sheet("compras")
+    ws_merge = wb.create_sheet("itens_resultado_merge")
+    ws_modalidades = wb.create_sheet("modalidades")
+    ws_fornecedores = wb.create_sheet("fornecedores")
+    ws_inex = wb.create_sheet("inexigibilidade")
+
+    # Abas por modalidade: criadas antes da passada, apenas para modalidades com itens
+    modalidade_ids = (
+        ItemCompra.objects
+        .filter(compra__codigo_unidade=codigo_unidade, compra__modalidade__isnull=False)
+        .values_list("compra__modalidade_id", flat=True)
+        .distinct()
+        .order_by()
+    )
+    modalidades = Modalidade.objects.in_bulk(list(modalidade_ids))
+    abas_modalidade = {}
+    for modalidade_id in sorted(modalidades):
+        modalidade = modalidades[modalidade_id]
+        if modalidade.nome.lower() == "inexigibilidade":
+            abas_modalidade[modalidade_id] = ws_inex
+            continue
+        ws_mod = wb.create_sheet(nome_aba(modalidade.nome))
+        ws_mod.append(COLUNAS_MODALIDADE)
+        abas_modalidade[modalidade_id] = ws_mod
+
+    # compras
+    ws_compras.append(COLUNAS_COMPRAS)
+    for compra in _iter_compras(codigo_unidade):
+        compra["modalidade"] = compra.pop("modalidade_nome")
+        compra["amparo_legal"] = compra.pop("amparo_legal_nome")
+        compra["modo_disputa"] = compra.pop("modo_disputa_nome")
+        ws_compras.append(_linha(compra, COLUNAS_COMPRAS))
+
+    # itens_resultado_merge + inexigibilidade + abas por modalidade, numa única passada
+    cabecalho_merge = cabecalho_inex = False
+    itens = ItemCompra.objects.merge_resultados(codigo_unidade)
+    for item in itens.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        if not cabecalho_merge:
+            ws_merge.append(COLUNAS_MERGE)
+            cabecalho_merge = True
+        ws_merge.append(_linha(item, COLUNAS_MERGE))
+
+        ws_mod = abas_modalidade.get(item["modalidade_id"])
+        if ws_mod is None:
+            continue
+        if ws_mod is ws_inex and not cabecalho_inex:
+            ws_inex.append(COLUNAS_MODALIDADE)
+            cabecalho_inex = True
+        ws_mod.append(_linha(item, COLUNAS_MODALIDADE))
+
+    # modalidades (resumo mantido pela ingestão)
+    ws_modalidades.append(
+        ["ano_compra", "modalidade_id", "modalidade_nome", "quantidade_compras", "valor_total_homologado"]
+    )
+    resumo_modalidades = (
+        ResumoCompraUnidade.objects
+        .filter(codigo_unidade=codigo_unidade)
+        .order_by("ano_compra", "modalidade_id")
+        .values_list(
+            "ano_compra", "modalidade_id", "modalidade__nome",
+            "quantidade_compras", "valor_total_homologado",
+        )
+    )
+    for row in resumo_modalidades.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        ws_modalidades.append(list(row))
+
+    # fornecedores (resumo mantido pela ingestão)
+    ws_fornecedores.append(["cnpj_fornecedor", "razao_social", "valor_total_homologado"])
+    resumo_fornecedores = (
+        ResumoFornecedorUnidade.objects
+        .filter(codigo_unidade=codigo_unidade)
+        .order_by("fornecedor_id")
+        .values_list("fornecedor_id", "fornecedor__razao_social", "valor_total_homologado")
+    )
+    for row in resumo_fornecedores.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        ws_fornecedores.append(list(row))
+
+    arquivo = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+    try:
+        wb.save(arquivo)
+    except Exception:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo
+
+
+def versao_dados_unidade(codigo_unidade: str) -> str:
+    """
+    Hash da versão dos dados exportados da unidade. Muda sempre que a ingestão grava
+    compras, itens ou resultados da unidade; enquanto não muda, o XLSX gerado pode
+    ser reaproveitado.
+    """
+    qn = connection.ops.quote_name
+    compras = qn(Compra._meta.db_table)
+    itens = qn(ItemCompra._meta.db_table)
+    resumo_compras = qn(ResumoCompraUnidade._meta.db_table)
+    resumo_fornecedores = qn(ResumoFornecedorUnidade._meta.db_table)
+    # Contagens e MAX dos timestamps, sem agregar o conteúdo de cada item
+    sql = f"""
+        SELECT c.total, c.atualizacao, i.total, i.atualizacao, rc.atualizacao, rf.atualizacao
+          FROM (SELECT COUNT(*) AS total, MAX(data_atualizacao) AS atualizacao
+                  FROM {compras} WHERE codigo_unidade = %s) AS c,
+               (SELECT COUNT(*) AS total, MAX(ic.atualizado_em) AS atualizacao
+                  FROM {itens} AS ic
+                  JOIN {compras} AS co ON co.compra_id = ic.compra_id
+                 WHERE co.codigo_unidade = %s) AS i,
+               (SELECT MAX(atualizado_em) AS atualizacao
+                  FROM {resumo_compras} WHERE codigo_unidade = %s) AS rc,
+               (SELECT MAX(atualizado_em) AS atualizacao
+                  FROM {resumo_fornecedores} WHERE codigo_unidade = %s) AS rf
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [codigo_unidade] * 4)
+        row = cursor.fetchone()
+    return hashlib.sha1("|".join(str(value) for value in row).encode("utf-8")).hexdigest()
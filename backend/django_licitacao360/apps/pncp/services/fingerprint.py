@@ -0,0 +1,57 @@
+"""
+Impressões digitais (hash) do conteúdo recebido do PNCP.
+
+Compra e ItemCompra guardam ``hash_conteudo`` (dados relevantes + data de
+atualização da API) e o hash vigente na última busca da etapa seguinte
+(``hash_itens_sincronizados`` / ``hash_resultados_sincronizados``). As etapas de
+itens e resultados só voltam à API quando os dois diferem. O cálculo do hash fica
+em ``core.services.fingerprint``.
+"""
+from typing import Dict, Optional
+
+from django.db.models import F, Q
+
+from django_licitacao360.apps.core.services.fingerprint import fingerprint
+
+from ..models import Compra, ItemCompra
+
+__all__ = [
+    "filtro_alterado",
+    "fingerprint",
+    "marcar_itens_sincronizados",
+    "marcar_resultados_sincronizados",
+]
+
+BULK_UPDATE_BATCH_SIZE = 1000
+
+
+def filtro_alterado(campo_sincronizado: str, incluir_sem_hash: bool = False) -> Q:
+    """
+    Linhas com hash conhecido que ainda não foi sincronizado pela etapa seguinte.
+    Linhas sem ``hash_conteudo`` (carregadas de outras fontes) só entram com
+    ``incluir_sem_hash=True``.
+    """
+    alterado = Q(hash_conteudo__isnull=False) & (
+        Q(**{f"{campo_sincronizado}__isnull": True})
+        | ~Q(**{campo_sincronizado: F("hash_conteudo")})
+    )
+    if incluir_sem_hash:
+        alterado |= Q(hash_conteudo__isnull=True)
+    return alterado
+
+
+def _marcar(model, campo: str, marcas: Dict[str, Optional[str]]) -> int:
+    objs = [model(pk=pk, **{campo: valor}) for pk, valor in marcas.items() if valor]
+    if not objs:
+        return 0
+    return model.objects.bulk_update(objs, [campo], batch_size=BULK_UPDATE_BATCH_SIZE)
+
+
+def marcar_itens_sincronizados(marcas: Dict[str, Optional[str]]) -> int:
+    """Grava ``{compra_id: hash_conteudo}`` lido antes da busca dos itens."""
+    return _marcar(Compra, "hash_itens_sincronizados", marcas)
+
+
+def marcar_resultados_sincronizados(marcas: Dict[str, Optional[str]]) -> int:
+    """Grava ``{item_id: hash_conteudo}`` lido antes da busca dos resultados."""
+    return _marcar(ItemCompra, "hash_resultados_sincronizados", marcas)
@@ -0,0 +1,194 @@
+"""
+Assistente de índices: reexecuta uma carga de consultas gravada com
+``EXPLAIN (ANALYZE, FORMAT JSON)`` e aponta leituras sequenciais com filtro, com uma
+sugestão de índice para cada uma.
+
+A carga é um arquivo JSONL (``{"sql": ..., "params": [...]}`` por linha, o formato que
+``gravar_workload`` produz) ou um ``.sql`` com comandos separados por ``;``. Só
+consultas ``SELECT`` são reexecutadas, sempre dentro de uma transação desfeita.
+"""
+import json
+import logging
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Linhas descartadas pelo filtro a partir das quais a leitura sequencial é reportada
+MIN_LINHAS_REMOVIDAS = 1000
+
+_RE_COMPARACAO = re.compile(
+    r"\(?\(?(?:\w+\.)?\"?(?P<coluna>[a-z_][a-z0-9_]*)\"?\)?(?:::\w+(?:\s\w+)*)?\)?\s*"
+    r"(?P<operador>=|<>|<=|>=|<|>|~~\*?|!~~\*?|IS NOT NULL|IS NULL|= ANY)",
+    re.IGNORECASE,
+)
+_OPERADORES_IGUALDADE = {"=", "= ANY", "IS NULL"}
+_OPERADORES_INTERVALO = {"<", ">", "<=", ">="}
+
+
+class _Rollback(Exception):
+    pass
+
+
+@dataclass
+class Achado:
+    """Leitura sequencial encontrada no plano de uma consulta da carga."""
+    relacao: str
+    filtro: str
+    linhas: int
+    linhas_removidas: int
+    tempo_ms: float
+    consulta: int
+    sugestao: Optional[str] = None
+    colunas: List[str] = field(default_factory=list)
+
+
+@contextmanager
+def gravar_workload(caminho: str) -> Iterator[None]:
+    """Grava em JSONL os ``SELECT`` executados pela conexão padrão dentro do bloco."""
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        def registrar(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith("SELECT"):
+                arquivo.write(json.dumps({"sql": sql, "params": list(params or [])}, default=str) + "\n")
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(registrar):
+            yield
+
+
+def carregar_workload(caminho: str) -> List[Tuple[str, List[Any]]]:
+    """Lê a carga gravada (JSONL ou ``.sql``) e devolve apenas as consultas ``SELECT``."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        conteudo = arquivo.read()
+
+    consultas: List[Tuple[str, List[Any]]] = []
+    if caminho.endswith(".sql"):
+        for comando in conteudo.split(";"):
+            comando = comando.strip()
+            if comando:
+                consultas.append((comando, []))
+    else:
+        for linha in conteudo.splitlines():
+            if linha.strip():
+                registro = json.loads(linha)
+                consultas.append((registro["sql"], registro.get("params") or []))
+    return [(sql, params) for sql, params in consultas if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+
+def colunas_do_filtro(filtro: str) -> List[str]:
+    """
+    Colunas de um ``Filter`` do plano, na ordem de um índice composto: primeiro as de
+    igualdade, depois as de intervalo. ``LIKE``/``ILIKE`` com curinga inicial não usam
+    B-tree e ficam de fora.
+    """
+    igualdade: List[str] = []
+    intervalo: List[str] = []
+    for match in _RE_COMPARACAO.finditer(filtro):
+        coluna = match.group("coluna").lower()
+        operador = match.group("operador").upper()
+        if operador in _OPERADORES_IGUALDADE and coluna not in igualdade:
+            igualdade.append(coluna)
+        elif operador in _OPERADORES_INTERVALO and coluna not in intervalo:
+            intervalo.append(coluna)
+    return igualdade + [coluna for coluna in intervalo if coluna not in igualdade]
+
+
+def sugerir_indice(relacao: str, colunas: Sequence[str]) -> Optional[str]:
+    if not colunas:
+        return None
+    qn = connection.ops.quote_name
+    nome = f"{relacao}_{'_'.join(colunas)}_idx"[:63]
+    return f"CREATE INDEX CONCURRENTLY {qn(nome)} ON {qn(relacao)} ({', '.join(qn(c) for c in colunas)});"
+
+
+def _nos(plano: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def analisar_plano(
+    plano: Dict[str, Any], consulta: int = 0, min_linhas_removidas: int = MIN_LINHAS_REMOVIDAS
+) -> List[Achado]:
+    """Leituras sequenciais com filtro que descartam ao menos ``min_linhas_removidas``."""
+    achados = []
+    for no in _nos(plano.get("Plan", plano)):
+        if no.get("Node Type") not in ("Seq Scan", "Parallel Seq Scan") or "Filter" not in no:
+            continue
+        loops = no.get("Actual Loops", 1) or 1
+        removidas = int(no.get("Rows Removed by Filter", 0)) * loops
+        if removidas < min_linhas_removidas:
+            continue
+        relacao = no["Relation Name"]
+        colunas = colunas_do_filtro(no["Filter"])
+        achados.append(Achado(
+            relacao=relacao,
+            filtro=no["Filter"],
+            linhas=int(no.get("Actual Rows", no.get("Plan Rows", 0))) * loops,
+            linhas_removidas=removidas,
+            tempo_ms=float(no.get("Actual Total Time", 0.0)) * loops,
+            consulta=consulta,
+            sugestao=sugerir_indice(relacao, colunas),
+            colunas=colunas,
+        ))
+    return achados
+
+
+def explicar(sql: str, params: Sequence[Any], analyze: bool = True) -> Dict[str, Any]:
+    """Plano JSON da consulta; com ``analyze`` ela é executada numa transação desfeita."""
+    opcoes = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    plano: Dict[str, Any] = {}
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Sem parâmetros, None evita que "%" de LIKE seja lido como placeholder
+            cursor.execute(f"EXPLAIN ({opcoes}) {sql}", list(params) or None)
+            resultado = cursor.fetchone()[0]
+            if isinstance(resultado, str):
+                resultado = json.loads(resultado)
+            plano = resultado[0]
+            raise _Rollback()
+    except _Rollback:
+        pass
+    return plano
+
+
+def analisar_workload(
+    consultas: Sequence[Tuple[str, Sequence[Any]]],
+    analyze: bool = True,
+    min_linhas_removidas: int = MIN_LINHAS_REMOVIDAS,
+) -> Tuple[List[Achado], List[Tuple[int, str]]]:
+    """Reexecuta a carga e devolve (achados, erros por número da consulta)."""
+    achados: List[Achado] = []
+    erros: List[Tuple[int, str]] = []
+    for numero, (sql, params) in enumerate(consultas, start=1):
+        try:
+            plano = explicar(sql, params, analyze=analyze)
+        except Exception as e:
+            logger.warning(f"Consulta {numero} da carga falhou no EXPLAIN: {e}")
+            erros.append((numero, str(e)))
+            continue
+        achados.extend(analisar_plano(plano, consulta=numero, min_linhas_removidas=min_linhas_removidas))
+    return achados, erros
+
+
+def agrupar_sugestoes(achados: Sequence[Achado]) -> List[Dict[str, Any]]:
+    """Uma linha por índice sugerido, com o custo somado das leituras que ele evitaria."""
+    grupos: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+    for achado in achados:
+        chave = (achado.relacao, tuple(achado.colunas))
+        grupo = grupos.setdefault(chave, {
+            "relacao": achado.relacao,
+            "colunas": list(achado.colunas),
+            "sugestao": achado.sugestao,
+            "consultas": set(),
+            "linhas_removidas": 0,
+            "tempo_ms": 0.0,
+        })
+        grupo["consultas"].add(achado.consulta)
+        grupo["linhas_removidas"] += achado.linhas_removidas
+        grupo["tempo_ms"] += achado.tempo_ms
+    return sorted(grupos.values(), key=lambda g: g["tempo_ms"], reverse=True)
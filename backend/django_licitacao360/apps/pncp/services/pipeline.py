@@ -0,0 +1,148 @@
+"""
+Pipeline produtor/consumidor para os endpoints paginados do PNCP.
+
+Um número fixo de fetchers busca as páginas e as coloca numa ``asyncio.Queue``
+limitada; o consumidor processa cada página assim que ela chega, descarta
+duplicatas dentro de uma janela deslizante e entrega as linhas a um
+``AsyncUpsertBuffer``, que grava em lotes enquanto as demais páginas ainda
+estão sendo baixadas. A memória fica limitada pelo tamanho da fila, do buffer
+e da janela, independentemente do número de páginas.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .buffer import AsyncUpsertBuffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCHERS = 10
+DEFAULT_QUEUE_SIZE = 20
+DEFAULT_DEDUP_WINDOW = 50_000
+
+PageResult = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+
+class SlidingWindowDedup:
+    """
+    Lembra as últimas ``size`` chaves vistas e a impressão digital de cada linha.
+
+    Uma linha é considerada duplicada apenas se a mesma chave já apareceu na janela
+    com o mesmo conteúdo; se o conteúdo mudou, ela segue adiante (vale a última).
+    """
+
+    def __init__(self, size: int = DEFAULT_DEDUP_WINDOW):
+        self.size = max(1, size)
+        self._seen: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def seen(self, key: Hashable, row: Dict[str, Any]) -> bool:
+        fingerprint = hash(repr(sorted(row.items())))
+        duplicated = self._seen.get(key) == fingerprint
+        self._seen[key] = fingerprint
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.size:
+            self._seen.popitem(last=False)
+        return duplicated
+
+
+async def stream_paginas(
+    fetch_page: Callable[[int], Awaitable[PageResult]],
+    extract: Callable[[Dict[str, Any]], Tuple[List[Dict[str, Any]], int, int]],
+    process: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+    key: Callable[[Dict[str, Any]], Hashable],
+    buffer: AsyncUpsertBuffer,
+    label: str = "PNCP Pipeline",
+    fetchers: int = DEFAULT_FETCHERS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    dedup_window: int = DEFAULT_DEDUP_WINDOW,
+) -> Dict[str, int]:
+    """
+    Percorre todas as páginas de um endpoint e envia as linhas processadas ao buffer.
+
+    Args:
+        fetch_page: ``fetch_page(pagina) -> (payload, erro)``
+        extract: ``extract(payload) -> (registros, total_paginas, numero_pagina)``
+        process: Converte um registro da API em linha (``None`` = ignorado)
+        key: Chave de deduplicação da linha processada
+        buffer: Buffer já aberto (``async with``) que grava as linhas
+        label: Prefixo usado nos logs
+        fetchers: Número de páginas buscadas em paralelo
+        queue_size: Páginas baixadas aguardando processamento (backpressure)
+        dedup_window: Quantidade de chaves lembradas para deduplicação
+
+    Returns:
+        ``{"paginas", "ignoradas", "duplicadas", "falhas"}``. Páginas que falharam
+        contam em ``falhas`` e também em ``ignoradas``, como nos fetchers anteriores.
+    """
+    totals = {"paginas": 0, "ignoradas": 0, "duplicadas": 0, "falhas": 0}
+    dedup = SlidingWindowDedup(dedup_window)
+
+    async def consume(registros: List[Dict[str, Any]]) -> None:
+        rows = []
+        for registro in registros:
+            row = process(registro)
+            if not row:
+                totals["ignoradas"] += 1
+                continue
+            if dedup.seen(key(row), row):
+                totals["duplicadas"] += 1
+                continue
+            rows.append(row)
+        totals["paginas"] += 1
+        await buffer.add(rows)
+
+    payload, err = await fetch_page(1)
+    if err:
+        logger.error(f"[{label}] Falha ao buscar página 1: {err}")
+        totals["falhas"] += 1
+        return totals
+
+    registros, total_paginas, _ = extract(payload)
+    logger.info(f"[{label}] Total de páginas: {total_paginas}")
+    await consume(registros)
+
+    if total_paginas <= 1:
+        return totals
+
+    queue: "asyncio.Queue[Optional[Tuple[int, PageResult]]]" = asyncio.Queue(maxsize=max(1, queue_size))
+    paginas = iter(range(2, total_paginas + 1))
+
+    async def fetcher() -> None:
+        for pg in paginas:
+            try:
+                result = await fetch_page(pg)
+            except Exception as e:
+                result = (None, f"{type(e).__name__}: {e!r}")
+            await queue.put((pg, result))
+
+    async def produce() -> None:
+        try:
+            await asyncio.gather(*(fetcher() for _ in range(max(1, fetchers))))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            pg, (payload, err) = item
+            if err:
+                logger.warning(f"[{label}] Falha ao buscar página {pg}: {err}")
+                totals["ignoradas"] += 1
+                totals["falhas"] += 1
+                continue
+            registros, _, _ = extract(payload)
+            await consume(registros)
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    return totals
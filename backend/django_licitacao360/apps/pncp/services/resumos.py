@@ -0,0 +1,147 @@
+"""
+Tabelas de resumo dos painéis do PNCP (ResumoCompraUnidade e ResumoFornecedorUnidade).
+
+As agregações são recalculadas por unidade: a cada lote gravado pela ingestão, as
+linhas de resumo das unidades tocadas são substituídas por um único INSERT ... SELECT
+agrupado. Os endpoints de painel leem direto dos resumos, então o custo por requisição
+não cresce com o volume de compras e resultados.
+
+Lotes ou shards que tocam a mesma unidade ao mesmo tempo são serializados por um
+``pg_advisory_xact_lock`` por unidade (em ordem, para não haver deadlock); a
+recriação completa trava a tabela de resumo inteira.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+
+from ..models import (
+    Compra,
+    ItemCompra,
+    ResultadoItem,
+    ResumoCompraUnidade,
+    ResumoFornecedorUnidade,
+)
+
+logger = logging.getLogger(__name__)
+
+# Primeira chave dos advisory locks de cada resumo (a segunda é o hash da unidade)
+LOCK_RESUMO_COMPRAS = 7101
+LOCK_RESUMO_FORNECEDORES = 7102
+
+
+def _normalizar(codigos_unidade: Optional[Iterable[str]]) -> Optional[List[str]]:
+    if codigos_unidade is None:
+        return None
+    return sorted({str(codigo) for codigo in codigos_unidade if codigo})
+
+
+def _travar_unidades(cursor, tabela: str, namespace: int, codigos: Optional[List[str]]) -> None:
+    """Trava as unidades até o fim da transação (ou a tabela toda, sem unidades)."""
+    if codigos is None:
+        cursor.execute(f"LOCK TABLE {tabela} IN EXCLUSIVE MODE")
+        return
+    cursor.execute(
+        """
+        SELECT pg_advisory_xact_lock(%s, hashtext(u))
+          FROM (SELECT u FROM unnest(%s::text[]) AS u ORDER BY u) AS unidades
+        """,
+        [namespace, codigos],
+    )
+
+
+def atualizar_resumo_compras(codigos_unidade: Optional[Iterable[str]] = None) -> int:
+    """
+    Recalcula ResumoCompraUnidade das unidades informadas (todas quando ``None``).
+    Retorna o número de linhas de resumo gravadas.
+    """
+    codigos = _normalizar(codigos_unidade)
+    if codigos == []:
+        return 0
+
+    qn = connection.ops.quote_name
+    resumo = qn(ResumoCompraUnidade._meta.db_table)
+    compras = qn(Compra._meta.db_table)
+    filtro = "WHERE codigo_unidade = ANY(%s)" if codigos is not None else ""
+    params = [codigos] if codigos is not None else []
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _travar_unidades(cursor, resumo, LOCK_RESUMO_COMPRAS, codigos)
+        cursor.execute(f"DELETE FROM {resumo} {filtro}", params)
+        cursor.execute(
+            f"""
+            INSERT INTO {resumo} (
+                ano_compra, codigo_unidade, modalidade_id, quantidade_compras,
+                valor_total_estimado, valor_total_homologado, atualizado_em
+            )
+            SELECT ano_compra, codigo_unidade, modalidade_id, COUNT(*),
+                   SUM(valor_total_estimado), SUM(valor_total_homologado), NOW()
+              FROM {compras}
+             {filtro}
+             GROUP BY ano_compra, codigo_unidade, modalidade_id
+            """,
+            params,
+        )
+        return cursor.rowcount
+
+
+def atualizar_resumo_fornecedores(codigos_unidade: Optional[Iterable[str]] = None) -> int:
+    """
+    Recalcula ResumoFornecedorUnidade das unidades informadas (todas quando ``None``).
+    Retorna o número de linhas de resumo gravadas.
+    """
+    codigos = _normalizar(codigos_unidade)
+    if codigos == []:
+        return 0
+
+    qn = connection.ops.quote_name
+    resumo = qn(ResumoFornecedorUnidade._meta.db_table)
+    compras = qn(Compra._meta.db_table)
+    itens = qn(ItemCompra._meta.db_table)
+    resultados = qn(ResultadoItem._meta.db_table)
+    filtro = "WHERE codigo_unidade = ANY(%s)" if codigos is not None else ""
+    filtro_compras = "WHERE c.codigo_unidade = ANY(%s)" if codigos is not None else ""
+    params = [codigos] if codigos is not None else []
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _travar_unidades(cursor, resumo, LOCK_RESUMO_FORNECEDORES, codigos)
+        cursor.execute(f"DELETE FROM {resumo} {filtro}", params)
+        cursor.execute(
+            f"""
+            INSERT INTO {resumo} (
+                codigo_unidade, fornecedor_id, quantidade_resultados,
+                valor_total_homologado, atualizado_em
+            )
+            SELECT c.codigo_unidade, ri.fornecedor_id, COUNT(*),
+                   COALESCE(SUM(ri.valor_total_homologado), 0), NOW()
+              FROM {resultados} AS ri
+              JOIN {itens} AS ic ON ic.item_id = ri.item_compra_id
+              JOIN {compras} AS c ON c.compra_id = ic.compra_id
+             {filtro_compras}
+             GROUP BY c.codigo_unidade, ri.fornecedor_id
+            """,
+            params,
+        )
+        return cursor.rowcount
+
+
+def unidades_dos_itens(item_ids: Iterable[str]) -> List[str]:
+    """Códigos de unidade das compras dos itens informados."""
+    item_ids = list(set(item_ids))
+    if not item_ids:
+        return []
+    return list(
+        Compra.objects
+        .filter(itens__item_id__in=item_ids)
+        .values_list("codigo_unidade", flat=True)
+        .distinct()
+    )
+
+
+def atualizar_resumos(codigos_unidade: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Recalcula os dois resumos das unidades informadas (todas quando ``None``)."""
+    codigos = _normalizar(codigos_unidade)
+    return {
+        "resumo_compras": atualizar_resumo_compras(codigos),
+        "resumo_fornecedores": atualizar_resumo_fornecedores(codigos),
+    }
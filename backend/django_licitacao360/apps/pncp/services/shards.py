@@ -0,0 +1,113 @@
+"""
+Divisão da sincronização do PNCP em shards independentes (cnpj × modalidade × período).
+
+Cada shard é um dicionário serializável em JSON, para trafegar entre as tasks do
+Celery encadeadas (publicações → itens → resultados). Cada etapa acrescenta ao
+shard seus contadores em ``totais[etapa]`` e a maior ``data_atualizacao`` vista
+em ``max_data_atualizacao[etapa]``; o callback do chord junta tudo com
+``agregar_shards``.
+"""
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DIAS_POR_SHARD = int(os.getenv("PNCP_SHARD_DIAS", "5"))
+
+
+def dividir_periodo(inicio: date, fim: date, dias: int = DIAS_POR_SHARD) -> List[Tuple[date, date]]:
+    """Divide ``inicio..fim`` (inclusive) em intervalos consecutivos de até ``dias`` dias."""
+    dias = max(1, dias)
+    intervalos = []
+    atual = inicio
+    while atual <= fim:
+        limite = min(atual + timedelta(days=dias - 1), fim)
+        intervalos.append((atual, limite))
+        atual = limite + timedelta(days=1)
+    return intervalos
+
+
+def criar_shard(
+    cnpj: str,
+    modalidade: int,
+    data_inicial: date,
+    data_final: date,
+    incremental: bool = False,
+    full: bool = False,
+) -> Dict[str, Any]:
+    return {
+        "cnpj": cnpj,
+        "modalidade": modalidade,
+        "data_inicial": data_inicial.isoformat(),
+        "data_final": data_final.isoformat(),
+        "incremental": incremental,
+        "full": full,
+        "totais": {},
+        "max_data_atualizacao": {},
+        "erros": [],
+    }
+
+
+def gerar_shards(
+    janelas: Iterable[Tuple[str, int, date, date, bool]],
+    dias: int = DIAS_POR_SHARD,
+    full: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Gera os shards a partir de ``(cnpj, modalidade, inicio, fim, incremental)``,
+    dividindo cada janela em períodos de ``dias`` dias.
+    """
+    shards = []
+    for cnpj, modalidade, inicio, fim, incremental in janelas:
+        for data_inicial, data_final in dividir_periodo(inicio, fim, dias):
+            shards.append(criar_shard(cnpj, modalidade, data_inicial, data_final, incremental, full))
+    return shards
+
+
+def _max_iso(atual: Optional[str], novo: Optional[str]) -> Optional[str]:
+    # Datas ISO com o mesmo fuso ordenam corretamente como texto
+    if not novo:
+        return atual
+    if not atual or novo > atual:
+        return novo
+    return atual
+
+
+def agregar_shards(shards: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Soma os contadores dos shards por etapa e agrupa as janelas por (cnpj, modalidade).
+
+    Returns:
+        ``{"shards", "totais": {etapa: {...}}, "janelas": {"cnpj:modalidade": {...}}}``.
+        Cada janela traz o período coberto, os contadores (incluindo ``falhas``) e a
+        maior ``data_atualizacao`` por etapa, usados para avançar o estado incremental.
+    """
+    totais: Dict[str, Dict[str, int]] = {}
+    janelas: Dict[str, Dict[str, Any]] = {}
+    quantidade = 0
+
+    for shard in shards:
+        if not shard:
+            continue
+        quantidade += 1
+        chave = f"{shard['cnpj']}:{shard['modalidade']}"
+        janela = janelas.setdefault(chave, {
+            "cnpj": shard["cnpj"],
+            "modalidade": shard["modalidade"],
+            "data_inicial": shard["data_inicial"],
+            "data_final": shard["data_final"],
+            "totais": {},
+            "max_data_atualizacao": {},
+        })
+        janela["data_inicial"] = min(janela["data_inicial"], shard["data_inicial"])
+        janela["data_final"] = max(janela["data_final"], shard["data_final"])
+
+        for etapa, contadores in shard.get("totais", {}).items():
+            for destino in (totais.setdefault(etapa, {}), janela["totais"].setdefault(etapa, {})):
+                for key, value in contadores.items():
+                    if isinstance(value, int) and not isinstance(value, bool):
+                        destino[key] = destino.get(key, 0) + value
+
+        for etapa, valor in shard.get("max_data_atualizacao", {}).items():
+            janela["max_data_atualizacao"][etapa] = _max_iso(janela["max_data_atualizacao"].get(etapa), valor)
+
+    return {"shards": quantidade, "totais": totais, "janelas": janelas}
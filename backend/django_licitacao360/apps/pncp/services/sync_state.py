@@ -0,0 +1,99 @@
+"""
+Sincronização incremental do PNCP: janelas de busca a partir das marcas d'água
+gravadas em EstadoSincronizacao.
+
+- Etapa ``compras``: consulta o endpoint /contratacoes/atualizacao a partir do fim
+  da última janela concluída (menos uma sobreposição de segurança).
+- Etapas ``itens`` e ``resultados``: selecionam no banco as compras cuja
+  ``data_atualizacao`` é posterior à maior data já processada pela etapa.
+
+Sem estado gravado, ou com ``full=True``, volta-se à janela fixa dos últimos
+``JANELA_PADRAO_DIAS`` dias.
+"""
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import EstadoSincronizacao
+
+logger = logging.getLogger(__name__)
+
+JANELA_PADRAO_DIAS = 10
+SOBREPOSICAO_DIAS = int(os.getenv("PNCP_SYNC_SOBREPOSICAO_DIAS", "1"))
+
+
+def calcular_janela(
+    estado: Optional[EstadoSincronizacao],
+    hoje: date,
+    full: bool = False,
+    dias: int = JANELA_PADRAO_DIAS,
+    sobreposicao: int = SOBREPOSICAO_DIAS,
+) -> Tuple[date, date, bool]:
+    """
+    Retorna ``(data_inicial, data_final, incremental)`` para a próxima execução.
+
+    ``incremental`` é False quando a janela padrão foi usada (sem estado ou ``full``).
+    """
+    if full or estado is None or estado.janela_fim is None:
+        return hoje - timedelta(days=dias - 1), hoje, False
+
+    if estado.etapa != EstadoSincronizacao.ETAPA_COMPRAS and estado.max_data_atualizacao:
+        referencia = timezone.localtime(estado.max_data_atualizacao).date()
+    else:
+        referencia = estado.janela_fim
+
+    inicio = min(referencia - timedelta(days=sobreposicao), hoje)
+    return inicio, hoje, True
+
+
+def obter_estados(
+    cnpj: str,
+    etapa: str,
+    modalidades: Iterable[int],
+) -> Dict[int, EstadoSincronizacao]:
+    """Estados gravados para as modalidades informadas, indexados pelo código."""
+    return {
+        estado.modalidade: estado
+        for estado in EstadoSincronizacao.objects.filter(
+            cnpj=cnpj, etapa=etapa, modalidade__in=list(modalidades)
+        )
+    }
+
+
+def registrar_sucesso(
+    cnpj: str,
+    modalidade: int,
+    etapa: str,
+    janela_inicio: date,
+    janela_fim: date,
+    max_data_atualizacao: Optional[datetime],
+    totals: Dict[str, Any],
+) -> EstadoSincronizacao:
+    """
+    Grava a janela concluída e avança a marca d'água (nunca para trás).
+    Só deve ser chamada quando todas as páginas/compras da janela foram processadas.
+    """
+    with transaction.atomic():
+        estado, _ = EstadoSincronizacao.objects.select_for_update().get_or_create(
+            cnpj=cnpj, modalidade=modalidade, etapa=etapa,
+        )
+        estado.janela_inicio = janela_inicio
+        estado.janela_fim = janela_fim
+        if max_data_atualizacao and (
+            estado.max_data_atualizacao is None or max_data_atualizacao > estado.max_data_atualizacao
+        ):
+            estado.max_data_atualizacao = max_data_atualizacao
+        estado.ultimo_resultado = {
+            key: value for key, value in totals.items() if isinstance(value, int)
+        }
+        estado.save()
+
+    logger.info(
+        f"[PNCP Sync] Estado gravado - cnpj={cnpj}, etapa={etapa}, modalidade={modalidade}, "
+        f"janela={janela_inicio}..{janela_fim}, max_data_atualizacao={estado.max_data_atualizacao}"
+    )
+    return estado
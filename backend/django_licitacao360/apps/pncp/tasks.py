@@ -2,27 +2,37 @@
 Tasks do Celery para atualização de dados do PNCP
 """
 import asyncio
-import json
 import logging
-from datetime import date, datetime, timedelta
+import os
+from datetime import date, datetime, timezone as dt_timezone
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-import aiohttp
-from celery import shared_task
+from celery import chain, chord, shared_task
 from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 
-from .models import AmparoLegal, Compra, ItemCompra, Modalidade, ModoDisputa, ResultadoItem, Fornecedor
+from .models import Compra, EstadoSincronizacao, ItemCompra, ResultadoItem, Fornecedor
+from .services.buffer import AsyncUpsertBuffer
+from .services.bulk_upsert import bulk_upsert, upsert_compras
+from .services.client import PNCP_API_BASE, PNCP_CONSULTA_BASE, PncpClient, PncpRequestError
+from .services.economia import recalcular_derivados
+from .services.fingerprint import (
+    filtro_alterado,
+    fingerprint,
+    marcar_itens_sincronizados,
+    marcar_resultados_sincronizados,
+)
+from .services.pipeline import stream_paginas
+from .services.resumos import atualizar_resumo_compras, atualizar_resumo_fornecedores, unidades_dos_itens
+from .services.shards import DIAS_POR_SHARD, agregar_shards, gerar_shards
+from .services.sync_state import calcular_janela, obter_estados, registrar_sucesso
 
 logger = logging.getLogger(__name__)
 
-PNCP_BASE = "https://pncp.gov.br/api/consulta/v1"
-HEADERS = {
-    "User-Agent": "curl/8.8",
-    "Accept": "application/json",
-}
+PNCP_BASE = PNCP_CONSULTA_BASE
 
 # CNPJ padrão do órgão (pode ser configurado via variável de ambiente)
 DEFAULT_CNPJ = "00394502000144"
@@ -88,125 +98,211 @@ def _parse_date(value: Optional[str]) -> Optional[datetime]:
 
 
 async def _get_publications_page(
-    session: aiohttp.ClientSession,
+    client: PncpClient,
     params: Dict[str, str],
-    max_retries: int = 3,
-    backoff_base: float = 1.0,
 ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
-    Faz GET assíncrono com retry/backoff simples.
+    Faz GET assíncrono de uma página de publicações (retry/rate limit no PncpClient).
     Retorna (payload_json, erro_str)
     """
     url = f"{PNCP_BASE}/contratacoes/publicacao"
-    timeout = aiohttp.ClientTimeout(total=60)
     # Log da URL completa para debug
     url_with_params = f"{url}?" + "&".join([f"{k}={v}" for k, v in params.items()])
     logger.debug(f"[PNCP Task] GET {url_with_params}")
-    for attempt in range(1, max_retries + 1):
-        try:
-            async with session.get(url, params=params, headers=HEADERS, timeout=timeout) as resp:
-                if resp.status != 200:
-                    body = (await resp.text())[:240]
-                    err = f"API {resp.status}: {body}"
-                    if attempt < max_retries and resp.status in (500, 502, 503, 504):
-                        await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                        continue
-                    return None, err
-                ct = (resp.headers.get("Content-Type") or "").lower()
-                if "application/json" not in ct:
-                    preview = (await resp.text())[:240].replace("\n", " ")
-                    return None, f"Content-Type inesperado ({ct}). Body[:240]={preview!r}"
-                data = await resp.json()
-                return data, None
-        except aiohttp.ClientError as e:
-            if attempt < max_retries:
-                await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                continue
-            return None, f"ClientError: {repr(e)}"
-        except asyncio.TimeoutError as e:
-            if attempt < max_retries:
-                await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                continue
-            return None, f"TimeoutError: {repr(e)}"
-        except json.JSONDecodeError as e:
-            return None, f"JSONDecodeError: {repr(e)}"
-    return None, "Erro desconhecido"
+    try:
+        data = await client.get_json(url, params=params, endpoint="publicacao")
+    except PncpRequestError as e:
+        return None, str(e)
+    # 204/404: janela sem publicações
+    return data or {}, None
 
 
-def _get_modalidade_sync(modalidade_id: Optional[int]) -> Optional[Modalidade]:
-    """Busca modalidade por ID"""
-    if not modalidade_id:
-        return None
-    try:
-        return Modalidade.objects.get(id=modalidade_id)
-    except Modalidade.DoesNotExist:
-        return None
+def _save_compras_sync(compras_data: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Função síncrona para salvar compras no banco de dados.
+    Esta função será chamada via sync_to_async dentro do contexto assíncrono.
 
+    Grava em lotes via INSERT ... ON CONFLICT (ver services/bulk_upsert.py) e
+    recalcula o resumo de compras das unidades tocadas (ver services/resumos.py).
+    Retorna {'compras', 'inseridas', 'atualizadas', 'inalteradas', 'ignoradas', 'resumos'}.
+    """
+    if not compras_data:
+        return {"compras": 0, "inseridas": 0, "atualizadas": 0, "inalteradas": 0, "ignoradas": 0, "resumos": 0}
+    stats = upsert_compras(compras_data)
+    stats["resumos"] = 0
+    if stats["inseridas"] or stats["atualizadas"]:
+        stats["resumos"] = atualizar_resumo_compras(
+            compra.get("codigo_unidade") for compra in compras_data
+        )
+    return stats
 
-def _get_amparo_legal_sync(amparo_id: Optional[int]) -> Optional[AmparoLegal]:
-    """Busca amparo legal por ID"""
-    if not amparo_id:
-        return None
-    try:
-        return AmparoLegal.objects.get(id=amparo_id)
-    except AmparoLegal.DoesNotExist:
-        return None
 
+# Gravação das compras em lotes: grava quando o buffer atinge N compras ou após T segundos
+COMPRAS_FLUSH_SIZE = int(os.getenv("PNCP_COMPRAS_FLUSH_SIZE", "1000"))
+COMPRAS_FLUSH_SECONDS = float(os.getenv("PNCP_COMPRAS_FLUSH_SECONDS", "5"))
+# Páginas buscadas em paralelo e páginas baixadas aguardando processamento
+PAGINAS_CONCORRENTES = 10
+PAGINAS_EM_FILA = 20
 
-def _get_modo_disputa_sync(modo_disputa_id: Optional[int]) -> Optional[ModoDisputa]:
-    """Busca modo de disputa por ID"""
-    if not modo_disputa_id:
-        return None
-    try:
-        return ModoDisputa.objects.get(id=modo_disputa_id)
-    except ModoDisputa.DoesNotExist:
-        return None
 
+def _compra_key(compra_data: Dict[str, Any]) -> Tuple[int, int]:
+    """Chave de deduplicação das compras processadas."""
+    return compra_data["ano_compra"], compra_data["sequencial_compra"]
 
-def _save_compras_sync(compras_data: List[Dict[str, Any]]) -> Dict[str, int]:
+
+async def _stream_compras(
+    get_page,
+    base_params: Dict[str, str],
+    process,
+    extract,
+    label: str,
+) -> Dict[str, int]:
     """
-    Função síncrona para salvar compras no banco de dados.
-    Esta função será chamada via sync_to_async dentro do contexto assíncrono.
+    Percorre as páginas de um endpoint de compras gravando em lotes à medida que
+    as páginas chegam (ver services/pipeline.py). Lotes já gravados permanecem
+    no banco mesmo que o worker seja interrompido.
+
+    Além dos contadores, retorna em ``max_data_atualizacao`` a maior
+    ``data_atualizacao`` entre as compras recebidas (marca d'água da etapa).
     """
-    totals = {"compras": 0, "ignoradas": 0}
-    if not compras_data:
-        return totals
-    
-    with transaction.atomic():
-        for compra_data in compras_data:
-            try:
-                # Extrai IDs dos relacionamentos antes de salvar
-                modalidade_id = compra_data.pop("modalidade_id", None)
-                amparo_legal_id = compra_data.pop("amparo_legal_id", None)
-                modo_disputa_id = compra_data.pop("modo_disputa_id", None)
-                
-                # Busca os objetos relacionados
-                modalidade = _get_modalidade_sync(modalidade_id) if modalidade_id else None
-                amparo_legal = _get_amparo_legal_sync(amparo_legal_id) if amparo_legal_id else None
-                modo_disputa = _get_modo_disputa_sync(modo_disputa_id) if modo_disputa_id else None
-                
-                # Adiciona os objetos relacionados aos defaults
-                defaults = dict(compra_data)
-                defaults["modalidade"] = modalidade
-                defaults["amparo_legal"] = amparo_legal
-                defaults["modo_disputa"] = modo_disputa
-                
-                Compra.objects.update_or_create(
-                    compra_id=compra_data["compra_id"],
-                    defaults=defaults
-                )
-                totals["compras"] += 1
-            except Exception as e:
-                logger.error(
-                    f"[PNCP Task] Erro ao salvar compra {compra_data.get('compra_id', 'N/A')}: {e}"
-                )
-                totals["ignoradas"] += 1
+    totals = {"compras": 0, "ignoradas": 0, "paginas": 0}
+    marca = {"max_data_atualizacao": None}
+
+    def process_com_marca(registro: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        compra_data = process(registro)
+        if compra_data:
+            data_atualizacao = compra_data.get("data_atualizacao")
+            if data_atualizacao and (
+                marca["max_data_atualizacao"] is None or data_atualizacao > marca["max_data_atualizacao"]
+            ):
+                marca["max_data_atualizacao"] = data_atualizacao
+        return compra_data
+
+    buffer = AsyncUpsertBuffer(
+        _save_compras_sync,
+        flush_size=COMPRAS_FLUSH_SIZE,
+        flush_interval=COMPRAS_FLUSH_SECONDS,
+        label=label,
+    )
+
+    async with PncpClient() as client, buffer:
+        async def fetch_page(pg: int):
+            params = dict(base_params)
+            params["pagina"] = str(pg)
+            return await get_page(client, params)
+
+        stream_totals = await stream_paginas(
+            fetch_page,
+            extract,
+            process_com_marca,
+            _compra_key,
+            buffer,
+            label=label,
+            fetchers=PAGINAS_CONCORRENTES,
+            queue_size=PAGINAS_EM_FILA,
+        )
+
+    for key, value in stream_totals.items():
+        totals[key] = totals.get(key, 0) + value
+    for key, value in buffer.totals.items():
+        totals[key] = totals.get(key, 0) + value
+    totals["lotes"] = buffer.lotes
+    totals["max_data_atualizacao"] = marca["max_data_atualizacao"]
     return totals
 
 
-# Versão assíncrona da função de salvamento
-# thread_sensitive=False permite que operações de banco sejam executadas em thread separada
-_save_compras_async = sync_to_async(_save_compras_sync, thread_sensitive=False)
+def _acumular_totais(total_geral: Dict[str, int], totals: Dict[str, Any]) -> None:
+    """Soma os contadores inteiros de uma execução ao total geral da task."""
+    for key, value in totals.items():
+        if isinstance(value, int) and not isinstance(value, bool):
+            total_geral[key] = total_geral.get(key, 0) + value
+
+
+def _registrar_etapa(
+    cnpj: str,
+    modalidade: int,
+    etapa: str,
+    data_inicial: date,
+    data_final: date,
+    totals: Dict[str, Any],
+) -> None:
+    """
+    Avança o estado incremental da etapa se a janela foi processada sem falhas;
+    caso contrário mantém o estado anterior para que a próxima execução repita a janela.
+    """
+    if totals.get("falhas", 0):
+        logger.warning(
+            f"[PNCP Sync] Estado não avançado - cnpj={cnpj}, etapa={etapa}, "
+            f"modalidade={modalidade}: {totals['falhas']} falha(s) na janela {data_inicial}..{data_final}"
+        )
+        return
+    registrar_sucesso(
+        cnpj,
+        modalidade,
+        etapa,
+        janela_inicio=data_inicial,
+        janela_fim=data_final,
+        max_data_atualizacao=totals.get("max_data_atualizacao"),
+        totals=totals,
+    )
+
+
+def _sincronizar_compras(
+    loop: asyncio.AbstractEventLoop,
+    cnpj: str,
+    modalidades: List[int],
+    full: bool,
+    publicacoes_na_janela_padrao: bool,
+    label: str,
+) -> Dict[str, int]:
+    """
+    Executa a etapa de compras para cada modalidade.
+
+    Com estado gravado (e sem ``full``), busca apenas o que mudou desde a última
+    janela no endpoint /contratacoes/atualizacao. Sem estado, ou com ``full``, usa a
+    janela fixa dos últimos 10 dias no endpoint de publicação
+    (``publicacoes_na_janela_padrao=True``) ou de atualização.
+    """
+    hoje = timezone.localdate()
+    estados = obter_estados(cnpj, EstadoSincronizacao.ETAPA_COMPRAS, modalidades)
+    total_geral = {
+        "compras": 0, "ignoradas": 0, "paginas": 0,
+        "inseridas": 0, "atualizadas": 0, "inalteradas": 0,
+        "duplicadas": 0, "falhas": 0,
+    }
+
+    # Processa cada modalidade sequencialmente
+    for modalidade in modalidades:
+        modalidade_nome = MODALIDADES.get(modalidade, f"Modalidade {modalidade}")
+        inicio, fim, incremental = calcular_janela(estados.get(modalidade), hoje, full=full)
+        data_inicial = inicio.strftime("%Y-%m-%d")
+        data_final = fim.strftime("%Y-%m-%d")
+        logger.info(
+            f"[{label}] Processando modalidade {modalidade} - {modalidade_nome} "
+            f"({'incremental' if incremental else 'janela padrão'}: {data_inicial}..{data_final})"
+        )
+
+        fetch = _fetch_and_process_atualizacoes
+        if not incremental and publicacoes_na_janela_padrao:
+            fetch = _fetch_and_process_publications
+        totals = loop.run_until_complete(
+            fetch(
+                data_inicial=data_inicial,
+                data_final=data_final,
+                modalidade=modalidade,
+                cnpj=cnpj,
+            )
+        )
+        _acumular_totais(total_geral, totals)
+        _registrar_etapa(cnpj, modalidade, EstadoSincronizacao.ETAPA_COMPRAS, inicio, fim, totals)
+        logger.info(
+            f"[{label}] Modalidade {modalidade} ({modalidade_nome}) concluída - "
+            f"compras={totals.get('compras', 0)}, "
+            f"ignoradas={totals.get('ignoradas', 0)}, "
+            f"páginas={totals.get('paginas', 0)}"
+        )
+
+    return total_geral
 
 
 def _extract_list(payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int, int]:
@@ -274,7 +370,7 @@ def _process_publicacao(p: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     # Gera compra_id no formato "ano::sequencial"
     compra_id = f"{ano}::{seq}"
     
-    return {
+    compra_data = {
         "compra_id": compra_id,
         "ano_compra": ano,
         "sequencial_compra": seq,
@@ -291,6 +387,8 @@ def _process_publicacao(p: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         "valor_total_homologado": valor_total_homologado,
         "percentual_desconto": percentual_desconto,
     }
+    compra_data["hash_conteudo"] = fingerprint(compra_data, data_atualizacao)
+    return compra_data
 
 
 async def _fetch_and_process_publications(
@@ -329,92 +427,43 @@ async def _fetch_and_process_publications(
     # Log dos parâmetros para debug
     logger.info(f"[PNCP Task] Parâmetros da requisição: {base_params}")
     
-    totals = {"compras": 0, "ignoradas": 0, "paginas": 0}
-    compras_data = {}  # Usado para deduplicação: {(ano, seq): dados}
-    
-    async with aiohttp.ClientSession(trust_env=True) as session:
-        # Busca primeira página
-        params = dict(base_params)
-        params["pagina"] = "1"
-        payload, err = await _get_publications_page(session, params)
-        
-        if err:
-            logger.error(f"[PNCP Task] Falha ao buscar página 1: {err}")
-            return totals
-        
-        pubs, total_paginas, numero_pagina = _extract_list(payload)
-        logger.info(f"[PNCP Task] Total de páginas: {total_paginas}")
-        
-        # Processa primeira página
-        for p in pubs:
-            compra_data = _process_publicacao(p)
-            if compra_data:
-                key = (compra_data["ano_compra"], compra_data["sequencial_compra"])
-                compras_data[key] = compra_data  # Mantém a última ocorrência
-            else:
-                totals["ignoradas"] += 1
-        totals["paginas"] += 1
-        
-        # Busca páginas restantes em paralelo
-        if total_paginas > 1:
-            sem = asyncio.Semaphore(10)
-            
-            async def fetch_page(pg: int):
-                params = dict(base_params)
-                params["pagina"] = str(pg)
-                async with sem:
-                    payload, err = await _get_publications_page(session, params)
-                return pg, payload, err
-            
-            tasks = [
-                asyncio.create_task(fetch_page(pg))
-                for pg in range(2, total_paginas + 1)
-            ]
-            
-            for coro in asyncio.as_completed(tasks):
-                pg, payload, err = await coro
-                if err:
-                    logger.warning(f"[PNCP Task] Falha ao buscar página {pg}: {err}")
-                    totals["ignoradas"] += 1
-                    continue
-                
-                pubs, _, _ = _extract_list(payload)
-                for p in pubs:
-                    compra_data = _process_publicacao(p)
-                    if compra_data:
-                        key = (compra_data["ano_compra"], compra_data["sequencial_compra"])
-                        compras_data[key] = compra_data
-                    else:
-                        totals["ignoradas"] += 1
-                totals["paginas"] += 1
-        
-        # Salva no banco usando Django ORM (função síncrona)
-        if compras_data:
-            totals_saved = await _save_compras_async(list(compras_data.values()))
-            totals["compras"] += totals_saved["compras"]
-            totals["ignoradas"] += totals_saved["ignoradas"]
+    totals = await _stream_compras(
+        _get_publications_page,
+        base_params,
+        process=_process_publicacao,
+        extract=_extract_list,
+        label="PNCP Task",
+    )
     
     logger.info(
         f"[PNCP Task] Concluído - compras={totals['compras']}, "
+        f"inseridas={totals.get('inseridas', 0)}, atualizadas={totals.get('atualizadas', 0)}, "
+        f"inalteradas={totals.get('inalteradas', 0)}, "
         f"ignoradas={totals['ignoradas']}, páginas={totals['paginas']}"
     )
     return totals
 
 
 @shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_atualizacao_seq_pncp")
-def task_atualizacao_seq_pncp(self, cnpj: Optional[str] = None, modalidades: Optional[List[int]] = None):
+def task_atualizacao_seq_pncp(
+    self,
+    cnpj: Optional[str] = None,
+    modalidades: Optional[List[int]] = None,
+    full: bool = False,
+):
     """
-    Task do Celery para atualizar dados dos sequenciais dos últimos 10 dias.
+    Task do Celery para atualizar dados dos sequenciais.
     
-    A task busca publicações do PNCP dos últimos 10 dias (incluindo o dia atual)
-    para todas as modalidades configuradas.
+    Na primeira execução (ou com ``full=True``) busca as publicações do PNCP dos
+    últimos 10 dias (incluindo o dia atual). Nas seguintes busca, por modalidade,
+    apenas as compras alteradas desde a última janela concluída, via
+    /contratacoes/atualizacao (ver services/sync_state.py).
     
     Args:
         cnpj: CNPJ do órgão (padrão: DEFAULT_CNPJ)
         modalidades: Lista de códigos de modalidades (padrão: todas as 13 modalidades)
+        full: Ignora o estado incremental e reprocessa a janela padrão
     """
-    import os
-    
     cnpj = cnpj or os.getenv("PNCP_CNPJ", DEFAULT_CNPJ)
     
     # Processa modalidades da variável de ambiente ou usa padrão
@@ -425,17 +474,8 @@ def task_atualizacao_seq_pncp(self, cnpj: Optional[str] = None, modalidades: Opt
         else:
             modalidades = DEFAULT_MODALIDADES
     
-    # Calcula datas: últimos 10 dias (incluindo o dia atual)
-    hoje = timezone.now().date()
-    data_inicial_dt = hoje - timedelta(days=9)  # 9 dias atrás + hoje = 10 dias
-    
-    data_inicial = data_inicial_dt.strftime("%Y-%m-%d")
-    data_final = hoje.strftime("%Y-%m-%d")
-    
     logger.info(
-        f"[PNCP Task] Iniciando atualização - "
-        f"data_inicial={data_inicial}, data_final={data_final} "
-        f"(últimos 10 dias), cnpj={cnpj}, modalidades={modalidades}"
+        f"[PNCP Task] Iniciando atualização - cnpj={cnpj}, modalidades={modalidades}, full={full}"
     )
     
     try:
@@ -443,33 +483,11 @@ def task_atualizacao_seq_pncp(self, cnpj: Optional[str] = None, modalidades: Opt
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            total_geral = {"compras": 0, "ignoradas": 0, "paginas": 0}
-            
-            # Processa cada modalidade sequencialmente
-            for modalidade in modalidades:
-                modalidade_nome = MODALIDADES.get(modalidade, f"Modalidade {modalidade}")
-                logger.info(
-                    f"[PNCP Task] Processando modalidade {modalidade} - {modalidade_nome}"
-                )
-                totals = loop.run_until_complete(
-                    _fetch_and_process_publications(
-                        data_inicial=data_inicial,
-                        data_final=data_final,
-                        modalidade=modalidade,
-                        cnpj=cnpj,
-                    )
-                )
-                # Acumula totais
-                total_geral["compras"] += totals.get("compras", 0)
-                total_geral["ignoradas"] += totals.get("ignoradas", 0)
-                total_geral["paginas"] += totals.get("paginas", 0)
-                logger.info(
-                    f"[PNCP Task] Modalidade {modalidade} ({modalidade_nome}) concluída - "
-                    f"compras={totals.get('compras', 0)}, "
-                    f"ignoradas={totals.get('ignoradas', 0)}, "
-                    f"páginas={totals.get('paginas', 0)}"
-                )
-            
+            total_geral = _sincronizar_compras(
+                loop, cnpj, modalidades, full,
+                publicacoes_na_janela_padrao=True,
+                label="PNCP Task",
+            )
             logger.info(f"[PNCP Task] Sucesso geral - {total_geral}")
             return total_geral
         finally:
@@ -483,52 +501,38 @@ def task_atualizacao_seq_pncp(self, cnpj: Optional[str] = None, modalidades: Opt
 # Task para buscar itens das compras (Etapa 2)
 # ============================================================================
 
-PNCP_API_BASE = "https://pncp.gov.br/api/pncp/v1"
 MAX_CONCURRENCY_ITENS = 5
-MAX_RETRIES_ITENS = 5
 PAGE_SIZE_ITENS = 999_999_999  # força a API a retornar todos os itens em uma única página
-
-
-def _get_compra_sync(ano: int, seq: int) -> Optional[Compra]:
-    """
-    Busca uma compra específica no banco de dados.
-    """
-    try:
-        return Compra.objects.get(ano_compra=ano, sequencial_compra=seq)
-    except Compra.DoesNotExist:
-        return None
-    except Compra.MultipleObjectsReturned:
-        logger.warning(f"[PNCP Itens] Múltiplas compras encontradas para {ano}/{seq}")
-        return Compra.objects.filter(ano_compra=ano, sequencial_compra=seq).first()
-
-
-_get_compra_async = sync_to_async(_get_compra_sync, thread_sensitive=False)
+# Gravação dos itens em lotes: grava quando o buffer atinge N itens ou após T segundos
+ITENS_FLUSH_SIZE = int(os.getenv("PNCP_ITENS_FLUSH_SIZE", "5000"))
+ITENS_FLUSH_SECONDS = float(os.getenv("PNCP_ITENS_FLUSH_SECONDS", "5"))
 
 
 def _get_compras_para_itens_sync(
     data_inicial: datetime,
     data_final: datetime,
-    modalidades: List[str],
+    modalidades: List[int],
     cnpj: str,
+    campo_data: str = "data_publicacao_pncp",
+    somente_alteradas: bool = True,
 ) -> List[Dict[str, Any]]:
     """
     Busca compras no banco de dados usando Django ORM.
     Retorna lista de compras com informações necessárias para buscar itens.
     Como todas as compras são do mesmo CNPJ, apenas filtramos por data e modalidade.
+    ``campo_data`` define o campo da janela: data de publicação (janela padrão) ou
+    ``data_atualizacao`` (sincronização incremental).
+    Com ``somente_alteradas``, ignora compras cujo ``hash_conteudo`` não mudou
+    desde a última busca de itens.
     """
-    # Converte nomes de modalidades para IDs
-    modalidades_ids = []
-    for modalidade_nome in modalidades:
-        modalidade_obj = Modalidade.objects.filter(nome=modalidade_nome).first()
-        if modalidade_obj:
-            modalidades_ids.append(modalidade_obj.id)
-    
-    queryset = Compra.objects.filter(
-        data_publicacao_pncp__gte=data_inicial,
-        data_publicacao_pncp__lte=data_final,
-    )
-    if modalidades_ids:
-        queryset = queryset.filter(modalidade_id__in=modalidades_ids)
+    queryset = Compra.objects.filter(**{
+        f"{campo_data}__gte": data_inicial,
+        f"{campo_data}__lte": data_final,
+    })
+    if modalidades:
+        queryset = queryset.filter(modalidade_id__in=modalidades)
+    if somente_alteradas:
+        queryset = queryset.filter(filtro_alterado("hash_itens_sincronizados", incluir_sem_hash=True))
     queryset = queryset.order_by("-ano_compra", "-sequencial_compra")
     
     compras = []
@@ -539,6 +543,7 @@ def _get_compras_para_itens_sync(
             "codigo_unidade": compra.codigo_unidade,
             "orgao_cnpj": cnpj,  # Usa o CNPJ passado como parâmetro (todos são do mesmo órgão)
             "compra": compra,  # Mantém referência ao objeto Compra para usar depois
+            "hash_conteudo": compra.hash_conteudo,
         })
     
     return compras
@@ -558,11 +563,10 @@ def _to_decimal_itens(value: Optional[Any]) -> Optional[Decimal]:
 
 
 async def _fetch_itens_api(
-    session: aiohttp.ClientSession,
+    client: PncpClient,
     orgao_cnpj: str,
     ano: int,
     seq: int,
-    max_retries: int = MAX_RETRIES_ITENS,
 ) -> List[Dict[str, Any]]:
     """
     Busca itens de uma compra específica da API do PNCP.
@@ -572,57 +576,21 @@ async def _fetch_itens_api(
     
     logger.debug(f"[PNCP Itens] GET {url} params={params}")
     
-    for attempt in range(1, max_retries + 1):
-        try:
-            async with session.get(url, timeout=60, params=params, headers=HEADERS) as resp:
-                logger.debug(
-                    f"[PNCP Itens] Resposta {resp.status} para {ano}/{seq} (tentativa {attempt}/{max_retries})"
-                )
-                
-                if resp.status == 404:
-                    logger.debug(f"[PNCP Itens] Nenhum item (404) para {ano}/{seq}")
-                    return []
-                
-                if resp.status == 429:
-                    retry_after = resp.headers.get("Retry-After")
-                    wait = (
-                        int(retry_after)
-                        if retry_after and retry_after.isdigit()
-                        else 2 ** attempt
-                    )
-                    logger.debug(
-                        f"[PNCP Itens] Rate limit para {ano}/{seq}; aguardando {wait}s antes de retry"
-                    )
-                    await asyncio.sleep(wait)
-                    continue
-                
-                resp.raise_for_status()
-                data = await resp.json()
-                
-                # A API pode retornar lista direta ou objeto com 'data'
-                itens = data if isinstance(data, list) else data.get("data", [])
-                logger.debug(
-                    f"[PNCP Itens] Itens recebidos para {ano}/{seq}: {len(itens)}"
-                )
-                return itens
-                
-        except asyncio.CancelledError:
-            logger.debug(f"[PNCP Itens] Cancelado durante fetch {ano}/{seq}")
-            raise
-        except aiohttp.ClientError as e:
-            logger.warning(
-                f"[PNCP Itens] Erro de rede em {ano}/{seq} (tentativa {attempt}/{max_retries}): {e}"
-            )
-            if attempt == max_retries:
-                raise
-            await asyncio.sleep(2 ** attempt)
+    data = await client.get_json(url, params=params, endpoint="itens")
+    if data is None:
+        logger.debug(f"[PNCP Itens] Nenhum item (404) para {ano}/{seq}")
+        return []
     
-    raise RuntimeError(f"[PNCP Itens] Falha após {max_retries} tentativas para {ano}/{seq}")
+    # A API pode retornar lista direta ou objeto com 'data'
+    itens = data if isinstance(data, list) else data.get("data", [])
+    logger.debug(
+        f"[PNCP Itens] Itens recebidos para {ano}/{seq}: {len(itens)}"
+    )
+    return itens
 
 
 async def _worker_itens(
-    session: aiohttp.ClientSession,
-    sem: asyncio.Semaphore,
+    client: PncpClient,
     compra_info: Dict[str, Any],
 ) -> Tuple[int, int, List[Dict[str, Any]], Optional[str]]:
     """
@@ -634,8 +602,7 @@ async def _worker_itens(
     
     try:
         logger.debug(f"[PNCP Itens] Iniciando worker {ano}/{seq} orgao={cnpj}")
-        async with sem:
-            itens = await _fetch_itens_api(session, cnpj, ano, seq)
+        itens = await _fetch_itens_api(client, cnpj, ano, seq)
         logger.debug(f"[PNCP Itens] Worker concluído {ano}/{seq} itens={len(itens)}")
         return ano, seq, itens, None
     except asyncio.CancelledError:
@@ -646,81 +613,126 @@ async def _worker_itens(
         return ano, seq, [], str(e)
 
 
-def _save_item_sync(
-    compra: Compra,
-    numero_item: int,
-    descricao: str,
-    unidade_medida: str,
-    valor_unitario_estimado: Optional[Decimal],
-    valor_total_estimado: Optional[Decimal],
-    quantidade: Optional[Decimal],
-    situacao_compra_item_nome: str,
-    tem_resultado: bool,
-) -> None:
+def _build_itens_rows(ano: int, seq: int, itens: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Salva ou atualiza um item de compra no banco de dados.
-    """
-    item_id = f"{compra.ano_compra}::{compra.sequencial_compra}::{numero_item}"
-    
-    # Garante que quantidade não seja None (campo não aceita null)
-    quantidade_final = quantidade if quantidade is not None else Decimal("0")
-    
-    ItemCompra.objects.update_or_create(
-        item_id=item_id,
-        defaults={
-            "compra": compra,
-            "numero_item": numero_item,
-            "descricao": descricao or "",
-            "unidade_medida": unidade_medida or "",
-            "valor_unitario_estimado": valor_unitario_estimado,
-            "valor_total_estimado": valor_total_estimado,
-            "quantidade": quantidade_final,
-            "percentual_economia": None,  # Será calculado depois se necessário
-            "situacao_compra_item_nome": situacao_compra_item_nome or "",
-            "tem_resultado": tem_resultado,
+    Converte os itens retornados pela API em linhas para o buffer de gravação.
+    A compra é identificada por (ano_compra, sequencial_compra) e resolvida na gravação.
+    """
+    rows = []
+    for item in itens:
+        numero_item = item.get("numeroItem")
+        if numero_item is None:
+            continue
+
+        quantidade = _to_decimal_itens(item.get("quantidade"))
+        tem_resultado_raw = item.get("temResultado")
+
+        row = {
+            "ano_compra": ano,
+            "sequencial_compra": seq,
+            "numero_item": int(numero_item),
+            "descricao": item.get("descricao") or item.get("descricaoItem") or "",
+            "unidade_medida": item.get("unidadeMedida") or "",
+            "valor_unitario_estimado": _to_decimal_itens(item.get("valorUnitarioEstimado")),
+            "valor_total_estimado": _to_decimal_itens(item.get("valorTotal")),
+            # Garante que quantidade não seja None (campo não aceita null)
+            "quantidade": quantidade if quantidade is not None else Decimal("0"),
+            "situacao_compra_item_nome": item.get("situacaoCompraItemNome") or "",
+            "tem_resultado": bool(tem_resultado_raw) if tem_resultado_raw is not None else False,
         }
-    )
+        row["hash_conteudo"] = fingerprint(row, item.get("dataAtualizacao"))
+        rows.append(row)
+    return rows
 
 
-_save_item_async = sync_to_async(_save_item_sync, thread_sensitive=False)
+def _resolve_compra_ids_sync(chaves: Set[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+    """
+    Resolve {(ano, seq): compra_id} para várias compras em uma única consulta.
+    """
+    if not chaves:
+        return {}
+    anos = {ano for ano, _ in chaves}
+    seqs = {seq for _, seq in chaves}
+    resolvidas: Dict[Tuple[int, int], str] = {}
+    queryset = (
+        Compra.objects
+        .filter(ano_compra__in=anos, sequencial_compra__in=seqs)
+        .order_by("compra_id")
+        .values_list("ano_compra", "sequencial_compra", "compra_id")
+    )
+    for ano, seq, compra_id in queryset:
+        if (ano, seq) in chaves:
+            resolvidas.setdefault((ano, seq), compra_id)
+    return resolvidas
 
 
-def _save_itens_batch_sync(
-    itens_data: List[Dict[str, Any]]
-) -> Dict[str, int]:
+def _upsert_itens_sync(rows: List[Dict[str, Any]]) -> Dict[str, int]:
     """
-    Salva um lote de itens no banco de dados.
+    Grava um lote de itens (de várias compras) com um upsert multi-linha.
+    O percentual_economia existente é preservado; ele é calculado na etapa de resultados.
     """
-    totals = {"itens": 0, "ignoradas": 0}
-    
-    if not itens_data:
+    totals = {"itens": 0, "ignoradas": 0, "inseridas": 0, "atualizadas": 0, "inalteradas": 0}
+    if not rows:
         return totals
-    
-    with transaction.atomic():
-        for item_data in itens_data:
-            try:
-                _save_item_sync(**item_data)
-                totals["itens"] += 1
-            except Exception as e:
-                logger.error(
-                    f"[PNCP Itens] Erro ao salvar item {item_data.get('numero_item', 'N/A')}: {e}"
-                )
-                totals["ignoradas"] += 1
-    
-    return totals
 
+    compra_ids = _resolve_compra_ids_sync(
+        {(row["ano_compra"], row["sequencial_compra"]) for row in rows}
+    )
 
-_save_itens_batch_async = sync_to_async(_save_itens_batch_sync, thread_sensitive=False)
+    agora = timezone.now()
+    itens_rows = []
+    sem_compra = set()
+    for row in rows:
+        key = (row["ano_compra"], row["sequencial_compra"])
+        compra_id = compra_ids.get(key)
+        if not compra_id:
+            sem_compra.add(key)
+            totals["ignoradas"] += 1
+            continue
+        item = {k: v for k, v in row.items() if k not in ("ano_compra", "sequencial_compra")}
+        item["item_id"] = f"{key[0]}::{key[1]}::{row['numero_item']}"
+        item["compra_id"] = compra_id
+        item["percentual_economia"] = None
+        item["atualizado_em"] = agora
+        itens_rows.append(item)
+
+    for ano, seq in sorted(sem_compra):
+        logger.warning(f"[PNCP Itens] Compra {ano}/{seq} não encontrada no banco")
+
+    update_fields = [
+        "compra_id", "numero_item", "descricao", "unidade_medida",
+        "valor_unitario_estimado", "valor_total_estimado", "quantidade",
+        "situacao_compra_item_nome", "tem_resultado", "hash_conteudo",
+    ]
+    stats = bulk_upsert(
+        ItemCompra,
+        itens_rows,
+        conflict_fields=["item_id"],
+        update_fields=update_fields,
+        touch_fields=["atualizado_em"],
+        label="PNCP Itens",
+    )
+    totals["inseridas"] = stats["inseridas"]
+    totals["atualizadas"] = stats["atualizadas"]
+    totals["inalteradas"] = stats["inalteradas"]
+    totals["ignoradas"] += stats["ignoradas"]
+    totals["itens"] = stats["inseridas"] + stats["atualizadas"] + stats["inalteradas"]
+    return totals
 
 
 async def _processar_itens_async(
     data_inicial: datetime,
     data_final: datetime,
-    modalidades: List[str],
+    modalidades: List[int],
     cnpj: str,
+    campo_data: str = "data_publicacao_pncp",
+    somente_alteradas: bool = True,
 ) -> Dict[str, int]:
     """
     Processa itens de compras: busca compras, busca itens da API e salva no banco.
+    Retorna também ``falhas`` (compras cuja busca falhou) e ``max_data_atualizacao``
+    das compras processadas, usados pelo estado incremental.
+    Ao final, grava em cada compra processada o hash cujos itens foram sincronizados.
     """
     logger.info(
         f"[PNCP Itens] Iniciando processamento de itens - "
@@ -730,7 +742,7 @@ async def _processar_itens_async(
     
     # Busca compras do banco
     compras = await _get_compras_para_itens_async(
-        data_inicial, data_final, modalidades, cnpj
+        data_inicial, data_final, modalidades, cnpj, campo_data, somente_alteradas
     )
     
     if not compras:
@@ -739,12 +751,25 @@ async def _processar_itens_async(
     
     logger.info(f"[PNCP Itens] Compras encontradas: {len(compras)}")
     
-    totals = {"itens": 0, "ignoradas": 0, "compras_processadas": 0}
-    sem = asyncio.Semaphore(MAX_CONCURRENCY_ITENS)
+    totals = {"itens": 0, "ignoradas": 0, "compras_processadas": 0, "falhas": 0}
+    datas_atualizacao = {
+        (c["ano_compra"], c["sequencial_compra"]): c["compra"].data_atualizacao for c in compras
+    }
+    hashes = {
+        (c["ano_compra"], c["sequencial_compra"]): (c["compra"].pk, c["hash_conteudo"]) for c in compras
+    }
+    sincronizadas: Dict[str, str] = {}
+    max_data_atualizacao = None
+    buffer = AsyncUpsertBuffer(
+        _upsert_itens_sync,
+        flush_size=ITENS_FLUSH_SIZE,
+        flush_interval=ITENS_FLUSH_SECONDS,
+        label="PNCP Itens",
+    )
     
-    async with aiohttp.ClientSession(headers=HEADERS, trust_env=True) as session:
+    async with PncpClient(max_concurrency=MAX_CONCURRENCY_ITENS) as client, buffer:
         tasks = [
-            asyncio.create_task(_worker_itens(session, sem, comp)) for comp in compras
+            asyncio.create_task(_worker_itens(client, comp)) for comp in compras
         ]
         
         try:
@@ -754,56 +779,19 @@ async def _processar_itens_async(
                 if err:
                     logger.warning(f"[PNCP Itens] Falha ao buscar itens {ano}/{seq}: {err}")
                     totals["ignoradas"] += 1
+                    totals["falhas"] += 1
                     continue
                 
                 totals["compras_processadas"] += 1
+                compra_pk, hash_conteudo = hashes.get((ano, seq), (None, None))
+                if compra_pk is not None:
+                    sincronizadas[compra_pk] = hash_conteudo
+                data_atualizacao = datas_atualizacao.get((ano, seq))
+                if data_atualizacao and (max_data_atualizacao is None or data_atualizacao > max_data_atualizacao):
+                    max_data_atualizacao = data_atualizacao
                 
-                # Busca a compra no banco de dados (função síncrona)
-                compra_obj = await _get_compra_async(ano, seq)
-                
-                if not compra_obj:
-                    logger.warning(f"[PNCP Itens] Compra {ano}/{seq} não encontrada no banco")
-                    totals["ignoradas"] += 1
-                    continue
-                
-                # Processa cada item
-                itens_para_salvar = []
-                
-                for item in itens:
-                    numero_item = item.get("numeroItem")
-                    if numero_item is None:
-                        continue
-                    
-                    descricao = (
-                        item.get("descricao") or item.get("descricaoItem") or ""
-                    )
-                    unidade = item.get("unidadeMedida") or ""
-                    valor_unitario_estimado = _to_decimal_itens(
-                        item.get("valorUnitarioEstimado")
-                    )
-                    valor_total_estimado = _to_decimal_itens(item.get("valorTotal"))
-                    quantidade = _to_decimal_itens(item.get("quantidade"))
-                    situacao_nome = item.get("situacaoCompraItemNome") or ""
-                    tem_resultado_raw = item.get("temResultado")
-                    tem_resultado = bool(tem_resultado_raw) if tem_resultado_raw is not None else False
-                    
-                    itens_para_salvar.append({
-                        "compra": compra_obj,
-                        "numero_item": int(numero_item),
-                        "descricao": descricao,
-                        "unidade_medida": unidade,
-                        "valor_unitario_estimado": valor_unitario_estimado,
-                        "valor_total_estimado": valor_total_estimado,
-                        "quantidade": quantidade,
-                        "situacao_compra_item_nome": situacao_nome,
-                        "tem_resultado": tem_resultado,
-                    })
-                
-                # Salva lote de itens
-                if itens_para_salvar:
-                    batch_totals = await _save_itens_batch_async(itens_para_salvar)
-                    totals["itens"] += batch_totals["itens"]
-                    totals["ignoradas"] += batch_totals["ignoradas"]
+                # Acumula os itens; a gravação ocorre em lotes de várias compras
+                await buffer.add(_build_itens_rows(ano, seq, itens))
                     
         except asyncio.CancelledError:
             logger.warning("[PNCP Itens] Cancelamento recebido; aguardando finalização das tasks...")
@@ -816,6 +804,13 @@ async def _processar_itens_async(
                     t.cancel()
                 await asyncio.gather(*pendentes, return_exceptions=True)
     
+    for key, value in buffer.totals.items():
+        totals[key] = totals.get(key, 0) + value
+    totals["lotes"] = buffer.lotes
+    totals["max_data_atualizacao"] = max_data_atualizacao
+    # Só marca depois que o buffer gravou todos os itens
+    totals["marcadas"] = await sync_to_async(marcar_itens_sincronizados, thread_sensitive=False)(sincronizadas)
+    
     logger.info(
         f"[PNCP Itens] Concluído - itens={totals['itens']}, "
         f"ignoradas={totals['ignoradas']}, compras_processadas={totals['compras_processadas']}"
@@ -823,20 +818,75 @@ async def _processar_itens_async(
     return totals
 
 
+def _sincronizar_etapa_banco(
+    loop: asyncio.AbstractEventLoop,
+    cnpj: str,
+    modalidades: List[int],
+    full: bool,
+    etapa: str,
+    processar,
+    label: str,
+) -> Dict[str, int]:
+    """
+    Executa uma etapa que parte das compras já gravadas (itens ou resultados),
+    uma modalidade por vez.
+
+    Sem estado (ou com ``full``) usa as compras publicadas nos últimos 10 dias; com
+    estado, apenas as compras com ``data_atualizacao`` desde a marca d'água da etapa.
+    Fora do modo ``full``, compras/itens cujo hash de conteúdo não mudou são pulados.
+    """
+    hoje = timezone.localdate()
+    estados = obter_estados(cnpj, etapa, modalidades)
+    total_geral: Dict[str, int] = {"falhas": 0}
+
+    for modalidade in modalidades:
+        modalidade_nome = MODALIDADES.get(modalidade, f"Modalidade {modalidade}")
+        inicio, fim, incremental = calcular_janela(estados.get(modalidade), hoje, full=full)
+
+        # Converte para datetime no início e fim do dia
+        data_inicial = timezone.make_aware(datetime.combine(inicio, datetime.min.time()))
+        data_final = timezone.make_aware(datetime.combine(fim, datetime.max.time()))
+        logger.info(
+            f"[{label}] Processando modalidade {modalidade} - {modalidade_nome} "
+            f"({'incremental' if incremental else 'janela padrão'}: {inicio}..{fim})"
+        )
+
+        totals = loop.run_until_complete(
+            processar(
+                data_inicial=data_inicial,
+                data_final=data_final,
+                modalidades=[modalidade],
+                cnpj=cnpj,
+                campo_data="data_atualizacao" if incremental else "data_publicacao_pncp",
+                somente_alteradas=not full,
+            )
+        )
+        _acumular_totais(total_geral, totals)
+        _registrar_etapa(cnpj, modalidade, etapa, inicio, fim, totals)
+
+    return total_geral
+
+
 @shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_atualizacao_itens_pncp")
-def task_atualizacao_itens_pncp(self, cnpj: Optional[str] = None, modalidades: Optional[List[int]] = None):
+def task_atualizacao_itens_pncp(
+    self,
+    cnpj: Optional[str] = None,
+    modalidades: Optional[List[int]] = None,
+    full: bool = False,
+):
     """
-    Task do Celery para atualizar itens das compras dos últimos 10 dias.
+    Task do Celery para atualizar itens das compras.
     
     Esta task deve ser executada após task_atualizacao_seq_pncp para buscar
-    os itens das compras já cadastradas.
+    os itens das compras já cadastradas. Na primeira execução (ou com ``full=True``)
+    considera as compras publicadas nos últimos 10 dias; depois, apenas as compras
+    alteradas desde a última execução concluída de cada modalidade.
     
     Args:
         cnpj: CNPJ do órgão (padrão: DEFAULT_CNPJ)
         modalidades: Lista de códigos de modalidades (padrão: todas as 13 modalidades)
+        full: Ignora o estado incremental e reprocessa a janela padrão
     """
-    import os
-    
     cnpj = cnpj or os.getenv("PNCP_CNPJ", DEFAULT_CNPJ)
     
     # Processa modalidades da variável de ambiente ou usa padrão
@@ -847,21 +897,9 @@ def task_atualizacao_itens_pncp(self, cnpj: Optional[str] = None, modalidades: O
         else:
             modalidades = DEFAULT_MODALIDADES
     
-    # Converte códigos de modalidades para nomes
-    modalidades_nomes = [MODALIDADES.get(m, f"Modalidade {m}") for m in modalidades]
-    
-    # Calcula datas: últimos 10 dias (incluindo o dia atual)
-    hoje = timezone.now().date()
-    data_inicial_dt = hoje - timedelta(days=9)  # 9 dias atrás + hoje = 10 dias
-    
-    # Converte para datetime no início e fim do dia
-    data_inicial = timezone.make_aware(datetime.combine(data_inicial_dt, datetime.min.time()))
-    data_final = timezone.make_aware(datetime.combine(hoje, datetime.max.time()))
-    
     logger.info(
         f"[PNCP Itens Task] Iniciando atualização de itens - "
-        f"data_inicial={data_inicial.date()}, data_final={data_final.date()} "
-        f"(últimos 10 dias), cnpj={cnpj}, modalidades={modalidades_nomes}"
+        f"cnpj={cnpj}, modalidades={modalidades}, full={full}"
     )
     
     try:
@@ -869,13 +907,11 @@ def task_atualizacao_itens_pncp(self, cnpj: Optional[str] = None, modalidades: O
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            totals = loop.run_until_complete(
-                _processar_itens_async(
-                    data_inicial=data_inicial,
-                    data_final=data_final,
-                    modalidades=modalidades_nomes,
-                    cnpj=cnpj,
-                )
+            totals = _sincronizar_etapa_banco(
+                loop, cnpj, modalidades, full,
+                etapa=EstadoSincronizacao.ETAPA_ITENS,
+                processar=_processar_itens_async,
+                label="PNCP Itens Task",
             )
             logger.info(f"[PNCP Itens Task] Sucesso - {totals}")
             return totals
@@ -891,62 +927,69 @@ def task_atualizacao_itens_pncp(self, cnpj: Optional[str] = None, modalidades: O
 # ============================================================================
 
 MAX_CONCURRENCY_RESULTADOS = 5
-MAX_RETRIES_RESULTADOS = 3
+RESULTADOS_FLUSH_SIZE = int(os.getenv("PNCP_RESULTADOS_FLUSH_SIZE", "2000"))
+RESULTADOS_FLUSH_SECONDS = float(os.getenv("PNCP_RESULTADOS_FLUSH_SECONDS", "5"))
 
 
 def _get_itens_para_resultados_sync(
     data_inicial: datetime,
     data_final: datetime,
-    modalidades: List[str],
+    modalidades: List[int],
     cnpj: str,
+    campo_data: str = "data_publicacao_pncp",
+    somente_alteradas: bool = True,
 ) -> List[Dict[str, Any]]:
     """
     Busca itens que precisam ter resultados buscados:
     - tem_resultado = True
     - situacao_compra_item_nome contém "Homologado"
-    - Não têm resultado com valor_unitario_homologado ainda
+    - Não têm resultado com valor_unitario_homologado ainda, ou o ``hash_conteudo``
+      do item mudou desde a última busca de resultados
+    Sem ``somente_alteradas``, todos os itens homologados da janela são retornados.
+    A janela é aplicada sobre ``compra.<campo_data>``.
     """
     # Busca itens que atendem aos critérios
-    # Converte nomes de modalidades para IDs
-    modalidades_ids = []
-    for modalidade_nome in modalidades:
-        modalidade_obj = Modalidade.objects.filter(nome=modalidade_nome).first()
-        if modalidade_obj:
-            modalidades_ids.append(modalidade_obj.id)
-    
     queryset = ItemCompra.objects.filter(
-        compra__data_publicacao_pncp__gte=data_inicial,
-        compra__data_publicacao_pncp__lte=data_final,
+        **{
+            f"compra__{campo_data}__gte": data_inicial,
+            f"compra__{campo_data}__lte": data_final,
+        },
         tem_resultado=True,
         situacao_compra_item_nome__icontains="Homologado",
     )
-    if modalidades_ids:
-        queryset = queryset.filter(compra__modalidade_id__in=modalidades_ids)
-    itens = queryset.select_related("compra").prefetch_related("resultados")
+    if modalidades:
+        queryset = queryset.filter(compra__modalidade_id__in=modalidades)
+    if somente_alteradas:
+        # Um único EXISTS no lugar de uma consulta por item
+        queryset = queryset.annotate(
+            tem_resultado_completo=Exists(
+                ResultadoItem.objects.filter(
+                    item_compra=OuterRef("pk"),
+                    valor_unitario_homologado__isnull=False,
+                )
+            )
+        ).filter(
+            Q(tem_resultado_completo=False) | filtro_alterado("hash_resultados_sincronizados")
+        )
+    itens = queryset.select_related("compra")
     
-    # Filtra apenas itens que não têm resultado com valor_unitario_homologado
     itens_para_processar = []
     for item in itens:
-        # Verifica se já tem resultado com valor_unitario_homologado
-        tem_resultado_completo = item.resultados.filter(
-            valor_unitario_homologado__isnull=False
-        ).exists()
-        
-        if not tem_resultado_completo:
-            # Garante que numero_item seja obtido corretamente do objeto item
-            numero_item = item.numero_item
-            itens_para_processar.append({
-                "ano_compra": item.compra.ano_compra,
-                "sequencial_compra": item.compra.sequencial_compra,
-                "numero_item": numero_item,  # numero_item do item de compra
-                "orgao_cnpj": cnpj,
-                "item": item,  # Mantém referência ao objeto ItemCompra
-            })
-            logger.debug(
-                f"[PNCP Resultados] Item adicionado para processamento: "
-                f"ano={item.compra.ano_compra}, seq={item.compra.sequencial_compra}, "
-                f"numero_item={numero_item}, item_id={item.item_id}"
-            )
+        # Garante que numero_item seja obtido corretamente do objeto item
+        numero_item = item.numero_item
+        itens_para_processar.append({
+            "ano_compra": item.compra.ano_compra,
+            "sequencial_compra": item.compra.sequencial_compra,
+            "numero_item": numero_item,  # numero_item do item de compra
+            "orgao_cnpj": cnpj,
+            "item": item,  # Mantém referência ao objeto ItemCompra
+            "hash_conteudo": item.hash_conteudo,
+        })
+        logger.debug(
+            f"[PNCP Resultados] Item adicionado para processamento: "
+            f"ano={item.compra.ano_compra}, seq={item.compra.sequencial_compra}, "
+            f"numero_item={numero_item}, item_id={item.item_id}"
+        )
     
     return itens_para_processar
 
@@ -975,12 +1018,11 @@ def _to_int_resultados(value: Optional[Any]) -> Optional[int]:
 
 
 async def _fetch_resultados_api(
-    session: aiohttp.ClientSession,
+    client: PncpClient,
     orgao_cnpj: str,
     ano: int,
     seq: int,
     numero_item: int,
-    max_retries: int = MAX_RETRIES_RESULTADOS,
 ) -> List[Dict[str, Any]]:
     """
     Busca resultados de um item específico da API do PNCP.
@@ -989,59 +1031,26 @@ async def _fetch_resultados_api(
     
     logger.debug(f"[PNCP Resultados] GET {url}")
     
-    for attempt in range(1, max_retries + 1):
-        try:
-            async with session.get(url, headers=HEADERS, timeout=60) as resp:
-                if resp.status == 404:
-                    logger.debug(f"[PNCP Resultados] Nenhum resultado (404) para {ano}/{seq}/{numero_item}")
-                    return []
-                
-                if resp.status == 429:
-                    retry_after = int(resp.headers.get("Retry-After", "5"))
-                    backoff = retry_after * (2 ** (attempt - 1))
-                    logger.warning(
-                        f"[PNCP Resultados] 429 recebido para {url} (tentativa {attempt}/{max_retries}). "
-                        f"Aguardando {backoff}s antes de tentar novamente."
-                    )
-                    await asyncio.sleep(backoff)
-                    continue
-                
-                resp.raise_for_status()
-                data = await resp.json()
-                
-                # Processa diferentes formatos de resposta
-                if data is None:
-                    return []
-                if isinstance(data, list):
-                    return [d for d in data if isinstance(d, dict)]
-                if isinstance(data, dict):
-                    inner = data.get("data")
-                    if isinstance(inner, list):
-                        return [d for d in inner if isinstance(d, dict)]
-                
-                logger.warning(
-                    f"[PNCP Resultados] Estrutura inesperada para {ano}/{seq}/{numero_item}: {type(data)}"
-                )
-                return []
-                
-        except asyncio.CancelledError:
-            logger.debug(f"[PNCP Resultados] Cancelado durante fetch {ano}/{seq}/{numero_item}")
-            raise
-        except aiohttp.ClientError as e:
-            logger.warning(
-                f"[PNCP Resultados] Erro de rede em {ano}/{seq}/{numero_item} "
-                f"(tentativa {attempt}/{max_retries}): {e}"
-            )
-            if attempt == max_retries:
-                raise
-            await asyncio.sleep(2 ** attempt)
+    data = await client.get_json(url, endpoint="resultados")
+    
+    # Processa diferentes formatos de resposta (None = 404/204)
+    if data is None:
+        return []
+    if isinstance(data, list):
+        return [d for d in data if isinstance(d, dict)]
+    if isinstance(data, dict):
+        inner = data.get("data")
+        if isinstance(inner, list):
+            return [d for d in inner if isinstance(d, dict)]
     
-    raise RuntimeError(f"[PNCP Resultados] Falha após {max_retries} tentativas para {ano}/{seq}/{numero_item}")
+    logger.warning(
+        f"[PNCP Resultados] Estrutura inesperada para {ano}/{seq}/{numero_item}: {type(data)}"
+    )
+    return []
 
 
 async def _worker_resultados(
-    session: aiohttp.ClientSession,
-    sem: asyncio.Semaphore,
+    client: PncpClient,
     item_info: Dict[str, Any],
 ) -> Tuple[int, int, int, List[Dict[str, Any]], Optional[str]]:
     """
@@ -1054,8 +1063,7 @@ async def _worker_resultados(
     
     try:
         logger.debug(f"[PNCP Resultados] Iniciando worker {ano}/{seq}/{num} orgao={cnpj}")
-        async with sem:
-            resultados = await _fetch_resultados_api(session, cnpj, ano, seq, num)
+        resultados = await _fetch_resultados_api(client, cnpj, ano, seq, num)
         logger.debug(f"[PNCP Resultados] Worker concluído {ano}/{seq}/{num} resultados={len(resultados)}")
         return ano, seq, num, resultados, None
     except asyncio.CancelledError:
@@ -1066,169 +1074,131 @@ async def _worker_resultados(
         return ano, seq, num, [], str(e)
 
 
-def _save_fornecedor_sync(cnpj: str, razao_social: Optional[str]) -> None:
-    """Salva ou atualiza um fornecedor"""
-    if not cnpj:
-        return
-    
-    Fornecedor.objects.update_or_create(
-        cnpj_fornecedor=cnpj,
-        defaults={"razao_social": razao_social or ""}
-    )
-
-
-_save_fornecedor_async = sync_to_async(_save_fornecedor_sync, thread_sensitive=False)
-
+def _parse_resultado_api(resultado_api: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Extrai os campos de um resultado da API. Retorna None se faltar dado obrigatório.
+    """
+    cnpj_f = resultado_api.get("niFornecedor")
+    valor_total = _to_decimal_resultados(resultado_api.get("valorTotalHomologado"))
+    quantidade = _to_int_resultados(resultado_api.get("quantidadeHomologada"))
+    valor_unitario = _to_decimal_resultados(resultado_api.get("valorUnitarioHomologado"))
+    if not cnpj_f or not valor_total or not quantidade or not valor_unitario:
+        return None
 
-def _save_resultado_sync(
-    item_compra: ItemCompra,
-    fornecedor: Fornecedor,
-    valor_total_homologado: Decimal,
-    quantidade_homologada: int,
-    valor_unitario_homologado: Decimal,
-    status: str,
-    marca: Optional[str] = None,
-    modelo: Optional[str] = None,
-) -> None:
-    """Salva ou atualiza um resultado de item"""
-    # Garante que estamos usando o numero_item correto do item_compra
-    ano = item_compra.compra.ano_compra
-    seq = item_compra.compra.sequencial_compra
-    numero_item = item_compra.numero_item  # Usa o numero_item do objeto item_compra
-    
-    resultado_id = f"{ano}::{seq}::{numero_item}"
-    
-    # Log para debug
-    logger.debug(
-        f"[PNCP Resultados] Criando resultado_id: {resultado_id} "
-        f"(ano={ano}, seq={seq}, numero_item={numero_item}, item_id={item_compra.item_id})"
-    )
-    
-    ResultadoItem.objects.update_or_create(
-        resultado_id=resultado_id,
-        defaults={
-            "item_compra": item_compra,
-            "fornecedor": fornecedor,
-            "valor_total_homologado": valor_total_homologado,
-            "quantidade_homologada": quantidade_homologada,
-            "valor_unitario_homologado": valor_unitario_homologado,
-            "status": status or "",
-            "marca": marca or "",
-            "modelo": modelo or "",
-        }
+    situacao = (
+        resultado_api.get("situacaoCompraItemResultadoNome") or
+        resultado_api.get("situacaoCompraItemResultadoId")
     )
-
-
-def _atualizar_percentual_item_sync(
-    item_compra: ItemCompra,
-    valor_total_homologado: Optional[Decimal],
-) -> None:
-    """Atualiza o percentual de economia do item"""
-    if valor_total_homologado is None:
-        return
-    
-    if item_compra.valor_total_estimado is None or item_compra.valor_total_estimado == 0:
-        item_compra.percentual_economia = None
-    else:
-        percentual = (
-            (item_compra.valor_total_estimado - valor_total_homologado) / 
-            item_compra.valor_total_estimado
-        ) * Decimal("100")
-        item_compra.percentual_economia = percentual.quantize(Decimal("0.01"))
-    
-    item_compra.save(update_fields=["percentual_economia"])
+    return {
+        "cnpj_fornecedor": str(cnpj_f),
+        "razao_social": resultado_api.get("nomeRazaoSocialFornecedor") or "",
+        "valor_total_homologado": valor_total,
+        "quantidade_homologada": quantidade,
+        "valor_unitario_homologado": valor_unitario,
+        "status": str(situacao) if situacao else "",
+        "marca": resultado_api.get("marca") or "",
+        "modelo": resultado_api.get("modelo") or "",
+    }
 
 
 def _processar_resultado_batch_sync(
     resultados_data: List[Dict[str, Any]]
 ) -> Dict[str, int]:
     """
-    Processa um lote de resultados: salva fornecedores, resultados e atualiza percentuais.
+    Processa um lote de resultados (de vários itens) em três etapas set-based:
+    1. upsert dos fornecedores
+    2. upsert dos resultados
+    3. recálculo de percentual_economia dos itens e dos totais homologados das compras
+    4. recálculo dos resumos de painel das unidades tocadas
+
+    Cada entrada contém item_id, ano_compra, sequencial_compra, numero_item e resultado_api.
     """
-    totals = {"resultados": 0, "fornecedores": 0, "ignoradas": 0}
-    
+    totals = {
+        "resultados": 0, "fornecedores": 0, "ignoradas": 0,
+        "itens_recalculados": 0, "compras_recalculadas": 0, "resumos": 0,
+    }
     if not resultados_data:
         return totals
-    
+
+    fornecedores: Dict[str, str] = {}
+    resultados_rows = []
+    for resultado_data in resultados_data:
+        dados = _parse_resultado_api(resultado_data["resultado_api"])
+        if dados is None:
+            logger.debug(
+                f"[PNCP Resultados] Dados incompletos para item {resultado_data['item_id']}: "
+                f"{resultado_data['resultado_api']}"
+            )
+            totals["ignoradas"] += 1
+            continue
+
+        cnpj_f = dados.pop("cnpj_fornecedor")
+        razao_f = dados.pop("razao_social")
+        if razao_f or cnpj_f not in fornecedores:
+            fornecedores[cnpj_f] = razao_f
+
+        resultados_rows.append({
+            "resultado_id": (
+                f"{resultado_data['ano_compra']}::{resultado_data['sequencial_compra']}::"
+                f"{resultado_data['numero_item']}"
+            ),
+            "item_compra_id": resultado_data["item_id"],
+            "fornecedor_id": cnpj_f,
+            **dados,
+        })
+
+    if not resultados_rows:
+        return totals
+
     with transaction.atomic():
-        for resultado_data in resultados_data:
-            try:
-                item_compra = resultado_data["item_compra"]
-                resultado_api = resultado_data["resultado_api"]
-                
-                # Extrai dados do resultado da API
-                cnpj_f = resultado_api.get("niFornecedor")
-                razao_f = resultado_api.get("nomeRazaoSocialFornecedor")
-                valor_total = _to_decimal_resultados(resultado_api.get("valorTotalHomologado"))
-                quantidade = _to_int_resultados(resultado_api.get("quantidadeHomologada"))
-                valor_unitario = _to_decimal_resultados(resultado_api.get("valorUnitarioHomologado"))
-                situacao = (
-                    resultado_api.get("situacaoCompraItemResultadoNome") or 
-                    resultado_api.get("situacaoCompraItemResultadoId")
-                )
-                marca = resultado_api.get("marca")
-                modelo = resultado_api.get("modelo")
-                
-                # Valida dados obrigatórios
-                if not cnpj_f or not valor_total or not quantidade or not valor_unitario:
-                    logger.debug(
-                        f"[PNCP Resultados] Dados incompletos para item {item_compra.item_id}: "
-                        f"cnpj={cnpj_f}, valor_total={valor_total}, quantidade={quantidade}, "
-                        f"valor_unitario={valor_unitario}"
-                    )
-                    totals["ignoradas"] += 1
-                    continue
-                
-                # Salva fornecedor
-                fornecedor, created = Fornecedor.objects.get_or_create(
-                    cnpj_fornecedor=cnpj_f,
-                    defaults={"razao_social": razao_f or ""}
-                )
-                if created:
-                    totals["fornecedores"] += 1
-                elif razao_f:
-                    # Atualiza razão social se fornecida
-                    fornecedor.razao_social = razao_f
-                    fornecedor.save(update_fields=["razao_social"])
-                
-                # Salva resultado
-                _save_resultado_sync(
-                    item_compra=item_compra,
-                    fornecedor=fornecedor,
-                    valor_total_homologado=valor_total,
-                    quantidade_homologada=quantidade,
-                    valor_unitario_homologado=valor_unitario,
-                    status=str(situacao) if situacao else "",
-                    marca=marca,
-                    modelo=modelo,
-                )
-                
-                # Atualiza percentual de economia do item
-                _atualizar_percentual_item_sync(item_compra, valor_total)
-                
-                totals["resultados"] += 1
-                
-            except Exception as e:
-                logger.error(
-                    f"[PNCP Resultados] Erro ao processar resultado: {e}",
-                    exc_info=True
-                )
-                totals["ignoradas"] += 1
-    
-    return totals
+        # 1. Fornecedores: atualiza a razão social apenas quando a API a informou
+        com_razao = [
+            {"cnpj_fornecedor": cnpj, "razao_social": razao}
+            for cnpj, razao in fornecedores.items() if razao
+        ]
+        sem_razao = [
+            {"cnpj_fornecedor": cnpj, "razao_social": ""}
+            for cnpj, razao in fornecedores.items() if not razao
+        ]
+        for rows, update_fields in ((com_razao, ["razao_social"]), (sem_razao, [])):
+            stats = bulk_upsert(
+                Fornecedor, rows, conflict_fields=["cnpj_fornecedor"],
+                update_fields=update_fields, label="PNCP Resultados",
+            )
+            totals["fornecedores"] += stats["inseridas"]
 
+        # 2. Resultados
+        stats = bulk_upsert(
+            ResultadoItem, resultados_rows, conflict_fields=["resultado_id"],
+            label="PNCP Resultados",
+        )
+        totals["resultados"] = stats["inseridas"] + stats["atualizadas"] + stats["inalteradas"]
+        totals["ignoradas"] += stats["ignoradas"]
 
-_processar_resultado_batch_async = sync_to_async(_processar_resultado_batch_sync, thread_sensitive=False)
+        # 3. Campos derivados dos itens e compras tocados
+        item_ids = {row["item_compra_id"] for row in resultados_rows}
+        totals.update(recalcular_derivados(item_ids))
+
+        # 4. Resumos: o homologado das compras muda junto com os resultados
+        unidades = unidades_dos_itens(item_ids)
+        totals["resumos"] = atualizar_resumo_compras(unidades) + atualizar_resumo_fornecedores(unidades)
+
+    return totals
 
 
 async def _processar_resultados_async(
     data_inicial: datetime,
     data_final: datetime,
-    modalidades: List[str],
+    modalidades: List[int],
     cnpj: str,
+    campo_data: str = "data_publicacao_pncp",
+    somente_alteradas: bool = True,
 ) -> Dict[str, int]:
     """
     Processa resultados de itens: busca itens, busca resultados da API e salva no banco.
+    Retorna também ``falhas`` (itens cuja busca falhou) e ``max_data_atualizacao``
+    das compras dos itens processados, usados pelo estado incremental.
+    Ao final, grava em cada item processado o hash cujos resultados foram sincronizados.
     """
     logger.info(
         f"[PNCP Resultados] Iniciando processamento de resultados - "
@@ -1238,7 +1208,7 @@ async def _processar_resultados_async(
     
     # Busca itens que precisam ter resultados buscados
     itens = await _get_itens_para_resultados_async(
-        data_inicial, data_final, modalidades, cnpj
+        data_inicial, data_final, modalidades, cnpj, campo_data, somente_alteradas
     )
     
     if not itens:
@@ -1247,18 +1217,32 @@ async def _processar_resultados_async(
     
     logger.info(f"[PNCP Resultados] Itens encontrados: {len(itens)}")
     
-    totals = {"resultados": 0, "fornecedores": 0, "ignoradas": 0, "itens_processados": 0}
-    sem = asyncio.Semaphore(MAX_CONCURRENCY_RESULTADOS)
-    
-    # Cria dicionário de lookup para acesso rápido aos itens
+    totals = {"resultados": 0, "fornecedores": 0, "ignoradas": 0, "itens_processados": 0, "falhas": 0}
+    # Cria dicionário de lookup para acesso rápido ao item_id
     itens_lookup = {
-        (item_info["ano_compra"], item_info["sequencial_compra"], item_info["numero_item"]): item_info["item"]
+        (item_info["ano_compra"], item_info["sequencial_compra"], item_info["numero_item"]): item_info["item"].item_id
+        for item_info in itens
+    }
+    datas_atualizacao = {
+        (item_info["ano_compra"], item_info["sequencial_compra"]): item_info["item"].compra.data_atualizacao
         for item_info in itens
     }
+    hashes = {
+        (item_info["ano_compra"], item_info["sequencial_compra"], item_info["numero_item"]): item_info["hash_conteudo"]
+        for item_info in itens
+    }
+    sincronizados: Dict[str, str] = {}
+    max_data_atualizacao = None
+    buffer = AsyncUpsertBuffer(
+        _processar_resultado_batch_sync,
+        flush_size=RESULTADOS_FLUSH_SIZE,
+        flush_interval=RESULTADOS_FLUSH_SECONDS,
+        label="PNCP Resultados",
+    )
     
-    async with aiohttp.ClientSession(headers=HEADERS, trust_env=True) as session:
+    async with PncpClient(max_concurrency=MAX_CONCURRENCY_RESULTADOS) as client, buffer:
         tasks = [
-            asyncio.create_task(_worker_resultados(session, sem, item_info)) 
+            asyncio.create_task(_worker_resultados(client, item_info)) 
             for item_info in itens
         ]
         
@@ -1269,62 +1253,33 @@ async def _processar_resultados_async(
                 if err:
                     logger.warning(f"[PNCP Resultados] Falha ao buscar resultados {ano}/{seq}/{num}: {err}")
                     totals["ignoradas"] += 1
+                    totals["falhas"] += 1
                     continue
                 
                 totals["itens_processados"] += 1
+                sincronizados[itens_lookup[(ano, seq, num)]] = hashes.get((ano, seq, num))
+                data_atualizacao = datas_atualizacao.get((ano, seq))
+                if data_atualizacao and (max_data_atualizacao is None or data_atualizacao > max_data_atualizacao):
+                    max_data_atualizacao = data_atualizacao
                 
                 if not resultados:
                     logger.debug(f"[PNCP Resultados] Nenhum resultado para {ano}/{seq}/{num}")
                     continue
                 
-                # Busca o item no dicionário de lookup usando ano, seq e num (numero_item)
-                item_compra = itens_lookup.get((ano, seq, num))
+                item_id = itens_lookup[(ano, seq, num)]
                 
-                # Se não encontrou no lookup, busca no banco usando numero_item correto
-                if not item_compra:
-                    item_compra = await _get_item_compra_async(ano, seq, num)
-                
-                if not item_compra:
-                    logger.warning(f"[PNCP Resultados] Item {ano}/{seq}/{num} não encontrado")
-                    totals["ignoradas"] += 1
-                    continue
-                
-                # Valida que o numero_item do item_compra corresponde ao usado na busca
-                if item_compra.numero_item != num:
-                    logger.warning(
-                        f"[PNCP Resultados] Inconsistência: item_compra.numero_item={item_compra.numero_item} "
-                        f"diferente do numero_item usado na busca={num} para {ano}/{seq}"
-                    )
-                    # Usa o numero_item correto do item_compra
-                    num = item_compra.numero_item
-                
-                # Prepara dados para processamento em lote
-                # IMPORTANTE: Usa o item_compra correto com numero_item válido
-                resultados_para_salvar = []
-                for resultado in resultados:
-                    if not isinstance(resultado, dict):
-                        logger.debug(f"[PNCP Resultados] Ignorando resultado inválido: {type(resultado)}")
-                        continue
-                    
-                    # Garante que estamos usando o item_compra correto
-                    # O item_compra já foi validado acima e tem o numero_item correto
-                    resultados_para_salvar.append({
-                        "item_compra": item_compra,  # item_compra com numero_item correto
+                # Acumula os resultados; a gravação ocorre em lotes de vários itens
+                await buffer.add([
+                    {
+                        "item_id": item_id,
+                        "ano_compra": ano,
+                        "sequencial_compra": seq,
+                        "numero_item": num,
                         "resultado_api": resultado,
-                    })
-                    
-                    logger.debug(
-                        f"[PNCP Resultados] Preparando resultado para item: "
-                        f"ano={ano}, seq={seq}, numero_item={item_compra.numero_item}, "
-                        f"item_id={item_compra.item_id}"
-                    )
-                
-                # Processa lote de resultados
-                if resultados_para_salvar:
-                    batch_totals = await _processar_resultado_batch_async(resultados_para_salvar)
-                    totals["resultados"] += batch_totals["resultados"]
-                    totals["fornecedores"] += batch_totals["fornecedores"]
-                    totals["ignoradas"] += batch_totals["ignoradas"]
+                    }
+                    for resultado in resultados
+                    if isinstance(resultado, dict)
+                ])
                     
         except asyncio.CancelledError:
             logger.warning("[PNCP Resultados] Cancelamento recebido; aguardando finalização das tasks...")
@@ -1337,6 +1292,13 @@ async def _processar_resultados_async(
                     t.cancel()
                 await asyncio.gather(*pendentes, return_exceptions=True)
     
+    for key, value in buffer.totals.items():
+        totals[key] = totals.get(key, 0) + value
+    totals["lotes"] = buffer.lotes
+    totals["max_data_atualizacao"] = max_data_atualizacao
+    # Só marca depois que o buffer gravou todos os resultados
+    totals["marcados"] = await sync_to_async(marcar_resultados_sincronizados, thread_sensitive=False)(sincronizados)
+    
     logger.info(
         f"[PNCP Resultados] Concluído - resultados={totals['resultados']}, "
         f"fornecedores={totals['fornecedores']}, ignoradas={totals['ignoradas']}, "
@@ -1345,42 +1307,25 @@ async def _processar_resultados_async(
     return totals
 
 
-def _get_item_compra_sync(ano: int, seq: int, num: int) -> Optional[ItemCompra]:
-    """Busca um item de compra específico"""
-    try:
-        return ItemCompra.objects.get(
-            compra__ano_compra=ano,
-            compra__sequencial_compra=seq,
-            numero_item=num
-        )
-    except ItemCompra.DoesNotExist:
-        return None
-    except ItemCompra.MultipleObjectsReturned:
-        logger.warning(f"[PNCP Resultados] Múltiplos itens encontrados para {ano}/{seq}/{num}")
-        return ItemCompra.objects.filter(
-            compra__ano_compra=ano,
-            compra__sequencial_compra=seq,
-            numero_item=num
-        ).first()
-
-
-_get_item_compra_async = sync_to_async(_get_item_compra_sync, thread_sensitive=False)
-
-
 @shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_atualizacao_resultados_pncp")
-def task_atualizacao_resultados_pncp(self, cnpj: Optional[str] = None, modalidades: Optional[List[int]] = None):
+def task_atualizacao_resultados_pncp(
+    self,
+    cnpj: Optional[str] = None,
+    modalidades: Optional[List[int]] = None,
+    full: bool = False,
+):
     """
-    Task do Celery para atualizar resultados dos itens dos últimos 10 dias.
+    Task do Celery para atualizar resultados dos itens.
     
     Esta task deve ser executada após task_atualizacao_itens_pncp para buscar
-    os resultados dos itens já cadastrados.
+    os resultados dos itens já cadastrados. Usa o mesmo esquema incremental da
+    etapa de itens (janela padrão de 10 dias na primeira execução ou com ``full=True``).
     
     Args:
         cnpj: CNPJ do órgão (padrão: DEFAULT_CNPJ)
         modalidades: Lista de códigos de modalidades (padrão: todas as 13 modalidades)
+        full: Ignora o estado incremental e reprocessa a janela padrão
     """
-    import os
-    
     cnpj = cnpj or os.getenv("PNCP_CNPJ", DEFAULT_CNPJ)
     
     # Processa modalidades da variável de ambiente ou usa padrão
@@ -1391,21 +1336,9 @@ def task_atualizacao_resultados_pncp(self, cnpj: Optional[str] = None, modalidad
         else:
             modalidades = DEFAULT_MODALIDADES
     
-    # Converte códigos de modalidades para nomes
-    modalidades_nomes = [MODALIDADES.get(m, f"Modalidade {m}") for m in modalidades]
-    
-    # Calcula datas: últimos 10 dias (incluindo o dia atual)
-    hoje = timezone.now().date()
-    data_inicial_dt = hoje - timedelta(days=9)  # 9 dias atrás + hoje = 10 dias
-    
-    # Converte para datetime no início e fim do dia
-    data_inicial = timezone.make_aware(datetime.combine(data_inicial_dt, datetime.min.time()))
-    data_final = timezone.make_aware(datetime.combine(hoje, datetime.max.time()))
-    
     logger.info(
         f"[PNCP Resultados Task] Iniciando atualização de resultados - "
-        f"data_inicial={data_inicial.date()}, data_final={data_final.date()} "
-        f"(últimos 10 dias), cnpj={cnpj}, modalidades={modalidades_nomes}"
+        f"cnpj={cnpj}, modalidades={modalidades}, full={full}"
     )
     
     try:
@@ -1413,13 +1346,11 @@ def task_atualizacao_resultados_pncp(self, cnpj: Optional[str] = None, modalidad
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            totals = loop.run_until_complete(
-                _processar_resultados_async(
-                    data_inicial=data_inicial,
-                    data_final=data_final,
-                    modalidades=modalidades_nomes,
-                    cnpj=cnpj,
-                )
+            totals = _sincronizar_etapa_banco(
+                loop, cnpj, modalidades, full,
+                etapa=EstadoSincronizacao.ETAPA_RESULTADOS,
+                processar=_processar_resultados_async,
+                label="PNCP Resultados Task",
             )
             logger.info(f"[PNCP Resultados Task] Sucesso - {totals}")
             return totals
@@ -1434,55 +1365,41 @@ def task_atualizacao_resultados_pncp(self, cnpj: Optional[str] = None, modalidad
 # Task para atualizar compras via endpoint de atualização (Etapa 1b)
 # ============================================================================
 
-PNCP_ATUALIZACAO_BASE = "https://pncp.gov.br/api/consulta/v1/contratacoes/atualizacao"
+PNCP_ATUALIZACAO_BASE = f"{PNCP_CONSULTA_BASE}/contratacoes/atualizacao"
 
 
 async def _get_atualizacoes_page(
-    session: aiohttp.ClientSession,
+    client: PncpClient,
     params: Dict[str, str],
-    max_retries: int = 3,
-    backoff_base: float = 1.0,
 ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
-    Faz GET assíncrono no endpoint de atualização com retry/backoff simples.
+    Faz GET assíncrono no endpoint de atualização (retry/rate limit no PncpClient).
     Retorna (payload_json, erro_str)
     """
     url = PNCP_ATUALIZACAO_BASE
-    timeout = aiohttp.ClientTimeout(total=60)
     
     # Log da URL completa para debug
     url_with_params = f"{url}?" + "&".join([f"{k}={v}" for k, v in params.items()])
     logger.debug(f"[PNCP Atualização] GET {url_with_params}")
     
-    for attempt in range(1, max_retries + 1):
-        try:
-            async with session.get(url, params=params, headers=HEADERS, timeout=timeout) as resp:
-                if resp.status != 200:
-                    body = (await resp.text())[:240]
-                    err = f"API {resp.status}: {body}"
-                    if attempt < max_retries and resp.status in (500, 502, 503, 504):
-                        await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                        continue
-                    return None, err
-                ct = (resp.headers.get("Content-Type") or "").lower()
-                if "application/json" not in ct:
-                    preview = (await resp.text())[:240].replace("\n", " ")
-                    return None, f"Content-Type inesperado ({ct}). Body[:240]={preview!r}"
-                data = await resp.json()
-                return data, None
-        except aiohttp.ClientError as e:
-            if attempt < max_retries:
-                await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                continue
-            return None, f"ClientError: {repr(e)}"
-        except asyncio.TimeoutError as e:
-            if attempt < max_retries:
-                await asyncio.sleep(backoff_base * (2 ** (attempt - 1)))
-                continue
-            return None, f"TimeoutError: {repr(e)}"
-        except json.JSONDecodeError as e:
-            return None, f"JSONDecodeError: {repr(e)}"
-    return None, "Erro desconhecido"
+    try:
+        data = await client.get_json(url, params=params, endpoint="atualizacao")
+    except PncpRequestError as e:
+        return None, str(e)
+    # 204/404: janela sem atualizações
+    return data or {}, None
+
+
+def _extract_atualizacoes(payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Extrai a lista de atualizações e info de paginação.
+    """
+    atualizacoes = payload.get("data")
+    if not isinstance(atualizacoes, list):
+        atualizacoes = []
+    total_paginas = int(payload.get("totalPaginas") or 1)
+    numero_pagina = int(payload.get("numeroPagina") or 1)
+    return atualizacoes, total_paginas, numero_pagina
 
 
 def _process_atualizacao(p: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -1531,7 +1448,7 @@ def _process_atualizacao(p: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     # Gera compra_id no formato "ano::sequencial"
     compra_id = f"{ano}::{seq}"
     
-    return {
+    compra_data = {
         "compra_id": compra_id,
         "ano_compra": ano,
         "sequencial_compra": seq,
@@ -1548,6 +1465,8 @@ def _process_atualizacao(p: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         "valor_total_homologado": valor_total_homologado,
         "percentual_desconto": percentual_desconto,
     }
+    compra_data["hash_conteudo"] = fingerprint(compra_data, data_atualizacao)
+    return compra_data
 
 
 async def _fetch_and_process_atualizacoes(
@@ -1586,102 +1505,43 @@ async def _fetch_and_process_atualizacoes(
     # Log dos parâmetros para debug
     logger.info(f"[PNCP Atualização] Parâmetros da requisição: {base_params}")
     
-    totals = {"compras": 0, "ignoradas": 0, "paginas": 0}
-    compras_data = {}  # Usado para deduplicação: {(ano, seq): dados}
-    
-    async with aiohttp.ClientSession(trust_env=True) as session:
-        # Busca primeira página
-        params = dict(base_params)
-        params["pagina"] = "1"
-        payload, err = await _get_atualizacoes_page(session, params)
-        
-        if err:
-            logger.error(f"[PNCP Atualização] Falha ao buscar página 1: {err}")
-            return totals
-        
-        # Extrai lista de atualizações
-        atualizacoes = payload.get("data")
-        if not isinstance(atualizacoes, list):
-            atualizacoes = []
-        
-        total_paginas = int(payload.get("totalPaginas") or 1)
-        numero_pagina = int(payload.get("numeroPagina") or 1)
-        
-        logger.info(f"[PNCP Atualização] Total de páginas: {total_paginas}")
-        
-        # Processa primeira página
-        for p in atualizacoes:
-            compra_data = _process_atualizacao(p)
-            if compra_data:
-                key = (compra_data["ano_compra"], compra_data["sequencial_compra"])
-                compras_data[key] = compra_data  # Mantém a última ocorrência
-            else:
-                totals["ignoradas"] += 1
-        totals["paginas"] += 1
-        
-        # Busca páginas restantes em paralelo
-        if total_paginas > 1:
-            sem = asyncio.Semaphore(10)
-            
-            async def fetch_page(pg: int):
-                params = dict(base_params)
-                params["pagina"] = str(pg)
-                async with sem:
-                    payload, err = await _get_atualizacoes_page(session, params)
-                return pg, payload, err
-            
-            tasks = [
-                asyncio.create_task(fetch_page(pg))
-                for pg in range(2, total_paginas + 1)
-            ]
-            
-            for coro in asyncio.as_completed(tasks):
-                pg, payload, err = await coro
-                if err:
-                    logger.warning(f"[PNCP Atualização] Falha ao buscar página {pg}: {err}")
-                    totals["ignoradas"] += 1
-                    continue
-                
-                atualizacoes = payload.get("data")
-                if not isinstance(atualizacoes, list):
-                    atualizacoes = []
-                
-                for p in atualizacoes:
-                    compra_data = _process_atualizacao(p)
-                    if compra_data:
-                        key = (compra_data["ano_compra"], compra_data["sequencial_compra"])
-                        compras_data[key] = compra_data
-                    else:
-                        totals["ignoradas"] += 1
-                totals["paginas"] += 1
-        
-        # Salva no banco usando Django ORM (função síncrona)
-        if compras_data:
-            totals_saved = await _save_compras_async(list(compras_data.values()))
-            totals["compras"] += totals_saved["compras"]
-            totals["ignoradas"] += totals_saved["ignoradas"]
+    totals = await _stream_compras(
+        _get_atualizacoes_page,
+        base_params,
+        process=_process_atualizacao,
+        extract=_extract_atualizacoes,
+        label="PNCP Atualização",
+    )
     
     logger.info(
         f"[PNCP Atualização] Concluído - compras={totals['compras']}, "
+        f"inseridas={totals.get('inseridas', 0)}, atualizadas={totals.get('atualizadas', 0)}, "
+        f"inalteradas={totals.get('inalteradas', 0)}, "
         f"ignoradas={totals['ignoradas']}, páginas={totals['paginas']}"
     )
     return totals
 
 
 @shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_atualizacao_compras_pncp")
-def task_atualizacao_compras_pncp(self, cnpj: Optional[str] = None, modalidades: Optional[List[int]] = None):
+def task_atualizacao_compras_pncp(
+    self,
+    cnpj: Optional[str] = None,
+    modalidades: Optional[List[int]] = None,
+    full: bool = False,
+):
     """
-    Task do Celery para atualizar compras via endpoint de atualização dos últimos 10 dias.
+    Task do Celery para atualizar compras via endpoint de atualização.
     
     Esta task busca atualizações de compras que já existem ou cria novas se não existirem.
-    Diferente da task de sequenciais, esta busca especificamente por atualizações.
+    Compartilha o estado incremental da etapa "compras" com task_atualizacao_seq_pncp:
+    sem estado (ou com ``full=True``) consulta os últimos 10 dias; depois, apenas o
+    intervalo desde a última janela concluída.
     
     Args:
         cnpj: CNPJ do órgão (padrão: DEFAULT_CNPJ)
         modalidades: Lista de códigos de modalidades (padrão: todas as 13 modalidades)
+        full: Ignora o estado incremental e reprocessa a janela padrão
     """
-    import os
-    
     cnpj = cnpj or os.getenv("PNCP_CNPJ", DEFAULT_CNPJ)
     
     # Processa modalidades da variável de ambiente ou usa padrão
@@ -1692,17 +1552,9 @@ def task_atualizacao_compras_pncp(self, cnpj: Optional[str] = None, modalidades:
         else:
             modalidades = DEFAULT_MODALIDADES
     
-    # Calcula datas: últimos 10 dias (incluindo o dia atual)
-    hoje = timezone.now().date()
-    data_inicial_dt = hoje - timedelta(days=9)  # 9 dias atrás + hoje = 10 dias
-    
-    data_inicial = data_inicial_dt.strftime("%Y-%m-%d")
-    data_final = hoje.strftime("%Y-%m-%d")
-    
     logger.info(
         f"[PNCP Atualização Task] Iniciando atualização - "
-        f"data_inicial={data_inicial}, data_final={data_final} "
-        f"(últimos 10 dias), cnpj={cnpj}, modalidades={modalidades}"
+        f"cnpj={cnpj}, modalidades={modalidades}, full={full}"
     )
     
     try:
@@ -1710,33 +1562,11 @@ def task_atualizacao_compras_pncp(self, cnpj: Optional[str] = None, modalidades:
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            total_geral = {"compras": 0, "ignoradas": 0, "paginas": 0}
-            
-            # Processa cada modalidade sequencialmente
-            for modalidade in modalidades:
-                modalidade_nome = MODALIDADES.get(modalidade, f"Modalidade {modalidade}")
-                logger.info(
-                    f"[PNCP Atualização Task] Processando modalidade {modalidade} - {modalidade_nome}"
-                )
-                totals = loop.run_until_complete(
-                    _fetch_and_process_atualizacoes(
-                        data_inicial=data_inicial,
-                        data_final=data_final,
-                        modalidade=modalidade,
-                        cnpj=cnpj,
-                    )
-                )
-                # Acumula totais
-                total_geral["compras"] += totals.get("compras", 0)
-                total_geral["ignoradas"] += totals.get("ignoradas", 0)
-                total_geral["paginas"] += totals.get("paginas", 0)
-                logger.info(
-                    f"[PNCP Atualização Task] Modalidade {modalidade} ({modalidade_nome}) concluída - "
-                    f"compras={totals.get('compras', 0)}, "
-                    f"ignoradas={totals.get('ignoradas', 0)}, "
-                    f"páginas={totals.get('paginas', 0)}"
-                )
-            
+            total_geral = _sincronizar_compras(
+                loop, cnpj, modalidades, full,
+                publicacoes_na_janela_padrao=False,
+                label="PNCP Atualização Task",
+            )
             logger.info(f"[PNCP Atualização Task] Sucesso geral - {total_geral}")
             return total_geral
         finally:
@@ -1744,3 +1574,234 @@ def task_atualizacao_compras_pncp(self, cnpj: Optional[str] = None, modalidades:
     except Exception as e:
         logger.error(f"[PNCP Atualização Task] Erro durante execução: {e}", exc_info=True)
         raise
+
+
+# ============================================================================
+# Orquestração paralela: shards (cnpj × modalidade × período) com chord
+# ============================================================================
+
+def _executar_async(coro):
+    """Executa uma corrotina num event loop próprio (padrão das tasks deste módulo)."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _janela_datetime(shard: Dict[str, Any]) -> Tuple[datetime, datetime]:
+    inicio = date.fromisoformat(shard["data_inicial"])
+    fim = date.fromisoformat(shard["data_final"])
+    return (
+        timezone.make_aware(datetime.combine(inicio, datetime.min.time())),
+        timezone.make_aware(datetime.combine(fim, datetime.max.time())),
+    )
+
+
+def _executar_etapa_shard(shard: Dict[str, Any], etapa: str, executar) -> Dict[str, Any]:
+    """
+    Executa uma etapa do shard e grava no próprio shard os contadores e a maior
+    ``data_atualizacao``. Erros viram falhas do shard em vez de derrubar o chord.
+    """
+    label = (
+        f"PNCP Shard {shard['cnpj']}/{shard['modalidade']} "
+        f"{shard['data_inicial']}..{shard['data_final']}"
+    )
+    try:
+        totals = _executar_async(executar())
+    except Exception as e:
+        logger.error(f"[{label}] Erro na etapa {etapa}: {e}", exc_info=True)
+        shard["totais"][etapa] = {"falhas": 1}
+        shard["erros"].append(f"{etapa}: {type(e).__name__}: {e}")
+        return shard
+
+    max_data = totals.get("max_data_atualizacao")
+    if max_data:
+        shard["max_data_atualizacao"][etapa] = max_data.astimezone(dt_timezone.utc).isoformat()
+    shard["totais"][etapa] = {
+        key: value for key, value in totals.items()
+        if isinstance(value, int) and not isinstance(value, bool)
+    }
+    logger.info(f"[{label}] Etapa {etapa} concluída: {shard['totais'][etapa]}")
+    return shard
+
+
+@shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_shard_compras_pncp")
+def task_shard_compras_pncp(self, shard: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Etapa 1 do shard: compras do período. Na janela padrão usa o endpoint de
+    publicação; em janela incremental, o de atualização.
+    """
+    fetch = _fetch_and_process_atualizacoes if shard["incremental"] else _fetch_and_process_publications
+    return _executar_etapa_shard(
+        shard,
+        EstadoSincronizacao.ETAPA_COMPRAS,
+        lambda: fetch(
+            data_inicial=shard["data_inicial"],
+            data_final=shard["data_final"],
+            modalidade=shard["modalidade"],
+            cnpj=shard["cnpj"],
+        ),
+    )
+
+
+@shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_shard_itens_pncp")
+def task_shard_itens_pncp(self, shard: Dict[str, Any]) -> Dict[str, Any]:
+    """Etapa 2 do shard: itens das compras do período (recebe o shard da etapa 1)."""
+    data_inicial, data_final = _janela_datetime(shard)
+    return _executar_etapa_shard(
+        shard,
+        EstadoSincronizacao.ETAPA_ITENS,
+        lambda: _processar_itens_async(
+            data_inicial=data_inicial,
+            data_final=data_final,
+            modalidades=[shard["modalidade"]],
+            cnpj=shard["cnpj"],
+            campo_data="data_atualizacao" if shard["incremental"] else "data_publicacao_pncp",
+            somente_alteradas=not shard["full"],
+        ),
+    )
+
+
+@shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_shard_resultados_pncp")
+def task_shard_resultados_pncp(self, shard: Dict[str, Any]) -> Dict[str, Any]:
+    """Etapa 3 do shard: resultados dos itens homologados do período."""
+    data_inicial, data_final = _janela_datetime(shard)
+    return _executar_etapa_shard(
+        shard,
+        EstadoSincronizacao.ETAPA_RESULTADOS,
+        lambda: _processar_resultados_async(
+            data_inicial=data_inicial,
+            data_final=data_final,
+            modalidades=[shard["modalidade"]],
+            cnpj=shard["cnpj"],
+            campo_data="data_atualizacao" if shard["incremental"] else "data_publicacao_pncp",
+            somente_alteradas=not shard["full"],
+        ),
+    )
+
+
+@shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_agregar_shards_pncp")
+def task_agregar_shards_pncp(self, shards: List[Dict[str, Any]], registrar_estado: bool = True):
+    """
+    Callback do chord: soma os contadores de todos os shards e, quando a janela
+    veio do estado incremental, avança o estado de cada (cnpj, modalidade, etapa)
+    cujos shards terminaram sem falhas.
+    """
+    resumo = agregar_shards(shards)
+
+    if registrar_estado:
+        for janela in resumo["janelas"].values():
+            for etapa, totals in janela["totais"].items():
+                max_data = janela["max_data_atualizacao"].get(etapa)
+                _registrar_etapa(
+                    janela["cnpj"],
+                    janela["modalidade"],
+                    etapa,
+                    date.fromisoformat(janela["data_inicial"]),
+                    date.fromisoformat(janela["data_final"]),
+                    {
+                        **totals,
+                        "max_data_atualizacao": datetime.fromisoformat(max_data) if max_data else None,
+                    },
+                )
+
+    erros = [erro for shard in shards if shard for erro in shard.get("erros", [])]
+    logger.info(
+        f"[PNCP Orquestrador] Concluído - shards={resumo['shards']}, "
+        f"totais={resumo['totais']}, erros={len(erros)}"
+    )
+    return {"shards": resumo["shards"], "totais": resumo["totais"], "erros": erros}
+
+
+def _janelas_orquestracao(
+    cnpjs: List[str],
+    modalidades: List[int],
+    inicio: Optional[date],
+    fim: Optional[date],
+    full: bool,
+) -> List[Tuple[str, int, date, date, bool]]:
+    """
+    Janela de cada (cnpj, modalidade): o período informado ou, sem período, a
+    calculada a partir do estado incremental da etapa de compras.
+    """
+    if inicio and fim:
+        return [(cnpj, modalidade, inicio, fim, False) for cnpj in cnpjs for modalidade in modalidades]
+
+    hoje = timezone.localdate()
+    janelas = []
+    for cnpj in cnpjs:
+        estados = obter_estados(cnpj, EstadoSincronizacao.ETAPA_COMPRAS, modalidades)
+        for modalidade in modalidades:
+            janela_inicio, janela_fim, incremental = calcular_janela(estados.get(modalidade), hoje, full=full)
+            janelas.append((cnpj, modalidade, janela_inicio, janela_fim, incremental))
+    return janelas
+
+
+@shared_task(bind=True, name="django_licitacao360.apps.pncp.tasks.task_orquestrar_pncp")
+def task_orquestrar_pncp(
+    self,
+    cnpjs: Optional[List[str]] = None,
+    modalidades: Optional[List[int]] = None,
+    data_inicial: Optional[str] = None,
+    data_final: Optional[str] = None,
+    dias_por_shard: int = DIAS_POR_SHARD,
+    full: bool = False,
+):
+    """
+    Divide a sincronização em shards (cnpj × modalidade × período) e dispara, para
+    cada shard, a cadeia publicações → itens → resultados como tasks independentes.
+    Um chord junta os totais em task_agregar_shards_pncp.
+
+    Cada shard cabe com folga no CELERY_TASK_SOFT_TIME_LIMIT e o paralelismo passa a
+    ser o dos workers do Celery (processos e nós), não o de um único processo.
+
+    Args:
+        cnpjs: CNPJs dos órgãos (padrão: PNCP_CNPJS, PNCP_CNPJ ou DEFAULT_CNPJ)
+        modalidades: Códigos de modalidades (padrão: PNCP_MODALIDADES ou todas)
+        data_inicial: Início do período (YYYY-MM-DD); sem período usa o estado incremental
+        data_final: Fim do período (YYYY-MM-DD)
+        dias_por_shard: Tamanho, em dias, do período de cada shard
+        full: Ignora o estado incremental e reprocessa a janela padrão
+    """
+    if not cnpjs:
+        cnpjs_str = os.getenv("PNCP_CNPJS") or os.getenv("PNCP_CNPJ", DEFAULT_CNPJ)
+        cnpjs = [c.strip() for c in cnpjs_str.split(",") if c.strip()]
+
+    if modalidades is None:
+        modalidades_str = os.getenv("PNCP_MODALIDADES", None)
+        if modalidades_str:
+            modalidades = [int(m.strip()) for m in modalidades_str.split(",") if m.strip()]
+        else:
+            modalidades = DEFAULT_MODALIDADES
+
+    if bool(data_inicial) != bool(data_final):
+        raise ValueError("Informe data_inicial e data_final juntas")
+    inicio = date.fromisoformat(data_inicial) if data_inicial else None
+    fim = date.fromisoformat(data_final) if data_final else None
+
+    shards = gerar_shards(
+        _janelas_orquestracao(cnpjs, modalidades, inicio, fim, full),
+        dias=dias_por_shard,
+        full=full,
+    )
+    logger.info(
+        f"[PNCP Orquestrador] Disparando {len(shards)} shard(s) - cnpjs={cnpjs}, "
+        f"modalidades={modalidades}, período={data_inicial or 'incremental'}..{data_final or ''}, "
+        f"dias_por_shard={dias_por_shard}, full={full}"
+    )
+    if not shards:
+        return {"shards": 0}
+
+    # Estado incremental só avança quando a janela veio dele (não em backfill de período)
+    resultado = chord([
+        chain(
+            task_shard_compras_pncp.s(shard),
+            task_shard_itens_pncp.s(),
+            task_shard_resultados_pncp.s(),
+        )
+        for shard in shards
+    ])(task_agregar_shards_pncp.s(registrar_estado=inicio is None))
+
+    return {"shards": len(shards), "chord_id": resultado.id}
@@ -0,0 +1,721 @@
+"""
+Testes da camada de ingestão do PNCP
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from aiohttp import web
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+
+from django_licitacao360.apps.core.services import bulk_upsert as upsert_generico
+from django_licitacao360.apps.core.services.bulk_upsert import build_upsert_sql
+from django_licitacao360.pagination import (
+    codificar_cursor,
+    colunas_projecao,
+    decodificar_cursor,
+    filtro_apos,
+    ordenacao_unica,
+    projetar_serializer,
+)
+
+from .models import Compra, EstadoSincronizacao, ItemCompra
+from .serializers import CompraSerializer, ItemResultadoMergeSerializer
+from .services import bulk_upsert
+from .services.buffer import AsyncUpsertBuffer
+from .services.checkpoint import CheckpointJournal, ProgressoETA, dividir_meses
+from .services.client import AdaptiveTokenBucket, PncpClient, PncpRequestError
+from .services import export_xlsx
+from .services.export_xlsx import _celula, nome_aba
+from .services.fingerprint import fingerprint
+from .services.index_advisor import agrupar_sugestoes, analisar_plano, carregar_workload, colunas_do_filtro
+from .services.pipeline import SlidingWindowDedup, stream_paginas
+from .services import resumos
+from .services.shards import agregar_shards, dividir_periodo, gerar_shards
+from .services.sync_state import calcular_janela
+from . import tasks as pncp_tasks
+from .tasks import _build_itens_rows, _parse_resultado_api
+
+
+class BuildUpsertSqlTest(SimpleTestCase):
+    """Testes para a montagem do comando INSERT ... ON CONFLICT"""
+
+    def _fields(self, *names):
+        return [Compra._meta.get_field(name) for name in names]
+
+    def test_sql_com_update_e_filtro_de_linhas_inalteradas(self):
+        fields = self._fields("compra_id", "ano_compra", "modalidade")
+        sql = build_upsert_sql(Compra, fields, ["compra_id"], ["ano_compra", "modalidade_id"], 2)
+
+        self.assertIn('INSERT INTO "pncp_compra" AS t', sql)
+        self.assertEqual(sql.count("(%s, %s, %s)"), 2)
+        self.assertIn('ON CONFLICT ("compra_id") DO UPDATE SET', sql)
+        self.assertIn('"modalidade_id" = EXCLUDED."modalidade_id"', sql)
+        self.assertIn("IS DISTINCT FROM", sql)
+        self.assertTrue(sql.endswith("RETURNING (xmax = 0) AS inserted"))
+
+    def test_sql_retorna_chave_primaria_quando_pedida(self):
+        fields = self._fields("compra_id", "ano_compra")
+        sql = build_upsert_sql(Compra, fields, ["compra_id"], ["ano_compra"], 1, returning_pk=True)
+        self.assertTrue(sql.endswith('RETURNING (xmax = 0) AS inserted, t."compra_id"'))
+
+    def test_sql_touch_fields_gravados_sem_entrar_na_comparacao(self):
+        fields = self._fields("compra_id", "ano_compra", "objeto_compra")
+        sql = build_upsert_sql(Compra, fields, ["compra_id"], ["ano_compra"], 1, touch_fields=["objeto_compra"])
+        self.assertIn('"objeto_compra" = EXCLUDED."objeto_compra"', sql)
+        self.assertIn('WHERE ROW(t."ano_compra") IS DISTINCT FROM ROW(EXCLUDED."ano_compra")', sql)
+
+    def test_sql_sem_campos_de_update_usa_do_nothing(self):
+        fields = self._fields("compra_id")
+        sql = build_upsert_sql(Compra, fields, ["compra_id"], [], 1)
+        self.assertIn("DO NOTHING", sql)
+
+
+class BulkUpsertTest(SimpleTestCase):
+    """Testes para deduplicação e contadores do upsert em lote"""
+
+    def test_deduplica_pela_chave_de_conflito(self):
+        chunks = []
+
+        def fake_execute(model, fields, conflict_fields, update_fields, chunk, pks=None, touch_fields=()):
+            chunks.append(list(chunk))
+            return {"inseridas": len(chunk), "atualizadas": 0, "inalteradas": 0, "ignoradas": 0}
+
+        rows = [
+            {"compra_id": "2024::1", "ano_compra": 2024, "objeto_compra": "antigo"},
+            {"compra_id": "2024::2", "ano_compra": 2024, "objeto_compra": "outro"},
+            {"compra_id": "2024::1", "ano_compra": 2024, "objeto_compra": "novo"},
+        ]
+        with patch.object(upsert_generico, "_execute_chunk", side_effect=fake_execute), \
+                patch.object(upsert_generico.transaction, "atomic"):
+            stats = upsert_generico.bulk_upsert(Compra, rows, ["compra_id"], chunk_size=1)
+
+        self.assertEqual(stats["inseridas"], 2)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0][0]["objeto_compra"], "novo")
+
+    def test_upsert_compras_nao_sobrescreve_homologado_recalculado(self):
+        row = {
+            "compra_id": "2024::1", "ano_compra": 2024, "objeto_compra": "Serviço",
+            "valor_total_homologado": Decimal("10"), "percentual_desconto": Decimal("5"),
+        }
+        with patch.object(bulk_upsert, "bulk_upsert", return_value=bulk_upsert.empty_stats()) as upsert, \
+                patch.object(bulk_upsert, "resolve_fk_ids"):
+            bulk_upsert.upsert_compras([row])
+
+        (_, rows), kwargs = upsert.call_args
+        self.assertIn("valor_total_homologado", rows[0])
+        self.assertIn("objeto_compra", kwargs["update_fields"])
+        self.assertNotIn("valor_total_homologado", kwargs["update_fields"])
+        self.assertNotIn("percentual_desconto", kwargs["update_fields"])
+        self.assertNotIn("compra_id", kwargs["update_fields"])
+
+
+class AsyncUpsertBufferTest(SimpleTestCase):
+    """Testes para o buffer de gravação em lotes"""
+
+    async def test_grava_ao_encher_e_ao_sair(self):
+        lotes = []
+
+        def flush(rows):
+            lotes.append(len(rows))
+            return {"itens": len(rows)}
+
+        async with AsyncUpsertBuffer(flush, flush_size=3, flush_interval=60) as buffer:
+            await buffer.add([{"n": 1}, {"n": 2}])
+            self.assertEqual(lotes, [])
+            await buffer.add([{"n": 3}, {"n": 4}])
+            await buffer.add([{"n": 5}])
+
+        self.assertEqual(lotes, [4, 1])
+        self.assertEqual(buffer.totals, {"itens": 5})
+        self.assertEqual(buffer.lotes, 2)
+
+    async def test_lote_com_falha_no_ticker_e_regravado_e_erro_propagado(self):
+        gravadas = []
+        falhas = [RuntimeError("banco indisponível")]
+
+        def flush(rows):
+            if falhas:
+                raise falhas.pop()
+            gravadas.extend(rows)
+            return {"itens": len(rows)}
+
+        with self.assertRaisesMessage(RuntimeError, "banco indisponível"):
+            async with AsyncUpsertBuffer(flush, flush_size=100, flush_interval=0.1) as buffer:
+                await buffer.add([{"n": 1}, {"n": 2}])
+                await asyncio.sleep(0.3)
+                self.assertEqual(len(buffer), 2)
+                with self.assertRaises(RuntimeError):
+                    await buffer.add([{"n": 3}])
+
+        self.assertEqual(gravadas, [{"n": 1}, {"n": 2}])
+
+    async def test_falha_na_saida_propaga_sem_perder_lote_seguinte(self):
+        def flush(rows):
+            raise RuntimeError("falhou")
+
+        buffer = AsyncUpsertBuffer(flush, flush_size=1, flush_interval=60)
+        with self.assertRaises(RuntimeError):
+            async with buffer:
+                await buffer.add([{"n": 1}])
+                await buffer.add([{"n": 2}])
+        self.assertEqual(len(buffer), 2)
+
+
+class BuildItensRowsTest(SimpleTestCase):
+    """Testes para a conversão dos itens da API"""
+
+    def test_converte_itens_e_ignora_sem_numero(self):
+        rows = _build_itens_rows(2024, 10, [
+            {"numeroItem": 3, "descricao": "Caneta", "valorTotal": "10.50", "temResultado": True},
+            {"descricao": "sem número"},
+        ])
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["numero_item"], 3)
+        self.assertEqual(rows[0]["ano_compra"], 2024)
+        self.assertEqual(rows[0]["quantidade"], 0)
+        self.assertTrue(rows[0]["tem_resultado"])
+
+
+class ParseResultadoApiTest(SimpleTestCase):
+    """Testes para a extração dos resultados da API"""
+
+    def test_extrai_campos_do_resultado(self):
+        dados = _parse_resultado_api({
+            "niFornecedor": "12345678000190",
+            "nomeRazaoSocialFornecedor": "Fornecedor LTDA",
+            "valorTotalHomologado": 90,
+            "quantidadeHomologada": "10.0",
+            "valorUnitarioHomologado": 9,
+            "situacaoCompraItemResultadoNome": "Informado",
+        })
+
+        self.assertEqual(dados["cnpj_fornecedor"], "12345678000190")
+        self.assertEqual(dados["quantidade_homologada"], 10)
+        self.assertEqual(dados["status"], "Informado")
+        self.assertEqual(dados["marca"], "")
+
+    def test_retorna_none_sem_dados_obrigatorios(self):
+        self.assertIsNone(_parse_resultado_api({"niFornecedor": "1", "valorTotalHomologado": 10}))
+
+
+class AdaptiveTokenBucketTest(SimpleTestCase):
+    """Testes para o ajuste AIMD da taxa"""
+
+    def test_sobe_aditivamente_e_cai_multiplicativamente(self):
+        bucket = AdaptiveTokenBucket(rate=4, min_rate=1, max_rate=5, increase=0.5, decrease=0.5)
+        bucket.on_success()
+        self.assertEqual(bucket.rate, 4.5)
+        bucket.on_success()
+        bucket.on_success()
+        self.assertEqual(bucket.rate, 5)
+        bucket.on_throttle()
+        self.assertEqual(bucket.rate, 2.5)
+        bucket.on_throttle()
+        bucket.on_throttle()
+        self.assertEqual(bucket.rate, 1)
+
+
+class PncpClientTest(SimpleTestCase):
+    """Testes do PncpClient contra um servidor aiohttp local"""
+
+    @asynccontextmanager
+    async def _serve(self, handler):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        try:
+            port = site._server.sockets[0].getsockname()[1]
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            await runner.cleanup()
+
+    def _client(self, **kwargs):
+        kwargs.setdefault("rate", 100)
+        kwargs.setdefault("max_rate", 100)
+        kwargs.setdefault("backoff_base", 0.01)
+        return PncpClient(**kwargs)
+
+    async def test_respeita_retry_after_e_reduz_taxa(self):
+        chamadas = []
+
+        async def handler(request):
+            chamadas.append(request.query.get("pagina"))
+            if len(chamadas) == 1:
+                return web.Response(status=429, text="limite", headers={"Retry-After": "0"})
+            return web.json_response({"data": [1, 2]})
+
+        async with self._serve(handler) as base, self._client() as client:
+            data = await client.get_json(f"{base}/publicacao", params={"pagina": "1"}, endpoint="publicacao")
+            stats = client.stats_summary()["publicacao"]
+
+        self.assertEqual(data, {"data": [1, 2]})
+        self.assertEqual(chamadas, ["1", "1"])
+        self.assertEqual(stats["requisicoes"], 2)
+        self.assertEqual(stats["throttled"], 1)
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["status"], {429: 1, 200: 1})
+
+    async def test_taxa_cai_sob_429_e_5xx_e_se_recupera_com_sucessos(self):
+        estado = {"sobrecarregado": True}
+
+        async def handler(request):
+            if estado["sobrecarregado"]:
+                status = 429 if int(request.query["n"]) % 2 else 503
+                return web.Response(status=status, text="sobrecarregado")
+            return web.json_response({"data": []})
+
+        async with self._serve(handler) as base, self._client(max_retries=1) as client:
+            client.bucket = AdaptiveTokenBucket(rate=40, min_rate=10, max_rate=40, increase=5)
+            falhas = await asyncio.gather(
+                *(client.get_json(f"{base}/publicacao", params={"n": str(n)}, endpoint="publicacao") for n in range(4)),
+                return_exceptions=True,
+            )
+            taxa_sob_erro = client.bucket.rate
+
+            estado["sobrecarregado"] = False
+            taxas = []
+            for n in range(8):
+                await client.get_json(f"{base}/publicacao", params={"n": str(n)}, endpoint="publicacao")
+                taxas.append(client.bucket.rate)
+            stats = client.stats_summary()["publicacao"]
+
+        self.assertTrue(all(isinstance(falha, PncpRequestError) for falha in falhas))
+        self.assertEqual(taxa_sob_erro, 10)
+        self.assertEqual(taxas, sorted(taxas))
+        self.assertEqual(taxas[0], 15)
+        self.assertEqual(taxas[-1], 40)
+        self.assertEqual(stats["throttled"], 4)
+        self.assertEqual(stats["status"], {429: 2, 503: 2, 200: 8})
+
+    async def test_404_retorna_none(self):
+        async def handler(request):
+            return web.Response(status=404)
+
+        async with self._serve(handler) as base, self._client() as client:
+            self.assertIsNone(await client.get_json(f"{base}/itens", endpoint="itens"))
+
+    async def test_falha_apos_esgotar_tentativas(self):
+        async def handler(request):
+            return web.Response(status=503, text="indisponível")
+
+        async with self._serve(handler) as base, self._client(max_retries=3) as client:
+            with self.assertRaises(PncpRequestError) as ctx:
+                await client.get_json(f"{base}/resultados", endpoint="resultados")
+            stats = client.stats_summary()["resultados"]
+
+        self.assertEqual(ctx.exception.status, 503)
+        self.assertEqual(stats["requisicoes"], 3)
+        self.assertEqual(stats["erros"], 1)
+
+    async def test_erro_4xx_nao_faz_retry(self):
+        chamadas = []
+
+        async def handler(request):
+            chamadas.append(1)
+            return web.Response(status=400, text="parâmetro inválido")
+
+        async with self._serve(handler) as base, self._client() as client:
+            with self.assertRaises(PncpRequestError):
+                await client.get_json(f"{base}/publicacao", endpoint="publicacao")
+
+        self.assertEqual(len(chamadas), 1)
+
+
+class StreamPaginasTest(SimpleTestCase):
+    """Testes para o pipeline de páginas"""
+
+    async def test_grava_em_lotes_deduplica_e_conta_falhas(self):
+        paginas = {
+            1: [{"id": 1, "v": "a"}, {"id": 2, "v": "b"}],
+            2: [{"id": 1, "v": "a"}, {"id": 3, "v": "c"}, {"v": "sem id"}],
+            3: None,  # falha
+            4: [{"id": 2, "v": "b2"}],
+        }
+
+        async def fetch_page(pg):
+            if paginas[pg] is None:
+                return None, "API 500"
+            return {"data": paginas[pg], "totalPaginas": len(paginas)}, None
+
+        def extract(payload):
+            return payload["data"], payload["totalPaginas"], 1
+
+        gravadas = []
+
+        def flush(rows):
+            gravadas.extend(rows)
+            return {"compras": len(rows)}
+
+        async with AsyncUpsertBuffer(flush, flush_size=2, flush_interval=60) as buffer:
+            totals = await stream_paginas(
+                fetch_page,
+                extract,
+                process=lambda r: r if "id" in r else None,
+                key=lambda r: r["id"],
+                buffer=buffer,
+                fetchers=2,
+                queue_size=1,
+            )
+
+        self.assertEqual(totals, {"paginas": 3, "ignoradas": 2, "duplicadas": 1, "falhas": 1})
+        self.assertEqual(buffer.totals, {"compras": 4})
+        self.assertEqual(sorted((r["id"], r["v"]) for r in gravadas), [(1, "a"), (2, "b"), (2, "b2"), (3, "c")])
+
+    def test_janela_esquece_chaves_antigas(self):
+        dedup = SlidingWindowDedup(size=2)
+        self.assertFalse(dedup.seen(1, {"v": 1}))
+        self.assertFalse(dedup.seen(2, {"v": 2}))
+        self.assertTrue(dedup.seen(1, {"v": 1}))
+        self.assertFalse(dedup.seen(3, {"v": 3}))
+        self.assertFalse(dedup.seen(2, {"v": 2}))
+        self.assertEqual(len(dedup), 2)
+
+
+class CalcularJanelaTest(SimpleTestCase):
+    """Testes para a janela da sincronização incremental"""
+
+    hoje = date(2025, 3, 20)
+
+    def _estado(self, etapa, janela_fim=None, max_data_atualizacao=None):
+        return EstadoSincronizacao(
+            cnpj="00394502000144", modalidade=6, etapa=etapa,
+            janela_fim=janela_fim, max_data_atualizacao=max_data_atualizacao,
+        )
+
+    def test_sem_estado_ou_full_usa_janela_padrao(self):
+        self.assertEqual(calcular_janela(None, self.hoje), (date(2025, 3, 11), self.hoje, False))
+        estado = self._estado(EstadoSincronizacao.ETAPA_COMPRAS, janela_fim=date(2025, 3, 19))
+        self.assertEqual(calcular_janela(estado, self.hoje, full=True), (date(2025, 3, 11), self.hoje, False))
+
+    def test_compras_continua_do_fim_da_ultima_janela(self):
+        estado = self._estado(
+            EstadoSincronizacao.ETAPA_COMPRAS,
+            janela_fim=date(2025, 3, 19),
+            max_data_atualizacao=datetime(2025, 1, 5, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(calcular_janela(estado, self.hoje, sobreposicao=1), (date(2025, 3, 18), self.hoje, True))
+
+    def test_itens_continua_da_marca_dagua(self):
+        estado = self._estado(
+            EstadoSincronizacao.ETAPA_ITENS,
+            janela_fim=date(2025, 3, 19),
+            max_data_atualizacao=datetime(2025, 3, 1, 15, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(calcular_janela(estado, self.hoje, sobreposicao=1), (date(2025, 2, 28), self.hoje, True))
+
+
+class FiltroModalidadeTest(SimpleTestCase):
+    """As etapas de itens e resultados filtram pelo código da modalidade, sem passar pelo nome"""
+
+    janela = (datetime(2025, 3, 1, tzinfo=dt_timezone.utc), datetime(2025, 3, 20, tzinfo=dt_timezone.utc))
+
+    def test_compras_para_itens_filtra_modalidade_id(self):
+        with patch.object(pncp_tasks.Compra, "objects") as objects:
+            pncp_tasks._get_compras_para_itens_sync(*self.janela, [8], "00394502000144", somente_alteradas=False)
+        objects.filter.return_value.filter.assert_called_once_with(modalidade_id__in=[8])
+
+    def test_itens_para_resultados_filtra_modalidade_id(self):
+        with patch.object(pncp_tasks.ItemCompra, "objects") as objects:
+            pncp_tasks._get_itens_para_resultados_sync(*self.janela, [8], "00394502000144", somente_alteradas=False)
+        objects.filter.return_value.filter.assert_called_once_with(compra__modalidade_id__in=[8])
+
+
+class FingerprintTest(SimpleTestCase):
+    """Testes para o hash de conteúdo usado para pular compras inalteradas"""
+
+    def test_independe_da_ordem_e_muda_com_conteudo(self):
+        base = fingerprint({"a": 1, "b": Decimal("2.50")}, "2025-03-01T10:00:00")
+        self.assertEqual(base, fingerprint({"b": Decimal("2.50"), "a": 1}, "2025-03-01T10:00:00"))
+        self.assertEqual(len(base), 40)
+        self.assertNotEqual(base, fingerprint({"a": 1, "b": Decimal("2.51")}, "2025-03-01T10:00:00"))
+        self.assertNotEqual(base, fingerprint({"a": 1, "b": Decimal("2.50")}, "2025-03-02T10:00:00"))
+
+    def test_itens_recebem_hash(self):
+        itens = [{"numeroItem": 1, "descricao": "Caneta", "dataAtualizacao": "2025-03-01T10:00:00"}]
+        primeiro = _build_itens_rows(2025, 10, itens)[0]
+        itens[0]["dataAtualizacao"] = "2025-03-05T10:00:00"
+        segundo = _build_itens_rows(2025, 10, itens)[0]
+        self.assertIsNotNone(primeiro["hash_conteudo"])
+        self.assertNotEqual(primeiro["hash_conteudo"], segundo["hash_conteudo"])
+
+
+class ShardsTest(SimpleTestCase):
+    """Testes para a divisão em shards e a agregação do chord"""
+
+    def test_divide_periodo_inclusive(self):
+        self.assertEqual(
+            dividir_periodo(date(2025, 3, 1), date(2025, 3, 12), dias=5),
+            [
+                (date(2025, 3, 1), date(2025, 3, 5)),
+                (date(2025, 3, 6), date(2025, 3, 10)),
+                (date(2025, 3, 11), date(2025, 3, 12)),
+            ],
+        )
+        self.assertEqual(dividir_periodo(date(2025, 3, 2), date(2025, 3, 1)), [])
+
+    def test_agrega_totais_por_etapa_e_janela(self):
+        shards = gerar_shards(
+            [("111", 6, date(2025, 3, 1), date(2025, 3, 10), True), ("222", 6, date(2025, 3, 1), date(2025, 3, 5), False)],
+            dias=5,
+        )
+        self.assertEqual(len(shards), 3)
+        shards[0]["totais"]["compras"] = {"compras": 3, "falhas": 0}
+        shards[0]["max_data_atualizacao"]["compras"] = "2025-03-04T12:00:00+00:00"
+        shards[1]["totais"]["compras"] = {"compras": 2, "falhas": 1}
+        shards[1]["max_data_atualizacao"]["compras"] = "2025-03-09T08:00:00+00:00"
+        shards[2]["totais"]["compras"] = {"compras": 5, "falhas": 0}
+
+        resumo = agregar_shards(shards + [None])
+
+        self.assertEqual(resumo["shards"], 3)
+        self.assertEqual(resumo["totais"], {"compras": {"compras": 10, "falhas": 1}})
+        janela = resumo["janelas"]["111:6"]
+        self.assertEqual((janela["data_inicial"], janela["data_final"]), ("2025-03-01", "2025-03-10"))
+        self.assertEqual(janela["totais"]["compras"], {"compras": 5, "falhas": 1})
+        self.assertEqual(janela["max_data_atualizacao"]["compras"], "2025-03-09T08:00:00+00:00")
+
+
+class CheckpointJournalTest(SimpleTestCase):
+    """Testes para o diário de checkpoints das cargas longas"""
+
+    def test_pula_concluidas_e_refaz_falhas(self):
+        with TemporaryDirectory() as tmp:
+            path = f"{tmp}/checkpoints.sqlite3"
+            with CheckpointJournal("itens", path) as journal:
+                journal.marcar("compra:1:2025:1")
+                journal.marcar("compra:1:2025:2", erro="HTTP 500")
+                journal.marcar("compra:2:2025:1")
+
+            # Nova execução lê o que a anterior deixou gravado
+            with CheckpointJournal("itens", path) as journal:
+                self.assertEqual(
+                    journal.pendentes(["compra:1:2025:1", "compra:1:2025:2", "compra:1:2025:3"]),
+                    ["compra:1:2025:2", "compra:1:2025:3"],
+                )
+                self.assertEqual(journal.concluidas("compra:1:"), {"compra:1:2025:1"})
+                self.assertEqual(journal.falhas(), ["compra:1:2025:2"])
+                journal.marcar("compra:1:2025:2")
+                self.assertEqual(journal.falhas(), [])
+                self.assertEqual(journal.limpar("compra:1:"), 2)
+                self.assertEqual(journal.concluidas(), {"compra:2:2025:1"})
+
+            with CheckpointJournal("resultados", path) as journal:
+                self.assertEqual(journal.concluidas(), set())
+
+    def test_divide_meses_e_estima_termino(self):
+        self.assertEqual(
+            list(dividir_meses(date(2024, 1, 15), date(2024, 3, 10))),
+            [
+                (date(2024, 1, 15), date(2024, 1, 31)),
+                (date(2024, 2, 1), date(2024, 2, 29)),
+                (date(2024, 3, 1), date(2024, 3, 10)),
+            ],
+        )
+        agora = [0.0]
+        progresso = ProgressoETA(4, "Teste", intervalo=10, relogio=lambda: agora[0])
+        agora[0] = 5.0
+        self.assertIsNone(progresso.avancar())
+        self.assertEqual(progresso.eta(), 15.0)
+        agora[0] = 20.0
+        linha = progresso.avancar(falha=True)
+        self.assertIn("2/4 (50.0%)", linha)
+        self.assertIn("falhas: 1", linha)
+        self.assertIn("ETA: 20s", linha)
+
+
+class ResumosTest(SimpleTestCase):
+    """Testes para a atualização dos resumos por unidade"""
+
+    def test_sem_unidades_nao_toca_no_banco(self):
+        with patch.object(resumos, "connection") as connection:
+            self.assertEqual(resumos.atualizar_resumo_compras([]), 0)
+            self.assertEqual(resumos.atualizar_resumo_fornecedores([None, ""]), 0)
+        connection.cursor.assert_not_called()
+
+    def test_normaliza_unidades_uma_vez_para_os_dois_resumos(self):
+        with patch.object(resumos, "atualizar_resumo_compras", return_value=3) as compras, \
+                patch.object(resumos, "atualizar_resumo_fornecedores", return_value=5) as fornecedores:
+            totals = resumos.atualizar_resumos(["787010", 787000, "787010", None])
+        self.assertEqual(totals, {"resumo_compras": 3, "resumo_fornecedores": 5})
+        compras.assert_called_once_with(["787000", "787010"])
+        fornecedores.assert_called_once_with(["787000", "787010"])
+
+    def _sql_executado(self, atualizar, codigos):
+        with patch.object(resumos, "connection") as connection, patch.object(resumos, "transaction"):
+            connection.ops.quote_name = lambda nome: f'"{nome}"'
+            atualizar(codigos)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        return [chamada.args for chamada in cursor.execute.call_args_list]
+
+    def test_trava_as_unidades_antes_de_apagar(self):
+        for atualizar, namespace in (
+            (resumos.atualizar_resumo_compras, resumos.LOCK_RESUMO_COMPRAS),
+            (resumos.atualizar_resumo_fornecedores, resumos.LOCK_RESUMO_FORNECEDORES),
+        ):
+            (lock_sql, lock_params), (delete_sql, _), _ = self._sql_executado(atualizar, ["787010", "787000"])
+            self.assertIn("pg_advisory_xact_lock", lock_sql)
+            self.assertEqual(lock_params, [namespace, ["787000", "787010"]])
+            self.assertTrue(delete_sql.startswith("DELETE"))
+
+    def test_recriacao_completa_trava_a_tabela(self):
+        (lock_sql, *_), *_ = self._sql_executado(resumos.atualizar_resumo_compras, None)
+        self.assertIn("LOCK TABLE", lock_sql)
+
+
+class ExportXlsxTest(SimpleTestCase):
+    """Testes para as funções auxiliares da exportação XLSX"""
+
+    def test_nome_aba_remove_caracteres_invalidos_e_trunca(self):
+        self.assertEqual(nome_aba("Pregão / Eletrônico [SRP]?"), "Pregão - Eletrônico (SRP)")
+        self.assertEqual(len(nome_aba("x" * 40)), 31)
+        self.assertEqual(nome_aba(None), "modalidade")
+
+    def test_datetime_com_fuso_vira_horario_local_sem_tzinfo(self):
+        valor = _celula(datetime(2025, 3, 1, 12, 0, tzinfo=dt_timezone.utc))
+        self.assertIsNone(valor.tzinfo)
+        self.assertEqual(_celula(Decimal("1.5")), Decimal("1.5"))
+
+    def test_versao_dos_dados_usa_contagens_e_timestamps(self):
+        with patch.object(export_xlsx, "connection") as connection:
+            connection.ops.quote_name = lambda nome: f'"{nome}"'
+            cursor = connection.cursor.return_value.__enter__.return_value
+            cursor.fetchone.return_value = (3, None, 10, None, None, None)
+            versao = export_xlsx.versao_dados_unidade("787010")
+            cursor.fetchone.return_value = (3, None, 11, None, None, None)
+            outra = export_xlsx.versao_dados_unidade("787010")
+
+        sql, params = cursor.execute.call_args.args
+        self.assertNotIn("STRING_AGG", sql.upper())
+        self.assertIn("MAX(ic.atualizado_em)", sql)
+        self.assertEqual(params, ["787010"] * 4)
+        self.assertEqual(len(versao), 40)
+        self.assertNotEqual(versao, outra)
+
+
+class MergeResultadosTest(SimpleTestCase):
+    """Testes para ItemCompra.objects.merge_resultados"""
+
+    def test_consulta_unica_com_janela_e_filtro_por_unidade(self):
+        sql = str(ItemCompra.objects.merge_resultados("787000", modalidade_id=6).query)
+        self.assertIn("ROW_NUMBER()", sql)
+        self.assertIn("PARTITION BY", sql)
+        self.assertIn("LEFT OUTER JOIN", sql)
+        self.assertIn("codigo_unidade", sql)
+        self.assertIn("modalidade_id", sql)
+        self.assertNotIn("compra_id\" IN", sql)
+
+    def test_chaves_do_serializer(self):
+        qs = ItemCompra.objects.merge_resultados("787000")
+        campos = set(qs.query.values_select) | set(qs.query.annotation_select)
+        self.assertTrue(set(ItemResultadoMergeSerializer().fields) <= campos)
+        self.assertIn("modalidade_id", campos)
+
+
+class KeysetPaginationTest(SimpleTestCase):
+    """Testes para a paginação por cursor e a projeção de campos"""
+
+    def test_cursor_preserva_microssegundos(self):
+        valores = [datetime(2025, 3, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc), Decimal("1.5"), None, 7]
+        decodificado = decodificar_cursor(codificar_cursor(valores), 4)
+        self.assertEqual(decodificado[0], "2025-03-01T12:00:00.123456+00:00")
+        self.assertEqual(decodificado[1:], ["1.5", None, 7])
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(NotFound):
+            decodificar_cursor("nao-e-cursor", 2)
+        with self.assertRaises(NotFound):
+            decodificar_cursor(codificar_cursor([1]), 2)
+
+    def test_ordenacao_recebe_chave_primaria_como_desempate(self):
+        self.assertEqual(
+            ordenacao_unica(Compra, ["-ano_compra", "-sequencial_compra"]),
+            ["-ano_compra", "-sequencial_compra", "compra_id"],
+        )
+        self.assertEqual(ordenacao_unica(Compra, ["compra_id"]), ["compra_id"])
+
+    def test_filtro_apos_sem_offset(self):
+        ordering = ["-ano_compra", "-sequencial_compra", "compra_id"]
+        sql = str(Compra.objects.filter(filtro_apos(ordering, [2024, 10, "x"])).order_by(*ordering).query)
+        self.assertIn('"ano_compra" < 2024', sql)
+        self.assertIn('"sequencial_compra" < 10', sql)
+        self.assertIn('"compra_id" > x', sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_filtro_apos_valor_nulo_decrescente(self):
+        sql = str(Compra.objects.filter(filtro_apos(["-data_atualizacao", "compra_id"], [None, "x"])).query)
+        self.assertIn('"data_atualizacao" IS NOT NULL', sql)
+
+    def test_projecao_de_colunas_e_relacoes(self):
+        colunas, relacoes = colunas_projecao(
+            Compra, CompraSerializer, ["objeto_compra", "modalidade", "inexistente"], ["ano_compra"]
+        )
+        self.assertEqual(colunas, ["ano_compra", "compra_id", "modalidade", "objeto_compra"])
+        self.assertEqual(relacoes, ["modalidade"])
+        # Relação reversa (itens) mantém o SELECT completo
+        self.assertIsNone(colunas_projecao(Compra, CompraSerializer, ["itens"]))
+
+    def test_projetar_serializer(self):
+        serializer = projetar_serializer(CompraSerializer([], many=True), ["compra_id", "ano_compra"])
+        self.assertEqual(set(serializer.child.fields), {"compra_id", "ano_compra"})
+
+
+class IndexAdvisorTest(SimpleTestCase):
+    """Testes para a análise de planos do assistente de índices"""
+
+    PLANO = {
+        "Plan": {
+            "Node Type": "Limit",
+            "Plans": [{
+                "Node Type": "Seq Scan",
+                "Relation Name": "pncp_compra",
+                "Filter": "(((codigo_unidade)::text = '787000'::text) AND (ano_compra >= 2024))",
+                "Rows Removed by Filter": 50000,
+                "Actual Rows": 120,
+                "Actual Loops": 1,
+                "Actual Total Time": 35.5,
+            }, {
+                "Node Type": "Seq Scan",
+                "Relation Name": "pncp_modalidade",
+                "Filter": "(id = 6)",
+                "Rows Removed by Filter": 12,
+                "Actual Loops": 1,
+            }],
+        }
+    }
+
+    def test_colunas_igualdade_antes_de_intervalo(self):
+        self.assertEqual(
+            colunas_do_filtro("((ano_compra >= 2024) AND ((codigo_unidade)::text = '787000'::text))"),
+            ["codigo_unidade", "ano_compra"],
+        )
+        self.assertEqual(colunas_do_filtro("((nome_om)::text ~~* '%marinha%'::text)"), [])
+
+    def test_analisar_plano_ignora_leituras_pequenas(self):
+        achados = analisar_plano(self.PLANO, consulta=3)
+        self.assertEqual(len(achados), 1)
+        achado = achados[0]
+        self.assertEqual(achado.relacao, "pncp_compra")
+        self.assertEqual(achado.colunas, ["codigo_unidade", "ano_compra"])
+        self.assertIn('ON "pncp_compra" ("codigo_unidade", "ano_compra")', achado.sugestao)
+        self.assertEqual(agrupar_sugestoes(achados)[0]["consultas"], {3})
+
+    def test_carregar_workload_so_select(self):
+        with TemporaryDirectory() as tmp:
+            caminho = f"{tmp}/carga.jsonl"
+            with open(caminho, "w", encoding="utf-8") as arquivo:
+                arquivo.write('{"sql": "SELECT 1 FROM pncp_compra WHERE ano_compra = %s", "params": [2024]}\n')
+                arquivo.write('{"sql": "UPDATE pncp_compra SET ano_compra = 1", "params": []}\n')
+            self.assertEqual(
+                carregar_workload(caminho),
+                [("SELECT 1 FROM pncp_compra WHERE ano_compra = %s", [2024])],
+            )
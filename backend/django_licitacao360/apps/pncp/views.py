@@ -2,20 +2,31 @@ from rest_framework import viewsets, views, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Q, Count, Sum, F
-from django.http import HttpResponse
-from django.core.cache import cache
+from django.db.models import Q, Sum, F
+from django.http import FileResponse
 from django.core.exceptions import ValidationError
 from decimal import Decimal
-import io
-import openpyxl
-from openpyxl.utils import get_column_letter
 import logging
 
 logger = logging.getLogger(__name__)
 
-from .models import AmparoLegal, Compra, ItemCompra, Modalidade, ModoDisputa, ResultadoItem, Fornecedor
+# Linhas lidas por vez do cursor do banco nos endpoints de merge itens/resultados
+MERGE_CHUNK_SIZE = 2000
+
+from .models import (
+    AmparoLegal,
+    Compra,
+    ItemCompra,
+    Modalidade,
+    ModoDisputa,
+    ResultadoItem,
+    Fornecedor,
+    ResumoCompraUnidade,
+    ResumoFornecedorUnidade,
+)
 from django_licitacao360.apps.uasgs.models import Uasg
+from django_licitacao360.pagination import KeysetListMixin
+from .services.export_xlsx import XLSX_CONTENT_TYPE, gerar_xlsx_unidade
 from .serializers import (
     CompraSerializer,
     CompraDetalhadaSerializer,
@@ -38,7 +49,7 @@ class FornecedorViewSet(viewsets.ModelViewSet):
     search_fields = ["cnpj_fornecedor", "razao_social"]
 
 
-class CompraViewSet(viewsets.ModelViewSet):
+class CompraViewSet(KeysetListMixin, viewsets.ModelViewSet):
     queryset = Compra.objects.all()
     serializer_class = CompraSerializer
     permission_classes = [AllowAny]
@@ -55,9 +66,8 @@ class CompraViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            compras = self.queryset.filter(codigo_unidade=codigo_unidade).order_by('-ano_compra', '-sequencial_compra')
-            serializer = self.get_serializer(compras, many=True)
-            return Response(serializer.data)
+            compras = self.queryset.filter(codigo_unidade=codigo_unidade)
+            return self.listar(compras, ['-ano_compra', '-sequencial_compra'])
         except Exception as e:
             logger.error(f"Erro ao buscar compras por unidade {codigo_unidade}: {str(e)}")
             return Response(
@@ -75,36 +85,13 @@ class CompraViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            # Lê do resumo mantido pela ingestão (ver services/resumos.py)
             modalidades = (
-                Compra.objects
+                ResumoCompraUnidade.objects
                 .filter(codigo_unidade=codigo_unidade)
                 .select_related('modalidade')
-                .values('ano_compra', 'modalidade_id')
-                .annotate(
-                    quantidade_compras=Count('compra_id'),
-                    valor_total_homologado=Sum('valor_total_homologado')
-                )
                 .order_by('ano_compra', 'modalidade_id')
             )
-            # Formata para o serializer - busca objetos Modalidade completos
-            modalidades_formatted = []
-            for mod in modalidades:
-                modalidade_obj = None
-                modalidade_id = mod.get('modalidade_id')
-                if modalidade_id:
-                    try:
-                        modalidade_obj = Modalidade.objects.get(pk=modalidade_id)
-                    except Modalidade.DoesNotExist:
-                        pass
-                
-                modalidades_formatted.append({
-                    'ano_compra': mod['ano_compra'],
-                    'modalidade_id': modalidade_id,
-                    'modalidade': modalidade_obj,
-                    'quantidade_compras': mod['quantidade_compras'],
-                    'valor_total_homologado': mod['valor_total_homologado'],
-                })
-            modalidades = modalidades_formatted
             serializer = ModalidadeAgregadaSerializer(modalidades, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -124,46 +111,10 @@ class CompraViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            compras = Compra.objects.filter(codigo_unidade=codigo_unidade)
-            compra_ids = list(compras.values_list('compra_id', flat=True))
-            
-            # Otimização: usar prefetch_related para evitar N+1 queries
-            itens = ItemCompra.objects.filter(
-                compra_id__in=compra_ids
-            ).select_related('compra').prefetch_related('resultados__fornecedor')
-            
-            result_data = []
-            for item in itens:
-                resultado = item.resultados.first()  # Pega o primeiro resultado se existir
-                
-                # Calcula percentual de desconto
-                percentual_desconto = None
-                if item.valor_total_estimado and resultado and resultado.valor_total_homologado:
-                    if item.valor_total_estimado > 0:
-                        percentual_desconto = (
-                            (item.valor_total_estimado - resultado.valor_total_homologado) 
-                            / item.valor_total_estimado
-                        ) * 100
-                
-                result_data.append({
-                    'ano_compra': item.compra.ano_compra,
-                    'sequencial_compra': item.compra.sequencial_compra,
-                    'numero_item': item.numero_item,
-                    'descricao': item.descricao,
-                    'unidade_medida': item.unidade_medida,
-                    'valor_unitario_estimado': item.valor_unitario_estimado,
-                    'valor_total_estimado': item.valor_total_estimado,
-                    'quantidade': item.quantidade,
-                    'situacao_compra_item_nome': item.situacao_compra_item_nome,
-                    'cnpj_fornecedor': resultado.fornecedor.cnpj_fornecedor if resultado else None,
-                    'valor_total_homologado': resultado.valor_total_homologado if resultado else None,
-                    'valor_unitario_homologado': resultado.valor_unitario_homologado if resultado else None,
-                    'quantidade_homologada': resultado.quantidade_homologada if resultado else None,
-                    'percentual_desconto': percentual_desconto,
-                    'razao_social': resultado.fornecedor.razao_social if resultado else None,
-                })
+            # Uma consulta: itens + primeiro resultado + desconto (ver ItemCompraQuerySet)
+            itens = ItemCompra.objects.merge_resultados(codigo_unidade)
             
-            serializer = ItemResultadoMergeSerializer(result_data, many=True)
+            serializer = ItemResultadoMergeSerializer(itens.iterator(chunk_size=MERGE_CHUNK_SIZE), many=True)
             return Response(serializer.data)
         except Exception as e:
             logger.error(f"Erro ao buscar itens-resultado merge para unidade {codigo_unidade}: {str(e)}")
@@ -182,25 +133,18 @@ class CompraViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            compras = Compra.objects.filter(codigo_unidade=codigo_unidade)
-            compra_ids = list(compras.values_list('compra_id', flat=True))
-            
-            # Otimização: usar select_related e valores diretamente
+            # Lê do resumo mantido pela ingestão (ver services/resumos.py)
             fornecedores = (
-                ResultadoItem.objects
-                .filter(item_compra__compra_id__in=compra_ids)
-                .select_related('fornecedor', 'item_compra')
-                .values('fornecedor__cnpj_fornecedor', 'fornecedor__razao_social')
-                .annotate(
-                    valor_total_homologado=Sum('valor_total_homologado')
-                )
-                .order_by('fornecedor__cnpj_fornecedor')
+                ResumoFornecedorUnidade.objects
+                .filter(codigo_unidade=codigo_unidade)
+                .values('fornecedor_id', 'fornecedor__razao_social', 'valor_total_homologado')
+                .order_by('fornecedor_id')
             )
             
             result_data = []
             for f in fornecedores:
                 result_data.append({
-                    'cnpj_fornecedor': f['fornecedor__cnpj_fornecedor'],
+                    'cnpj_fornecedor': f['fornecedor_id'],
                     'razao_social': f['fornecedor__razao_social'],
                     'valor_total_homologado': f['valor_total_homologado'] or Decimal('0'),
                 })
@@ -213,12 +157,6 @@ class CompraViewSet(viewsets.ModelViewSet):
                 {'error': 'Erro ao processar requisição'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-        except Exception as e:
-            logger.error(f"Erro ao buscar fornecedores agregados para unidade {codigo_unidade}: {str(e)}")
-            return Response(
-                {'error': 'Erro ao processar requisição'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
     
     @action(detail=False, methods=['get'], url_path='itens-por-modalidade/(?P<codigo_unidade>[^/.]+)', permission_classes=[AllowAny])
     def itens_por_modalidade(self, request, codigo_unidade=None):
@@ -232,40 +170,9 @@ class CompraViewSet(viewsets.ModelViewSet):
             
             modalidade_id = request.query_params.get('modalidade_id')
             
-            compras = Compra.objects.filter(codigo_unidade=codigo_unidade)
-            if modalidade_id:
-                compras = compras.filter(modalidade_id=modalidade_id)
-            
-            compra_ids = list(compras.values_list('compra_id', flat=True))
-            itens = ItemCompra.objects.filter(compra_id__in=compra_ids).select_related('compra').prefetch_related('resultados__fornecedor')
-            
-            result_data = []
-            for item in itens:
-                resultado = item.resultados.first()
-                
-                # Calcula percentual de desconto
-                percentual_desconto = None
-                if item.valor_total_estimado and resultado and resultado.valor_total_homologado:
-                    if item.valor_total_estimado > 0:
-                        percentual_desconto = (
-                            (item.valor_total_estimado - resultado.valor_total_homologado) 
-                            / item.valor_total_estimado
-                        ) * 100
-                
-                result_data.append({
-                    'ano_compra': item.compra.ano_compra,
-                    'sequencial_compra': item.compra.sequencial_compra,
-                    'numero_item': item.numero_item,
-                    'cnpj_fornecedor': resultado.fornecedor.cnpj_fornecedor if resultado else None,
-                    'razao_social': resultado.fornecedor.razao_social if resultado else None,
-                    'descricao': item.descricao,
-                    'quantidade': item.quantidade,
-                    'valor_total_estimado': item.valor_total_estimado,
-                    'valor_total_homologado': resultado.valor_total_homologado if resultado else None,
-                    'percentual_desconto': percentual_desconto,
-                })
+            itens = ItemCompra.objects.merge_resultados(codigo_unidade, modalidade_id=modalidade_id)
             
-            serializer = ItemResultadoMergeSerializer(result_data, many=True)
+            serializer = ItemResultadoMergeSerializer(itens.iterator(chunk_size=MERGE_CHUNK_SIZE), many=True)
             return Response(serializer.data)
         except Exception as e:
             logger.error(f"Erro ao buscar itens por modalidade para unidade {codigo_unidade}: {str(e)}")
@@ -284,250 +191,20 @@ class CompraViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            from django.db.models import Prefetch
-            
-            # --- Compras ---
-            compras = Compra.objects.filter(codigo_unidade=codigo_unidade)
-            
-            if not compras.exists():
+            arquivo = gerar_xlsx_unidade(codigo_unidade)
+            if arquivo is None:
                 return Response(
                     {'error': f'Nenhuma compra encontrada para o código de unidade {codigo_unidade}'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            compra_ids = list(compras.values_list('compra_id', flat=True))
-            
-            # --- Itens ---
-            itens = ItemCompra.objects.filter(
-                compra_id__in=compra_ids
-            ).select_related('compra').prefetch_related('resultados__fornecedor')
-            
-            # --- Resultados ---
-            resultados_dict = {}
-            for item in itens:
-                resultado = item.resultados.first()
-                if resultado:
-                    resultados_dict[item.item_id] = resultado
-            
-            # --- Fornecedores ---
-            # Otimização: carregar apenas fornecedores relacionados aos resultados
-            fornecedores_cnpjs = set()
-            for item in itens:
-                resultado = item.resultados.first()
-                if resultado:
-                    fornecedores_cnpjs.add(resultado.fornecedor.cnpj_fornecedor)
-            
-            fornecedores_dict = {
-                f.cnpj_fornecedor: f.razao_social 
-                for f in Fornecedor.objects.filter(cnpj_fornecedor__in=fornecedores_cnpjs)
-            }
-            
-            # --- Merge Itens + Resultados ---
-            merge_data = []
-            for item in itens:
-                resultado = resultados_dict.get(item.item_id)
-                
-                percentual_desconto = None
-                if item.valor_total_estimado and resultado and resultado.valor_total_homologado:
-                    if item.valor_total_estimado > 0:
-                        percentual_desconto = (
-                            (item.valor_total_estimado - resultado.valor_total_homologado) 
-                            / item.valor_total_estimado
-                        ) * 100
-                
-                merge_data.append({
-                    'ano_compra': item.compra.ano_compra,
-                    'sequencial_compra': item.compra.sequencial_compra,
-                    'numero_item': item.numero_item,
-                    'descricao': item.descricao,
-                    'unidade_medida': item.unidade_medida,
-                    'valor_unitario_estimado': item.valor_unitario_estimado,
-                    'valor_total_estimado': item.valor_total_estimado,
-                    'quantidade': item.quantidade,
-                    'situacao_compra_item_nome': item.situacao_compra_item_nome,
-                    'cnpj_fornecedor': resultado.fornecedor.cnpj_fornecedor if resultado else None,
-                    'valor_total_homologado': resultado.valor_total_homologado if resultado else None,
-                    'valor_unitario_homologado': resultado.valor_unitario_homologado if resultado else None,
-                    'quantidade_homologada': resultado.quantidade_homologada if resultado else None,
-                    'percentual_desconto': percentual_desconto,
-                })
-            
-            # --- Modalidades Agregadas ---
-            modalidades = (
-                compras.select_related('modalidade')
-                .values('ano_compra', 'modalidade_id')
-                .annotate(
-                    quantidade_compras=Count('compra_id'),
-                    valor_total_homologado=Sum('valor_total_homologado')
-                )
-            )
-            # Formata para o serializer - busca objetos Modalidade completos
-            modalidades_formatted = []
-            for mod in modalidades:
-                modalidade_obj = None
-                modalidade_id = mod.get('modalidade_id')
-                if modalidade_id:
-                    try:
-                        modalidade_obj = Modalidade.objects.get(pk=modalidade_id)
-                    except Modalidade.DoesNotExist:
-                        pass
-                
-                modalidades_formatted.append({
-                    'ano_compra': mod['ano_compra'],
-                    'modalidade_id': modalidade_id,
-                    'modalidade': modalidade_obj,
-                    'quantidade_compras': mod['quantidade_compras'],
-                    'valor_total_homologado': mod['valor_total_homologado'],
-                })
-            modalidades = modalidades_formatted
-            
-            # --- Fornecedores Agregados ---
-            fornecedores_agregados = []
-            fornecedores_valores = {}
-            for item in merge_data:
-                if item['cnpj_fornecedor'] and item['valor_total_homologado']:
-                    cnpj = item['cnpj_fornecedor']
-                    if cnpj not in fornecedores_valores:
-                        fornecedores_valores[cnpj] = Decimal('0')
-                    fornecedores_valores[cnpj] += item['valor_total_homologado']
-            
-            for cnpj, valor in fornecedores_valores.items():
-                fornecedores_agregados.append({
-                    'cnpj_fornecedor': cnpj,
-                    'razao_social': fornecedores_dict.get(cnpj),
-                    'valor_total_homologado': valor,
-                })
-            
-            # --- Preparar dados das compras ---
-            compras_data = []
-            for compra in compras:
-                compra_dict = CompraSerializer(compra).data
-                compras_data.append(compra_dict)
-            
-            # --- Adicionar razao_social ao merge ---
-            for item in merge_data:
-                item['razao_social'] = fornecedores_dict.get(item['cnpj_fornecedor']) if item['cnpj_fornecedor'] else None
-            
-            # --- Criar dicionário de compras para lookup rápido ---
-            compras_lookup = {}
-            for compra in compras:
-                key = (compra.ano_compra, compra.sequencial_compra)
-                compras_lookup[key] = compra.modalidade if compra.modalidade else None
-            
-            # --- Itens por Modalidade ---
-            modalidades_unicas = compras.select_related('modalidade').values_list('modalidade', flat=True).distinct()
-            
-            # --- Criar XLSX ---
-            output = io.BytesIO()
-            wb = openpyxl.Workbook()
-            
-            # Remover sheet padrão
-            wb.remove(wb.active)
-            
-            # Função auxiliar para nome de sheet
-            def _sheet_name_from_modalidade(modalidade):
-                if not modalidade:
-                    return "modalidade"
-                nome = str(modalidade).strip()
-                nome = nome.replace("/", "-").replace("\\", "-").replace(":", "-")
-                nome = nome.replace("*", " ").replace("?", " ").replace("[", "(").replace("]", ")")
-                nome = " ".join(nome.split())
-                return nome[:31] if nome else "modalidade"
-            
-            # Sheet: compras
-            ws_compras = wb.create_sheet("compras")
-            if compras_data:
-                headers = list(compras_data[0].keys())
-                ws_compras.append(headers)
-                for compra in compras_data:
-                    ws_compras.append([compra.get(h) for h in headers])
-            
-            # Sheet: itens_resultado_merge
-            ws_merge = wb.create_sheet("itens_resultado_merge")
-            if merge_data:
-                headers = list(merge_data[0].keys())
-                ws_merge.append(headers)
-                for item in merge_data:
-                    ws_merge.append([item.get(h) for h in headers])
-            
-            # Sheet: modalidades
-            ws_modalidades = wb.create_sheet("modalidades")
-            ws_modalidades.append(['ano_compra', 'modalidade_id', 'modalidade_nome', 'quantidade_compras', 'valor_total_homologado'])
-            for mod in modalidades:
-                modalidade_nome = mod.get('modalidade').nome if mod.get('modalidade') else None
-                ws_modalidades.append([
-                    mod['ano_compra'],
-                    mod.get('modalidade_id'),
-                    modalidade_nome,
-                    mod['quantidade_compras'],
-                    mod['valor_total_homologado']
-                ])
-            
-            # Sheet: fornecedores
-            ws_fornecedores = wb.create_sheet("fornecedores")
-            ws_fornecedores.append(['cnpj_fornecedor', 'razao_social', 'valor_total_homologado'])
-            for f in fornecedores_agregados:
-                ws_fornecedores.append([
-                    f['cnpj_fornecedor'],
-                    f['razao_social'],
-                    f['valor_total_homologado']
-                ])
-            
-            # Sheet: inexigibilidade
-            inexigibilidade_modalidade = Modalidade.objects.filter(nome='Inexigibilidade').first()
-            inexigibilidade_data = [
-                item for item in merge_data
-                if compras_lookup.get((item['ano_compra'], item['sequencial_compra'])) == inexigibilidade_modalidade
-            ]
-            ws_inex = wb.create_sheet("inexigibilidade")
-            if inexigibilidade_data:
-                cols_inex = ['ano_compra', 'sequencial_compra', 'numero_item', 'cnpj_fornecedor', 
-                            'razao_social', 'descricao', 'quantidade', 'valor_total_estimado', 
-                            'valor_total_homologado', 'percentual_desconto']
-                ws_inex.append(cols_inex)
-                for item in inexigibilidade_data:
-                    ws_inex.append([item.get(c) for c in cols_inex])
-            
-            # Sheets por modalidade
-            for modalidade_id in modalidades_unicas:
-                if not modalidade_id:
-                    continue
-                
-                try:
-                    modalidade_obj = Modalidade.objects.get(id=modalidade_id)
-                except Modalidade.DoesNotExist:
-                    continue
-                
-                # Pula inexigibilidade (já tem sheet própria)
-                if modalidade_obj.nome.lower() == 'inexigibilidade':
-                    continue
-                
-                modalidade_data = [
-                    item for item in merge_data
-                    if compras_lookup.get((item['ano_compra'], item['sequencial_compra'])) == modalidade_obj
-                ]
-                
-                if not modalidade_data:
-                    continue
-                
-                sheet_name = _sheet_name_from_modalidade(modalidade_obj.nome)
-                ws_mod = wb.create_sheet(sheet_name)
-                cols_mod = ['ano_compra', 'sequencial_compra', 'numero_item', 'cnpj_fornecedor', 
-                           'razao_social', 'descricao', 'quantidade', 'valor_total_estimado', 
-                           'valor_total_homologado', 'percentual_desconto']
-                ws_mod.append(cols_mod)
-                for item in modalidade_data:
-                    ws_mod.append([item.get(c) for c in cols_mod])
-            
-            wb.save(output)
-            output.seek(0)
-            
-            response = HttpResponse(
-                output.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            # O arquivo é enviado em blocos e fechado pelo FileResponse ao final
+            return FileResponse(
+                arquivo,
+                as_attachment=True,
+                filename=f"compras_{codigo_unidade}.xlsx",
+                content_type=XLSX_CONTENT_TYPE,
             )
-            response['Content-Disposition'] = f'attachment; filename="compras_{codigo_unidade}.xlsx"'
-            return response
         except Exception as e:
             logger.error(f"Erro ao exportar XLSX para unidade {codigo_unidade}: {str(e)}")
             return Response(
@@ -698,43 +375,35 @@ class ModalidadesAgregadasAnoView(views.APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        cache_key = f"pncp_modalidades_agregadas_ano_{ano_compra}"
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return Response(cached)
-
         try:
+            # Soma o resumo por unidade (ver services/resumos.py) em vez de agrupar Compra
             modalidades = (
-                Compra.objects
+                ResumoCompraUnidade.objects
                 .filter(ano_compra=ano_compra)
-                .select_related('modalidade')
                 .values('ano_compra', 'modalidade_id')
                 .annotate(
-                    quantidade_compras=Count('compra_id'),
-                    valor_total_homologado=Sum('valor_total_homologado')
+                    total_compras=Sum('quantidade_compras'),
+                    total_homologado=Sum('valor_total_homologado')
                 )
                 .order_by('modalidade_id')
             )
+            modalidades_obj = Modalidade.objects.in_bulk(
+                [mod['modalidade_id'] for mod in modalidades if mod['modalidade_id']]
+            )
 
             modalidades_formatted = []
             for mod in modalidades:
-                modalidade_obj = None
                 modalidade_id = mod.get('modalidade_id')
-                if modalidade_id:
-                    modalidade_obj = Modalidade.objects.filter(id=modalidade_id).first()
-
                 modalidades_formatted.append({
                     'ano_compra': mod['ano_compra'],
                     'modalidade_id': modalidade_id,
-                    'modalidade': modalidade_obj,
-                    'quantidade_compras': mod['quantidade_compras'],
-                    'valor_total_homologado': mod['valor_total_homologado'],
+                    'modalidade': modalidades_obj.get(modalidade_id),
+                    'quantidade_compras': mod['total_compras'],
+                    'valor_total_homologado': mod['total_homologado'],
                 })
 
             serializer = ModalidadeAgregadaSerializer(modalidades_formatted, many=True)
-            response_data = serializer.data
-            cache.set(cache_key, response_data, timeout=60 * 60 * 2)
-            return Response(response_data)
+            return Response(serializer.data)
         except Exception as e:
             logger.error(f"Erro ao buscar modalidades agregadas por ano {ano_compra}: {str(e)}")
             return Response(
@@ -766,18 +435,27 @@ class UnidadesPorAnoView(views.APIView):
             )
 
         try:
-            # Buscar todas as unidades distintas com compras no ano especificado
-            unidades = (
-                Compra.objects
-                .filter(ano_compra=ano_compra)
-                .values('codigo_unidade', 'ano_compra')
-                .annotate(
-                    quantidade_compras=Count('compra_id'),
-                    valor_total_estimado=Sum('valor_total_estimado'),
-                    valor_total_homologado=Sum('valor_total_homologado')
+            # Buscar todas as unidades com compras no ano especificado (resumo por modalidade)
+            unidades = [
+                {
+                    'codigo_unidade': unidade['codigo_unidade'],
+                    'ano_compra': unidade['ano_compra'],
+                    'quantidade_compras': unidade['total_compras'],
+                    'valor_total_estimado': unidade['total_estimado'],
+                    'valor_total_homologado': unidade['total_homologado'],
+                }
+                for unidade in (
+                    ResumoCompraUnidade.objects
+                    .filter(ano_compra=ano_compra)
+                    .values('codigo_unidade', 'ano_compra')
+                    .annotate(
+                        total_compras=Sum('quantidade_compras'),
+                        total_estimado=Sum('valor_total_estimado'),
+                        total_homologado=Sum('valor_total_homologado')
+                    )
+                    .order_by('codigo_unidade')
                 )
-                .order_by('codigo_unidade')
-            )
+            ]
 
             serializer = UnidadePorAnoSerializer(unidades, many=True)
             return Response({
@@ -800,31 +478,27 @@ class AnosUnidadesComboView(views.APIView):
 
     def get(self, request):
         try:
-            # Buscar todos os anos distintos ordenados de forma decrescente
-            anos_distintos = (
-                Compra.objects
-                .values_list('ano_compra', flat=True)
+            # Pares (ano, unidade) distintos em uma única consulta ao resumo
+            pares = (
+                ResumoCompraUnidade.objects
+                .values_list('ano_compra', 'codigo_unidade')
                 .distinct()
-                .order_by('-ano_compra')
+                .order_by('-ano_compra', 'codigo_unidade')
             )
-            anos_list = list(anos_distintos)
+            codigos_por_ano = {}
+            for ano, codigo in pares:
+                codigos_por_ano.setdefault(ano, []).append(codigo)
+            anos_list = list(codigos_por_ano)
 
-            # Buscar todos os códigos de unidade únicos de uma vez para otimizar
-            todos_codigos_unidade = (
-                Compra.objects
-                .values_list('codigo_unidade', flat=True)
-                .distinct()
-            )
-            
             # Criar um dicionário de código_unidade -> sigla_om para lookup rápido
             siglas_cache = {}
-            codigos_para_buscar = []
-            for codigo in todos_codigos_unidade:
-                try:
-                    codigo_int = int(codigo)
-                    codigos_para_buscar.append(codigo_int)
-                except (ValueError, TypeError):
-                    pass
+            codigos_para_buscar = set()
+            for codigos in codigos_por_ano.values():
+                for codigo in codigos:
+                    try:
+                        codigos_para_buscar.add(int(codigo))
+                    except (ValueError, TypeError):
+                        pass
             
             # Buscar todas as UASGs de uma vez
             if codigos_para_buscar:
@@ -832,28 +506,13 @@ class AnosUnidadesComboView(views.APIView):
                 for uasg in uasgs:
                     siglas_cache[str(uasg['uasg'])] = uasg['sigla_om']
 
-            # Para cada ano, buscar os códigos de unidade distintos com sigla_om
-            unidades_por_ano = {}
-            for ano in anos_list:
-                # Buscar códigos de unidade distintos para o ano
-                codigos_unidade = (
-                    Compra.objects
-                    .filter(ano_compra=ano)
-                    .values_list('codigo_unidade', flat=True)
-                    .distinct()
-                    .order_by('codigo_unidade')
-                )
-                
-                # Criar lista de unidades com sigla_om usando o cache
-                unidades_com_sigla = []
-                for codigo in codigos_unidade:
-                    sigla_om = siglas_cache.get(codigo)
-                    unidades_com_sigla.append({
-                        'codigo_unidade': codigo,
-                        'sigla_om': sigla_om
-                    })
-                
-                unidades_por_ano[str(ano)] = unidades_com_sigla
+            unidades_por_ano = {
+                str(ano): [
+                    {'codigo_unidade': codigo, 'sigla_om': siglas_cache.get(codigo)}
+                    for codigo in codigos
+                ]
+                for ano, codigos in codigos_por_ano.items()
+            }
 
             return Response({
                 'anos': anos_list,
@@ -0,0 +1,255 @@
+"""
+Paginação por cursor (keyset) e projeção de campos para endpoints de listagem grandes.
+
+``KeysetPagination`` pagina pela própria ordenação do endpoint: o cursor guarda os
+valores da última linha da página e a próxima página é um ``WHERE`` sobre esses valores
+(sem ``OFFSET`` e sem ``COUNT(*)``), então o custo de cada página não depende de quantas
+linhas vieram antes. A chave primária entra como desempate quando a ordenação não é
+única.
+
+``KeysetListMixin.listar`` junta as duas coisas para as actions que antes devolviam o
+queryset inteiro com ``many=True``:
+
+- ``?fields=a,b`` reduz o serializer e, quando todos os campos pedidos mapeiam para
+  colunas, também a lista do ``SELECT`` (``.only()``);
+- ``?cursor=`` ou ``?page_size=`` ativam a paginação e a resposta passa a ser
+  ``{"next": ..., "results": [...]}``. Sem esses parâmetros a resposta continua sendo
+  a lista completa, como antes.
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+PARAM_CAMPOS = "fields"
+
+
+def _campo(ordem: str) -> str:
+    return ordem.lstrip("-")
+
+
+def _valor(obj: Any, campo: str) -> Any:
+    return getattr(obj, campo)
+
+
+def ordenacao_unica(model, ordering: Sequence[str]) -> List[str]:
+    """Acrescenta a chave primária à ordenação quando ela ainda não está lá."""
+    ordering = list(ordering)
+    pk = model._meta.pk.name
+    if not any(_campo(ordem) in (pk, "pk") for ordem in ordering):
+        ordering.append(pk)
+    return ordering
+
+
+def filtro_apos(ordering: Sequence[str], valores: Sequence[Any]) -> Q:
+    """
+    ``Q`` das linhas que vêm depois de ``valores`` na ``ordering`` informada.
+
+    Segue a ordenação padrão do PostgreSQL para nulos: eles vêm por último em campos
+    crescentes e primeiro em campos decrescentes.
+    """
+    filtro = Q(pk__in=[])
+    igualdade = Q()
+    for ordem, valor in zip(ordering, valores):
+        campo = _campo(ordem)
+        decrescente = ordem.startswith("-")
+        if valor is None:
+            # Nulo: só há linhas depois no decrescente (todos os não nulos)
+            depois = Q(**{f"{campo}__isnull": False}) if decrescente else Q(pk__in=[])
+            igual = Q(**{f"{campo}__isnull": True})
+        else:
+            if decrescente:
+                depois = Q(**{f"{campo}__lt": valor})
+            else:
+                depois = Q(**{f"{campo}__gt": valor}) | Q(**{f"{campo}__isnull": True})
+            igual = Q(**{campo: valor})
+        filtro |= igualdade & depois
+        igualdade &= igual
+    return filtro
+
+
+def _json_cursor(valor: Any) -> Any:
+    # isoformat completo: o DjangoJSONEncoder trunca microssegundos e o cursor perderia linhas
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    if isinstance(valor, (Decimal, UUID)):
+        return str(valor)
+    raise TypeError(f"Valor não serializável no cursor: {valor!r}")
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    dados = json.dumps(list(valores), default=_json_cursor, separators=(",", ":"))
+    return base64.urlsafe_b64encode(dados.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str, tamanho: int) -> List[Any]:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        raise NotFound("Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        raise NotFound("Cursor inválido")
+    return valores
+
+
+class KeysetPagination(BasePagination):
+    """Paginação por cursor sobre uma ordenação de colunas locais do modelo."""
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 100
+    max_page_size = 1000
+
+    def solicitada(self, request) -> bool:
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request) -> int:
+        try:
+            tamanho = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(tamanho, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None, ordering: Optional[Sequence[str]] = None):
+        ordering = ordenacao_unica(queryset.model, ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        self.request = request
+        self.ordering = ordering
+        self.tamanho = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(filtro_apos(ordering, decodificar_cursor(cursor, len(ordering))))
+
+        # Uma linha a mais indica se existe próxima página, sem COUNT(*)
+        linhas = list(queryset.order_by(*ordering)[: self.tamanho + 1])
+        self.tem_proxima = len(linhas) > self.tamanho
+        linhas = linhas[: self.tamanho]
+        self.ultimo = [_valor(linhas[-1], _campo(ordem)) for ordem in ordering] if linhas else None
+        return linhas
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.tem_proxima or self.ultimo is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.cursor_query_param, codificar_cursor(self.ultimo))
+        return replace_query_param(url, self.page_size_query_param, self.tamanho)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def campos_solicitados(request) -> Optional[List[str]]:
+    """Campos de ``?fields=a,b`` na ordem pedida, ou ``None`` sem o parâmetro."""
+    valor = request.query_params.get(PARAM_CAMPOS)
+    if not valor:
+        return None
+    return [campo.strip() for campo in valor.split(",") if campo.strip()]
+
+
+def projetar_serializer(serializer, campos: Optional[Sequence[str]]):
+    """Remove do serializer (ou do filho de um ListSerializer) os campos não pedidos."""
+    if campos is None:
+        return serializer
+    alvo = getattr(serializer, "child", serializer)
+    for nome in list(alvo.fields):
+        if nome not in campos:
+            alvo.fields.pop(nome)
+    return serializer
+
+
+def colunas_projecao(
+    model, serializer_class, campos: Sequence[str], obrigatorios: Sequence[str] = ()
+) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Caminhos para ``.only()`` dos ``campos`` do serializer, mais os ``obrigatorios``
+    (ordenação do cursor), e as relações a carregar com ``select_related``. Retorna
+    ``None`` quando algum campo não corresponde a uma coluna (métodos, ``source='*'``,
+    relações reversas) e o ``SELECT`` deve ficar como está.
+    """
+    fields = serializer_class().fields
+    colunas = {model._meta.pk.name}
+    for campo in obrigatorios:
+        # Anotações da ordenação (ex.: rank da busca) não entram no .only()
+        try:
+            model._meta.get_field(campo)
+        except FieldDoesNotExist:
+            continue
+        colunas.add(campo)
+    relacoes = set()
+    for nome in campos:
+        field = fields.get(nome)
+        if field is None:
+            continue
+        partes = (field.source or nome).split(".")
+        if "*" in partes:
+            return None
+        atual = model
+        for i, parte in enumerate(partes):
+            try:
+                model_field = atual._meta.get_field(parte)
+            except FieldDoesNotExist:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                return None
+            if model_field.is_relation:
+                # FK no meio do caminho ou serializada inteira (serializer aninhado)
+                relacoes.add("__".join(partes[: i + 1]))
+                atual = model_field.related_model
+            elif i < len(partes) - 1:
+                return None
+        colunas.add("__".join(partes))
+    return sorted(colunas), sorted(relacoes)
+
+
+class KeysetListMixin:
+    """Listagem de actions com ``?fields=`` e paginação por cursor opcional."""
+
+    keyset_pagination_class = KeysetPagination
+
+    def listar(self, queryset, ordering: Sequence[str], serializer_class=None) -> Response:
+        serializer_class = serializer_class or self.get_serializer_class()
+        ordering = ordenacao_unica(queryset.model, ordering)
+        campos = campos_solicitados(self.request)
+        if campos is not None:
+            projecao = colunas_projecao(
+                queryset.model, serializer_class, campos, [_campo(ordem) for ordem in ordering]
+            )
+            if projecao is not None:
+                # select_related só das relações projetadas: as demais seriam adiadas e percorridas
+                colunas, relacoes = projecao
+                queryset = queryset.select_related(None).select_related(*relacoes).only(*colunas)
+
+        paginator = self.keyset_pagination_class()
+        contexto = self.get_serializer_context()
+        if paginator.solicitada(self.request):
+            try:
+                pagina = paginator.paginate_queryset(queryset, self.request, view=self, ordering=ordering)
+            except NotFound as e:
+                # As actions tratam exceções genéricas como 500; cursor inválido é erro do cliente
+                return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+            serializer = projetar_serializer(serializer_class(pagina, many=True, context=contexto), campos)
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = serializer_class(queryset.order_by(*ordering), many=True, context=contexto)
+        return Response(projetar_serializer(serializer, campos).data)
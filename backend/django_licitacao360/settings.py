@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -306,35 +307,10 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(hour=12, minute=0),  # Diariamente às 10:00 BRT/BRST (Brasília)
     },
     # Sincronização de Contratos ComprasNet
-    "sync_contratos_uasg_787010": {
-        "task": "django_licitacao360.apps.gestao_contratos.tasks.sync_contratos_uasg",
-        "schedule": crontab(hour=22, minute=5),  # Diariamente às 22:05 BRT/BRST (Brasília) 789330
-        "args": ("787010",),
-    },
-    "sync_contratos_uasg_789330": {
-        "task": "django_licitacao360.apps.gestao_contratos.tasks.sync_contratos_uasg",
-        "schedule": crontab(hour=9, minute=30),  # Diariamente às 22:05 BRT/BRST (Brasília)
-        "args": ("789330",), # capitania dos portos do paraná - cppr
-    },
-    "sync_contratos_uasg_732100": {
-        "task": "django_licitacao360.apps.gestao_contratos.tasks.sync_contratos_uasg",
-        "schedule": crontab(hour=9, minute=28),  # Diariamente às 22:05 BRT/BRST (Brasília)
-        "args": ("732110",), # centro de instrução CIASC
-    },
-    "sync_contratos_uasg_765701": {
-        "task": "django_licitacao360.apps.gestao_contratos.tasks.sync_contratos_uasg",
-        "schedule": crontab(hour=9, minute=25),  # Diariamente às 22:05 BRT/BRST (Brasília)
-        "args": ("765701",), #  Hospital Central da Marinha - HCM
-    },
-    "sync_contratos_uasg_787400": {
-        "task": "django_licitacao360.apps.gestao_contratos.tasks.sync_contratos_uasg",
-        "schedule": crontab(hour=22, minute=7),  # Diariamente às 22:07 BRT/BRST (Brasília)
-        "args": ("787400",),
-    },
-    "sync_contratos_uasg_787700": {
-        "task": "django_licitacao360.apps.gestao_contratos.tasks.sync_contratos_uasg",
-        "schedule": crontab(hour=22, minute=7),  # Diariamente às 22:07 BRT/BRST (Brasília)
-        "args": ("787700",),
+    # UASGs vêm de uasgs.Uasg (ativa=True); concorrência em CONTRATOS_SYNC_CONCORRENCIA
+    "sync_contratos_uasgs_ativas": {
+        "task": "django_licitacao360.apps.gestao_contratos.tasks.sync_contratos_uasgs_ativas",
+        "schedule": crontab(hour=22, minute=5),  # Diariamente às 22:05 BRT/BRST (Brasília)
     },
     # Atualização de Sequenciais PNCP
     "atualizacao_seq_pncp_08": {